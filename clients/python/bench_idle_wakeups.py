@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+空闲唤醒基准测试
+
+在本地替身服务器上启动完整的客户端（剪贴板使用带变化通知的内存剪贴板），等待启动时的首次同步完成后，
+空闲 --idle 秒，用 psutil 统计各线程的主动上下文切换次数（线程每次从等待中醒来计一次），
+换算为每分钟唤醒次数，按运行方式（threads / asyncio）分别输出：
+- 进程合计的每分钟唤醒次数
+- 各线程的每分钟唤醒次数（按线程名汇总）
+- 同期到期执行的定时任务次数（心跳、定时截图等按配置间隔执行的工作）
+
+空闲期间的唤醒应当只来自到期的定时任务，不应有固定间隔的轮询。
+
+示例：
+    python bench_idle_wakeups.py
+    python bench_idle_wakeups.py --idle 30 --settle 5 --output idle.json
+    python bench_idle_wakeups.py --screenshot-interval 3600   # 没有到期任务时的基线
+"""
+
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import psutil
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from core.config import AppConfig
+from core.client import ScreenMonitorClient
+from modules.clipboard_watcher import MemoryClipboardWatcher
+from mock_server import MockBackend
+
+logger = logging.getLogger("bench_idle_wakeups")
+
+
+class _BenchClient(ScreenMonitorClient):
+    """使用内存剪贴板的客户端（无图形环境下没有剪贴板变化通知），白名单缓存写入临时目录"""
+
+    cache_dir: Path = None
+
+    def _initialize_modules(self, client_id: str) -> None:
+        super()._initialize_modules(client_id)
+        self.clipboard_monitor._watcher = MemoryClipboardWatcher(self.logger)
+        self.clipboard_monitor._owns_watcher = False
+        self.whitelist_manager._cache_file = self.cache_dir / "whitelist.json"
+
+
+def _thread_switches() -> Dict[int, int]:
+    """各线程的主动上下文切换次数（线程ID -> 次数）
+
+    Linux 上逐个线程读取；其他平台只能取得进程合计，记在进程ID下。
+    """
+    process = psutil.Process()
+    if not sys.platform.startswith('linux'):
+        return {process.pid: process.num_ctx_switches().voluntary}
+    switches = {}
+    for thread in process.threads():
+        try:
+            switches[thread.id] = psutil.Process(thread.id).num_ctx_switches().voluntary
+        except psutil.Error:
+            continue
+    return switches
+
+
+def _thread_names() -> Dict[int, str]:
+    names = {}
+    for thread in threading.enumerate():
+        native_id = getattr(thread, 'native_id', None)
+        if native_id is not None:
+            names[native_id] = thread.name
+    return names
+
+
+def _group(name: str) -> str:
+    # 线程池线程名带序号（xxxWorker_0），按线程池汇总
+    return name.rsplit('_', 1)[0] if name.rsplit('_', 1)[-1].isdigit() else name
+
+
+def simulate(mode: str, args) -> Dict:
+    backend = MockBackend()
+    backend.start()
+    config = AppConfig()
+    config.server.api_base_url = backend.api_base_url
+    config.server.websocket_url = ""
+    config.server.timeout = 5
+    config.runtime.mode = mode
+    config.violation_report.two_phase = True
+    if args.screenshot_interval:
+        config.screenshot.interval = args.screenshot_interval
+    client = _BenchClient(config, logger)
+    cache_dir = tempfile.TemporaryDirectory()
+    client.cache_dir = Path(cache_dir.name)
+    try:
+        client.start()
+        # 启动时的首次同步、注册等一次性工作完成后再开始统计
+        time.sleep(args.settle)
+
+        runs_before = {name: job['runs'] for name, job in client.scheduler.get_stats().items()}
+        before = _thread_switches()
+        started = time.monotonic()
+        time.sleep(args.idle)
+        elapsed = time.monotonic() - started
+        after = _thread_switches()
+        names = _thread_names()
+        job_runs = {name: job['runs'] - runs_before.get(name, 0)
+                    for name, job in client.scheduler.get_stats().items()}
+    finally:
+        client.stop()
+        backend.stop()
+        cache_dir.cleanup()
+
+    main_id = threading.main_thread().native_id
+    per_minute = 60.0 / elapsed
+    threads = defaultdict(float)
+    for thread_id, count in after.items():
+        name = _group(names.get(thread_id, f"thread-{thread_id}"))
+        # 主线程在统计期间只在 sleep 中；替身服务器的线程不属于客户端
+        if thread_id == main_id or name.startswith("MockBackend"):
+            continue
+        threads[name] += (count - before.get(thread_id, 0)) * per_minute
+
+    return {
+        'mode': mode,
+        'threads': len(after),
+        'job_runs': {name: runs for name, runs in sorted(job_runs.items()) if runs},
+        'wakeups_per_minute': round(sum(threads.values()), 1),
+        'per_thread': {name: round(value, 1) for name, value in sorted(threads.items()) if value}
+    }
+
+
+def run(args) -> List[Dict]:
+    results = [simulate(mode, args) for mode in args.modes]
+
+    print(f"空闲 {args.idle} 秒（启动后等待 {args.settle} 秒）")
+    print(f"{'方式':<10}{'线程数':>6}{'唤醒/分钟':>12}  到期任务")
+    for result in results:
+        jobs = ', '.join(f"{name}×{runs}" for name, runs in result['job_runs'].items()) or '-'
+        print(f"{result['mode']:<10}{result['threads']:>6}{result['wakeups_per_minute']:>12.1f}  {jobs}")
+        for name, value in result['per_thread'].items():
+            print(f"    {name:<32}{value:>8.1f}")
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='空闲唤醒基准测试（psutil 上下文切换）')
+    parser.add_argument('--idle', type=float, default=20, help='空闲统计时间（秒）')
+    parser.add_argument('--settle', type=float, default=3, help='启动后等待首次同步完成的时间（秒）')
+    parser.add_argument('--screenshot-interval', type=int, help='定时截图间隔（秒），默认使用配置默认值')
+    parser.add_argument('--modes', nargs='+', default=['threads', 'asyncio'], choices=['threads', 'asyncio'],
+                        help='运行方式')
+    parser.add_argument('--max-wakeups', type=float, help='每分钟唤醒次数上限，超出时返回非0')
+    parser.add_argument('--output', help='结果输出路径(JSON)')
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding='utf-8')
+    if args.max_wakeups is not None:
+        return 0 if all(result['wakeups_per_minute'] <= args.max_wakeups for result in results) else 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
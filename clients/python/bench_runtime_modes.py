@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行方式基准测试（threads / asyncio）
+
+按两种运行方式分别启动定时调度器（--jobs 个周期任务，间隔 --interval 秒）和剪贴板监控器（内存剪贴板），
+先空闲 --idle 秒，再模拟 --copies 次复制违规地址，统计：
+- 新增线程数（启动后、处理复制之后）
+- 空闲期间的进程CPU时间
+- 从发现剪贴板变化到清空完成的耗时（p50/p95）
+
+示例：
+    python bench_runtime_modes.py
+    python bench_runtime_modes.py --jobs 6 --interval 0.2 --idle 5 --copies 50
+"""
+
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from core.config import AppConfig
+from modules.clipboard import ClipboardMonitor
+from modules.clipboard_watcher import MemoryClipboardWatcher
+from utils.async_runtime import AsyncRuntime
+from utils.scheduler import Scheduler
+
+logger = logging.getLogger("bench_runtime_modes")
+
+ETH_ADDRESS = "0x742d35Cc6634C0532925a3b8D4C9db96C4b4d8b6"
+
+
+class _Reporter:
+    def __init__(self):
+        self.reported = 0
+
+    def report_violation(self, violation_data, evidence=None):
+        self.reported += 1
+        return True
+
+
+class _Whitelist:
+    def is_address_whitelisted(self, address, blockchain_type):
+        return False
+
+
+def simulate(mode: str, args) -> Dict:
+    threads_before = threading.active_count()
+    config = AppConfig()
+    runtime = AsyncRuntime(logger, workers=config.runtime.executor_workers) if mode == 'asyncio' else None
+    if runtime:
+        runtime.start()
+
+    scheduler = Scheduler(logger, seed="bench", max_workers=config.scheduler.workers, runtime=runtime)
+    for index in range(args.jobs):
+        scheduler.add_job(f"job{index}", lambda: True, interval=args.interval)
+    scheduler.start()
+
+    watcher = MemoryClipboardWatcher(logger, initial_text="")
+    reporter = _Reporter()
+    monitor = ClipboardMonitor(config, "BENCH-CLIENT", logger, _Whitelist(), reporter, clipboard_watcher=watcher)
+    monitor._capture_violation_screenshot = lambda: None
+    if runtime:
+        monitor.start_async(runtime)
+    else:
+        threading.Thread(target=monitor.start, name="ClipboardMonitor", daemon=True).start()
+    while watcher.read_count < 1:
+        time.sleep(0.01)
+    threads_started = threading.active_count() - threads_before
+
+    cpu_before = time.process_time()
+    time.sleep(args.idle)
+    idle_cpu = time.process_time() - cpu_before
+
+    for index in range(args.copies):
+        cleared = watcher.clear_count
+        watcher.set_text(f"第{index}次 转账地址 {ETH_ADDRESS}")
+        deadline = time.monotonic() + 5
+        while watcher.clear_count == cleared and time.monotonic() < deadline:
+            time.sleep(0.001)
+    threads_busy = threading.active_count() - threads_before
+    latency = monitor.get_performance_metrics()['clearLatencyMs']
+
+    monitor.stop()
+    scheduler.stop()
+    if runtime:
+        runtime.stop()
+
+    return {
+        'mode': mode,
+        'threads_started': threads_started,
+        'threads_busy': threads_busy,
+        'idle_cpu_ms': round(idle_cpu * 1000, 1),
+        'clears': watcher.clear_count,
+        'clear_p50_ms': latency.get('p50', 0),
+        'clear_p95_ms': latency.get('p95', 0)
+    }
+
+
+def run(args) -> List[Dict]:
+    results = [simulate(mode, args) for mode in ('threads', 'asyncio')]
+
+    print(f"{args.jobs} 个周期任务（间隔 {args.interval}秒），空闲 {args.idle}秒，复制 {args.copies} 次违规地址")
+    print(f"{'方式':<10}{'启动线程':>8}{'处理后线程':>10}{'空闲CPU(ms)':>12}{'清空次数':>8}"
+          f"{'清空p50(ms)':>12}{'清空p95(ms)':>12}")
+    for result in results:
+        print(f"{result['mode']:<10}{result['threads_started']:>8}{result['threads_busy']:>10}"
+              f"{result['idle_cpu_ms']:>12.1f}{result['clears']:>8}"
+              f"{result['clear_p50_ms']:>12.2f}{result['clear_p95_ms']:>12.2f}")
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='运行方式基准测试（threads/asyncio）')
+    parser.add_argument('--jobs', type=int, default=4, help='周期任务数')
+    parser.add_argument('--interval', type=float, default=0.5, help='周期任务间隔（秒）')
+    parser.add_argument('--idle', type=float, default=3.0, help='空闲观察时间（秒）')
+    parser.add_argument('--copies', type=int, default=20, help='模拟复制违规地址的次数')
+    parser.add_argument('--output', help='结果输出路径(JSON)')
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding='utf-8')
+    return 0 if all(result['clears'] == args.copies for result in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
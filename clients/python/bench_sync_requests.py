@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+同步请求数基准测试
+
+在本地替身服务器上模拟单个客户端运行若干小时（虚拟时间，按各任务间隔依次执行同步），
+统计每客户端每小时发往服务器的同步请求数：
+- separate：配置、规则包、白名单分别请求（当前方式）
+- combined：合并同步，一次请求携带各资源的本地版本
+
+期间服务器按 --changes 指定的次数更新白名单、配置和规则包，验证合并同步后客户端状态一致。
+截图上传（附带心跳）两种方式相同，单独列出。
+
+示例：
+    python bench_sync_requests.py
+    python bench_sync_requests.py --hours 4 --whitelist-interval 300 --changes 2
+"""
+
+import sys
+import copy
+import json
+import heapq
+import logging
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from core.config import AppConfig
+from modules.http_client import HttpClient
+from modules.rule_pack import DEFAULT_RULE_PACK, RulePackManager, get_active_rule_pack
+from modules.whitelist import WhitelistManager
+from mock_server import MockBackend
+
+logger = logging.getLogger("bench_sync_requests")
+
+CLIENT_ID = "BENCH-CLIENT"
+
+
+def _make_config(args, api_base_url: str) -> AppConfig:
+    config = AppConfig()
+    config.server.api_base_url = api_base_url
+    config.server.timeout = 5
+    config.config_sync.interval = args.config_interval
+    config.whitelist.sync_interval = args.whitelist_interval
+    config.blockchain.rule_pack_sync = True
+    return config
+
+
+def _addresses(version: int) -> List[str]:
+    return [f"0x{index:040x}" for index in range(version * 10, version * 10 + 200)]
+
+
+def simulate(mode: str, args) -> Dict:
+    """模拟一个客户端在虚拟时间内的同步，返回请求统计"""
+    backend = MockBackend()
+    backend.set_whitelist(_addresses(0))
+    backend.set_client_config({'screenshotInterval': args.screenshot_interval})
+    rule_pack = copy.deepcopy(DEFAULT_RULE_PACK)
+    backend.set_rule_pack(rule_pack)
+    backend.start()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        config = _make_config(args, backend.api_base_url)
+        whitelist = WhitelistManager(config, logger)
+        whitelist._cache_file = Path(cache_dir) / "whitelist.json"
+        whitelist._publish(frozenset(), 0)
+        rule_packs = RulePackManager(config, logger)
+        rule_packs._cache_file = Path(cache_dir) / "rule_pack.json"
+        client = HttpClient(config, CLIENT_ID, logger, whitelist, rule_packs)
+
+        # 各同步任务：(下次执行时刻, 名称, 间隔, 执行函数)
+        if mode == 'combined':
+            client._combined = True
+            whitelist.set_sync_delegate(client._request_combined_sync)
+            jobs = [(0.0, 'combined', client._config_sync_interval(), client._run_config_sync)]
+        else:
+            client._combined = False
+            jobs = [(0.0, 'config', config.config_sync.interval, client._run_config_sync),
+                    (0.0, 'whitelist', config.whitelist.sync_interval, whitelist._sync_whitelist)]
+        heapq.heapify(jobs)
+
+        duration = args.hours * 3600
+        change_times = [duration * (index + 1) / (args.changes + 1) for index in range(args.changes)]
+        changes = 0
+        runs = 0
+        try:
+            while jobs[0][0] < duration:
+                due, name, interval, func = heapq.heappop(jobs)
+                # 到期前发生的服务器端变更
+                while change_times and change_times[0] <= due:
+                    change_times.pop(0)
+                    changes += 1
+                    backend.set_whitelist(_addresses(changes))
+                    backend.set_client_config({'screenshotInterval': args.screenshot_interval, 'revision': changes})
+                    rule_pack = dict(rule_pack, version=f"bench-{changes}")
+                    backend.set_rule_pack(rule_pack)
+                func()
+                runs += 1
+                heapq.heappush(jobs, (due + interval, name, interval, func))
+
+            consistent = (
+                whitelist.get_snapshot().version == backend.whitelist_version
+                and get_active_rule_pack().digest == backend.rule_pack_digest(rule_pack)
+            )
+        finally:
+            backend.stop()
+            client.stop()
+            rule_packs.stop()
+
+    by_path: Dict[str, int] = {}
+    for request in backend.requests:
+        by_path[request['path']] = by_path.get(request['path'], 0) + 1
+    total = len(backend.requests)
+    return {
+        'mode': mode,
+        'hours': args.hours,
+        'job_runs': runs,
+        'requests': total,
+        'requests_per_agent_hour': round(total / args.hours, 1),
+        'by_path': by_path,
+        'server_changes': changes,
+        'consistent': consistent
+    }
+
+
+def run(args) -> List[Dict]:
+    results = [simulate(mode, args) for mode in ('separate', 'combined')]
+    uploads_per_hour = 3600 / args.screenshot_interval
+
+    print(f"{'方式':<10}{'同步请求/客户端/小时':>20}{'含截图心跳上传':>16}  状态一致")
+    for result in results:
+        rate = result['requests_per_agent_hour']
+        print(f"{result['mode']:<10}{rate:>20.1f}{rate + uploads_per_hour:>16.1f}  {result['consistent']}")
+    for result in results:
+        print(f"  {result['mode']}: " + ", ".join(f"{path} x{count}" for path, count in sorted(result['by_path'].items())))
+
+    before, after = results[0]['requests_per_agent_hour'], results[1]['requests_per_agent_hour']
+    if before:
+        print(f"同步请求减少 {100 * (before - after) / before:.0f}%（截图上传每小时 {uploads_per_hour:.0f} 次，两种方式相同）")
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='同步请求数基准测试（分别同步 vs 合并同步）')
+    parser.add_argument('--hours', type=float, default=1.0, help='模拟时长（小时）')
+    parser.add_argument('--config-interval', type=int, default=300, help='配置同步间隔（秒）')
+    parser.add_argument('--whitelist-interval', type=int, default=300, help='白名单同步间隔（秒）')
+    parser.add_argument('--screenshot-interval', type=int, default=15, help='截图（附带心跳）间隔（秒）')
+    parser.add_argument('--changes', type=int, default=2, help='模拟期间服务器端更新次数')
+    parser.add_argument('--output', help='结果输出路径(JSON)')
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding='utf-8')
+    return 0 if all(result['consistent'] for result in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+违规突发上报基准测试
+
+模拟用户一次粘贴大量地址：在本地替身服务器上（--latency 模拟网络往返时间）一次产生 --events 个违规事件，
+统计违规上报器清空队列所需的时间和请求数：
+- single：1 个发送线程，逐个上报（原方式）
+- concurrent：--senders 个发送线程，逐个上报
+- batch：1 个发送线程，每个请求最多 --batch-size 个事件
+- concurrent+batch：--senders 个发送线程，批量上报
+
+同时检查服务器按 clientSeq 排序后的事件顺序与产生顺序一致、没有重复。
+
+示例：
+    python bench_violation_burst.py
+    python bench_violation_burst.py --events 500 --latency 0.1 --senders 8 --batch-size 50
+"""
+
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from core.config import AppConfig
+from modules.violation import ViolationReporter
+from mock_server import MockBackend
+
+logger = logging.getLogger("bench_violation_burst")
+
+CLIENT_ID = "BENCH-CLIENT"
+
+
+def simulate(mode: str, senders: int, batch_size: int, args) -> Dict:
+    """产生一次突发违规并等待上报完成，返回耗时和请求统计"""
+    backend = MockBackend()
+    backend.latency = args.latency
+    backend.start()
+
+    config = AppConfig()
+    config.server.api_base_url = backend.api_base_url
+    config.server.timeout = 10
+    config.violation_report.two_phase = True
+    config.violation_report.senders = senders
+    config.violation_report.batch_size = batch_size
+    config.violation_queue.max_events = max(config.violation_queue.max_events, args.events)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        reporter = ViolationReporter(config, CLIENT_ID, logger, data_dir=Path(data_dir))
+        # 基准只统计元数据上报，不截图
+        reporter._get_current_screenshot = lambda: None
+        reporter.start()
+        try:
+            started = time.perf_counter()
+            event_ids = []
+            for index in range(args.events):
+                event = {'violationType': 'BLOCKCHAIN_ADDRESS', 'violationContent': f"0x{index:040x}"}
+                reporter.report_violation(event)
+                event_ids.append(event['event_id'])
+            enqueued = time.perf_counter() - started
+
+            deadline = time.monotonic() + args.timeout
+            while reporter.get_queue_size() and time.monotonic() < deadline:
+                time.sleep(0.005)
+            drained = time.perf_counter() - started
+        finally:
+            reporter.stop()
+            backend.stop()
+
+    received = sorted(backend.violations, key=lambda metadata: metadata['clientSeq'])
+    in_order = [metadata['clientEventId'] for metadata in received] == event_ids
+    return {
+        'mode': mode,
+        'senders': senders,
+        'batch_size': batch_size,
+        'events': args.events,
+        'enqueue_seconds': round(enqueued, 3),
+        'drain_seconds': round(drained, 3),
+        'events_per_second': round(args.events / drained, 1),
+        'requests': len(backend.requests),
+        'order_preserved': in_order
+    }
+
+
+def run(args) -> List[Dict]:
+    variants = [
+        ('single', 1, 1),
+        ('concurrent', args.senders, 1),
+        ('batch', 1, args.batch_size),
+        ('concurrent+batch', args.senders, args.batch_size),
+    ]
+    results = [simulate(mode, senders, batch_size, args) for mode, senders, batch_size in variants]
+
+    print(f"突发 {args.events} 个违规事件，往返时间 {args.latency * 1000:.0f}ms")
+    print(f"{'方式':<18}{'发送线程':>8}{'批量':>6}{'清空耗时(秒)':>14}{'事件/秒':>10}{'请求数':>8}  顺序一致")
+    for result in results:
+        print(f"{result['mode']:<18}{result['senders']:>8}{result['batch_size']:>6}"
+              f"{result['drain_seconds']:>14.2f}{result['events_per_second']:>10.1f}{result['requests']:>8}"
+              f"  {result['order_preserved']}")
+
+    baseline = results[0]['drain_seconds']
+    for result in results[1:]:
+        print(f"  {result['mode']}: 比逐个上报快 {baseline / result['drain_seconds']:.1f} 倍")
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='违规突发上报基准测试（逐个/并发/批量）')
+    parser.add_argument('--events', type=int, default=200, help='突发产生的违规事件数')
+    parser.add_argument('--latency', type=float, default=0.05, help='模拟网络往返时间（秒）')
+    parser.add_argument('--senders', type=int, default=4, help='并发发送线程数')
+    parser.add_argument('--batch-size', type=int, default=25, help='批量上报每个请求的事件数')
+    parser.add_argument('--timeout', type=float, default=120, help='等待清空队列的最长时间（秒）')
+    parser.add_argument('--output', help='结果输出路径(JSON)')
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding='utf-8')
+    return 0 if all(result['order_preserved'] for result in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
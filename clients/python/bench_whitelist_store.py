@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+白名单存储基准测试
+
+比较两种白名单存储在不同规模下的加载时间、内存占用(RSS)和查找延迟：
+- memory：当前方式，JSON缓存加载为内存中的字符串集合
+- compact：mmap映射的紧凑哈希文件（可选Bloom过滤器）
+
+每个变体在独立子进程中加载，RSS互不影响。
+
+示例：
+    python bench_whitelist_store.py
+    python bench_whitelist_store.py --sizes 10000 1000000 --lookups 50000 --bloom 10
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import psutil
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from modules.whitelist_store import CompactWhitelist
+
+HIT_SEED = 1
+MISS_SEED = 2
+
+
+def generate_addresses(count: int, seed: int = HIT_SEED) -> Iterator[str]:
+    """生成确定性的EVM风格地址（已标准化为小写）"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield f"0x{rng.getrandbits(160):040x}"
+
+
+def write_json_cache(path: Path, count: int) -> None:
+    """按当前白名单缓存格式写出JSON（流式写出，避免在父进程持有全部地址）"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"addresses":[')
+        for index, address in enumerate(generate_addresses(count)):
+            f.write(('"' if index == 0 else ',"') + address + '"')
+        f.write('],"last_update":0}')
+
+
+def _rss_mb() -> float:
+    return psutil.Process().memory_info().rss / 1024 / 1024
+
+
+def _measure_lookups(container, addresses: List[str]) -> float:
+    """返回平均单次查找耗时（微秒）"""
+    started = time.perf_counter()
+    for address in addresses:
+        address in container
+    return (time.perf_counter() - started) / len(addresses) * 1e6
+
+
+def run_child(variant: str, path: str, size: int, lookups: int) -> Dict:
+    """子进程：加载一种存储并测量"""
+    hits = list(generate_addresses(min(lookups, size)))
+    misses = list(generate_addresses(lookups, seed=MISS_SEED))
+    rss_before = _rss_mb()
+
+    started = time.perf_counter()
+    if variant == 'memory':
+        with open(path, 'r', encoding='utf-8') as f:
+            container = frozenset(json.load(f)['addresses'])
+    else:
+        container = CompactWhitelist(path)
+    load_seconds = time.perf_counter() - started
+    rss_loaded = _rss_mb()
+
+    hit_us = _measure_lookups(container, hits)
+    miss_us = _measure_lookups(container, misses)
+
+    return {
+        'variant': variant,
+        'size': size,
+        'file_mb': round(os.path.getsize(path) / 1024 / 1024, 1),
+        'load_ms': round(load_seconds * 1000, 2),
+        'rss_added_mb': round(rss_loaded - rss_before, 1),
+        'rss_after_lookups_mb': round(_rss_mb() - rss_before, 1),
+        'hit_us': round(hit_us, 2),
+        'miss_us': round(miss_us, 2)
+    }
+
+
+def _spawn(variant: str, path: Path, size: int, lookups: int) -> Dict:
+    output = subprocess.check_output([
+        sys.executable, __file__, '--child', variant, str(path), '--sizes', str(size), '--lookups', str(lookups)
+    ])
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+
+def run(sizes: List[int], lookups: int, bloom_bits: int, work_dir: Optional[str] = None) -> List[Dict]:
+    """执行全部基准测试"""
+    results = []
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp_dir:
+        for size in sizes:
+            json_path = Path(tmp_dir) / f"whitelist_{size}.json"
+            write_json_cache(json_path, size)
+            results.append(_spawn('memory', json_path, size, lookups))
+            json_path.unlink()
+
+            variants = [('compact', 0)] + ([('compact+bloom', bloom_bits)] if bloom_bits > 0 else [])
+            for name, bits in variants:
+                store_path = Path(tmp_dir) / f"whitelist_{size}_{bits}.bin"
+                started = time.perf_counter()
+                CompactWhitelist.build(store_path, generate_addresses(size), bloom_bits_per_entry=bits).close()
+                build_seconds = time.perf_counter() - started
+
+                result = _spawn('compact', store_path, size, lookups)
+                result['variant'] = name
+                result['build_s'] = round(build_seconds, 1)
+                results.append(result)
+                store_path.unlink()
+
+            for result in results[-(1 + len(variants)):]:
+                print(_format_row(result), file=sys.stderr)
+    return results
+
+
+def _format_row(result: Dict) -> str:
+    return (f"{result['size']:>10,} {result['variant']:<14} 文件 {result['file_mb']:>8} MB  "
+            f"加载 {result['load_ms']:>10} ms  RSS +{result['rss_added_mb']:>8} MB "
+            f"(查找后 +{result['rss_after_lookups_mb']} MB)  "
+            f"命中 {result['hit_us']} us  未命中 {result['miss_us']} us")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='白名单存储基准测试（RSS与查找延迟）')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 1_000_000, 10_000_000],
+                        help='白名单地址数量')
+    parser.add_argument('--lookups', type=int, default=100_000, help='命中/未命中各查找次数')
+    parser.add_argument('--bloom', type=int, default=10, help='Bloom过滤器每地址位数，0表示不测试Bloom')
+    parser.add_argument('--work-dir', help='临时文件目录（10M规模需要约1GB空间）')
+    parser.add_argument('--output', help='结果输出路径(JSON)')
+    parser.add_argument('--child', nargs=2, metavar=('VARIANT', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_child(args.child[0], args.child[1], args.sizes[0], args.lookups)))
+        return 0
+
+    results = run(args.sizes, args.lookups, args.bloom, args.work_dir)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding='utf-8')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+离线批量区块链地址检测工具
+
+用于检测规则变更后回放历史剪贴板/违规文本，评估检测效果：
+- 支持逐行文本或JSONL输入（文件或标准输入），流式读取
+- 使用进程池并行检测，检测逻辑与客户端 BlockchainAddressDetector 完全一致
+- 输出逐条检测结果（JSONL）和汇总报告（精确率/召回率/吞吐量）
+
+JSONL 记录字段：
+- content（可通过 --field 指定）：待检测文本
+- id：可选，原样写入结果
+- expected：可选，期望检测到的地址列表，用于计算地址级精确率/召回率
+- label：可选，布尔值，该记录是否应检测到地址，用于计算记录级精确率/召回率
+
+示例：
+    python detect_batch.py exported.jsonl --workers 4 --output results.jsonl --report report.json
+    cat clipboard.log | python detect_batch.py - --format text
+"""
+
+import sys
+import json
+import time
+import logging
+import argparse
+import multiprocessing
+from collections import Counter, deque
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, TextIO
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from modules.blockchain_detector import BlockchainAddressDetector
+
+
+def read_records(stream: TextIO, input_format: str, field: str) -> Iterator[Dict]:
+    """从输入流逐条读取记录
+
+    Args:
+        stream: 输入流
+        input_format: 输入格式 text/jsonl/auto
+        field: JSONL记录中待检测文本的字段名
+
+    Yields:
+        记录字典，包含 line、content 以及可选的 id/expected/label
+    """
+    for line_number, line in enumerate(stream, 1):
+        line = line.rstrip('\r\n')
+        if not line:
+            continue
+
+        record = None
+        if input_format in ('jsonl', 'auto'):
+            try:
+                data = json.loads(line)
+                if isinstance(data, dict):
+                    record = {
+                        'line': line_number,
+                        'id': data.get('id'),
+                        'content': str(data.get(field) or ''),
+                        'expected': data.get('expected'),
+                        'label': data.get('label')
+                    }
+            except ValueError:
+                if input_format == 'jsonl':
+                    print(f"第 {line_number} 行不是有效的JSON，已跳过", file=sys.stderr)
+                    continue
+
+        if record is None:
+            record = {'line': line_number, 'id': None, 'content': line, 'expected': None, 'label': None}
+
+        yield record
+
+
+class BatchReport:
+    """批量检测汇总统计"""
+
+    def __init__(self):
+        self.records = 0
+        self.characters = 0
+        self.records_with_detections = 0
+        self.addresses_found = 0
+        self.by_type = Counter()
+        self.by_confidence = Counter()
+
+        # 记录级混淆矩阵（需要label）
+        self.record_confusion = Counter()
+        # 地址级统计（需要expected）
+        self.address_true_positives = 0
+        self.address_false_positives = 0
+        self.address_false_negatives = 0
+
+        self._started = time.perf_counter()
+
+    def add(self, record: Dict, addresses: List[Dict]) -> None:
+        """累计一条记录的检测结果"""
+        self.records += 1
+        self.characters += len(record['content'])
+        self.addresses_found += len(addresses)
+        if addresses:
+            self.records_with_detections += 1
+        for addr_info in addresses:
+            self.by_type[addr_info['type']] += 1
+            self.by_confidence[addr_info.get('confidence', 'unknown')] += 1
+
+        label = record.get('label')
+        if isinstance(label, bool):
+            predicted = bool(addresses)
+            key = ('tp' if label else 'fp') if predicted else ('fn' if label else 'tn')
+            self.record_confusion[key] += 1
+
+        expected = record.get('expected')
+        if isinstance(expected, list):
+            expected_set = {str(address) for address in expected}
+            found_set = {addr_info['address'] for addr_info in addresses}
+            self.address_true_positives += len(found_set & expected_set)
+            self.address_false_positives += len(found_set - expected_set)
+            self.address_false_negatives += len(expected_set - found_set)
+
+    @staticmethod
+    def _ratio(numerator: int, denominator: int) -> Optional[float]:
+        return round(numerator / denominator, 4) if denominator else None
+
+    def to_dict(self) -> Dict:
+        """生成汇总报告"""
+        elapsed = time.perf_counter() - self._started
+        report = {
+            'records': self.records,
+            'characters': self.characters,
+            'records_with_detections': self.records_with_detections,
+            'addresses_found': self.addresses_found,
+            'by_type': dict(self.by_type.most_common()),
+            'by_confidence': dict(self.by_confidence),
+            'elapsed_seconds': round(elapsed, 3),
+            'records_per_second': round(self.records / elapsed, 1) if elapsed > 0 else None,
+            'characters_per_second': round(self.characters / elapsed, 1) if elapsed > 0 else None
+        }
+
+        if self.record_confusion:
+            tp = self.record_confusion['tp']
+            report['record_level'] = {
+                **{key: self.record_confusion[key] for key in ('tp', 'fp', 'fn', 'tn')},
+                'precision': self._ratio(tp, tp + self.record_confusion['fp']),
+                'recall': self._ratio(tp, tp + self.record_confusion['fn'])
+            }
+
+        labelled = self.address_true_positives + self.address_false_positives + self.address_false_negatives
+        if labelled:
+            tp = self.address_true_positives
+            report['address_level'] = {
+                'tp': tp,
+                'fp': self.address_false_positives,
+                'fn': self.address_false_negatives,
+                'precision': self._ratio(tp, tp + self.address_false_positives),
+                'recall': self._ratio(tp, tp + self.address_false_negatives)
+            }
+
+        return report
+
+
+def run(input_stream: TextIO, output_stream: Optional[TextIO], input_format: str = 'auto',
+        field: str = 'content', workers: int = 1, chunksize: int = 64) -> Dict:
+    """执行批量检测
+
+    Args:
+        input_stream: 输入流
+        output_stream: 逐条结果输出流（None 表示不输出）
+        input_format: 输入格式
+        field: JSONL文本字段名
+        workers: 工作进程数
+        chunksize: 每次分派给工作进程的记录数
+
+    Returns:
+        汇总报告字典
+    """
+    detector = BlockchainAddressDetector(logging.getLogger(__name__))
+    report = BatchReport()
+
+    # 检测结果按输入顺序返回，用FIFO把记录的元数据传递给对应的结果
+    pending = deque()
+
+    def contents() -> Iterator[str]:
+        for record in read_records(input_stream, input_format, field):
+            pending.append(record)
+            yield record['content']
+
+    for addresses in detector.detect_many(contents(), workers=workers, chunksize=chunksize):
+        record = pending.popleft()
+        report.add(record, addresses)
+
+        if output_stream is not None:
+            output_stream.write(json.dumps({
+                'line': record['line'],
+                'id': record['id'],
+                'addresses': addresses
+            }, ensure_ascii=False) + '\n')
+
+    return report.to_dict()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='离线批量区块链地址检测（规则回放/回测）')
+    parser.add_argument('input', help="输入文件路径，'-' 表示标准输入")
+    parser.add_argument('--format', choices=['auto', 'text', 'jsonl'], default='auto',
+                        help='输入格式: text(逐行文本), jsonl(每行一个JSON对象), auto(自动识别)')
+    parser.add_argument('--field', default='content', help='JSONL记录中待检测文本的字段名')
+    parser.add_argument('--output', help="逐条检测结果输出路径(JSONL)，'-' 表示标准输出")
+    parser.add_argument('--report', help='汇总报告输出路径(JSON)，默认打印到标准错误')
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(), help='工作进程数')
+    parser.add_argument('--chunksize', type=int, default=64, help='每次分派给工作进程的记录数')
+
+    args = parser.parse_args(argv)
+
+    input_stream = sys.stdin if args.input == '-' else open(args.input, 'r', encoding='utf-8', errors='replace')
+    output_stream = None
+    if args.output == '-':
+        output_stream = sys.stdout
+    elif args.output:
+        output_stream = open(args.output, 'w', encoding='utf-8')
+
+    try:
+        report = run(input_stream, output_stream, args.format, args.field, args.workers, args.chunksize)
+    finally:
+        if input_stream is not sys.stdin:
+            input_stream.close()
+        if output_stream not in (None, sys.stdout):
+            output_stream.close()
+
+    report_text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.report:
+        Path(args.report).write_text(report_text, encoding='utf-8')
+    else:
+        print(report_text, file=sys.stderr)
+
+    return 0
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -78,6 +78,8 @@ class ClientRunner:
         self.logger = None
         self._running = False
         self._stop_event = threading.Event()
+        # 停止信号是否能唤醒无超时的等待（Windows 上需要控制台事件处理器）
+        self._untimed_wait = sys.platform != "win32"
     
     def setup_signal_handlers(self):
         """设置信号处理器"""
@@ -91,6 +93,21 @@ class ClientRunner:
         
         signal.signal(signal.SIGINT, signal_handler)
         signal.signal(signal.SIGTERM, signal_handler)
+        
+        # Windows 上主线程阻塞在无超时的等待中时 Python 信号处理器不会执行，
+        # 控制台事件处理器在独立线程中调用，可以直接停止客户端
+        if sys.platform == "win32":
+            try:
+                import win32api
+                
+                def console_handler(ctrl_type):
+                    signal_handler(ctrl_type, None)
+                    return True
+                
+                win32api.SetConsoleCtrlHandler(console_handler, True)
+                self._untimed_wait = True
+            except Exception:
+                self._untimed_wait = False
     
     def _setup_console_display(self, config):
         """设置控制台窗口显示
@@ -193,22 +210,27 @@ class ClientRunner:
                 print(f"停止客户端时出错: {e}")
     
     def wait_for_stop(self, timeout: float = None):
-        """等待停止信号
+        """等待停止信号（客户端停止或收到停止信号时返回，期间不定时唤醒）
         
         Args:
-            timeout: 超时时间（秒）
+            timeout: 超时时间（秒），None 表示一直等待
         """
+        wait = self.client.wait_stopped if self.client else self._stop_event.wait
+        deadline = None if timeout is None else time.monotonic() + timeout
         try:
             while self._running:
-                # 检查客户端状态
-                if self.client and not self.client.is_running():
-                    if self.logger:
-                        self.logger.warning("客户端已停止运行")
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
                     break
-                
-                # 等待停止事件
-                if self._stop_event.wait(timeout=1):
+                if not self._untimed_wait:
+                    # 没有控制台事件处理器时分段等待，使 Ctrl+C 能被处理
+                    remaining = 1 if remaining is None else min(remaining, 1)
+                if wait(remaining):
                     break
+            
+            if self._running and self.client and not self.client.is_running():
+                if self.logger:
+                    self.logger.warning("客户端已停止运行")
         
         except KeyboardInterrupt:
             if self.logger:
@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地替身服务器
+
+模拟后端中客户端依赖的接口，用于在没有完整后端环境时测试同步协议：
+- GET /api/whitelist/addresses/active：支持 ETag/If-None-Match 和按版本增量
+- GET /api/client-config/client/{id}/effective：客户端生效配置
+- GET /api/detection/rule-pack：检测规则包，支持 ETag/If-None-Match
+- POST /api/clients/{id}/sync：合并同步，按客户端携带的版本只返回有变化的部分和指令
+- POST /api/security/screenshots/upload-with-heartbeat：截图上传（附带心跳），响应可附带限流指令
+- POST /api/clients/heartbeat：心跳
+- POST /api/security/violations：两阶段违规上报的元数据，返回事件ID（按 clientEventId 去重）
+- POST /api/security/violations/batch：批量提交违规元数据，逐个返回结果
+- GET/PUT /api/security/violations/{id}/evidence：查询证据上传进度 / 按 Content-Range 分块续传证据
+- POST /api/security/violations/report-with-screenshot：一次性违规上报（含截图）
+
+记录收到的所有请求，测试可据此断言请求次数和请求头。latency 可模拟网络往返时间。
+
+示例：
+    python mock_server.py --port 3001 --address 0x742d35Cc6634C0532925a3b8D4C9db96C4b4d8b6
+"""
+
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterable, List, Optional, Pattern, Tuple
+from urllib.parse import parse_qs, urlparse
+
+
+class MockBackend:
+    """替身后端：保存接口状态并处理请求"""
+
+    def __init__(self):
+        self.requests: List[Dict] = []
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        # 每个请求响应前等待的秒数（模拟网络往返时间）
+        self.latency = 0.0
+
+        # 白名单版本历史：版本号 -> 地址集合
+        self._whitelist_versions: Dict[str, frozenset] = {}
+        self._whitelist_version: Optional[str] = None
+        self.whitelist_delta_enabled = True
+        self.set_whitelist([])
+
+        # 客户端配置（版本号 c1、c2...）、规则包和随合并同步下发的指令
+        self._client_config: Dict[str, Any] = {}
+        self._client_config_version = 'c0'
+        self._rule_pack: Optional[Dict[str, Any]] = None
+        self.directives: Dict[str, Any] = {}
+        self.combined_sync_enabled = True
+        # 截图上传/心跳响应中附带的限流指令（每次响应都带上，直到被修改）
+        self.upload_directives: Dict[str, Any] = {}
+
+        # 违规事件（事件ID -> 元数据）和证据上传状态（事件ID -> {size, sha256, data, complete}）
+        self.two_phase_enabled = True
+        self._violations: Dict[str, Dict[str, Any]] = {}
+        self._violation_ids: Dict[str, str] = {}
+        self._evidence: Dict[str, Dict[str, Any]] = {}
+        # 接下来的若干个证据分块请求返回503（模拟链路中断）
+        self.evidence_failures = 0
+        self.batch_enabled = True
+        # 批量上报中被服务器拒绝的事件（clientEventId）
+        self.rejected_events: set = set()
+
+        self._routes: Dict[Tuple[str, str], Callable] = {
+            ('GET', '/api/whitelist/addresses/active'): self._get_whitelist,
+            ('GET', '/api/detection/rule-pack'): self._get_rule_pack,
+            ('POST', '/api/security/screenshots/upload-with-heartbeat'): self._post_screenshot,
+            ('POST', '/api/clients/heartbeat'): self._post_heartbeat,
+            ('POST', '/api/security/violations'): self._post_violation,
+            ('POST', '/api/security/violations/batch'): self._post_violation_batch,
+            ('POST', '/api/security/violations/report-with-screenshot'): self._post_violation_with_screenshot,
+        }
+        # 路径中带客户端ID的接口，按正则匹配，命名分组放入 request['params']
+        self._pattern_routes: List[Tuple[str, Pattern, Callable]] = [
+            ('GET', re.compile(r'/api/client-config/client/(?P<client_id>[^/]+)/effective\Z'), self._get_client_config),
+            ('POST', re.compile(r'/api/clients/(?P<client_id>[^/]+)/sync\Z'), self._post_sync),
+            ('GET', re.compile(r'/api/security/violations/(?P<event_id>[^/]+)/evidence\Z'), self._get_evidence),
+            ('PUT', re.compile(r'/api/security/violations/(?P<event_id>[^/]+)/evidence\Z'), self._put_evidence),
+        ]
+
+    # ---------- 服务器生命周期 ----------
+
+    def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """在后台线程启动服务器
+
+        Returns:
+            API基础地址（对应配置中的 server.api_base_url）
+        """
+        backend = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                backend._dispatch(self, 'GET')
+
+            def do_POST(self):
+                backend._dispatch(self, 'POST')
+
+            def do_PUT(self):
+                backend._dispatch(self, 'PUT')
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="MockBackend", daemon=True)
+        self._thread.start()
+        return self.api_base_url
+
+    def stop(self) -> None:
+        """停止服务器"""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    @property
+    def api_base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api"
+
+    def requests_to(self, path: str) -> List[Dict]:
+        """获取发往指定路径的请求记录"""
+        with self._lock:
+            return [request for request in self.requests if request['path'] == path]
+
+    # ---------- 请求分发 ----------
+
+    def _dispatch(self, handler: BaseHTTPRequestHandler, method: str) -> None:
+        parsed = urlparse(handler.path)
+        length = int(handler.headers.get('Content-Length') or 0)
+        request = {
+            'method': method,
+            'path': parsed.path,
+            'query': {key: values[-1] for key, values in parse_qs(parsed.query).items()},
+            'headers': dict(handler.headers.items()),
+            'body': handler.rfile.read(length) if length else b''
+        }
+        with self._lock:
+            self.requests.append(request)
+        if self.latency:
+            time.sleep(self.latency)
+
+        route = self._routes.get((method, parsed.path))
+        if route is None:
+            for route_method, pattern, handler_func in self._pattern_routes:
+                match = pattern.match(parsed.path) if route_method == method else None
+                if match:
+                    request['params'] = match.groupdict()
+                    route = handler_func
+                    break
+        if route is None:
+            status, headers, payload = 404, {}, {'code': 404, 'success': False, 'message': 'Not Found'}
+        else:
+            status, headers, payload = route(request)
+
+        body = b'' if payload is None else json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        handler.send_response(status)
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        if payload is not None:
+            handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    @staticmethod
+    def _wrap(data) -> Dict:
+        """与后端统一响应格式一致"""
+        return {'code': 200, 'success': True, 'data': data, 'timestamp': datetime.now().isoformat()}
+
+    # ---------- 白名单 ----------
+
+    def set_whitelist(self, addresses: Iterable[str]) -> str:
+        """替换白名单并生成新版本
+
+        Returns:
+            新版本号
+        """
+        with self._lock:
+            version = f"v{len(self._whitelist_versions) + 1}"
+            self._whitelist_versions[version] = frozenset(addresses)
+            self._whitelist_version = version
+            return version
+
+    @property
+    def whitelist_version(self) -> str:
+        return self._whitelist_version
+
+    def _get_whitelist(self, request: Dict):
+        with self._lock:
+            etag = f'"{self._whitelist_version}"'
+
+            if request['headers'].get('If-None-Match') == etag:
+                return 304, {'ETag': etag}, None
+
+            data = self._whitelist_data(request['query'].get('sinceVersion'))
+
+        return 200, {'ETag': etag}, self._wrap(data)
+
+    def _whitelist_data(self, since: Optional[str]) -> Dict:
+        """白名单数据：since 为已知版本时返回增量，否则返回完整列表（调用方持有锁）"""
+        version = self._whitelist_version
+        current = self._whitelist_versions[version]
+        data = {'version': version, 'lastUpdated': datetime.now().isoformat()}
+        if self.whitelist_delta_enabled and since in self._whitelist_versions and since != version:
+            base = self._whitelist_versions[since]
+            data.update({
+                'delta': True,
+                'baseVersion': since,
+                'added': sorted(current - base),
+                'removed': sorted(base - current)
+            })
+        else:
+            data['addresses'] = sorted(current)
+        return data
+
+    # ---------- 客户端配置和规则包 ----------
+
+    def set_client_config(self, config: Dict[str, Any]) -> str:
+        """替换客户端生效配置
+
+        Returns:
+            新版本号
+        """
+        with self._lock:
+            number = int(self._client_config_version[1:]) + 1
+            self._client_config = dict(config)
+            self._client_config_version = f"c{number}"
+            return self._client_config_version
+
+    def set_rule_pack(self, rule_pack: Optional[Dict[str, Any]]) -> None:
+        """设置服务器规则包（None表示不提供）"""
+        with self._lock:
+            self._rule_pack = rule_pack
+
+    @staticmethod
+    def rule_pack_digest(rule_pack: Dict[str, Any]) -> str:
+        """规则包内容摘要（与客户端 rule_pack_digest 的计算方式一致）"""
+        canonical = json.dumps(rule_pack, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def _get_client_config(self, request: Dict):
+        with self._lock:
+            return 200, {}, self._wrap(dict(self._client_config))
+
+    def _get_rule_pack(self, request: Dict):
+        with self._lock:
+            rule_pack = self._rule_pack
+        if rule_pack is None:
+            return 404, {}, {'code': 404, 'success': False, 'message': 'Not Found'}
+        etag = f'"{self.rule_pack_digest(rule_pack)}"'
+        if request['headers'].get('If-None-Match') == etag:
+            return 304, {'ETag': etag}, None
+        return 200, {'ETag': etag}, self._wrap(rule_pack)
+
+    # ---------- 合并同步 ----------
+
+    def _post_sync(self, request: Dict):
+        """合并同步：只返回与客户端版本不一致的部分，以及待下发的指令"""
+        if not self.combined_sync_enabled:
+            return 404, {}, {'code': 404, 'success': False, 'message': 'Not Found'}
+        try:
+            versions = json.loads(request['body'] or b'{}').get('versions') or {}
+        except ValueError:
+            return 400, {}, {'code': 400, 'success': False, 'message': 'Bad Request'}
+
+        data: Dict[str, Any] = {}
+        with self._lock:
+            if versions.get('config') != self._client_config_version:
+                data['config'] = {'version': self._client_config_version, 'data': dict(self._client_config)}
+            if 'whitelist' in versions and versions['whitelist'] != self._whitelist_version:
+                data['whitelist'] = self._whitelist_data(versions['whitelist'])
+            if 'rulePack' in versions and self._rule_pack is not None \
+                    and versions['rulePack'] != self.rule_pack_digest(self._rule_pack):
+                data['rulePack'] = self._rule_pack
+            if self.directives:
+                data['directives'] = dict(self.directives)
+        return 200, {}, self._wrap(data)
+
+    # ---------- 截图上传与心跳 ----------
+
+    def _upload_response(self, data: Dict[str, Any]):
+        with self._lock:
+            if self.upload_directives:
+                data['directives'] = dict(self.upload_directives)
+        return 200, {}, self._wrap(data)
+
+    def _post_screenshot(self, request: Dict):
+        return self._upload_response({'screenshotUploaded': True})
+
+    def _post_heartbeat(self, request: Dict):
+        return self._upload_response({'status': 'online'})
+
+    # ---------- 违规上报 ----------
+
+    @property
+    def violations(self) -> List[Dict[str, Any]]:
+        """收到的违规事件元数据（按到达顺序）"""
+        with self._lock:
+            return [dict(metadata, eventId=event_id) for event_id, metadata in self._violations.items()]
+
+    def evidence(self, event_id: str) -> Optional[bytes]:
+        """已完整上传的证据内容，未完成时返回None"""
+        with self._lock:
+            state = self._evidence.get(event_id)
+            return bytes(state['data']) if state and state['complete'] else None
+
+    def _post_violation(self, request: Dict):
+        if not self.two_phase_enabled:
+            return 404, {}, {'code': 404, 'success': False, 'message': 'Not Found'}
+        try:
+            metadata = json.loads(request['body'] or b'{}')
+        except ValueError:
+            return 400, {}, {'code': 400, 'success': False, 'message': 'Bad Request'}
+
+        with self._lock:
+            event_id = self._store_violation(metadata)
+        return 201, {}, self._wrap({'eventId': event_id})
+
+    def _post_violation_batch(self, request: Dict):
+        if not (self.two_phase_enabled and self.batch_enabled):
+            return 404, {}, {'code': 404, 'success': False, 'message': 'Not Found'}
+        try:
+            events = json.loads(request['body'] or b'{}').get('events') or []
+        except ValueError:
+            return 400, {}, {'code': 400, 'success': False, 'message': 'Bad Request'}
+
+        results = []
+        with self._lock:
+            for metadata in events:
+                client_event_id = metadata.get('clientEventId')
+                if client_event_id in self.rejected_events:
+                    results.append({'clientEventId': client_event_id, 'success': False, 'message': 'rejected'})
+                else:
+                    results.append({'clientEventId': client_event_id, 'success': True,
+                                    'eventId': self._store_violation(metadata)})
+        return 201, {}, self._wrap({'results': results})
+
+    def _store_violation(self, metadata: Dict[str, Any]) -> str:
+        """保存违规元数据并返回事件ID，同一 clientEventId 返回已有事件（调用方持有锁）"""
+        client_event_id = metadata.get('clientEventId')
+        event_id = self._violation_ids.get(client_event_id)
+        if event_id is None:
+            event_id = f"e{len(self._violations) + 1}"
+            self._violations[event_id] = metadata
+            if client_event_id:
+                self._violation_ids[client_event_id] = event_id
+            evidence = metadata.get('evidence')
+            if evidence:
+                self._evidence[event_id] = {'size': int(evidence['size']), 'sha256': evidence['sha256'],
+                                            'data': bytearray(), 'complete': False}
+        return event_id
+
+    def _post_violation_with_screenshot(self, request: Dict):
+        return 201, {}, self._wrap({'success': True, 'screenshotSaved': True})
+
+    def _evidence_progress(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        return {'received': len(state['data']), 'size': state['size'], 'complete': state['complete']}
+
+    def _get_evidence(self, request: Dict):
+        with self._lock:
+            state = self._evidence.get(request['params']['event_id'])
+            if state is None:
+                return 404, {}, {'code': 404, 'success': False, 'message': 'Not Found'}
+            return 200, {}, self._wrap(self._evidence_progress(state))
+
+    def _put_evidence(self, request: Dict):
+        match = re.match(r'bytes (\d+)-(\d+)/(\d+)\Z', request['headers'].get('Content-Range', ''))
+        if not match:
+            return 400, {}, {'code': 400, 'success': False, 'message': 'Bad Content-Range'}
+        start, total = int(match.group(1)), int(match.group(3))
+
+        with self._lock:
+            state = self._evidence.get(request['params']['event_id'])
+            if state is None:
+                return 404, {}, {'code': 404, 'success': False, 'message': 'Not Found'}
+            if self.evidence_failures > 0:
+                self.evidence_failures -= 1
+                return 503, {}, {'code': 503, 'success': False, 'message': 'Service Unavailable'}
+            if start != len(state['data']) or total != state['size']:
+                return 409, {}, {'code': 409, 'success': False, 'data': self._evidence_progress(state)}
+
+            state['data'].extend(request['body'])
+            if len(state['data']) >= state['size']:
+                if hashlib.sha256(state['data']).hexdigest() != state['sha256']:
+                    state['data'] = bytearray()
+                    return 422, {}, {'code': 422, 'success': False, 'data': self._evidence_progress(state)}
+                state['complete'] = True
+            return 200, {}, self._wrap(self._evidence_progress(state))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='客户端接口本地替身服务器')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=3001)
+    parser.add_argument('--address', action='append', default=[], help='初始白名单地址，可重复指定')
+    args = parser.parse_args(argv)
+
+    backend = MockBackend()
+    backend.set_whitelist(args.address)
+    api_base_url = backend.start(args.host, args.port)
+    print(f"替身服务器已启动: {api_base_url}（Ctrl+C 退出）")
+
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        backend.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
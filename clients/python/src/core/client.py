@@ -7,22 +7,32 @@
 - 协调各个功能模块
 - 管理客户端生命周期
 - 处理异常和错误恢复
+
+runtime.mode 为 asyncio 时，定时调度、WebSocket推送和剪贴板监听由一个事件循环驱动（见 utils.async_runtime），
+上传和违规上报仍由各自的工作线程发送。
 """
 
 import asyncio
 import threading
-import time
-from typing import Optional
+from concurrent.futures import Future
+from typing import Callable, Optional
 from pathlib import Path
 
 from .config import AppConfig
 from .logger import get_logger
+from .remote_config import RemoteConfigManager
 from modules.screenshot import ScreenshotManager
 from modules.clipboard import ClipboardMonitor
 from modules.http_client import HttpClient
 from modules.whitelist import WhitelistManager
 from modules.violation import ViolationReporter
+from modules.rule_pack import RulePackManager
+from modules.websocket_client import WebSocketClient
 from utils.client_id import ClientIdManager
+from utils.scheduler import Scheduler
+from utils.async_runtime import AsyncRuntime
+from utils.bandwidth import BandwidthBudget
+from utils.upload_scheduler import UploadScheduler
 
 
 class ScreenMonitorClient:
@@ -47,10 +57,20 @@ class ScreenMonitorClient:
         self.websocket_client = None
         self.whitelist_manager = None
         self.violation_reporter = None
+        self.rule_pack_manager = None
+        self.scheduler = None
+        self.runtime = None
+        self.remote_config = None
+        self.bandwidth = None
+        self.uploader = None
         
         # 工作线程
         self._threads = []
         
+        # WebSocket推送协程及唤醒它退出的回调
+        self._websocket_future: Optional[Future] = None
+        self._websocket_stop: Optional[Callable[[], None]] = None
+        
         self.logger.info("屏幕监控客户端初始化完成")
     
     def start(self) -> None:
@@ -62,6 +82,9 @@ class ScreenMonitorClient:
         try:
             self.logger.info("正在启动屏幕监控客户端...")
             
+            # 重新启动时复位停止事件
+            self._stop_event.clear()
+            
             # 获取或生成客户端ID
             client_id = self.client_id_manager.get_client_uid()
             self.logger.info(f"客户端ID: {client_id}")
@@ -78,6 +101,8 @@ class ScreenMonitorClient:
         except Exception as e:
             self.logger.error(f"客户端启动失败: {e}")
             self.stop()
+            # 未完成启动时 stop() 不做任何事，这里唤醒等待客户端停止的调用方
+            self._stop_event.set()
             raise
     
     def stop(self) -> None:
@@ -90,6 +115,7 @@ class ScreenMonitorClient:
         # 设置停止事件
         self._stop_event.set()
         self._running = False
+        self._wake_websocket()
         
         # 停止各个模块
         self._stop_modules()
@@ -106,21 +132,65 @@ class ScreenMonitorClient:
         """检查客户端是否在运行"""
         return self._running
     
+    def wait_stopped(self, timeout: Optional[float] = None) -> bool:
+        """阻塞等待客户端停止（期间不定时唤醒）
+        
+        Args:
+            timeout: 最长等待时间（秒），None 表示一直等待
+        
+        Returns:
+            客户端是否已停止
+        """
+        return self._stop_event.wait(timeout)
+    
     def _initialize_modules(self, client_id: str) -> None:
         """初始化各个模块"""
         self.logger.info("正在初始化功能模块...")
         
+        # asyncio 模式：定时调度、WebSocket推送和剪贴板监听共用一个事件循环
+        if self.config.runtime.mode == 'asyncio':
+            self.runtime = AsyncRuntime(self.logger, workers=self.config.runtime.executor_workers)
+        
+        # 统一定时调度器：白名单同步、配置同步和定时截图共用，
+        # 以客户端ID为随机种子，使同时启动的客户端错开执行时间
+        self.scheduler = Scheduler(
+            self.logger,
+            seed=client_id,
+            max_workers=self.config.scheduler.workers,
+            runtime=self.runtime
+        )
+        
+        # 服务器下发的配置在运行中生效（各模块在下方注册）
+        self.remote_config = RemoteConfigManager(self.config, self.logger)
+        
+        # 上传带宽预算和优先级上传调度器：违规上报、心跳和定时截图共用
+        # 紧急通道不少于违规发送线程数，并发发送的违规上报不会被上传调度器串行化
+        self.bandwidth = BandwidthBudget(self.config, self.logger)
+        self.uploader = UploadScheduler(
+            self.logger,
+            self.bandwidth,
+            workers=self.config.upload.workers,
+            urgent_workers=max(self.config.upload.urgent_workers, self.config.violation_report.senders),
+            max_queued=self.config.upload.max_queued
+        )
+        
+        # 加载检测规则包（需在创建检测器之前发布）
+        self.rule_pack_manager = RulePackManager(self.config, self.logger)
+        self.rule_pack_manager.load()
+        
         # 初始化违规事件上报器
         self.violation_reporter = ViolationReporter(
             self.config, 
             client_id, 
-            self.logger
+            self.logger,
+            self.uploader
         )
         
         # 初始化白名单管理器
         self.whitelist_manager = WhitelistManager(
             self.config, 
-            self.logger
+            self.logger,
+            self.scheduler
         )
         
         # 初始化HTTP客户端
@@ -128,7 +198,10 @@ class ScreenMonitorClient:
             self.config, 
             client_id, 
             self.logger,
-            self.whitelist_manager
+            self.whitelist_manager,
+            self.rule_pack_manager,
+            self.scheduler,
+            self.remote_config
         )
         
         # 初始化截图管理器
@@ -137,9 +210,27 @@ class ScreenMonitorClient:
             self.logger,
             self.client_id_manager,
             self.whitelist_manager,
-            self.violation_reporter
+            self.violation_reporter,
+            self.scheduler,
+            self.bandwidth,
+            self.uploader
         )
         
+        # 初始化WebSocket推送客户端（收到白名单/配置更新通知时立即同步，收到截图请求时立即截图）
+        if self.config.push.enabled:
+            try:
+                self.websocket_client = WebSocketClient(
+                    self.config,
+                    client_id,
+                    self.logger,
+                    self.whitelist_manager,
+                    self.http_client,
+                    screenshot_manager=self.screenshot_manager
+                )
+            except Exception as e:
+                self.logger.warning(f"WebSocket推送不可用，继续使用定时同步: {e}")
+                self.websocket_client = None
+        
         # 初始化剪贴板监控器
         self.clipboard_monitor = ClipboardMonitor(
             self.config, 
@@ -148,6 +239,34 @@ class ScreenMonitorClient:
             self.whitelist_manager,
             self.violation_reporter
         )
+
+        # 剪贴板清空耗时等指标随心跳上报
+        self.screenshot_manager.register_metrics_provider(
+            'clipboard', self.clipboard_monitor.get_performance_metrics
+        )
+        # 各定时任务的下次执行时间和执行统计随心跳上报
+        self.screenshot_manager.register_metrics_provider('scheduler', self.scheduler.get_stats)
+        
+        # 当前生效的服务器上传指令随心跳上报
+        self.screenshot_manager.register_metrics_provider('upload_directives',
+                                                          self.screenshot_manager.directives.get_stats)
+        self.screenshot_manager.register_metrics_provider('bandwidth', self.bandwidth.get_stats)
+        # 各优先级上传的排队延迟和总延迟随心跳上报
+        self.screenshot_manager.register_metrics_provider('uploads', self.uploader.get_stats)
+        # 待续传的违规证据随心跳上报
+        self.screenshot_manager.register_metrics_provider('violation_evidence',
+                                                          self.violation_reporter.evidence.get_stats)
+        # 服务器请求的立即截图从收到请求到上传完成的耗时随心跳上报
+        self.screenshot_manager.register_metrics_provider('on_demand_capture',
+                                                          self.screenshot_manager.get_capture_stats)
+        
+        # 远程配置变化时通知各模块，当前生效的配置随心跳上报
+        self.remote_config.register("截图管理器", self.screenshot_manager.apply_runtime_config)
+        self.remote_config.register("剪贴板监控器", self.clipboard_monitor.apply_runtime_config)
+        self.remote_config.register("白名单管理器", self.whitelist_manager.apply_runtime_config)
+        self.remote_config.register("HTTP客户端", self.http_client.apply_runtime_config)
+        self.remote_config.register("客户端", self._apply_runtime_config)
+        self.screenshot_manager.register_metrics_provider('remote_config', self.remote_config.get_stats)
         
         self.logger.info("功能模块初始化完成")
     
@@ -155,50 +274,38 @@ class ScreenMonitorClient:
         """启动各个模块"""
         self.logger.info("正在启动功能模块...")
         
-        # 启动白名单管理器
-        if self.config.whitelist.enabled:
-            thread = threading.Thread(
-                target=self._run_whitelist_manager,
-                name="WhitelistManager",
-                daemon=True
-            )
-            thread.start()
-            self._threads.append(thread)
-            self.logger.info("白名单管理器已启动")
-        
-        # 启动HTTP客户端
-        thread = threading.Thread(
-            target=self._run_http_client,
-            name="HttpClient",
-            daemon=True
-        )
-        thread.start()
-        self._threads.append(thread)
-        self.logger.info("HTTP客户端已启动")
+        # 事件循环最先启动、最后停止
+        if self.runtime:
+            self.runtime.start()
         
-        # 等待HTTP客户端启动
-        time.sleep(1)
+        # 启动上传调度器和违规事件上报器
+        self.uploader.start()
+        self._start_module(self.violation_reporter, "违规事件上报器")
         
-        # 启动截图管理器
-        thread = threading.Thread(
-            target=self._run_screenshot_manager,
-            name="ScreenshotManager",
-            daemon=True
-        )
-        thread.start()
-        self._threads.append(thread)
-        self.logger.info("截图管理器已启动")
+        # 启动白名单管理器、HTTP客户端和截图管理器（注册定时任务，由调度器执行）
+        if self.config.whitelist.enabled:
+            self._start_module(self.whitelist_manager, "白名单管理器")
+        self._start_module(self.http_client, "HTTP客户端")
+        self._start_module(self.screenshot_manager, "截图管理器")
+        self.scheduler.start()
+        
+        # 启动WebSocket推送客户端
+        if self.websocket_client:
+            if self.runtime:
+                self._websocket_future = self.runtime.spawn(self._websocket_main())
+            else:
+                thread = threading.Thread(
+                    target=self._run_websocket_client,
+                    name="WebSocketClient",
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+            self.logger.info("WebSocket推送客户端已启动")
         
         # 启动剪贴板监控器
         if self.config.clipboard.enabled:
-            thread = threading.Thread(
-                target=self._run_clipboard_monitor,
-                name="ClipboardMonitor",
-                daemon=True
-            )
-            thread.start()
-            self._threads.append(thread)
-            self.logger.info("剪贴板监控器已启动")
+            self._start_clipboard_monitor()
         
         self.logger.info("所有功能模块启动完成")
     
@@ -212,7 +319,8 @@ class ScreenMonitorClient:
             (self.screenshot_manager, "截图管理器"),
             (self.http_client, "HTTP客户端"),
             (self.whitelist_manager, "白名单管理器"),
-            (self.violation_reporter, "违规事件上报器")
+            (self.violation_reporter, "违规事件上报器"),
+            (self.rule_pack_manager, "规则包管理器")
         ]
         
         for module, name in modules:
@@ -222,46 +330,109 @@ class ScreenMonitorClient:
                     self.logger.info(f"{name}已停止")
                 except Exception as e:
                     self.logger.error(f"停止{name}时出错: {e}")
+        
+        # 停止定时调度器和上传调度器
+        if self.scheduler:
+            self.scheduler.stop()
+        if self.uploader:
+            self.uploader.stop()
+        
+        # 等待WebSocket推送客户端断开后停止事件循环
+        if self._websocket_future is not None:
+            try:
+                self._websocket_future.result(timeout=5)
+            except Exception as e:
+                self.logger.debug(f"WebSocket推送协程退出: {e}")
+            self._websocket_future = None
+        if self.runtime:
+            self.runtime.stop()
     
-    def _run_whitelist_manager(self) -> None:
-        """运行白名单管理器"""
+    def _start_module(self, module, name: str) -> None:
+        """启动由调度器驱动的模块，单个模块启动失败不影响其他模块"""
         try:
-            self.whitelist_manager.start()
-            while not self._stop_event.is_set():
-                time.sleep(1)
+            module.start()
+            self.logger.info(f"{name}已启动")
         except Exception as e:
-            self.logger.error(f"白名单管理器运行异常: {e}")
+            self.logger.error(f"{name}启动失败: {e}")
     
-    def _run_http_client(self) -> None:
-        """运行HTTP客户端"""
+    def _run_websocket_client(self) -> None:
+        """运行WebSocket推送客户端（独立事件循环）"""
         try:
-            # 启动HTTP客户端
-            self.http_client.start()
-            
-            # 运行轮询循环
-            self.http_client.run_polling_loop()
-                
+            asyncio.run(self._websocket_main())
         except Exception as e:
-            self.logger.error(f"HTTP客户端运行异常: {e}")
+            self.logger.error(f"WebSocket客户端运行异常: {e}")
+    
+    async def _websocket_main(self) -> None:
+        """连接推送服务器（首次连接失败时退避重试），直到客户端停止"""
+        loop = asyncio.get_running_loop()
+        stopped = asyncio.Event()
+        # 客户端停止时由 _wake_websocket 唤醒（不占用线程池线程等待停止事件）
+        self._websocket_stop = lambda: loop.call_soon_threadsafe(stopped.set)
+        if self._stop_event.is_set():
+            stopped.set()
+        retry_delay = 1
+        
+        while not stopped.is_set():
+            try:
+                await self.websocket_client.start()
+                break
+            except Exception:
+                # 连接失败期间各管理器保持正常轮询间隔
+                try:
+                    await asyncio.wait_for(stopped.wait(), retry_delay)
+                except asyncio.TimeoutError:
+                    pass
+                retry_delay = min(retry_delay * 2, 60)
+        
+        # 已连接后由Socket.IO自动重连，这里等待客户端停止
+        await stopped.wait()
+        self._websocket_stop = None
+        await self.websocket_client.stop()
     
-    def _run_screenshot_manager(self) -> None:
-        """运行截图管理器"""
+    def _wake_websocket(self) -> None:
+        """唤醒WebSocket推送协程退出"""
+        callback = self._websocket_stop
+        if callback is None:
+            return
         try:
-            self.screenshot_manager.start()
-            while not self._stop_event.is_set():
-                time.sleep(1)
-        except Exception as e:
-            self.logger.error(f"截图管理器运行异常: {e}")
+            callback()
+        except RuntimeError:
+            # 事件循环已关闭
+            pass
+    
+    def _start_clipboard_monitor(self) -> None:
+        """运行剪贴板监控器：asyncio 模式下在事件循环上监听，否则使用独立线程"""
+        if self.runtime:
+            self.clipboard_monitor.start_async(self.runtime)
+            self.logger.info("剪贴板监控器已启动")
+            return
+        
+        thread = threading.Thread(
+            target=self._run_clipboard_monitor,
+            name="ClipboardMonitor",
+            daemon=True
+        )
+        thread.start()
+        self._threads.append(thread)
+        self.logger.info("剪贴板监控器已启动")
     
     def _run_clipboard_monitor(self) -> None:
-        """运行剪贴板监控器"""
+        """运行剪贴板监控器（阻塞到监控器停止）"""
         try:
             self.clipboard_monitor.start()
-            while not self._stop_event.is_set():
-                time.sleep(0.1)  # 剪贴板监控需要更频繁的检查
         except Exception as e:
             self.logger.error(f"剪贴板监控器运行异常: {e}")
     
+    def _apply_runtime_config(self, changes) -> None:
+        """远程配置变化：启停剪贴板监控"""
+        if 'clipboard.enabled' not in changes or self._stop_event.is_set():
+            return
+        if self.config.clipboard.enabled:
+            if not self.clipboard_monitor.is_running():
+                self._start_clipboard_monitor()
+        else:
+            self.clipboard_monitor.stop()
+    
     def _trigger_whitelist_sync(self) -> None:
         """触发白名单同步"""
         try:
@@ -75,6 +75,12 @@ class ClipboardConfig:
     enabled: bool = True
     max_content_length: int = 10000
     auto_clear_on_violation: bool = True
+    streaming_scan: bool = False  # 分块流式扫描完整剪贴板内容，不再按max_content_length截断
+    scan_chunk_size: int = 8192
+    scan_chunk_overlap: int = 256  # 必须大于最长地址长度
+    stop_on_first_violation: bool = True
+    watcher_backend: str = "auto"  # 剪贴板变化监听方式: auto/win32/x11/polling
+    violation_queue_size: int = 64  # 待上报违规事件队列长度，满时丢弃最早的事件
 
 
 @dataclass
@@ -88,6 +94,108 @@ class HeartbeatConfig:
 class ConfigSyncConfig:
     """配置同步配置"""
     interval: int = 300  # 5分钟
+    # 合并同步：一次请求携带配置、白名单、规则包的本地版本，服务器只返回有变化的部分
+    # （需要服务器提供该接口；接口不存在时自动退回分别同步）
+    combined: bool = False
+    combined_endpoint: str = "/clients/{client_id}/sync"
+
+
+@dataclass
+class PushConfig:
+    """服务器推送配置（通过WebSocket接收白名单/配置更新通知）"""
+    enabled: bool = False
+    coalesce_delay: float = 1.0  # 推送合并窗口（秒），窗口内多次推送只同步一次
+    fallback_interval: int = 3600  # 推送连接正常时的兜底轮询间隔（秒）
+
+
+@dataclass
+class OnDemandCaptureConfig:
+    """立即截图配置（服务器通过WebSocket请求截图，如管理员点击刷新）"""
+    enabled: bool = True
+    slo_ms: int = 3000  # 从收到请求到上传完成的目标耗时（毫秒），超过时计入超标次数
+    max_wait: float = 10.0  # 等待上传带宽预算的最长时间（秒），超过则本次请求失败
+    max_pending: int = 16  # 同时等待的请求数上限（等待中的请求由同一张截图响应）
+
+
+@dataclass
+class SchedulerConfig:
+    """周期任务调度配置（白名单同步、配置同步、定时截图）"""
+    jitter: float = 0.1  # 每次执行的随机抖动，占任务间隔的比例（0-0.5）
+    splay: bool = True  # 首次执行在一个间隔内随机分散，避免同时启动的客户端同时请求
+    retry_delay: int = 30  # 同步失败后首次重试延迟（秒），之后指数退避
+    max_backoff: int = 900  # 退避上限（秒），不超过任务间隔
+    workers: int = 3  # 执行任务的工作线程数
+
+
+@dataclass
+class RuntimeConfig:
+    """运行方式配置"""
+    mode: str = "threads"  # threads(各模块使用独立线程) / asyncio(单事件循环驱动调度、推送和剪贴板监听)
+    executor_workers: int = 4  # asyncio 模式下执行阻塞和CPU密集工作的线程池大小
+
+
+@dataclass
+class UploadDirectivesConfig:
+    """截图上传响应指令配置（服务器在 upload-with-heartbeat 响应中下发的临时限流指令）"""
+    enabled: bool = True
+    default_ttl: int = 60  # 指令未指定有效期时的有效期（秒）
+    max_ttl: int = 600  # 指令有效期上限（秒），过期后恢复本地配置
+    max_capture_delay: int = 300  # 推迟下一次截图的上限（秒）
+    min_quality: int = 20  # 质量上限指令的下限
+    unchanged_threshold: float = 2.0  # 画面缩略图平均像素差（0-255）低于此值视为未变化
+
+
+@dataclass
+class BandwidthConfig:
+    """上传带宽预算配置（定时截图和违规证据共用一个令牌桶）"""
+    enabled: bool = True
+    max_bytes_per_second: int = 65536  # 平均上传速率上限（64KB/s）
+    burst_bytes: int = 1048576  # 令牌桶容量（1MB），允许的突发上传量
+    adaptive: bool = True  # 需求持续超过预算时降低定时截图的质量和分辨率
+    adapt_window: int = 60  # 统计上传需求的窗口（秒），每个窗口最多调整一档
+
+
+@dataclass
+class UploadConfig:
+    """上传调度配置（违规上报、心跳、定时截图按优先级共用上行链路）"""
+    workers: int = 1  # 按优先级执行所有上传的工作线程数
+    urgent_workers: int = 1  # 只执行违规上报的紧急通道线程数
+    max_queued: int = 32  # 排队上传上限，满时淘汰优先级最低的任务
+
+
+@dataclass
+class ViolationReportConfig:
+    """违规上报配置"""
+    two_phase: bool = False  # 两阶段上报：先上报违规元数据取得事件ID，再后台续传证据截图（服务器不支持时退回一次性上报）
+    metadata_endpoint: str = "/security/violations"
+    evidence_endpoint: str = "/security/violations/{event_id}/evidence"
+    evidence_chunk_size: int = 262144  # 证据分块大小（256KB），违规元数据可以插在分块之间发送
+    evidence_max_attempts: int = 10  # 证据上传失败次数上限，超过后放弃
+    evidence_retry_delay: int = 5  # 证据首次重试延迟（秒），之后指数退避
+    senders: int = 1  # 并发发送违规事件的线程数
+    batch_size: int = 1  # 两阶段上报时每个请求最多提交的违规元数据数，大于1时使用批量接口
+    batch_endpoint: str = "/security/violations/batch"
+
+
+@dataclass
+class ViolationQueueConfig:
+    """违规事件本地持久化队列配置（超出上限时从最早的事件开始淘汰）"""
+    max_events: int = 1000  # 最多保留的待上报事件数
+    max_bytes: int = 104857600  # 待上报事件和证据截图的总字节数上限（100MB）
+    max_age: int = 604800  # 事件最长保留时间（秒），默认7天，过期的事件移入死信表
+    synchronous: str = "NORMAL"  # SQLite同步级别：NORMAL（进程崩溃不丢失）/ FULL（断电也不丢失，写入较慢）
+    retry_delay: int = 5  # 上报失败后首次重试延迟（秒），之后指数退避
+    max_retry_delay: int = 600  # 重试延迟上限（秒）
+    max_attempts: int = 100  # 上报失败次数上限，超过后移入死信表（0表示不限制）
+    dead_letter_max: int = 1000  # 死信表最多保留的事件数
+
+
+@dataclass
+class ViolationDedupConfig:
+    """违规事件去重合并配置（同一地址、类型和内容在窗口内重复出现时合并上报）"""
+    window: float = 0  # 合并窗口（秒），从首次发生开始计时，0表示不合并
+    evidence_sample_every: int = 0  # 窗口内每重复N次截取一次证据，0表示只在首次发生时截取
+    max_windows: int = 1000  # 同时跟踪的窗口数上限，超出时提前结束最早的窗口
 
 
 @dataclass
@@ -97,11 +205,17 @@ class WhitelistConfig:
     cache_file: str = "whitelist_cache.json"
     cache_ttl: int = 3600  # 缓存过期时间（秒），默认1小时
     enabled: bool = True
+    store: str = "memory"  # 地址存储方式: memory(内存集合) / compact(mmap紧凑存储，适合超大白名单)
+    bloom_bits_per_entry: int = 10  # 紧凑存储Bloom过滤器每地址位数，0表示不使用
 
 
 @dataclass
 class BlockchainConfig:
     """区块链地址检测配置"""
+    rule_pack_file: str = ""  # 检测规则包文件（JSON/YAML），为空时使用内置规则包
+    rule_pack_sync: bool = False  # 是否从服务器拉取规则包更新
+    rule_pack_endpoint: str = "/detection/rule-pack"
+    # 旧版检测正则，检测规则已由规则包提供，仅为兼容旧配置文件保留
     patterns: Dict[str, Any] = field(default_factory=lambda: {
         "bitcoin": [
             r"\b[13][a-km-z1-9A-HJ-NP-Z]{25,34}\b",
@@ -158,6 +272,16 @@ class AppConfig:
     clipboard: ClipboardConfig = field(default_factory=ClipboardConfig)
     heartbeat: HeartbeatConfig = field(default_factory=HeartbeatConfig)
     config_sync: ConfigSyncConfig = field(default_factory=ConfigSyncConfig)
+    push: PushConfig = field(default_factory=PushConfig)
+    on_demand_capture: OnDemandCaptureConfig = field(default_factory=OnDemandCaptureConfig)
+    scheduler: SchedulerConfig = field(default_factory=SchedulerConfig)
+    runtime: RuntimeConfig = field(default_factory=RuntimeConfig)
+    upload_directives: UploadDirectivesConfig = field(default_factory=UploadDirectivesConfig)
+    bandwidth: BandwidthConfig = field(default_factory=BandwidthConfig)
+    upload: UploadConfig = field(default_factory=UploadConfig)
+    violation_report: ViolationReportConfig = field(default_factory=ViolationReportConfig)
+    violation_queue: ViolationQueueConfig = field(default_factory=ViolationQueueConfig)
+    violation_dedup: ViolationDedupConfig = field(default_factory=ViolationDedupConfig)
     whitelist: WhitelistConfig = field(default_factory=WhitelistConfig)
     blockchain: BlockchainConfig = field(default_factory=BlockchainConfig)
     logging: LoggingConfig = field(default_factory=LoggingConfig)
@@ -258,11 +382,24 @@ class ConfigManager:
         screenshot_config = ScreenshotConfig(**config_data.get('screenshot', {}))
         clipboard_config = ClipboardConfig(**config_data.get('clipboard', {}))
         heartbeat_config = HeartbeatConfig(**config_data.get('heartbeat', {}))
+        config_sync_config = ConfigSyncConfig(**config_data.get('config_sync', {}))
+        push_config = PushConfig(**config_data.get('push', {}))
+        on_demand_capture_config = OnDemandCaptureConfig(**config_data.get('on_demand_capture', {}))
+        scheduler_config = SchedulerConfig(**config_data.get('scheduler', {}))
+        runtime_config = RuntimeConfig(**config_data.get('runtime', {}))
+        upload_directives_config = UploadDirectivesConfig(**config_data.get('upload_directives', {}))
+        bandwidth_config = BandwidthConfig(**config_data.get('bandwidth', {}))
+        upload_config = UploadConfig(**config_data.get('upload', {}))
+        violation_report_config = ViolationReportConfig(**config_data.get('violation_report', {}))
+        violation_queue_config = ViolationQueueConfig(**config_data.get('violation_queue', {}))
+        violation_dedup_config = ViolationDedupConfig(**config_data.get('violation_dedup', {}))
         whitelist_config = WhitelistConfig(**config_data.get('whitelist', {}))
         
         # 区块链配置需要特殊处理
         blockchain_data = config_data.get('blockchain', {})
-        blockchain_config = BlockchainConfig()
+        blockchain_config = BlockchainConfig(
+            **{key: value for key, value in blockchain_data.items() if key != 'patterns'}
+        )
         if 'patterns' in blockchain_data:
             blockchain_config.patterns = blockchain_data['patterns']
         
@@ -277,6 +414,17 @@ class ConfigManager:
             screenshot=screenshot_config,
             clipboard=clipboard_config,
             heartbeat=heartbeat_config,
+            config_sync=config_sync_config,
+            push=push_config,
+            on_demand_capture=on_demand_capture_config,
+            scheduler=scheduler_config,
+            runtime=runtime_config,
+            upload_directives=upload_directives_config,
+            bandwidth=bandwidth_config,
+            upload=upload_config,
+            violation_report=violation_report_config,
+            violation_queue=violation_queue_config,
+            violation_dedup=violation_dedup_config,
             whitelist=whitelist_config,
             blockchain=blockchain_config,
             logging=logging_config,
@@ -316,6 +464,102 @@ class ConfigManager:
         # 验证剪贴板配置
         if self._config.clipboard.check_interval <= 0:
             raise ValueError("剪贴板检查间隔必须大于0")
+        
+        if self._config.clipboard.scan_chunk_size <= self._config.clipboard.scan_chunk_overlap:
+            raise ValueError("剪贴板扫描分块大小必须大于分块重叠长度")
+
+        if self._config.clipboard.watcher_backend not in ('auto', 'win32', 'x11', 'polling'):
+            raise ValueError("剪贴板监听方式必须是 auto/win32/x11/polling 之一")
+
+        if self._config.clipboard.violation_queue_size <= 0:
+            raise ValueError("违规上报队列长度必须大于0")
+
+        # 验证推送配置
+        if self._config.push.coalesce_delay < 0:
+            raise ValueError("推送合并窗口不能小于0")
+        
+        if self._config.push.fallback_interval <= 0:
+            raise ValueError("推送兜底轮询间隔必须大于0")
+        
+        # 验证立即截图配置
+        on_demand = self._config.on_demand_capture
+        if on_demand.slo_ms <= 0 or on_demand.max_wait <= 0:
+            raise ValueError("立即截图目标耗时和最长等待时间必须大于0")
+        
+        if on_demand.max_pending <= 0:
+            raise ValueError("立即截图等待请求数上限必须大于0")
+        
+        # 验证调度配置
+        if not (0 <= self._config.scheduler.jitter <= 0.5):
+            raise ValueError("调度抖动比例必须在0-0.5之间")
+        
+        if self._config.scheduler.workers <= 0:
+            raise ValueError("调度工作线程数必须大于0")
+        
+        # 验证运行方式配置
+        if self._config.runtime.mode not in ('threads', 'asyncio'):
+            raise ValueError("运行方式必须是 threads 或 asyncio")
+        
+        if self._config.runtime.executor_workers <= 0:
+            raise ValueError("运行时线程池大小必须大于0")
+        
+        # 验证上传响应指令配置
+        directives = self._config.upload_directives
+        if directives.default_ttl <= 0 or directives.max_ttl < directives.default_ttl:
+            raise ValueError("上传指令有效期必须大于0且不超过有效期上限")
+        
+        if not (1 <= directives.min_quality <= 100):
+            raise ValueError("上传指令质量下限必须在1-100之间")
+        
+        # 验证带宽预算配置
+        if self._config.bandwidth.max_bytes_per_second <= 0 or self._config.bandwidth.burst_bytes <= 0:
+            raise ValueError("上传带宽预算和突发量必须大于0")
+        
+        if self._config.bandwidth.adapt_window <= 0:
+            raise ValueError("带宽需求统计窗口必须大于0")
+        
+        # 验证上传调度配置
+        if self._config.upload.workers <= 0 or self._config.upload.urgent_workers < 0:
+            raise ValueError("上传工作线程数必须大于0")
+        
+        if self._config.upload.max_queued <= 0:
+            raise ValueError("排队上传上限必须大于0")
+        
+        # 验证违规上报配置
+        if self._config.violation_report.evidence_chunk_size <= 0:
+            raise ValueError("证据分块大小必须大于0")
+        
+        if self._config.violation_report.evidence_max_attempts <= 0:
+            raise ValueError("证据上传失败次数上限必须大于0")
+        
+        if self._config.violation_report.senders <= 0 or self._config.violation_report.batch_size <= 0:
+            raise ValueError("违规发送线程数和批量大小必须大于0")
+        
+        # 验证违规事件队列配置
+        violation_queue = self._config.violation_queue
+        if violation_queue.max_events <= 0 or violation_queue.max_bytes <= 0 or violation_queue.max_age <= 0:
+            raise ValueError("违规事件队列的数量、字节数和保留时间上限必须大于0")
+        
+        if violation_queue.synchronous not in ('NORMAL', 'FULL'):
+            raise ValueError("违规事件队列同步级别必须是 NORMAL 或 FULL")
+        
+        if violation_queue.retry_delay <= 0 or violation_queue.max_retry_delay < violation_queue.retry_delay:
+            raise ValueError("违规事件重试延迟必须大于0且不超过重试延迟上限")
+        
+        if violation_queue.max_attempts < 0 or violation_queue.dead_letter_max <= 0:
+            raise ValueError("违规事件失败次数上限不能小于0，死信表容量必须大于0")
+        
+        # 验证违规去重合并配置
+        violation_dedup = self._config.violation_dedup
+        if violation_dedup.window < 0 or violation_dedup.evidence_sample_every < 0:
+            raise ValueError("违规合并窗口和证据采样间隔不能小于0")
+        
+        if violation_dedup.max_windows <= 0:
+            raise ValueError("违规合并窗口数上限必须大于0")
+        
+        # 验证白名单配置
+        if self._config.whitelist.store not in ('memory', 'compact'):
+            raise ValueError("白名单存储方式必须是 memory 或 compact")
     
     def get_config(self) -> AppConfig:
         """获取配置对象"""
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+远程配置运行时应用模块
+
+服务器下发的客户端配置（client-config 生效配置，字段见后端 ClientConfig 实体）
+在运行中直接生效，无需重启：
+- 只接受白名单中的字段，逐项校验类型和取值范围，任一字段无效时整份配置被拒绝
+- 有变化的字段写入 AppConfig 后，依次通知各模块（调整调度间隔、监听间隔、启停功能）
+- 任一模块应用失败时恢复到上一份成功应用的配置，并再次通知各模块
+- 被拒绝或回滚的同一份配置再次下发时不重复尝试
+
+extendedSettings 中可提供实体之外的字段（如 maxLongSide、clipboardCheckInterval、uploadBytesPerSecond）。
+"""
+
+import json
+import math
+import hashlib
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from .config import AppConfig
+
+# 变化集合：配置路径 -> (旧值, 新值)
+ConfigChanges = Dict[str, Tuple[Any, Any]]
+
+
+class RemoteSetting(NamedTuple):
+    """可远程修改的配置项"""
+    path: str  # AppConfig 中的路径，如 screenshot.interval
+    kind: type  # int / float / bool
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+
+
+# 服务器字段 -> 本地配置项（范围之外的值视为无效配置）
+REMOTE_SETTINGS: Dict[str, RemoteSetting] = {
+    'screenshotInterval': RemoteSetting('screenshot.interval', int, 5, 3600),
+    'imageQuality': RemoteSetting('screenshot.quality', int, 10, 100),
+    'maxLongSide': RemoteSetting('screenshot.max_long_side', int, 320, 7680),
+    'heartbeatInterval': RemoteSetting('heartbeat.interval', int, 5, 3600),
+    'whitelistSyncInterval': RemoteSetting('whitelist.sync_interval', int, 30, 86400),
+    'configSyncInterval': RemoteSetting('config_sync.interval', int, 30, 86400),
+    'clipboardCheckInterval': RemoteSetting('clipboard.check_interval', float, 0.05, 10),
+    'enableClipboardMonitoring': RemoteSetting('clipboard.enabled', bool),
+    'clearClipboardOnViolation': RemoteSetting('clipboard.auto_clear_on_violation', bool),
+    'uploadBytesPerSecond': RemoteSetting('bandwidth.max_bytes_per_second', int, 8192, 104857600),
+}
+
+
+class RemoteConfigError(ValueError):
+    """远程配置无效"""
+
+
+def _coerce(name: str, setting: RemoteSetting, value: Any) -> Any:
+    """校验并转换单个字段的值
+
+    Raises:
+        RemoteConfigError: 类型或范围无效
+    """
+    if setting.kind is bool:
+        # MySQL tinyint 可能以 0/1 下发
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, int) and value in (0, 1):
+            return bool(value)
+        raise RemoteConfigError(f"{name} 应为布尔值: {value!r}")
+
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise RemoteConfigError(f"{name} 应为数值: {value!r}")
+    # json.loads 接受 NaN/Infinity：NaN 能通过范围比较，Infinity 无法转换为整数
+    if not math.isfinite(value):
+        raise RemoteConfigError(f"{name} 应为有限数值: {value!r}")
+    if setting.kind is int:
+        if value != int(value):
+            raise RemoteConfigError(f"{name} 应为整数: {value!r}")
+        value = int(value)
+    else:
+        value = float(value)
+    if setting.minimum is not None and value < setting.minimum:
+        raise RemoteConfigError(f"{name} 不能小于 {setting.minimum}: {value}")
+    if setting.maximum is not None and value > setting.maximum:
+        raise RemoteConfigError(f"{name} 不能大于 {setting.maximum}: {value}")
+    return value
+
+
+class RemoteConfigManager:
+    """把服务器下发的配置应用到运行中的模块（线程安全）"""
+
+    def __init__(self, config: AppConfig, logger):
+        """初始化远程配置管理器
+
+        Args:
+            config: 应用配置（原地修改）
+            logger: 日志记录器
+        """
+        self.config = config
+        self.logger = logger
+
+        self._lock = threading.Lock()
+        self._hooks: List[Tuple[str, Callable[[ConfigChanges], None]]] = []
+        # 上一份成功应用的配置（初始为本地配置文件中的值）
+        self._last_good = self._current_values()
+        self._bad_digest: Optional[str] = None
+
+        self._stats = {
+            'updates_received': 0,
+            'updates_applied': 0,
+            'updates_unchanged': 0,
+            'updates_rejected': 0,
+            'rollbacks': 0,
+            'last_applied': None,
+            'last_error': None
+        }
+
+    def register(self, name: str, hook: Callable[[ConfigChanges], None]) -> None:
+        """注册配置变化时需要通知的模块
+
+        Args:
+            name: 模块名称（用于日志）
+            hook: 接收变化集合的函数，抛出异常表示应用失败
+        """
+        self._hooks.append((name, hook))
+
+    def apply(self, remote: Dict[str, Any]) -> bool:
+        """应用服务器下发的配置
+
+        Args:
+            remote: 生效配置（未知字段忽略）
+
+        Returns:
+            是否已生效（没有变化也视为成功）
+        """
+        if not isinstance(remote, dict):
+            return False
+
+        self._stats['updates_received'] += 1
+        digest = self._digest(remote)
+        if digest == self._bad_digest:
+            self.logger.debug("远程配置与上次被拒绝的配置相同，跳过")
+            return False
+
+        try:
+            values = self._validate(remote)
+        except RemoteConfigError as e:
+            self._reject(digest, f"远程配置无效，保持当前配置: {e}")
+            self._stats['updates_rejected'] += 1
+            return False
+
+        with self._lock:
+            changes = {path: (self._get(path), value) for path, value in values.items()
+                       if self._get(path) != value}
+            if not changes:
+                self._stats['updates_unchanged'] += 1
+                return True
+
+            for path, (old, new) in changes.items():
+                self.logger.info(f"远程配置: {path} {old} -> {new}")
+
+            self._set_values({path: new for path, (_, new) in changes.items()})
+            try:
+                self._notify(changes)
+            except Exception as e:
+                self._rollback(changes)
+                self._reject(digest, f"远程配置应用失败，已回滚到上一份有效配置: {e}")
+                self._stats['rollbacks'] += 1
+                return False
+
+            self._last_good = self._current_values()
+            self._stats['updates_applied'] += 1
+            self._stats['last_applied'] = datetime.now().isoformat()
+            return True
+
+    def get_stats(self) -> Dict:
+        """获取统计信息（含当前生效值，随心跳上报）"""
+        stats = self._stats.copy()
+        stats['effective'] = self._current_values()
+        return stats
+
+    # ---------- 内部 ----------
+
+    def _validate(self, remote: Dict[str, Any]) -> Dict[str, Any]:
+        """提取并校验已知字段，返回 配置路径 -> 新值"""
+        merged = dict(remote.get('extendedSettings') or {})
+        merged.update({key: value for key, value in remote.items() if key != 'extendedSettings'})
+
+        values = {}
+        for name, setting in REMOTE_SETTINGS.items():
+            if merged.get(name) is not None:
+                values[setting.path] = _coerce(name, setting, merged[name])
+        return values
+
+    def _notify(self, changes: ConfigChanges) -> None:
+        for name, hook in self._hooks:
+            try:
+                hook(changes)
+            except Exception as e:
+                raise RuntimeError(f"{name}: {e}") from e
+
+    def _rollback(self, changes: ConfigChanges) -> None:
+        """恢复上一份有效配置并通知各模块（通知失败只记录日志）"""
+        restore = {path: self._last_good[path] for path in changes}
+        reverse = {path: (changes[path][1], value) for path, value in restore.items()}
+        self._set_values(restore)
+        for name, hook in self._hooks:
+            try:
+                hook(reverse)
+            except Exception as e:
+                self.logger.error(f"回滚远程配置时 {name} 出错: {e}")
+
+    def _reject(self, digest: str, message: str) -> None:
+        self._bad_digest = digest
+        self._stats['last_error'] = message
+        self.logger.error(message)
+
+    def _current_values(self) -> Dict[str, Any]:
+        return {setting.path: self._get(setting.path) for setting in REMOTE_SETTINGS.values()}
+
+    def _get(self, path: str) -> Any:
+        section, name = path.split('.')
+        return getattr(getattr(self.config, section), name)
+
+    def _set_values(self, values: Dict[str, Any]) -> None:
+        for path, value in values.items():
+            section, name = path.split('.')
+            setattr(getattr(self.config, section), name, value)
+
+    @staticmethod
+    def _digest(remote: Dict[str, Any]) -> str:
+        canonical = json.dumps(remote, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
@@ -12,14 +12,20 @@
 
 import re
 import time
-from typing import List, Dict, Optional, Set
+import logging
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Pattern, Set, Tuple, Union
 from datetime import datetime
 
+from .rule_pack import RulePack, compile_rule_pack, get_active_rule_pack
+
 
 class BlockchainAddressDetector:
     """区块链地址检测器"""
     
-    def __init__(self, logger, whitelist_manager=None, violation_reporter=None):
+    def __init__(self, logger, whitelist_manager=None, violation_reporter=None,
+                 rule_pack: Optional[RulePack] = None):
         """
         初始化区块链地址检测器
         
@@ -27,179 +33,12 @@ class BlockchainAddressDetector:
             logger: 日志记录器
             whitelist_manager: 白名单管理器
             violation_reporter: 违规事件上报器
+            rule_pack: 固定使用的检测规则包，为None时跟随当前生效的规则包
         """
         self.logger = logger
         self.whitelist_manager = whitelist_manager
         self.violation_reporter = violation_reporter
-        
-        # 地址检测正则表达式 - 增强版，支持更多格式
-        self._address_patterns = {
-            'BTC': [
-                # Legacy P2PKH addresses (1...)
-                re.compile(r'\b[13][a-km-zA-HJ-NP-Z1-9]{25,34}\b'),
-                # P2SH addresses (3...)
-                re.compile(r'\b3[a-km-zA-HJ-NP-Z1-9]{25,34}\b'),
-                # Bech32 addresses (bc1...)
-                re.compile(r'\bbc1[a-z0-9]{39,59}\b'),
-                # Taproot addresses (bc1p...)
-                re.compile(r'\bbc1p[a-z0-9]{58}\b')
-            ],
-            'ETH': [
-                # Ethereum addresses (0x...)
-                re.compile(r'\b0x[a-fA-F0-9]{40}\b'),
-                # ENS domains (.eth)
-                re.compile(r'\b[a-zA-Z0-9][a-zA-Z0-9-]*[a-zA-Z0-9]\.eth\b', re.IGNORECASE)
-            ],
-            'TRX': [
-                # TRON addresses (T...)
-                re.compile(r'\bT[A-Za-z1-9]{33}\b')
-            ],
-            'LTC': [
-                # Litecoin Legacy addresses (L, M...)
-                re.compile(r'\b[LM][a-km-zA-HJ-NP-Z1-9]{26,33}\b'),
-                # Litecoin P2SH addresses (3...)
-                re.compile(r'\b3[a-km-zA-HJ-NP-Z1-9]{26,33}\b'),
-                # Litecoin Bech32 addresses (ltc1...)
-                re.compile(r'\bltc1[a-z0-9]{39,59}\b')
-            ],
-            'DOGE': [
-                # Dogecoin addresses (D...)
-                re.compile(r'\bD{1}[5-9A-HJ-NP-U]{1}[1-9A-HJ-NP-Za-km-z]{32}\b'),
-                # Dogecoin P2SH addresses (9, A...)
-                re.compile(r'\b[9A][a-km-zA-HJ-NP-Z1-9]{33}\b')
-            ],
-            'BCH': [
-                # Bitcoin Cash Legacy addresses
-                re.compile(r'\b[13][a-km-zA-HJ-NP-Z1-9]{25,34}\b'),
-                # CashAddr format (bitcoincash:)
-                re.compile(r'\bbitcoincash:[qp][a-z0-9]{41}\b'),
-                # CashAddr format (q, p...)
-                re.compile(r'\b[qp][a-z0-9]{41}\b')
-            ],
-            'XRP': [
-                # Ripple Classic addresses (r...)
-                re.compile(r'\br[a-zA-Z0-9]{24,34}\b'),
-                # Ripple X-addresses (X...)
-                re.compile(r'\bX[a-zA-Z0-9]{46,47}\b')
-            ],
-            'ADA': [
-                # Cardano Shelley addresses (addr1...)
-                re.compile(r'\baddr1[a-z0-9]{98}\b'),
-                # Cardano Byron addresses (Ae2...)
-                re.compile(r'\bAe2[a-zA-Z0-9]{51}\b'),
-                # Cardano stake addresses (stake1...)
-                re.compile(r'\bstake1[a-z0-9]{53}\b')
-            ],
-            'DOT': [
-                # Polkadot addresses (1...)
-                re.compile(r'\b1[a-zA-Z0-9]{47}\b'),
-                # Kusama addresses (similar format)
-                re.compile(r'\b[A-HJ-NP-Z][a-zA-Z0-9]{47}\b')
-            ],
-            'SOL': [
-                # Solana addresses (base58, 32-44 chars)
-                re.compile(r'\b[1-9A-HJ-NP-Za-km-z]{32,44}\b')
-            ],
-            'BNB': [
-                # Binance Smart Chain (0x...)
-                re.compile(r'\b0x[a-fA-F0-9]{40}\b'),
-                # Binance Chain (bnb...)
-                re.compile(r'\bbnb[a-z0-9]{39}\b')
-            ],
-            'MATIC': [
-                # Polygon addresses (0x...)
-                re.compile(r'\b0x[a-fA-F0-9]{40}\b')
-            ],
-            'AVAX': [
-                # Avalanche C-Chain (0x...)
-                re.compile(r'\b0x[a-fA-F0-9]{40}\b'),
-                # Avalanche X-Chain (X-avax...)
-                re.compile(r'\bX-avax[a-z0-9]{39}\b'),
-                # Avalanche P-Chain (P-avax...)
-                re.compile(r'\bP-avax[a-z0-9]{39}\b')
-            ],
-            'ATOM': [
-                # Cosmos addresses (cosmos...)
-                re.compile(r'\bcosmos[a-z0-9]{39}\b')
-            ],
-            'XMR': [
-                # Monero addresses (4...)
-                re.compile(r'\b4[a-zA-Z0-9]{94}\b'),
-                # Monero integrated addresses (4...)
-                re.compile(r'\b4[a-zA-Z0-9]{106}\b')
-            ],
-            'ZEC': [
-                # Zcash transparent addresses (t1...)
-                re.compile(r'\bt1[a-zA-Z0-9]{33}\b'),
-                # Zcash shielded addresses (zs1...)
-                re.compile(r'\bzs1[a-z0-9]{75}\b')
-            ],
-            'DASH': [
-                # Dash addresses (X...)
-                re.compile(r'\bX[a-km-zA-HJ-NP-Z1-9]{33}\b')
-            ],
-            'ETC': [
-                # Ethereum Classic addresses (0x...)
-                re.compile(r'\b0x[a-fA-F0-9]{40}\b')
-            ],
-            'XLM': [
-                # Stellar addresses (G...)
-                re.compile(r'\bG[A-Z2-7]{55}\b')
-            ],
-            'NEO': [
-                # NEO addresses (A...)
-                re.compile(r'\bA[a-km-zA-HJ-NP-Z1-9]{33}\b')
-            ],
-            'IOTA': [
-                # IOTA addresses (90 chars, A-Z and 9)
-                re.compile(r'\b[A-Z9]{90}\b')
-            ],
-            'ALGO': [
-                # Algorand addresses (base32, 58 chars)
-                re.compile(r'\b[A-Z2-7]{58}\b')
-            ],
-            'FIL': [
-                # Filecoin addresses (f1...)
-                re.compile(r'\bf1[a-z0-9]{38}\b'),
-                # Filecoin addresses (f3...)
-                re.compile(r'\bf3[a-z0-9]{84}\b')
-            ]
-        }
-
-        # 可疑模式检测 - 更宽泛的检测
-        self._suspicious_patterns = {
-            'GENERIC_CRYPTO': [
-                # 长字符串数字字母组合 (可能是地址)
-                re.compile(r'\b[a-zA-Z0-9]{25,100}\b'),
-                # 包含数字和字母的长字符串
-                re.compile(r'\b(?=.*[0-9])(?=.*[a-zA-Z])[a-zA-Z0-9]{20,}\b'),
-                # Base58字符集 (常用于加密货币)
-                re.compile(r'\b[1-9A-HJ-NP-Za-km-z]{25,}\b'),
-                # 十六进制长字符串
-                re.compile(r'\b[a-fA-F0-9]{32,}\b')
-            ],
-            'WALLET_KEYWORDS': [
-                # 钱包相关关键词后的地址
-                re.compile(r'(?:wallet|address|addr|钱包|地址|收款|转账|充值|提现)[:：\s]*([a-zA-Z0-9]{20,})', re.IGNORECASE),
-                # 收款码、付款码等
-                re.compile(r'(?:收款码|付款码|转账码|充币|提币)[:：\s]*([a-zA-Z0-9]{20,})', re.IGNORECASE)
-            ],
-            'EXCHANGE_PATTERNS': [
-                # 交易所充值地址模式
-                re.compile(r'(?:充值|deposit|recharge)[:：\s]*([a-zA-Z0-9]{20,})', re.IGNORECASE),
-                # 提现地址模式
-                re.compile(r'(?:提现|withdraw|提币)[:：\s]*([a-zA-Z0-9]{20,})', re.IGNORECASE)
-            ]
-        }
-
-        # 高风险关键词
-        self._high_risk_keywords = [
-            '洗钱', '黑钱', '跑分', '代收', '代付', '刷流水', 'money laundering',
-            '暗网', 'dark web', '匿名交易', 'anonymous', '混币', 'mixer',
-            '赌博', 'gambling', '博彩', '投注', 'betting', '下注',
-            '诈骗', 'scam', '欺诈', 'fraud', '钓鱼', 'phishing',
-            '勒索', 'ransom', '敲诈', 'extortion', '黑客', 'hacker'
-        ]
+        self._rule_pack = rule_pack
 
         # 统计信息
         self._stats = {
@@ -212,7 +51,12 @@ class BlockchainAddressDetector:
             'last_detection_time': None
         }
 
-        self.logger.info("区块链地址检测器初始化完成 - 增强检测模式已启用")
+        self.logger.info(f"区块链地址检测器初始化完成 - 增强检测模式已启用 (规则包版本: {self.rule_pack.version})")
+
+    @property
+    def rule_pack(self) -> RulePack:
+        """本检测器使用的规则包"""
+        return self._rule_pack or get_active_rule_pack()
     
     def detect_addresses(self, content: str) -> List[Dict[str, str]]:
         """
@@ -222,94 +66,245 @@ class BlockchainAddressDetector:
             content: 要检测的文本内容
 
         Returns:
-            检测到的地址列表，每个元素包含 {'address': str, 'type': str, 'confidence': str, 'risk_level': str}
+            检测到的地址列表，每个元素包含 {'address': str, 'type': str, 'confidence': str, 'risk_level': str, 'position': int}
         """
         if not content or not isinstance(content, str):
             return []
 
         self._stats['total_detections'] += 1
-        detected_addresses = []
+        validated_addresses = self._scan_text(content, rules=self.rule_pack)
+        self._record_detections(validated_addresses)
+
+        return validated_addresses
+
+    def iter_addresses_chunked(self, source: Union[str, Iterable[str]], chunk_size: int = 8192,
+                               overlap: int = 256) -> Iterator[Dict[str, str]]:
+        """
+        以重叠分块的方式流式检测区块链地址
+
+        与 detect_addresses 使用同一套匹配与验证逻辑，但每次只处理 chunk_size 个字符，
+        内存占用与内容总长度无关；调用方可在确认违规后随时停止迭代以提前结束扫描。
+
+        与 detect_addresses 的区别：风险等级（risk_level）只按地址所在分块的内容评估，
+        分块之外的风险关键词和金额信息不计入。
+
+        Args:
+            source: 文本内容，或按顺序产出文本片段的可迭代对象（如文件）
+            chunk_size: 每个分块的字符数
+            overlap: 相邻分块的重叠字符数，必须大于最长地址长度（约120字符）
+
+        Yields:
+            地址信息字典，额外包含 'position'（在完整内容中的起始偏移）
+        """
+        for found in self.iter_address_chunks(source, chunk_size, overlap):
+            yield from found
+
+    def iter_address_chunks(self, source: Union[str, Iterable[str]], chunk_size: int = 8192,
+                            overlap: int = 256) -> Iterator[List[Dict[str, str]]]:
+        """
+        按分块流式检测区块链地址，每个分块的新地址作为一组产出
+
+        便于调用方按组批量处理（如一次查询白名单）；参数和地址信息同 iter_addresses_chunked，
+        没有新地址的分块不产出。
+
+        Yields:
+            一个分块中首次出现的地址信息列表
+        """
+        if chunk_size <= overlap:
+            raise ValueError(f"chunk_size ({chunk_size}) 必须大于 overlap ({overlap})")
+
+        self._stats['total_detections'] += 1
+        seen: Set[str] = set()
+        # 整个流式扫描使用开始时的规则包版本
+        rules = self.rule_pack
+
+        for offset, chunk, is_last in self._iter_chunks(source, chunk_size, overlap):
+            chunk_length = len(chunk)
+
+            # 触及分块边界的匹配可能是被截断的长字符串，留给包含完整上下文的相邻分块处理
+            def accept(start: int, end: int) -> bool:
+                if offset > 0 and start == 0:
+                    return False
+                if not is_last and end == chunk_length:
+                    return False
+                return True
+
+            found = [addr_info for addr_info in self._scan_text(chunk, accept, rules)
+                     if addr_info['address'] not in seen]
+            if not found:
+                continue
+            self._record_detections(found)
+
+            for addr_info in found:
+                seen.add(addr_info['address'])
+                addr_info['position'] += offset
+            yield found
+
+    @staticmethod
+    def _iter_chunks(source: Union[str, Iterable[str]], chunk_size: int,
+                     overlap: int) -> Iterator[Tuple[int, str, bool]]:
+        """
+        将内容切分为重叠分块
+
+        Yields:
+            (分块在完整内容中的偏移, 分块文本, 是否为最后一块)
+        """
+        step = chunk_size - overlap
+
+        if isinstance(source, str):
+            offset = 0
+            while True:
+                end = min(offset + chunk_size, len(source))
+                is_last = end >= len(source)
+                yield offset, source[offset:end], is_last
+                if is_last:
+                    return
+                offset += step
+
+        buffer = ''
+        offset = 0
+        iterator = iter(source)
+        pending = next(iterator, None)
+        while pending is not None:
+            buffer += pending
+            pending = next(iterator, None)
+            while len(buffer) > chunk_size or (pending is not None and len(buffer) == chunk_size):
+                yield offset, buffer[:chunk_size], False
+                buffer = buffer[step:]
+                offset += step
+        yield offset, buffer, True
+
+    def _scan_text(self, content: str, accept: Optional[Callable[[int, int], bool]] = None,
+                   rules: Optional[RulePack] = None) -> List[Dict[str, str]]:
+        """
+        对一段文本执行完整的检测流程：精确匹配、可疑模式匹配和地址验证
+
+        Args:
+            content: 要检测的文本
+            accept: 可选的匹配位置过滤函数 (start, end) -> bool
+            rules: 使用的规则包，默认为本检测器当前的规则包
+
+        Returns:
+            验证通过的地址列表，每个元素额外包含 'position'
+        """
+        rules = rules or self.rule_pack
+        detected: Dict[str, Dict[str, str]] = {}
 
         # 1. 精确匹配已知地址格式
-        for address_type, patterns in self._address_patterns.items():
-            for pattern in patterns:
-                matches = pattern.findall(content)
-                for match in matches:
-                    # 去重检查
-                    if not any(addr['address'] == match for addr in detected_addresses):
-                        detected_addresses.append({
-                            'address': match,
+        for address_type, chain_rule in rules.chains.items():
+            for pattern in chain_rule.patterns:
+                for address, start in self._iter_matches(pattern, content, accept):
+                    if address not in detected:
+                        detected[address] = {
+                            'address': address,
                             'type': address_type,
                             'confidence': 'high',
-                            'risk_level': self._assess_risk_level(content, match),
-                            'detection_method': 'exact_pattern'
-                        })
+                            'risk_level': self._assess_risk_level(content, address, rules),
+                            'detection_method': 'exact_pattern',
+                            'position': start
+                        }
 
-        # 2. 可疑模式检测 (更宽泛)
-        suspicious_addresses = self._detect_suspicious_patterns(content)
-        for addr_info in suspicious_addresses:
-            # 避免重复添加已经精确匹配的地址
-            if not any(addr['address'] == addr_info['address'] for addr in detected_addresses):
-                detected_addresses.append(addr_info)
+        # 2. 可疑模式检测 (更宽泛)，避免重复添加已经精确匹配的地址
+        for pattern_type, patterns in rules.suspicious.items():
+            for pattern in patterns:
+                for address, start in self._iter_matches(pattern, content, accept):
+                    if address in detected or len(address) < 20:  # 最小长度过滤
+                        continue
+                    # 进一步验证是否可能是地址
+                    if self._is_likely_crypto_address(address, rules):
+                        detected[address] = {
+                            'address': address,
+                            'type': 'UNKNOWN_CRYPTO',
+                            'confidence': 'medium',
+                            'risk_level': self._assess_risk_level(content, address, rules),
+                            'detection_method': f'suspicious_pattern_{pattern_type.lower()}',
+                            'position': start
+                        }
 
         # 3. 额外验证检测到的地址
-        validated_addresses = []
-        for addr_info in detected_addresses:
-            if self._validate_address_enhanced(addr_info['address'], addr_info['type']):
-                validated_addresses.append(addr_info)
+        return [addr_info for addr_info in detected.values()
+                if self._validate_address_enhanced(addr_info['address'], addr_info['type'], rules)]
 
-        if validated_addresses:
-            self._stats['addresses_found'] += len(validated_addresses)
-            self._stats['last_detection_time'] = datetime.now().isoformat()
+    @staticmethod
+    def _iter_matches(pattern: Pattern, content: str,
+                      accept: Optional[Callable[[int, int], bool]]) -> Iterator[Tuple[str, int]]:
+        """
+        遍历正则匹配结果，带分组的模式取第一个分组（与 findall 语义一致）
 
-            # 统计可疑模式
-            suspicious_count = len([addr for addr in validated_addresses if addr.get('confidence') == 'medium'])
-            if suspicious_count > 0:
-                self._stats['suspicious_patterns_found'] += suspicious_count
+        Yields:
+            (匹配文本, 起始位置)
+        """
+        group = 1 if pattern.groups else 0
+        for match in pattern.finditer(content):
+            start, end = match.span(group)
+            if start < 0 or (accept and not accept(start, end)):
+                continue
+            address = match.group(group)
+            if address:
+                yield address, start
+
+    def detect_many(self, contents: Iterable[str], workers: int = 1,
+                    chunksize: int = 64) -> Iterator[List[Dict[str, str]]]:
+        """
+        批量检测多段文本中的区块链地址
 
-            self.logger.debug(f"检测到 {len(validated_addresses)} 个地址 (精确: {len(validated_addresses) - suspicious_count}, 可疑: {suspicious_count})")
+        workers > 1 时使用进程池并行检测，每个工作进程持有一个独立的
+        BlockchainAddressDetector，检测逻辑与 detect_addresses 完全一致。
+        输入按窗口分批提交，内存占用与输入总量无关。
 
-        return validated_addresses
+        Args:
+            contents: 文本内容的可迭代对象
+            workers: 工作进程数，1 表示在当前进程中顺序检测
+            chunksize: 每次分派给工作进程的记录数
 
-    def _detect_suspicious_patterns(self, content: str) -> List[Dict[str, str]]:
+        Yields:
+            每段文本的检测结果，顺序与输入一致
+        """
+        if workers <= 1:
+            for content in contents:
+                yield self.detect_addresses(content)
+            return
+
+        iterator = iter(contents)
+        window = workers * chunksize * 4
+        # 工作进程使用与当前检测器相同的规则包
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_detect_worker,
+                                 initargs=(self.rule_pack.source,)) as executor:
+            while True:
+                batch = list(islice(iterator, window))
+                if not batch:
+                    break
+                self._stats['total_detections'] += len(batch)
+                for result in executor.map(_detect_in_worker, batch, chunksize=chunksize):
+                    yield result
+
+    def _record_detections(self, addresses: List[Dict[str, str]]) -> None:
         """
-        检测可疑模式 - 更宽泛的检测
+        更新检测统计
 
         Args:
-            content: 要检测的文本内容
-
-        Returns:
-            可疑地址列表
+            addresses: 本次检测到的地址列表
         """
-        suspicious_addresses = []
+        if not addresses:
+            return
 
-        # 检测通用加密货币模式
-        for pattern_type, patterns in self._suspicious_patterns.items():
-            for pattern in patterns:
-                matches = pattern.findall(content)
-                for match in matches:
-                    # 提取地址部分（如果是分组匹配）
-                    address = match if isinstance(match, str) else match[0] if match else ""
-
-                    if address and len(address) >= 20:  # 最小长度过滤
-                        # 进一步验证是否可能是地址
-                        if self._is_likely_crypto_address(address):
-                            suspicious_addresses.append({
-                                'address': address,
-                                'type': 'UNKNOWN_CRYPTO',
-                                'confidence': 'medium',
-                                'risk_level': self._assess_risk_level(content, address),
-                                'detection_method': f'suspicious_pattern_{pattern_type.lower()}'
-                            })
-
-        return suspicious_addresses
-
-    def _is_likely_crypto_address(self, address: str) -> bool:
+        self._stats['addresses_found'] += len(addresses)
+        self._stats['last_detection_time'] = datetime.now().isoformat()
+
+        # 统计可疑模式
+        suspicious_count = len([addr for addr in addresses if addr.get('confidence') == 'medium'])
+        if suspicious_count > 0:
+            self._stats['suspicious_patterns_found'] += suspicious_count
+
+        self.logger.debug(f"检测到 {len(addresses)} 个地址 (精确: {len(addresses) - suspicious_count}, 可疑: {suspicious_count})")
+
+    def _is_likely_crypto_address(self, address: str, rules: Optional[RulePack] = None) -> bool:
         """
         判断字符串是否可能是加密货币地址
 
         Args:
             address: 待检测的字符串
+            rules: 使用的规则包
 
         Returns:
             是否可能是地址
@@ -334,90 +329,80 @@ class BlockchainAddressDetector:
             return False
 
         # 排除常见的非地址模式
-        excluded_patterns = [
-            r'^[0-9a-f]{32}$',  # 可能是哈希值
-            r'^[A-Z]{20,}$',    # 全大写字母
-            r'^[a-z]{20,}$',    # 全小写字母
-        ]
-
-        for pattern in excluded_patterns:
-            if re.match(pattern, address):
+        for pattern in (rules or self.rule_pack).exclusions:
+            if pattern.match(address):
                 return False
 
         return True
 
-    def _assess_risk_level(self, content: str, address: str) -> str:
+    def _assess_risk_level(self, content: str, address: str, rules: Optional[RulePack] = None) -> str:
         """
         评估地址的风险等级
 
         Args:
             content: 完整内容
             address: 地址
+            rules: 使用的规则包
 
         Returns:
             风险等级: 'low', 'medium', 'high', 'critical'
         """
+        rules = rules or self.rule_pack
+        weights = rules.weights
         risk_score = 0
 
         # 检查高风险关键词
         content_lower = content.lower()
-        for keyword in self._high_risk_keywords:
-            if keyword.lower() in content_lower:
-                risk_score += 10
+        for keyword in rules.risk_keywords:
+            if keyword in content_lower:
+                risk_score += weights['keyword']
                 self._stats['high_risk_content_found'] += 1
 
         # 检查地址长度和复杂度
-        if len(address) > 60:
-            risk_score += 2
+        if len(address) > rules.long_address_length:
+            risk_score += weights['long_address']
 
         # 检查是否包含特殊前缀
-        high_risk_prefixes = ['bc1p', 'zs1', '4', 'X-avax', 'P-avax']
-        for prefix in high_risk_prefixes:
-            if address.startswith(prefix):
-                risk_score += 3
-                break
+        if rules.risk_prefixes and address.startswith(rules.risk_prefixes):
+            risk_score += weights['prefix']
 
         # 检查内容中的数量信息
-        amount_patterns = [
-            r'\d+\.?\d*\s*(?:BTC|ETH|USDT|USD|CNY|RMB)',
-            r'[¥$€£]\s*\d+',
-            r'\d+\s*万',
-            r'\d+\s*千'
-        ]
-
-        for pattern in amount_patterns:
-            if re.search(pattern, content, re.IGNORECASE):
-                risk_score += 5
+        for pattern in rules.amount_patterns:
+            if pattern.search(content):
+                risk_score += weights['amount']
                 break
 
         # 风险等级判定
-        if risk_score >= 20:
+        thresholds = rules.thresholds
+        if risk_score >= thresholds['critical']:
             return 'critical'
-        elif risk_score >= 10:
+        elif risk_score >= thresholds['high']:
             return 'high'
-        elif risk_score >= 5:
+        elif risk_score >= thresholds['medium']:
             return 'medium'
         else:
             return 'low'
 
-    def _validate_address_enhanced(self, address: str, address_type: str) -> bool:
+    def _validate_address_enhanced(self, address: str, address_type: str,
+                                   rules: Optional[RulePack] = None) -> bool:
         """
         增强的地址验证
 
         Args:
             address: 地址字符串
             address_type: 地址类型
+            rules: 使用的规则包
 
         Returns:
             是否为有效地址
         """
         # 基本验证
-        if not self._validate_address(address, address_type):
+        if not self._validate_address(address, address_type, rules):
             return False
 
         # 对于未知类型的地址，进行额外验证
         if address_type == 'UNKNOWN_CRYPTO':
-            return self._is_likely_crypto_address(address)
+            return self._is_likely_crypto_address(address, rules)
 
         return True
 
@@ -451,7 +436,7 @@ class BlockchainAddressDetector:
             address_type = addr_info['type']
             
             # 检查是否在白名单中
-            if not self._check_whitelist(address):
+            if not self._check_whitelist(address, address_type):
                 violation_data = {
                     'address': address,
                     'type': address_type,
@@ -509,13 +494,12 @@ class BlockchainAddressDetector:
         if not detected_addresses:
             return violations
         
-        # 批量验证检测到的地址
+        # 批量验证检测到的地址（传入检测结果，白名单可按链类型检查）
         if self.whitelist_manager:
-            addresses = [addr_info['address'] for addr_info in detected_addresses]
             try:
-                validation_result = self.whitelist_manager.validate_addresses(addresses)
-                whitelisted_addresses = validation_result.get('whitelisted', [])
-                violation_addresses = validation_result.get('violations', [])
+                validation_result = self.whitelist_manager.validate_addresses(detected_addresses)
+                whitelisted_addresses = [item['address'] for item in validation_result.get('whitelisted', [])]
+                violation_addresses = [item['address'] for item in validation_result.get('violations', [])]
                 
                 self._stats['whitelisted_addresses'] += len(whitelisted_addresses)
                 
@@ -575,7 +559,7 @@ class BlockchainAddressDetector:
                     address_type = addr_info['type']
                     
                     # 检查是否在白名单中
-                    is_whitelisted = self._check_whitelist(address)
+                    is_whitelisted = self._check_whitelist(address, address_type)
                     
                     if is_whitelisted:
                         self._stats['whitelisted_addresses'] += 1
@@ -667,13 +651,14 @@ class BlockchainAddressDetector:
         
         return violations
     
-    def _validate_address(self, address: str, address_type: str) -> bool:
+    def _validate_address(self, address: str, address_type: str, rules: Optional[RulePack] = None) -> bool:
         """
         验证地址格式的有效性
         
         Args:
             address: 地址字符串
             address_type: 地址类型
+            rules: 使用的规则包
         
         Returns:
             是否为有效地址
@@ -681,44 +666,20 @@ class BlockchainAddressDetector:
         if not address or len(address) < 10:
             return False
         
-        # 基本长度检查
-        length_limits = {
-            'BTC': (25, 62),
-            'ETH': (42, 42),
-            'TRX': (34, 34),
-            'LTC': (26, 34),
-            'DOGE': (34, 34),
-            'BCH': (25, 54),
-            'XRP': (25, 34),
-            'ADA': (103, 103),
-            'DOT': (47, 47),
-            'SOL': (32, 44)
-        }
-        
-        if address_type in length_limits:
-            min_len, max_len = length_limits[address_type]
-            if not (min_len <= len(address) <= max_len):
-                return False
-        
-        # 特殊验证
-        if address_type == 'ETH':
-            # 以太坊地址必须以0x开头
-            return address.startswith('0x') and len(address) == 42
-        elif address_type == 'TRX':
-            # TRON地址必须以T开头
-            return address.startswith('T') and len(address) == 34
-        elif address_type == 'BTC':
-            # Bitcoin地址验证
-            return (address.startswith(('1', '3')) or address.startswith('bc1'))
+        # 按规则包中该链的长度、前缀和验证器检查
+        chain_rule = (rules or self.rule_pack).chains.get(address_type)
+        if chain_rule is not None:
+            return chain_rule.validate(address)
         
         return True
     
-    def _check_whitelist(self, address: str) -> bool:
+    def _check_whitelist(self, address: str, address_type: Optional[str] = None) -> bool:
         """
         检查地址是否在白名单中
         
         Args:
             address: 区块链地址
+            address_type: 区块链类型
         
         Returns:
             是否在白名单中
@@ -729,10 +690,10 @@ class BlockchainAddressDetector:
         
         try:
             # 兼容不同版本白名单接口
-            if hasattr(self.whitelist_manager, 'is_whitelisted'):
+            if hasattr(self.whitelist_manager, 'is_address_whitelisted'):
+                return self.whitelist_manager.is_address_whitelisted(address, address_type)
+            elif hasattr(self.whitelist_manager, 'is_whitelisted'):
                 return self.whitelist_manager.is_whitelisted(address)
-            elif hasattr(self.whitelist_manager, 'is_address_whitelisted'):
-                return self.whitelist_manager.is_address_whitelisted(address, None)
             elif hasattr(self.whitelist_manager, 'validate_addresses'):
                 res = self.whitelist_manager.validate_addresses([address])
                 return address in res.get('whitelisted', [])
@@ -783,4 +744,26 @@ class BlockchainAddressDetector:
             'detected_addresses': detected,
             'detection_time_ms': round((end_time - start_time) * 1000, 2),
             'address_count': len(detected)
-        }
\ No newline at end of file
+        }
+
+
+# 进程池工作进程内的检测器实例，由 _init_detect_worker 在每个进程中创建一次
+_worker_detector: Optional[BlockchainAddressDetector] = None
+
+
+def _init_detect_worker(rule_pack_source: Dict) -> None:
+    """初始化批量检测工作进程
+
+    Args:
+        rule_pack_source: 规则包定义，在工作进程中编译一次
+    """
+    global _worker_detector
+    _worker_detector = BlockchainAddressDetector(
+        logging.getLogger(__name__),
+        rule_pack=compile_rule_pack(rule_pack_source)
+    )
+
+
+def _detect_in_worker(content: str) -> List[Dict[str, str]]:
+    """在工作进程中检测单段文本"""
+    return _worker_detector.detect_addresses(content)
@@ -8,33 +8,25 @@
 - 检测区块链地址
 - 白名单验证
 - 违规事件上报
+
+监听方式：
+- start(): 在调用线程中阻塞等待剪贴板变化（线程模式）
+- start_async(runtime): 在事件循环上等待变化通知，读取、检测和清空交给运行时的线程池（asyncio 模式）
 """
 
-import re
 import time
+import queue
+import asyncio
 import threading
 import io
-import base64
-import platform
-from typing import Optional, Dict, List, Set
+from concurrent.futures import Future
+from typing import Optional, Dict, List, Set, Tuple
 from datetime import datetime
 
 # 导入区块链检测器
 from .blockchain_detector import BlockchainAddressDetector
-
-# 根据操作系统选择剪贴板库
-if platform.system() == "Windows":
-    try:
-        import win32clipboard
-        import win32con
-        WINDOWS_CLIPBOARD = True
-    except ImportError:
-        WINDOWS_CLIPBOARD = False
-else:
-    WINDOWS_CLIPBOARD = False
-
-# 使用pyperclip作为跨平台剪贴板库
-import pyperclip
+from .clipboard_watcher import ClipboardWatcher, create_clipboard_watcher
+from .whitelist_index import normalize_address
 
 from PIL import Image
 try:
@@ -50,12 +42,14 @@ except ImportError:
     MOZJPEG_AVAILABLE = False
 
 from core.config import AppConfig
+from utils.metrics import LatencyTracker
 
 
 class ClipboardMonitor:
     """剪贴板监控器"""
     
-    def __init__(self, config: AppConfig, client_id: str, logger, whitelist_manager, violation_reporter):
+    def __init__(self, config: AppConfig, client_id: str, logger, whitelist_manager, violation_reporter,
+                 clipboard_watcher: Optional[ClipboardWatcher] = None):
         """初始化剪贴板监控器
         
         Args:
@@ -64,6 +58,7 @@ class ClipboardMonitor:
             logger: 日志记录器
             whitelist_manager: 白名单管理器
             violation_reporter: 违规事件上报器
+            clipboard_watcher: 剪贴板监听器，默认启动时按平台创建
         """
         self.config = config
         self.client_id = client_id
@@ -74,92 +69,170 @@ class ClipboardMonitor:
         self._running = False
         self._stop_event = threading.Event()
         self._last_clipboard_content = ""
-        self._last_check_time = 0
+        self._watcher = clipboard_watcher
+        self._owns_watcher = clipboard_watcher is None
         
-        # 编译区块链地址正则表达式（保持兼容性）
-        self._blockchain_patterns = self._compile_blockchain_patterns()
-
-        # 初始化增强的区块链地址检测器
+        # 初始化增强的区块链地址检测器（检测规则来自当前生效的规则包）
         self._blockchain_detector = BlockchainAddressDetector(
             logger=self.logger,
             whitelist_manager=self.whitelist_manager,
             violation_reporter=self.violation_reporter
         )
 
+        # 违规上报队列：监听线程只负责读取、检测和清空，截图与上报由工作线程完成
+        self._violation_queue = queue.Queue(maxsize=config.clipboard.violation_queue_size)
+        self._violation_worker: Optional[threading.Thread] = None
+        # asyncio 模式下事件循环上的监听协程
+        self._watch_future: Optional[Future] = None
+
+        # 本次剪贴板变化的处理状态（仅监听线程访问）
+        self._change_detected_at = 0.0
+        self._clear_result: Optional[Dict] = None
+
+        # 从发现剪贴板变化到清空完成的耗时
+        self._clear_latency = LatencyTracker()
+
         # 检测统计
         self._detection_stats = {
             'total_checks': 0,
+            'change_notifications': 0,
             'content_changes': 0,
             'blockchain_detections': 0,
-            'violations_reported': 0
+            'violations_detected': 0,
+            'violations_reported': 0,
+            'violations_dropped': 0
         }
 
         self.logger.info("剪贴板监控器初始化完成 - 增强检测模式已启用")
     
-    def _compile_blockchain_patterns(self) -> Dict[str, List[re.Pattern]]:
-        """编译区块链地址正则表达式
-        
-        Returns:
-            编译后的正则表达式字典
-        """
-        patterns = {}
-        
-        for blockchain_type, pattern_list in self.config.blockchain.patterns.items():
-            compiled_patterns = []
-            
-            if isinstance(pattern_list, list):
-                # 多个模式
-                for pattern in pattern_list:
-                    try:
-                        compiled_patterns.append(re.compile(pattern, re.IGNORECASE))
-                    except re.error as e:
-                        self.logger.warning(f"无效的正则表达式 {blockchain_type}: {pattern} - {e}")
-            else:
-                # 单个模式
-                try:
-                    compiled_patterns.append(re.compile(pattern_list, re.IGNORECASE))
-                except re.error as e:
-                    self.logger.warning(f"无效的正则表达式 {blockchain_type}: {pattern_list} - {e}")
-            
-            if compiled_patterns:
-                patterns[blockchain_type] = compiled_patterns
-        
-        self.logger.info(f"已编译 {len(patterns)} 种区块链地址模式")
-        return patterns
-    
     def start(self) -> None:
-        """启动剪贴板监控器"""
-        if self._running:
-            self.logger.warning("剪贴板监控器已在运行中")
+        """启动剪贴板监控器（阻塞调用线程直到停止）"""
+        started = self._begin()
+        if started is None:
             return
-        
-        if not self.config.clipboard.enabled:
-            self.logger.info("剪贴板监控已禁用")
-            return
-        
-        self._running = True
-        self.logger.info("剪贴板监控器已启动")
+        watcher, stop_event = started
         
         # 获取初始剪贴板内容
+        sequence = watcher.get_sequence()
         self._last_clipboard_content = self._get_clipboard_content() or ""
         
-        # 主监控循环
-        while self._running and not self._stop_event.is_set():
+        # 主监控循环：阻塞等待剪贴板序列号变化，变化后才读取内容
+        while self._running and not stop_event.is_set():
             try:
-                current_time = time.time()
-                
-                # 检查是否需要检测
-                if (current_time - self._last_check_time) >= self.config.clipboard.check_interval:
-                    self._check_clipboard()
-                    self._last_check_time = current_time
-                
-                # 短暂休眠
-                time.sleep(0.1)
+                new_sequence = watcher.wait_for_change(sequence)
+                if not self._running or new_sequence == sequence:
+                    continue
+
+                sequence = new_sequence
+                self._detection_stats['change_notifications'] += 1
+                self._check_clipboard(changed_at=time.perf_counter())
                 
             except Exception as e:
                 self.logger.error(f"剪贴板监控异常: {e}")
-                time.sleep(1)  # 出错后等待1秒再继续
+                stop_event.wait(1)  # 出错后等待1秒再继续
     
+    def start_async(self, runtime) -> Optional[Future]:
+        """在事件循环运行时上启动剪贴板监控器（立即返回，不占用调用线程）
+
+        Args:
+            runtime: 事件循环运行时（AsyncRuntime）
+
+        Returns:
+            监听协程的 Future，未启动时返回None
+        """
+        started = self._begin()
+        if started is None:
+            return None
+        watcher, stop_event = started
+        self._watch_future = runtime.spawn(self._watch_async(runtime, watcher, stop_event))
+        return self._watch_future
+
+    def _begin(self) -> Optional[Tuple[ClipboardWatcher, threading.Event]]:
+        """启动前的准备：创建监听器并启动违规上报工作线程
+
+        Returns:
+            (监听器, 本次启动的停止事件)，已在运行或已禁用时返回None
+        """
+        if self._running:
+            self.logger.warning("剪贴板监控器已在运行中")
+            return None
+        
+        if not self.config.clipboard.enabled:
+            self.logger.info("剪贴板监控已禁用")
+            return None
+        
+        watcher = self._get_watcher()
+        self._running = True
+        # 每次启动使用新的停止事件：停止后立即重新启动时，旧的监控循环仍能退出
+        stop_event = self._stop_event = threading.Event()
+        self._violation_worker = threading.Thread(
+            target=self._run_violation_worker,
+            name="ClipboardViolationWorker",
+            daemon=True
+        )
+        self._violation_worker.start()
+        self.logger.info(f"剪贴板监控器已启动 (监听方式: {watcher.name})")
+        return watcher, stop_event
+
+    async def _watch_async(self, runtime, watcher: ClipboardWatcher, stop_event: threading.Event) -> None:
+        """事件循环上的监控循环：等待监听器的唤醒回调，序列号变化后在线程池中读取、检测和清空"""
+        loop = asyncio.get_running_loop()
+        changed = asyncio.Event()
+
+        def wake() -> None:
+            loop.call_soon_threadsafe(changed.set)
+
+        watcher.add_listener(wake)
+        try:
+            sequence = await runtime.run_blocking(watcher.get_sequence)
+            self._last_clipboard_content = (await runtime.run_blocking(self._get_clipboard_content)) or ""
+
+            while self._running and not stop_event.is_set() and not watcher.closed:
+                # 先清除唤醒标记再检查序列号，检查之后的变化会再次唤醒
+                changed.clear()
+                try:
+                    if watcher.event_driven:
+                        new_sequence = watcher.get_sequence()
+                    else:
+                        # 轮询监听器获取序列号时会读取剪贴板
+                        new_sequence = await runtime.run_blocking(watcher.get_sequence)
+                    if new_sequence == sequence:
+                        try:
+                            await asyncio.wait_for(changed.wait(),
+                                                   None if watcher.event_driven else watcher.poll_interval)
+                        except asyncio.TimeoutError:
+                            pass
+                        continue
+
+                    sequence = new_sequence
+                    self._detection_stats['change_notifications'] += 1
+                    await runtime.run_blocking(self._check_clipboard, time.perf_counter())
+
+                except Exception as e:
+                    self.logger.error(f"剪贴板监控异常: {e}")
+                    await asyncio.sleep(1)  # 出错后等待1秒再继续
+        finally:
+            watcher.remove_listener(wake)
+
+    def _get_watcher(self) -> ClipboardWatcher:
+        """获取剪贴板监听器，首次使用时按配置创建"""
+        if self._watcher is None:
+            self._watcher = create_clipboard_watcher(
+                self.logger,
+                backend=self.config.clipboard.watcher_backend,
+                poll_interval=self.config.clipboard.check_interval
+            )
+        return self._watcher
+
+    def is_running(self) -> bool:
+        """检查是否在运行"""
+        return self._running
+
+    def apply_runtime_config(self, changes: Dict) -> None:
+        """远程配置变化：调整序列号检查间隔（启停由客户端处理）"""
+        if 'clipboard.check_interval' in changes and self._watcher is not None:
+            self._watcher.poll_interval = self.config.clipboard.check_interval
+
     def stop(self) -> None:
         """停止剪贴板监控器"""
         if not self._running:
@@ -167,15 +240,40 @@ class ClipboardMonitor:
         
         self._running = False
         self._stop_event.set()
+        if self._watcher:
+            self._watcher.close()
+            # 自己创建的监听器关闭后不能复用，重新启动时按当前配置重新创建
+            if self._owns_watcher:
+                self._watcher = None
+
+        # 等待事件循环上的监听协程退出（正在进行的检查完成后）
+        if self._watch_future is not None:
+            try:
+                self._watch_future.result(timeout=self.config.server.timeout)
+            except Exception as e:
+                self.logger.debug(f"剪贴板监听协程退出: {e}")
+            self._watch_future = None
+
+        # 通知工作线程处理完已排队的违规事件后退出
+        if self._violation_worker:
+            self._enqueue_violation(None)
+            self._violation_worker.join(timeout=self.config.server.timeout)
+            self._violation_worker = None
         
         # 输出统计信息
         self.logger.info(f"剪贴板监控统计: {self._detection_stats}")
         self.logger.info("剪贴板监控器已停止")
     
-    def _check_clipboard(self) -> None:
-        """检查剪贴板内容"""
+    def _check_clipboard(self, changed_at: Optional[float] = None) -> None:
+        """检查剪贴板内容
+
+        Args:
+            changed_at: 发现剪贴板变化的时间（perf_counter），用于统计清空耗时
+        """
         try:
             self._detection_stats['total_checks'] += 1
+            self._change_detected_at = changed_at or time.perf_counter()
+            self._clear_result = None
             
             # 获取当前剪贴板内容
             current_content = self._get_clipboard_content()
@@ -204,39 +302,13 @@ class ClipboardMonitor:
             剪贴板文本内容，如果获取失败返回None
         """
         try:
-            if WINDOWS_CLIPBOARD:
-                # Windows平台使用win32clipboard
-                for _ in range(3):
-                    try:
-                        win32clipboard.OpenClipboard()
-                        break
-                    except Exception:
-                        time.sleep(0.05)
-
-                # 检查是否有文本格式
-                if not win32clipboard.IsClipboardFormatAvailable(win32con.CF_UNICODETEXT):
-                    try:
-                        win32clipboard.CloseClipboard()
-                    except:
-                        pass
-                    return None
-
-                # 获取文本内容
-                content = win32clipboard.GetClipboardData(win32con.CF_UNICODETEXT)
-
-                try:
-                    win32clipboard.CloseClipboard()
-                except:
-                    pass
-            else:
-                # 其他平台使用pyperclip
-                content = pyperclip.paste()
+            content = self._get_watcher().read_text()
 
-                if not content:
-                    return None
+            if not content:
+                return None
             
-            # 限制内容长度
-            if len(content) > self.config.clipboard.max_content_length:
+            # 限制内容长度（流式扫描模式下按分块处理完整内容，不截断）
+            if not self.config.clipboard.streaming_scan and len(content) > self.config.clipboard.max_content_length:
                 content = content[:self.config.clipboard.max_content_length]
                 self.logger.debug(f"剪贴板内容过长，已截断到 {self.config.clipboard.max_content_length} 字符")
             
@@ -245,12 +317,6 @@ class ClipboardMonitor:
         except Exception as e:
             self.logger.debug(f"获取剪贴板内容失败: {e}")
             return None
-        finally:
-            if WINDOWS_CLIPBOARD:
-                try:
-                    win32clipboard.CloseClipboard()
-                except:
-                    pass
     
     def _detect_blockchain_addresses(self, content: str) -> None:
         """检测区块链地址 - 使用增强检测器
@@ -261,6 +327,10 @@ class ClipboardMonitor:
         if not content or not content.strip():
             return
 
+        if self.config.clipboard.streaming_scan:
+            self._detect_blockchain_addresses_streaming(content)
+            return
+
         # 使用增强的区块链检测器
         detected_addresses = self._blockchain_detector.detect_addresses(content)
 
@@ -289,6 +359,60 @@ class ClipboardMonitor:
             # 处理检测到的地址
             self._process_detected_addresses(content, formatted_addresses)
     
+    def _detect_blockchain_addresses_streaming(self, content: str) -> None:
+        """分块流式检测区块链地址
+
+        按 scan_chunk_size 分块扫描完整内容，每个分块的地址在同一白名单快照上批量检查，
+        发现违规地址后即处理，启用 stop_on_first_violation 时不再扫描剩余内容。
+
+        与整体检测不同，地址的风险等级只按其所在分块的内容评估（见 iter_addresses_chunked）。
+
+        Args:
+            content: 要检测的文本内容
+        """
+        clipboard_config = self.config.clipboard
+        detected_count = 0
+        violation_count = 0
+
+        for found in self._blockchain_detector.iter_address_chunks(
+            content,
+            chunk_size=clipboard_config.scan_chunk_size,
+            overlap=clipboard_config.scan_chunk_overlap
+        ):
+            formatted_addresses = [{
+                'type': addr_info['type'],
+                'address': addr_info['address'],
+                'position': addr_info['position'],
+                'confidence': addr_info.get('confidence', 'high'),
+                'risk_level': addr_info.get('risk_level', 'medium'),
+                'detection_method': addr_info.get('detection_method', 'pattern_match')
+            } for addr_info in found]
+            whitelisted = self._check_whitelist_batch(formatted_addresses)
+
+            stopped = False
+            for formatted_address, is_whitelisted in zip(formatted_addresses, whitelisted):
+                detected_count += 1
+                self.logger.info(f"检测到{formatted_address['type']}地址: {formatted_address['address']}")
+
+                if is_whitelisted:
+                    self.logger.debug(f"地址在白名单中: {formatted_address['address']}")
+                    continue
+
+                violation_count += 1
+                self._handle_violation(content, formatted_address)
+
+                if clipboard_config.stop_on_first_violation:
+                    self.logger.info(f"已确认违规，停止扫描剩余内容 (位置 {formatted_address['position']}/{len(content)})")
+                    stopped = True
+                    break
+
+            if stopped:
+                break
+
+        if detected_count:
+            self._detection_stats['blockchain_detections'] += detected_count
+            self.logger.info(f"流式扫描检测到 {detected_count} 个地址，其中违规 {violation_count} 个")
+
     def _process_detected_addresses(self, content: str, addresses: List[Dict]) -> None:
         """处理检测到的区块链地址
         
@@ -296,38 +420,103 @@ class ClipboardMonitor:
             content: 原始剪贴板内容
             addresses: 检测到的地址列表
         """
-        violation_detected = False
+        violation_count = 0
         
-        for addr_info in addresses:
+        # 整批地址在同一白名单快照上检查
+        whitelisted = self._check_whitelist_batch(addresses)
+        
+        for addr_info, is_whitelisted in zip(addresses, whitelisted):
             address = addr_info['address']
             blockchain_type = addr_info['type']
             
             self.logger.info(f"检测到{blockchain_type}地址: {address}")
             
-            # 检查白名单
-            is_whitelisted = self._check_whitelist(address, blockchain_type)
-            
-            if not is_whitelisted:
-                # 不在白名单中，立即清空剪贴板（在上报前）
-                violation_detected = True
-
-                # 先清空剪贴板，再上报违规事件
-                clipboard_cleared = False
-                if self._clear_clipboard():
-                    clipboard_cleared = True
-                    self.logger.warning(f"检测到违规地址 {address}，已立即清空剪贴板")
-                else:
-                    self.logger.error(f"检测到违规地址 {address}，但清空剪贴板失败")
-
-                # 然后上报违规事件
-                self._report_violation(content, addr_info, clipboard_cleared)
-            else:
+            if is_whitelisted:
                 self.logger.debug(f"地址在白名单中: {address}")
+                continue
 
-        # 如果检测到违规但清空失败，记录警告
-        if violation_detected:
-            self.logger.warning(f"本次检测发现 {len([addr for addr in addresses if not self._check_whitelist(addr['address'], addr['type'])])} 个违规地址")
+            violation_count += 1
+            self._handle_violation(content, addr_info)
+
+        if violation_count:
+            self.logger.warning(f"本次检测发现 {violation_count} 个违规地址")
     
+    def _handle_violation(self, content: str, addr_info: Dict) -> None:
+        """处理违规地址：先清空剪贴板，再把上报任务交给工作线程
+
+        同一次剪贴板变化中发现多个违规地址时只清空一次。
+
+        Args:
+            content: 原始剪贴板内容
+            addr_info: 地址信息
+        """
+        address = addr_info['address']
+        self._detection_stats['violations_detected'] += 1
+
+        if self._clear_result is None and not self.config.clipboard.auto_clear_on_violation:
+            self._clear_result = {'cleared': False, 'clear_time': None, 'latency_ms': None}
+            self.logger.warning(f"检测到违规地址 {address}（违规时清空剪贴板已禁用）")
+        
+        if self._clear_result is None:
+            cleared = self._clear_clipboard()
+            clear_latency_ms = (time.perf_counter() - self._change_detected_at) * 1000
+            self._clear_result = {
+                'cleared': cleared,
+                'clear_time': datetime.now().isoformat() if cleared else None,
+                'latency_ms': round(clear_latency_ms, 2)
+            }
+
+            if cleared:
+                self._clear_latency.record(clear_latency_ms)
+                self.logger.warning(f"检测到违规地址 {address}，已立即清空剪贴板 (耗时 {clear_latency_ms:.1f}ms)")
+            else:
+                self.logger.error(f"检测到违规地址 {address}，但清空剪贴板失败")
+
+        # 只保留上报需要的内容片段，避免队列持有完整的超长剪贴板内容
+        max_length = self.config.clipboard.max_content_length
+        self._enqueue_violation({
+            'addr_info': addr_info,
+            'content': content if len(content) <= max_length else content[:max_length],
+            'content_length': len(content),
+            'detection_time': datetime.now().isoformat(),
+            'clipboard_cleared': self._clear_result['cleared'],
+            'clear_time': self._clear_result['clear_time'],
+            'clear_latency_ms': self._clear_result['latency_ms'] if self._clear_result['cleared'] else None
+        })
+
+    def _enqueue_violation(self, job: Optional[Dict]) -> None:
+        """把违规上报任务放入队列，队列已满时丢弃最早的任务，不阻塞监听线程
+
+        Args:
+            job: 上报任务，None 表示通知工作线程退出
+        """
+        # 监控器未启动（如直接调用检测接口）时没有工作线程，直接上报
+        if self._violation_worker is None:
+            if job is not None:
+                self._report_violation(job)
+            return
+
+        while True:
+            try:
+                self._violation_queue.put_nowait(job)
+                return
+            except queue.Full:
+                try:
+                    dropped = self._violation_queue.get_nowait()
+                except queue.Empty:
+                    continue
+                if dropped is not None:
+                    self._detection_stats['violations_dropped'] += 1
+                    self.logger.error(f"违规上报队列已满，丢弃最早的违规事件: {dropped['addr_info']['address']}")
+
+    def _run_violation_worker(self) -> None:
+        """违规上报工作线程：捕获证据截图、组装并提交违规事件"""
+        while True:
+            job = self._violation_queue.get()
+            if job is None:
+                break
+            self._report_violation(job)
+
     def _check_whitelist(self, address: str, blockchain_type: str) -> bool:
         """检查地址是否在白名单中
         
@@ -357,14 +546,47 @@ class ClipboardMonitor:
             self.logger.error(f"白名单检查异常: {e}")
             return False
     
-    def _report_violation(self, content: str, addr_info: Dict, clipboard_cleared: bool = False) -> None:
-        """上报违规事件
+    def _check_whitelist_batch(self, addresses: List[Dict]) -> List[bool]:
+        """批量检查地址是否在白名单中
+        
+        Args:
+            addresses: 检测到的地址信息列表（含 address 和 type）
+        
+        Returns:
+            与输入顺序一致的检查结果
+        """
+        if self.whitelist_manager and hasattr(self.whitelist_manager, 'validate_addresses'):
+            try:
+                res = self.whitelist_manager.validate_addresses(addresses)
+                # 按规范化后的地址和链匹配结果（结果中的元素可能是副本或只有地址字符串）
+                whitelisted = {self._whitelist_key(item) for item in res.get('whitelisted', [])}
+                results = []
+                for addr_info in addresses:
+                    address, chain = self._whitelist_key(addr_info)
+                    results.append((address, chain) in whitelisted or (address, None) in whitelisted)
+                return results
+            except Exception as e:
+                self.logger.error(f"批量白名单检查异常: {e}")
+        
+        return [self._check_whitelist(addr_info['address'], addr_info['type']) for addr_info in addresses]
+    
+    @staticmethod
+    def _whitelist_key(item) -> Tuple[str, Optional[str]]:
+        """批量白名单结果的匹配键：(规范化地址, 大写链类型)"""
+        if isinstance(item, dict):
+            address, chain = item.get('address') or '', item.get('type')
+        else:
+            address, chain = item, None
+        return normalize_address(str(address)), chain.upper() if chain else None
+    
+    def _report_violation(self, job: Dict) -> None:
+        """上报违规事件（在违规上报工作线程中执行）
 
         Args:
-            content: 剪贴板内容
-            addr_info: 地址信息
-            clipboard_cleared: 剪贴板是否已清空
+            job: 上报任务，包含地址信息、内容片段和清空结果
         """
+        addr_info = job['addr_info']
+        content = job['content']
         try:
             # 捕获违规截图
             screenshot_data = self._capture_violation_screenshot()
@@ -376,30 +598,25 @@ class ClipboardMonitor:
                 'additionalData': {
                     'blockchainType': addr_info['type'],
                     'fullClipboardContent': content,
-                    'detectionTime': datetime.now().isoformat(),
+                    'detectionTime': job['detection_time'],
                     'position': addr_info['position'],
-                    'contentLength': len(content),
+                    'contentLength': job['content_length'],
                     'contentPreview': content[:200] if len(content) > 200 else content,
                     'confidence': addr_info.get('confidence', 'high'),
                     'riskLevel': addr_info.get('risk_level', 'medium'),
                     'detectionMethod': addr_info.get('detection_method', 'pattern_match'),
-                    'clipboardCleared': clipboard_cleared,
-                    'clearTime': datetime.now().isoformat() if clipboard_cleared else None
+                    'clipboardCleared': job['clipboard_cleared'],
+                    'clearTime': job['clear_time'],
+                    'clearLatencyMs': job['clear_latency_ms']
                 }
             }
             
-            # 如果成功捕获截图，添加到违规数据中
+            # 证据截图不放进事件数据（不做base64），单独交给上报器随事件入队
             if screenshot_data:
-                violation_data['screenshot'] = {
-                    'data': base64.b64encode(screenshot_data).decode('utf-8'),
-                    'format': 'jpeg',
-                    'size': len(screenshot_data),
-                    'compressed_with_mozjpeg': MOZJPEG_AVAILABLE
-                }
                 self.logger.debug(f"违规截图已捕获，大小: {len(screenshot_data)} bytes")
             
             if self.violation_reporter:
-                success = self.violation_reporter.report_violation(violation_data)
+                success = self.violation_reporter.report_violation(violation_data, screenshot_data)
                 if success:
                     self._detection_stats['violations_reported'] += 1
                     self.logger.warning(f"已上报违规事件: {addr_info['type']}地址 {addr_info['address']}")
@@ -480,7 +697,23 @@ class ClipboardMonitor:
         Returns:
             统计信息字典
         """
-        return self._detection_stats.copy()
+        stats = self._detection_stats.copy()
+        stats['clear_latency_ms'] = self._clear_latency.summary()
+        stats['violation_queue_depth'] = self._violation_queue.qsize()
+        return stats
+
+    def get_performance_metrics(self) -> Dict:
+        """获取随心跳上报的性能指标
+
+        Returns:
+            性能指标字典
+        """
+        return {
+            'clearLatencyMs': self._clear_latency.summary(),
+            'violationsDetected': self._detection_stats['violations_detected'],
+            'violationQueueDepth': self._violation_queue.qsize(),
+            'violationsDropped': self._detection_stats['violations_dropped']
+        }
     
     def test_detection(self, test_content: str) -> List[Dict]:
         """测试检测功能
@@ -491,22 +724,14 @@ class ClipboardMonitor:
         Returns:
             检测到的地址列表
         """
-        detected_addresses = []
-        
-        for blockchain_type, patterns in self._blockchain_patterns.items():
-            for pattern in patterns:
-                matches = pattern.findall(test_content)
-                
-                for match in matches:
-                    address = match.strip()
-                    if address and address not in [addr['address'] for addr in detected_addresses]:
-                        detected_addresses.append({
-                            'type': blockchain_type,
-                            'address': address,
-                            'position': test_content.find(address)
-                        })
-        
-        return detected_addresses
+        return [
+            {
+                'type': addr_info['type'],
+                'address': addr_info['address'],
+                'position': addr_info['position']
+            }
+            for addr_info in self._blockchain_detector.detect_addresses(test_content)
+        ]
     
     def add_test_content_to_clipboard(self, content: str) -> bool:
         """添加测试内容到剪贴板（用于测试）
@@ -518,19 +743,12 @@ class ClipboardMonitor:
             是否成功
         """
         try:
-            win32clipboard.OpenClipboard()
-            win32clipboard.EmptyClipboard()
-            win32clipboard.SetClipboardText(content)
+            self._get_watcher().write_text(content)
             self.logger.info(f"已添加测试内容到剪贴板: {content[:50]}...")
             return True
         except Exception as e:
             self.logger.error(f"添加测试内容到剪贴板失败: {e}")
             return False
-        finally:
-            try:
-                win32clipboard.CloseClipboard()
-            except:
-                pass
     
     def _clear_clipboard(self) -> bool:
         """清空剪贴板内容
@@ -539,23 +757,8 @@ class ClipboardMonitor:
             bool: 清空操作是否成功
         """
         try:
-            if WINDOWS_CLIPBOARD:
-                # Windows平台使用win32clipboard，增加重试以提升成功率
-                success = False
-                for _ in range(3):
-                    try:
-                        win32clipboard.OpenClipboard()
-                        win32clipboard.EmptyClipboard()
-                        win32clipboard.CloseClipboard()
-                        success = True
-                        break
-                    except Exception as e:
-                        time.sleep(0.05)
-                if not success:
-                    raise RuntimeError('OpenClipboard/EmptyClipboard failed after retries')
-            else:
-                # 其他平台使用pyperclip
-                pyperclip.copy("")
+            if not self._get_watcher().clear():
+                raise RuntimeError('clear clipboard failed')
 
             # 更新本地记录的剪贴板内容
             self._last_clipboard_content = ""
@@ -566,9 +769,3 @@ class ClipboardMonitor:
         except Exception as e:
             self.logger.error(f"清空剪贴板失败: {e}")
             return False
-        finally:
-            if WINDOWS_CLIPBOARD:
-                try:
-                    win32clipboard.CloseClipboard()
-                except:
-                    pass
\ No newline at end of file
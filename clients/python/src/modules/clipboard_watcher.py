@@ -0,0 +1,565 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+剪贴板变化监听模块
+
+功能：
+- 统一的剪贴板监听接口（序列号 + 等待变化 + 读取/清空）
+- Windows：剪贴板序列号 + AddClipboardFormatListener 消息通知
+- X11：XFixes 选区所有者变化通知
+- 其他平台：按间隔读取内容比较的轮询后备方案
+- 内存模拟后端，便于在无界面环境下测试
+
+监听器在内容未变化时不读取剪贴板：调用方先比较廉价的序列号，
+序列号变化后才读取内容。
+"""
+
+import os
+import abc
+import time
+import select
+import ctypes
+import ctypes.util
+import threading
+import platform
+from typing import Callable, List, Optional
+
+try:
+    import pyperclip
+    PYPERCLIP_AVAILABLE = True
+except ImportError:
+    PYPERCLIP_AVAILABLE = False
+
+if platform.system() == "Windows":
+    try:
+        import win32api
+        import win32clipboard
+        import win32con
+        import win32gui
+        WINDOWS_CLIPBOARD = True
+    except ImportError:
+        WINDOWS_CLIPBOARD = False
+else:
+    WINDOWS_CLIPBOARD = False
+
+# 支持的监听后端
+WATCHER_BACKENDS = ('auto', 'win32', 'x11', 'polling')
+
+# Windows 剪贴板更新消息
+WM_CLIPBOARDUPDATE = 0x031D
+
+
+class ClipboardWatcher(abc.ABC):
+    """剪贴板监听器基类
+
+    子类必须实现 read_text 和 write_text。子类通过 _notify_change 通知内容变化（事件驱动），
+    或将 event_driven 设为 False，由 wait_for_change 按 poll_interval 检查序列号。
+    不在线程中阻塞等待的调用方（事件循环）可以用 add_listener 注册唤醒回调。
+    """
+
+    name = 'base'
+
+    def __init__(self, logger, poll_interval: float = 0.5):
+        """初始化剪贴板监听器
+
+        Args:
+            logger: 日志记录器
+            poll_interval: 无变化通知时检查序列号的间隔（秒）
+        """
+        self.logger = logger
+        self.poll_interval = poll_interval
+        self.event_driven = False
+
+        self._sequence = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._listeners: List[Callable[[], None]] = []
+
+    def start(self) -> None:
+        """启动监听（注册系统通知）"""
+
+    def get_sequence(self) -> int:
+        """获取剪贴板序列号，内容每次变化后序列号改变
+
+        Returns:
+            当前序列号
+        """
+        return self._sequence
+
+    def wait_for_change(self, last_sequence: int, timeout: Optional[float] = None) -> int:
+        """等待剪贴板序列号变化
+
+        Args:
+            last_sequence: 调用方上次看到的序列号
+            timeout: 最长等待时间（秒），None 表示一直等待直到变化或关闭
+
+        Returns:
+            当前序列号（超时或关闭时可能与 last_sequence 相同）
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self._condition:
+            while not self._closed:
+                current = self.get_sequence()
+                if current != last_sequence:
+                    return current
+
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+
+                wait_time = remaining if self.event_driven else self.poll_interval
+                if remaining is not None and wait_time is not None:
+                    wait_time = min(wait_time, remaining)
+                self._condition.wait(wait_time)
+
+        return self.get_sequence()
+
+    def add_listener(self, callback: Callable[[], None]) -> None:
+        """注册唤醒回调，变化通知到达或关闭时调用（在通知线程中持锁调用，回调不能阻塞）"""
+        with self._condition:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[], None]) -> None:
+        with self._condition:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    @abc.abstractmethod
+    def read_text(self) -> Optional[str]:
+        """读取剪贴板文本
+
+        Returns:
+            剪贴板文本，无文本或读取失败时返回None
+        """
+
+    @abc.abstractmethod
+    def write_text(self, text: str) -> bool:
+        """写入剪贴板文本
+
+        Returns:
+            是否成功
+        """
+
+    def clear(self) -> bool:
+        """清空剪贴板
+
+        Returns:
+            是否成功
+        """
+        return self.write_text("")
+
+    def close(self) -> None:
+        """停止监听并唤醒所有等待者"""
+        with self._condition:
+            self._closed = True
+            self._signal()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def _notify_change(self) -> None:
+        """系统通知到达：递增序列号并唤醒等待者"""
+        with self._condition:
+            self._sequence += 1
+            self._signal()
+
+    def _wake(self) -> None:
+        """唤醒等待者重新检查序列号（序列号由系统维护时使用）"""
+        with self._condition:
+            self._signal()
+
+    def _signal(self) -> None:
+        """唤醒等待线程并调用唤醒回调（调用方持有锁）"""
+        self._condition.notify_all()
+        for callback in self._listeners:
+            try:
+                callback()
+            except Exception as e:
+                self.logger.debug(f"剪贴板唤醒回调失败: {e}")
+
+
+class Win32ClipboardWatcher(ClipboardWatcher):
+    """Windows剪贴板监听器
+
+    序列号直接取自 GetClipboardSequenceNumber，无需打开剪贴板。
+    通过消息窗口注册 AddClipboardFormatListener 接收 WM_CLIPBOARDUPDATE，
+    注册失败时退化为按 poll_interval 比较序列号。
+    """
+
+    name = 'win32'
+
+    def __init__(self, logger, poll_interval: float = 0.5):
+        super().__init__(logger, poll_interval)
+        self._hwnd = None
+        self._listener_thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """创建消息窗口并注册剪贴板格式监听"""
+        ready = threading.Event()
+        self._listener_thread = threading.Thread(
+            target=self._run_listener, args=(ready,), name="ClipboardListener", daemon=True
+        )
+        self._listener_thread.start()
+        ready.wait(5)
+
+        if self.event_driven:
+            self.logger.info("剪贴板监听: Windows 格式监听器已注册")
+        else:
+            self.logger.warning(f"剪贴板格式监听器注册失败，改为每 {self.poll_interval} 秒比较剪贴板序列号")
+
+    def _run_listener(self, ready: threading.Event) -> None:
+        """监听线程：创建仅消息窗口并运行消息循环"""
+        class_atom = None
+        hinstance = None
+        try:
+            window_class = win32gui.WNDCLASS()
+            window_class.lpfnWndProc = self._window_proc
+            window_class.lpszClassName = "ScreenMonitorClipboardListener"
+            window_class.hInstance = hinstance = win32api.GetModuleHandle(None)
+            class_atom = win32gui.RegisterClass(window_class)
+
+            self._hwnd = win32gui.CreateWindow(
+                class_atom, "ScreenMonitorClipboardListener", 0, 0, 0, 0, 0,
+                win32con.HWND_MESSAGE, 0, hinstance, None
+            )
+            if not ctypes.windll.user32.AddClipboardFormatListener(self._hwnd):
+                raise ctypes.WinError()
+
+            self.event_driven = True
+        except Exception as e:
+            self.logger.debug(f"注册剪贴板格式监听器失败: {e}")
+            if self._hwnd:
+                try:
+                    win32gui.DestroyWindow(self._hwnd)
+                except Exception:
+                    pass
+                self._hwnd = None
+            self._unregister_class(class_atom, hinstance)
+            ready.set()
+            return
+
+        ready.set()
+        try:
+            win32gui.PumpMessages()
+        finally:
+            self._unregister_class(class_atom, hinstance)
+
+    def _unregister_class(self, class_atom, hinstance) -> None:
+        """注销窗口类：类名固定，不注销则重新启动时 RegisterClass 失败并退化为轮询"""
+        if class_atom is None:
+            return
+        try:
+            win32gui.UnregisterClass(class_atom, hinstance)
+        except Exception as e:
+            self.logger.debug(f"注销剪贴板监听窗口类失败: {e}")
+
+    def _window_proc(self, hwnd, message, wparam, lparam):
+        if message == WM_CLIPBOARDUPDATE:
+            self._wake()
+            return 0
+        if message == win32con.WM_DESTROY:
+            ctypes.windll.user32.RemoveClipboardFormatListener(hwnd)
+            win32gui.PostQuitMessage(0)
+            return 0
+        return win32gui.DefWindowProc(hwnd, message, wparam, lparam)
+
+    def get_sequence(self) -> int:
+        return win32clipboard.GetClipboardSequenceNumber()
+
+    def _open_clipboard(self) -> None:
+        """打开剪贴板，被其他进程占用时短暂重试"""
+        for attempt in range(3):
+            try:
+                win32clipboard.OpenClipboard()
+                return
+            except Exception:
+                if attempt == 2:
+                    raise
+                time.sleep(0.05)
+
+    def read_text(self) -> Optional[str]:
+        # 无文本格式时无需打开剪贴板
+        if not win32clipboard.IsClipboardFormatAvailable(win32con.CF_UNICODETEXT):
+            return None
+
+        self._open_clipboard()
+        try:
+            return win32clipboard.GetClipboardData(win32con.CF_UNICODETEXT)
+        finally:
+            try:
+                win32clipboard.CloseClipboard()
+            except Exception:
+                pass
+
+    def write_text(self, text: str) -> bool:
+        self._open_clipboard()
+        try:
+            win32clipboard.EmptyClipboard()
+            if text:
+                win32clipboard.SetClipboardText(text, win32con.CF_UNICODETEXT)
+            return True
+        finally:
+            try:
+                win32clipboard.CloseClipboard()
+            except Exception:
+                pass
+
+    def close(self) -> None:
+        super().close()
+        if self._hwnd:
+            try:
+                win32gui.PostMessage(self._hwnd, win32con.WM_CLOSE, 0, 0)
+            except Exception:
+                pass
+            self._hwnd = None
+        if self._listener_thread:
+            self._listener_thread.join(timeout=2)
+
+
+class _XEvent(ctypes.Union):
+    """XEvent 联合体，只需要其中的事件类型字段"""
+    _fields_ = [('type', ctypes.c_int), ('pad', ctypes.c_long * 24)]
+
+
+class X11ClipboardWatcher(ClipboardWatcher):
+    """X11剪贴板监听器
+
+    通过 XFixesSelectSelectionInput 订阅 CLIPBOARD 选区所有者变化，
+    每次复制都会产生一次通知。内容读写仍通过 pyperclip（xclip/xsel）。
+    """
+
+    name = 'x11'
+
+    # XFixesSetSelectionOwnerNotifyMask | SelectionWindowDestroyNotifyMask | SelectionClientCloseNotifyMask
+    _SELECTION_EVENT_MASK = 0x7
+
+    def __init__(self, logger, poll_interval: float = 0.5):
+        super().__init__(logger, poll_interval)
+        self._listener_thread: Optional[threading.Thread] = None
+        self._wake_pipe = None
+        self._error: Optional[str] = None
+
+    @staticmethod
+    def is_available() -> bool:
+        """当前环境是否可以使用X11通知"""
+        return bool(os.environ.get('DISPLAY')) and bool(ctypes.util.find_library('X11')) \
+            and bool(ctypes.util.find_library('Xfixes'))
+
+    def start(self) -> None:
+        """连接X服务器并订阅选区变化"""
+        self._wake_pipe = os.pipe()
+        ready = threading.Event()
+        self._listener_thread = threading.Thread(
+            target=self._run_listener, args=(ready,), name="ClipboardListener", daemon=True
+        )
+        self._listener_thread.start()
+        ready.wait(5)
+
+        if not self.event_driven:
+            raise RuntimeError(self._error or "XFixes 初始化超时")
+        self.logger.info("剪贴板监听: X11 XFixes 选区通知已注册")
+
+    def _run_listener(self, ready: threading.Event) -> None:
+        """监听线程：X连接只在本线程内使用"""
+        display = None
+        try:
+            xlib = ctypes.CDLL(ctypes.util.find_library('X11'))
+            xfixes = ctypes.CDLL(ctypes.util.find_library('Xfixes'))
+            xlib.XOpenDisplay.restype = ctypes.c_void_p
+            xlib.XOpenDisplay.argtypes = [ctypes.c_char_p]
+            xlib.XDefaultRootWindow.restype = ctypes.c_ulong
+            xlib.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+            xlib.XInternAtom.restype = ctypes.c_ulong
+            xlib.XInternAtom.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_int]
+            xlib.XConnectionNumber.argtypes = [ctypes.c_void_p]
+            xlib.XPending.argtypes = [ctypes.c_void_p]
+            xlib.XNextEvent.argtypes = [ctypes.c_void_p, ctypes.POINTER(_XEvent)]
+            xlib.XFlush.argtypes = [ctypes.c_void_p]
+            xlib.XCloseDisplay.argtypes = [ctypes.c_void_p]
+            xfixes.XFixesQueryExtension.argtypes = [
+                ctypes.c_void_p, ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_int)
+            ]
+            xfixes.XFixesSelectSelectionInput.argtypes = [
+                ctypes.c_void_p, ctypes.c_ulong, ctypes.c_ulong, ctypes.c_ulong
+            ]
+
+            display = xlib.XOpenDisplay(None)
+            if not display:
+                raise RuntimeError("无法连接X服务器")
+
+            event_base, error_base = ctypes.c_int(), ctypes.c_int()
+            if not xfixes.XFixesQueryExtension(display, ctypes.byref(event_base), ctypes.byref(error_base)):
+                raise RuntimeError("X服务器不支持XFixes扩展")
+
+            clipboard_atom = xlib.XInternAtom(display, b"CLIPBOARD", 0)
+            xfixes.XFixesSelectSelectionInput(
+                display, xlib.XDefaultRootWindow(display), clipboard_atom, self._SELECTION_EVENT_MASK
+            )
+            xlib.XFlush(display)
+
+            # XFixesSelectionNotify 是扩展的第一个事件
+            selection_notify = event_base.value
+            connection_fd = xlib.XConnectionNumber(display)
+            self.event_driven = True
+        except Exception as e:
+            self._error = str(e)
+            if display:
+                xlib.XCloseDisplay(display)
+            ready.set()
+            return
+
+        ready.set()
+        event = _XEvent()
+        try:
+            while not self._closed:
+                while xlib.XPending(display):
+                    xlib.XNextEvent(display, ctypes.byref(event))
+                    if event.type == selection_notify:
+                        self._notify_change()
+
+                readable, _, _ = select.select([connection_fd, self._wake_pipe[0]], [], [])
+                if self._wake_pipe[0] in readable:
+                    break
+        except Exception as e:
+            self.logger.error(f"X11剪贴板监听异常: {e}")
+        finally:
+            xlib.XCloseDisplay(display)
+
+    def read_text(self) -> Optional[str]:
+        return pyperclip.paste() or None
+
+    def write_text(self, text: str) -> bool:
+        pyperclip.copy(text)
+        return True
+
+    def close(self) -> None:
+        super().close()
+        if self._wake_pipe:
+            os.write(self._wake_pipe[1], b'x')
+            if self._listener_thread:
+                self._listener_thread.join(timeout=2)
+            for fd in self._wake_pipe:
+                os.close(fd)
+            self._wake_pipe = None
+
+
+class PollingClipboardWatcher(ClipboardWatcher):
+    """轮询剪贴板监听器（没有系统变化通知时的后备方案）
+
+    每 poll_interval 读取一次内容并与上次比较，内容不同则递增序列号；
+    变化后 read_text 直接返回本次轮询读到的内容，不再重复读取。
+    """
+
+    name = 'polling'
+
+    def __init__(self, logger, poll_interval: float = 0.5):
+        super().__init__(logger, poll_interval)
+        self._last_content: Optional[str] = None
+        self._last_poll = 0.0
+
+    def start(self) -> None:
+        self._last_content = self._read_backend()
+        self._last_poll = time.monotonic()
+        self.logger.info(f"剪贴板监听: 系统通知不可用，每 {self.poll_interval} 秒轮询剪贴板内容")
+
+    def get_sequence(self) -> int:
+        # 同一轮询间隔内重复查询不再读取剪贴板
+        now = time.monotonic()
+        if now - self._last_poll >= self.poll_interval:
+            self._last_poll = now
+            content = self._read_backend()
+            if content != self._last_content:
+                self._last_content = content
+                self._sequence += 1
+        return self._sequence
+
+    def _read_backend(self) -> Optional[str]:
+        try:
+            return pyperclip.paste() or None
+        except Exception as e:
+            self.logger.debug(f"轮询读取剪贴板失败: {e}")
+            return None
+
+    def read_text(self) -> Optional[str]:
+        return self._last_content
+
+    def write_text(self, text: str) -> bool:
+        pyperclip.copy(text)
+        self._last_content = text or None
+        return True
+
+
+class MemoryClipboardWatcher(ClipboardWatcher):
+    """内存剪贴板（测试用）
+
+    模拟带变化通知的系统剪贴板，并统计读取次数，
+    用于验证无变化时不会读取剪贴板。
+    """
+
+    name = 'memory'
+
+    def __init__(self, logger, initial_text: Optional[str] = None):
+        super().__init__(logger)
+        self.event_driven = True
+        self._text = initial_text
+        self.read_count = 0
+        self.clear_count = 0
+
+    def set_text(self, text: Optional[str]) -> None:
+        """模拟其他程序复制内容"""
+        with self._condition:
+            self._text = text
+            self._sequence += 1
+            self._signal()
+
+    def read_text(self) -> Optional[str]:
+        with self._condition:
+            self.read_count += 1
+            return self._text
+
+    def write_text(self, text: str) -> bool:
+        self.set_text(text or None)
+        return True
+
+    def clear(self) -> bool:
+        with self._condition:
+            self.clear_count += 1
+        return self.write_text("")
+
+
+def create_clipboard_watcher(logger, backend: str = 'auto', poll_interval: float = 0.5) -> ClipboardWatcher:
+    """根据平台创建并启动剪贴板监听器
+
+    Args:
+        logger: 日志记录器
+        backend: 监听后端 auto/win32/x11/polling
+        poll_interval: 轮询间隔（秒）
+
+    Returns:
+        已启动的剪贴板监听器
+    """
+    if backend not in WATCHER_BACKENDS:
+        raise ValueError(f"不支持的剪贴板监听后端: {backend}")
+
+    if backend in ('auto', 'win32') and WINDOWS_CLIPBOARD:
+        watcher = Win32ClipboardWatcher(logger, poll_interval)
+        watcher.start()
+        return watcher
+
+    if backend in ('auto', 'x11') and X11ClipboardWatcher.is_available():
+        watcher = X11ClipboardWatcher(logger, poll_interval)
+        try:
+            watcher.start()
+            return watcher
+        except Exception as e:
+            watcher.close()
+            logger.warning(f"X11剪贴板通知不可用: {e}")
+
+    if backend not in ('auto', 'polling'):
+        logger.warning(f"剪贴板监听后端 {backend} 在当前平台不可用，使用轮询")
+
+    watcher = PollingClipboardWatcher(logger, poll_interval)
+    watcher.start()
+    return watcher
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+违规证据续传模块
+
+两阶段违规上报的第二阶段：违规元数据上报取得服务器事件ID后，证据截图在后台分块上传并关联到该事件。
+
+接口（路径见 violation_report.evidence_endpoint）：
+- GET  查询服务器已收到的字节数
+    响应 data: {received, size, complete}
+- PUT  上传一个分块，请求头 Content-Range: bytes 起始-结束/总长度，X-Evidence-Sha256: 完整证据的摘要
+    响应 data: {received, complete}；起始位置与服务器已收到的字节数不一致时返回409（data.received 为正确位置），
+    完整证据摘要不一致时返回422（服务器丢弃已收到的部分，从头重传）
+
+- 证据入队时写入本地目录，上传完成后删除；客户端重启后继续上传未完成的证据
+- 每个分块作为一个证据任务提交到共用的上传调度器，新的违规元数据可以插在分块之间
+- 上传失败后按指数退避重试，每次先查询服务器已收到的位置再续传，超过重试次数后放弃
+"""
+
+import re
+import json
+import time
+import hashlib
+import threading
+import requests
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import quote
+
+from core.config import AppConfig
+from utils.upload_scheduler import PRIORITY_EVIDENCE, UploadDropped, UploadScheduler
+
+# 证据重试间隔上限（秒）
+MAX_RETRY_DELAY = 300
+
+_CONTENT_RANGE = 'bytes {start}-{end}/{total}'
+_SAFE_NAME = re.compile(r'[^A-Za-z0-9_.-]')
+
+
+class PendingEvidence:
+    """待上传的证据"""
+
+    __slots__ = ('event_ref', 'path', 'content_type', 'size', 'sha256', 'attempts', 'next_attempt')
+
+    def __init__(self, event_ref: str, path: Path, content_type: str, size: int, sha256: str,
+                 attempts: int = 0):
+        self.event_ref = event_ref
+        self.path = path
+        self.content_type = content_type
+        self.size = size
+        self.sha256 = sha256
+        self.attempts = attempts
+        self.next_attempt = 0.0
+
+    def manifest(self) -> Dict:
+        return {
+            'eventRef': self.event_ref,
+            'contentType': self.content_type,
+            'size': self.size,
+            'sha256': self.sha256,
+            'attempts': self.attempts
+        }
+
+
+class EvidenceUploader:
+    """违规证据分块续传器"""
+
+    def __init__(self, config: AppConfig, session: requests.Session, logger, uploader: UploadScheduler,
+                 evidence_dir: Path):
+        """初始化证据上传器
+
+        Args:
+            config: 应用配置
+            session: HTTP会话（与违规上报共用）
+            logger: 日志记录器
+            uploader: 共用的上传调度器
+            evidence_dir: 待上传证据的本地目录
+        """
+        self.config = config
+        self.session = session
+        self.logger = logger
+        self.uploader = uploader
+        self.evidence_dir = evidence_dir
+
+        self._cond = threading.Condition()
+        self._pending: List[PendingEvidence] = []
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+        self._stats = {
+            'queued': 0,
+            'uploaded': 0,
+            'resumed': 0,
+            'retries': 0,
+            'abandoned': 0,
+            'chunks': 0,
+            'bytes_sent': 0,
+            'stalled': 0
+        }
+
+        self._load_pending()
+
+    # ---------- 生命周期 ----------
+
+    def start(self) -> None:
+        """启动后台上传线程"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._worker, name="ViolationEvidence", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """停止上传线程（未完成的证据保留在本地，下次启动后续传）"""
+        with self._cond:
+            if not self._running:
+                return
+            self._running = False
+            self._cond.notify_all()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+        self._thread = None
+
+    # ---------- 入队 ----------
+
+    def enqueue(self, event_ref: str, data: bytes, content_type: str) -> bool:
+        """保存证据到本地并排队上传
+
+        Args:
+            event_ref: 服务器返回的违规事件ID
+            data: 证据内容
+            content_type: 证据类型（如 image/jpeg）
+
+        Returns:
+            是否成功入队
+        """
+        name = _SAFE_NAME.sub('_', event_ref)
+        item = PendingEvidence(event_ref, self.evidence_dir / f"{name}.bin", content_type, len(data),
+                               hashlib.sha256(data).hexdigest())
+        try:
+            self.evidence_dir.mkdir(parents=True, exist_ok=True)
+            item.path.write_bytes(data)
+            self._save_manifest(item)
+        except OSError as e:
+            self.logger.error(f"保存违规证据失败: {e}")
+            return False
+
+        with self._cond:
+            self._pending.append(item)
+            self._stats['queued'] += 1
+            self._cond.notify_all()
+        self.logger.debug(f"违规证据已排队: {event_ref} ({item.size} bytes)")
+        return True
+
+    def pending_count(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def get_stats(self) -> Dict:
+        with self._cond:
+            stats = self._stats.copy()
+            stats['pending'] = len(self._pending)
+        return stats
+
+    # ---------- 上传 ----------
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                item = self._next_due()
+                while self._running and item is None:
+                    delay = self._next_delay()
+                    self._cond.wait(delay)
+                    item = self._next_due()
+                if not self._running:
+                    return
+
+            try:
+                done = self._upload(item)
+            except Exception as e:
+                self.logger.error(f"违规证据上传异常: {e}")
+                done = False
+
+            if done:
+                self._finish(item)
+            else:
+                self._retry_later(item)
+
+    def _next_due(self) -> Optional[PendingEvidence]:
+        """按入队顺序取出已到重试时间的证据（调用方持有锁）"""
+        now = time.monotonic()
+        for item in self._pending:
+            if item.next_attempt <= now:
+                return item
+        return None
+
+    def _next_delay(self) -> Optional[float]:
+        """距离最早一次重试的秒数，没有待上传证据时返回None（调用方持有锁）"""
+        if not self._pending:
+            return None
+        return max(0.0, min(item.next_attempt for item in self._pending) - time.monotonic())
+
+    def _upload(self, item: PendingEvidence) -> bool:
+        """从服务器已收到的位置续传证据
+
+        Returns:
+            证据是否已完整上传
+        """
+        url = self._evidence_url(item.event_ref)
+        received = self._query_received(url)
+        if received is None:
+            return False
+        if received >= item.size:
+            return True
+        if received > 0:
+            self._stats['resumed'] += 1
+            self.logger.info(f"续传违规证据 {item.event_ref}: 从 {received}/{item.size} 字节开始")
+
+        data = item.path.read_bytes()
+        chunk_size = self.config.violation_report.evidence_chunk_size
+        conflicts = 0
+        while received < item.size:
+            chunk = data[received:received + chunk_size]
+            headers = {
+                'Content-Type': item.content_type,
+                'Content-Range': _CONTENT_RANGE.format(start=received, end=received + len(chunk) - 1,
+                                                       total=item.size),
+                'X-Evidence-Sha256': item.sha256
+            }
+            try:
+                response = self.uploader.run(
+                    PRIORITY_EVIDENCE,
+                    lambda: self.session.put(url, data=chunk, headers=headers,
+                                             timeout=self.config.server.timeout),
+                    nbytes=len(chunk)
+                )
+            except (requests.exceptions.RequestException, UploadDropped) as e:
+                self.logger.warning(f"违规证据分块上传失败 {item.event_ref}: {e}")
+                return False
+
+            if response.status_code in (409, 422):
+                # 位置不一致时按服务器的位置续传；摘要不一致时服务器已丢弃，从头重传
+                conflicts += 1
+                if conflicts > 3:
+                    self.logger.warning(f"违规证据续传位置反复不一致，稍后重试: {item.event_ref}")
+                    return False
+                received = 0 if response.status_code == 422 else self._received_from(response)
+                if received is None:
+                    return False
+                continue
+            if response.status_code not in (200, 201):
+                self.logger.warning(f"违规证据分块上传失败 {item.event_ref}: HTTP {response.status_code}")
+                return False
+
+            self._stats['chunks'] += 1
+            self._stats['bytes_sent'] += len(chunk)
+            position = self._received_from(response)
+            if position is None:
+                return False
+            if position <= received:
+                # 服务器没有确认本块（响应缺少已收到的字节数或位置没有前进）：不反复重发同一块，稍后重试
+                self._stats['stalled'] += 1
+                self.logger.warning(f"违规证据续传位置没有前进 ({position}/{item.size})，稍后重试: {item.event_ref}")
+                return False
+            received = position
+        return True
+
+    def _query_received(self, url: str) -> Optional[int]:
+        """查询服务器已收到的字节数，失败时返回None"""
+        try:
+            response = self.session.get(url, timeout=self.config.server.timeout)
+        except requests.exceptions.RequestException as e:
+            self.logger.warning(f"查询违规证据上传进度失败: {e}")
+            return None
+        if response.status_code == 404:
+            # 服务器尚无该证据的记录，从头上传
+            return 0
+        if response.status_code != 200:
+            self.logger.warning(f"查询违规证据上传进度失败: HTTP {response.status_code}")
+            return None
+        return self._received_from(response)
+
+    def _received_from(self, response) -> Optional[int]:
+        try:
+            data = response.json().get('data') or {}
+            return int(data.get('received', 0))
+        except (ValueError, TypeError, AttributeError) as e:
+            self.logger.warning(f"违规证据上传响应无效: {e}")
+            return None
+
+    def _evidence_url(self, event_ref: str) -> str:
+        endpoint = self.config.violation_report.evidence_endpoint.format(event_id=quote(event_ref, safe=''))
+        return f"{self.config.server.api_base_url}{endpoint}"
+
+    def _finish(self, item: PendingEvidence) -> None:
+        with self._cond:
+            self._pending.remove(item)
+            self._stats['uploaded'] += 1
+        self._remove_files(item)
+        self.logger.info(f"违规证据上传完成: {item.event_ref} ({item.size} bytes)")
+
+    def _retry_later(self, item: PendingEvidence) -> None:
+        settings = self.config.violation_report
+        item.attempts += 1
+        if item.attempts >= settings.evidence_max_attempts:
+            with self._cond:
+                self._pending.remove(item)
+                self._stats['abandoned'] += 1
+            self._remove_files(item)
+            self.logger.error(f"违规证据上传失败次数过多，已放弃: {item.event_ref}")
+            return
+
+        delay = min(MAX_RETRY_DELAY, settings.evidence_retry_delay * 2 ** (item.attempts - 1))
+        with self._cond:
+            item.next_attempt = time.monotonic() + delay
+            self._stats['retries'] += 1
+        try:
+            self._save_manifest(item)
+        except OSError:
+            pass
+        self.logger.debug(f"违规证据 {item.event_ref} 将在 {delay} 秒后重试（第 {item.attempts} 次失败）")
+
+    # ---------- 本地文件 ----------
+
+    def _save_manifest(self, item: PendingEvidence) -> None:
+        manifest_path = item.path.with_suffix('.json')
+        temp_path = manifest_path.with_suffix('.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(item.manifest(), f, ensure_ascii=False)
+        temp_path.replace(manifest_path)
+
+    def _remove_files(self, item: PendingEvidence) -> None:
+        for path in (item.path, item.path.with_suffix('.json')):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def _load_pending(self) -> None:
+        """加载上次未上传完成的证据"""
+        if not self.evidence_dir.exists():
+            return
+        for manifest_path in sorted(self.evidence_dir.glob('*.json'), key=lambda path: path.stat().st_mtime):
+            data_path = manifest_path.with_suffix('.bin')
+            try:
+                with open(manifest_path, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+                item = PendingEvidence(manifest['eventRef'], data_path, manifest['contentType'],
+                                       int(manifest['size']), manifest['sha256'], int(manifest.get('attempts', 0)))
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                self.logger.warning(f"忽略无效的待上传证据 {manifest_path.name}: {e}")
+                continue
+            if not data_path.exists():
+                manifest_path.unlink()
+                continue
+            self._pending.append(item)
+
+        if self._pending:
+            self.logger.info(f"已加载 {len(self._pending)} 个待上传的违规证据")
@@ -6,19 +6,23 @@ HTTP客户端模块
 功能：
 - HTTP轮询通信
 - 心跳机制
-- 配置同步
-- 白名单同步
+- 配置同步（收到服务器推送时立即同步，推送连接正常时定时同步退为长间隔兜底）
+- 合并同步：一次请求携带配置、白名单、规则包的本地版本，服务器只返回有变化的部分和指令
+- 服务器下发的配置交给 RemoteConfigManager 在运行中生效
+
+白名单同步由 WhitelistManager 统一负责，这里不再重复拉取；启用合并同步时白名单随合并同步更新。
 """
 
 import time
 import json
 import requests
-from typing import Optional, Dict, Any
+from typing import Callable, Optional, Dict, Any
 from datetime import datetime
 import threading
 
 from core.config import AppConfig
 from utils.system_info import SystemInfoCollector
+from utils.scheduler import Scheduler
 
 
 class SystemInfo:
@@ -40,7 +44,11 @@ class SystemInfo:
 class HttpClient:
     """HTTP客户端"""
     
-    def __init__(self, config: AppConfig, client_id: str, logger, whitelist_manager=None):
+    # 调度器中的定时配置同步任务名
+    CONFIG_SYNC_JOB = 'config_sync'
+    
+    def __init__(self, config: AppConfig, client_id: str, logger, whitelist_manager=None,
+                 rule_pack_manager=None, scheduler: Optional[Scheduler] = None, remote_config=None):
         """初始化HTTP客户端
         
         Args:
@@ -48,11 +56,16 @@ class HttpClient:
             client_id: 客户端ID
             logger: 日志记录器
             whitelist_manager: 白名单管理器
+            rule_pack_manager: 检测规则包管理器
+            scheduler: 共用的定时调度器，为None时使用自己的调度器
+            remote_config: 远程配置管理器（RemoteConfigManager），为None时只记录下发的配置
         """
         self.config = config
         self.client_id = client_id
         self.logger = logger
         self.whitelist_manager = whitelist_manager
+        self.rule_pack_manager = rule_pack_manager
+        self.remote_config = remote_config
         
         # HTTP会话
         self.session = requests.Session()
@@ -69,16 +82,27 @@ class HttpClient:
         self._running = False
         self._stop_event = threading.Event()
         
+        # 定时配置同步由调度器执行
+        self._owns_scheduler = scheduler is None
+        self.scheduler = scheduler or Scheduler(logger, seed=client_id, name="HttpScheduler", max_workers=1)
+        self._push_active = False
+        
+        # 合并同步：服务器不支持（接口返回404）时退回分别同步
+        self._combined = config.config_sync.combined
+        self._config_version: Optional[str] = None
+        self._directive_handlers: Dict[str, Callable[[Any], None]] = {}
+        
         # 上次同步时间
         self._last_heartbeat = 0
         self._last_config_sync = 0
-        self._last_whitelist_sync = 0
         
         # 统计信息
         self._stats = {
             'heartbeats_sent': 0,
             'config_syncs': 0,
-            'whitelist_syncs': 0,
+            'config_push_notifications': 0,
+            'combined_syncs': 0,
+            'directives_received': 0,
             'http_requests': 0,
             'http_errors': 0
         }
@@ -96,6 +120,23 @@ class HttpClient:
         
         self._running = True
         self._stop_event.clear()
+        
+        # 合并同步接管白名单同步
+        if self._combined and self._covers_whitelist():
+            self.whitelist_manager.set_sync_delegate(self._request_combined_sync)
+        
+        # 注册定时配置同步任务（首次同步由调度器随机分散）
+        scheduling = self.config.scheduler
+        self.scheduler.add_job(
+            self.CONFIG_SYNC_JOB,
+            self._run_config_sync,
+            interval=self._config_sync_interval(),
+            jitter=scheduling.jitter,
+            initial_delay=None if scheduling.splay else 0,
+            retry_delay=scheduling.retry_delay,
+            max_backoff=scheduling.max_backoff
+        )
+        self.scheduler.start()
         self.logger.info("HTTP客户端已启动")
         
         # 注意：心跳现在通过截图上传的合并API处理，不再单独发送
@@ -108,6 +149,11 @@ class HttpClient:
         
         self._running = False
         self._stop_event.set()
+        self.scheduler.remove_job(self.CONFIG_SYNC_JOB)
+        if self._combined and self._covers_whitelist():
+            self.whitelist_manager.set_sync_delegate(None)
+        if self._owns_scheduler:
+            self.scheduler.stop()
         
         # 关闭会话
         self.session.close()
@@ -116,34 +162,148 @@ class HttpClient:
         self.logger.info(f"HTTP客户端统计: {self._stats}")
         self.logger.info("HTTP客户端已停止")
     
-    def run_polling_loop(self) -> None:
-        """运行轮询循环"""
-        self.logger.info("HTTP轮询循环已启动")
+    def _run_config_sync(self) -> bool:
+        """定时配置同步任务（由调度器执行）
+        
+        注意：心跳现在通过截图上传的合并API处理，这里不再单独发送心跳
+        
+        Returns:
+            配置是否同步成功（失败时调度器按退避重试）
+        """
+        if self._combined:
+            result = self._combined_sync()
+            if result is not None:
+                self._last_config_sync = time.time()
+                return result
+        
+        result = self._sync_config()
+        # 检测规则包随配置一起同步（ETag未变化时服务器返回304）
+        if self.rule_pack_manager:
+            self.rule_pack_manager.sync()
+        self._last_config_sync = time.time()
+        return result
+    
+    def _config_sync_interval(self) -> float:
+        """当前定时配置同步间隔：推送连接正常时退为兜底间隔
+        
+        合并同步接管白名单时取配置和白名单同步间隔中较短的一个。
+        """
+        interval = self.config.config_sync.interval
+        if self._combined and self._covers_whitelist():
+            interval = min(interval, self.config.whitelist.sync_interval)
+        if self._push_active:
+            return max(interval, self.config.push.fallback_interval)
+        return interval
+    
+    def request_config_sync(self) -> None:
+        """收到配置更新推送：合并窗口后同步一次（不阻塞调用方）"""
+        self._stats['config_push_notifications'] += 1
+        self.scheduler.trigger(self.CONFIG_SYNC_JOB, delay=self.config.push.coalesce_delay)
+    
+    def set_push_active(self, active: bool) -> None:
+        """推送连接状态变化：连接正常时定时配置同步退为兜底间隔"""
+        self._push_active = active
+        self.scheduler.set_interval(self.CONFIG_SYNC_JOB, self._config_sync_interval())
+    
+    def apply_runtime_config(self, changes: Dict[str, Any]) -> None:
+        """远程配置变化：同步间隔变化时重新安排配置同步任务"""
+        if 'config_sync.interval' in changes or 'whitelist.sync_interval' in changes:
+            self.scheduler.set_interval(self.CONFIG_SYNC_JOB, self._config_sync_interval())
+    
+    def register_directive_handler(self, name: str, handler: Callable[[Any], None]) -> None:
+        """注册服务器指令的处理函数（合并同步响应中的 directives）
+        
+        Args:
+            name: 指令名称
+            handler: 处理函数，参数为指令值
+        """
+        self._directive_handlers[name] = handler
+    
+    def _covers_whitelist(self) -> bool:
+        """合并同步是否包含白名单"""
+        return self.whitelist_manager is not None and self.config.whitelist.enabled
+    
+    def _request_combined_sync(self) -> None:
+        """收到白名单更新推送（合并同步接管时）：合并窗口后执行一次合并同步"""
+        self.scheduler.trigger(self.CONFIG_SYNC_JOB, delay=self.config.push.coalesce_delay)
+    
+    def _combined_sync(self) -> Optional[bool]:
+        """合并同步：携带本地版本，只应用服务器返回的有变化部分
+        
+        请求: {clientId, versions: {config, whitelist?, rulePack?}}
+        响应 data: {config?: {version, data}, whitelist?: 白名单数据, rulePack?: 规则包, directives?: {...}}
+        省略的部分表示与本地版本一致。
+        
+        Returns:
+            是否同步成功；服务器不支持合并同步时返回None（调用方退回分别同步）
+        """
+        versions = {'config': self._config_version}
+        if self._covers_whitelist():
+            versions['whitelist'] = self.whitelist_manager.sync_version()
+        if self.rule_pack_manager and self.config.blockchain.rule_pack_sync:
+            versions['rulePack'] = self.rule_pack_manager.sync_version()
+        
+        endpoint = self.config.config_sync.combined_endpoint.format(client_id=self.client_id)
+        url = f"{self.config.server.api_base_url}{endpoint}"
+        response = self._make_request('POST', url, json={'clientId': self.client_id, 'versions': versions})
+        
+        if response is None:
+            return False
+        if response.status_code in (404, 405, 501):
+            self.logger.warning(f"服务器不支持合并同步 ({response.status_code})，退回分别同步")
+            self._disable_combined()
+            return None
+        if response.status_code != 200:
+            self.logger.error(f"合并同步失败: {response.status_code}")
+            return False
+        
+        try:
+            data = response.json().get('data') or {}
+        except ValueError as e:
+            self.logger.error(f"合并同步响应无效: {e}")
+            return False
         
-        while self._running and not self._stop_event.is_set():
+        self._stats['combined_syncs'] += 1
+        success = True
+        
+        if 'config' in data:
+            config_part = data['config'] or {}
+            self._config_version = config_part.get('version')
+            self._stats['config_syncs'] += 1
+            self._handle_config_update(config_part.get('data') or {})
+        
+        if 'whitelist' in versions:
+            # 未返回白名单表示服务器确认未变化
+            success = self.whitelist_manager.apply_sync_data(data.get('whitelist')) and success
+        
+        if 'rulePack' in versions and data.get('rulePack'):
+            self.rule_pack_manager.apply_sync_data(data['rulePack'])
+        
+        self._handle_directives(data.get('directives') or {})
+        changed = [name for name in ('config', 'whitelist', 'rulePack') if data.get(name)]
+        self.logger.debug(f"合并同步完成，有变化: {changed or '无'}")
+        return success
+    
+    def _disable_combined(self) -> None:
+        """退回分别同步，交还白名单同步"""
+        covers_whitelist = self._covers_whitelist()
+        self._combined = False
+        if covers_whitelist:
+            self.whitelist_manager.set_sync_delegate(None)
+        self.scheduler.set_interval(self.CONFIG_SYNC_JOB, self._config_sync_interval())
+    
+    def _handle_directives(self, directives: Dict[str, Any]) -> None:
+        """分发服务器指令，未注册处理函数的指令只记录日志"""
+        for name, value in directives.items():
+            self._stats['directives_received'] += 1
+            handler = self._directive_handlers.get(name)
+            if handler is None:
+                self.logger.debug(f"忽略未知的服务器指令: {name}")
+                continue
             try:
-                current_time = time.time()
-                
-                # 注意：心跳现在通过截图上传的合并API处理，这里不再单独发送心跳
-                
-                # 配置同步轮询
-                config_interval = self.config.config_sync.interval
-                if (current_time - self._last_config_sync) >= config_interval:
-                    self._sync_config()
-                    self._last_config_sync = current_time
-                
-                # 白名单同步轮询
-                if self.config.whitelist.enabled:
-                    if (current_time - self._last_whitelist_sync) >= self.config.whitelist.sync_interval:
-                        self._sync_whitelist()
-                        self._last_whitelist_sync = current_time
-                
-                # 等待5秒（增加间隔，因为不需要频繁轮询心跳）
-                self._stop_event.wait(5)
-                
+                handler(value)
             except Exception as e:
-                self.logger.error(f"轮询循环异常: {e}")
-                self._stop_event.wait(10)
+                self.logger.error(f"处理服务器指令 {name} 失败: {e}")
     
     def _send_heartbeat(self) -> bool:
         """发送心跳
@@ -199,12 +359,12 @@ class HttpClient:
             response = self._make_request('GET', url)
             
             if response and response.status_code == 200:
-                config_data = response.json()
+                body = response.json()
+                config_data = body.get('data', body) if isinstance(body, dict) else {}
                 self._stats['config_syncs'] += 1
                 self.logger.debug("配置同步成功")
                 
-                # 这里可以处理配置更新逻辑
-                self._handle_config_update(config_data)
+                self._handle_config_update(config_data or {})
                 return True
             else:
                 self.logger.error(f"配置同步失败: {response.status_code if response else 'No response'}")
@@ -214,34 +374,6 @@ class HttpClient:
             self.logger.error(f"配置同步异常: {e}")
             return False
     
-    def _sync_whitelist(self) -> bool:
-        """同步白名单
-        
-        Returns:
-            是否同步成功
-        """
-        try:
-            # 获取活跃白名单地址
-            url = f"{self.base_url}/api/whitelist/addresses/active"
-            response = self._make_request('GET', url)
-            
-            if response and response.status_code == 200:
-                whitelist_data = response.json()
-                self._stats['whitelist_syncs'] += 1
-                self.logger.debug("白名单同步成功")
-                
-                # 更新白名单管理器
-                if self.whitelist_manager:
-                    self._handle_whitelist_update(whitelist_data)
-                return True
-            else:
-                self.logger.error(f"白名单同步失败: {response.status_code if response else 'No response'}")
-                return False
-                
-        except Exception as e:
-            self.logger.error(f"白名单同步异常: {e}")
-            return False
-    
     def _make_request(self, method: str, url: str, **kwargs) -> Optional[requests.Response]:
         """发送HTTP请求
         
@@ -255,6 +387,8 @@ class HttpClient:
         """
         try:
             self._stats['http_requests'] += 1
+            # requests 的会话没有默认超时：合并同步一次请求承载配置、白名单和规则包，连接停滞会阻塞同步任务
+            kwargs.setdefault('timeout', self.config.server.timeout)
             response = self.session.request(method, url, **kwargs)
             return response
             
@@ -270,39 +404,15 @@ class HttpClient:
             config_data: 配置数据
         """
         try:
-            self.logger.info(f"收到配置更新: {config_data}")
+            self.logger.debug(f"收到配置更新: {config_data}")
             
-            # 这里可以实现配置更新逻辑
-            # 例如更新截图间隔、心跳间隔等
-            if 'screenshotInterval' in config_data:
-                new_interval = config_data['screenshotInterval']
-                self.logger.info(f"截图间隔更新为: {new_interval}秒")
-            
-            if 'heartbeatInterval' in config_data:
-                new_interval = config_data['heartbeatInterval']
-                self.logger.info(f"心跳间隔更新为: {new_interval}秒")
+            # 截图间隔、图片质量、同步间隔、功能开关等在运行中生效（校验失败或应用失败时保持原配置）
+            if self.remote_config:
+                self.remote_config.apply(config_data)
                 
         except Exception as e:
             self.logger.error(f"处理配置更新失败: {e}")
     
-    def _handle_whitelist_update(self, whitelist_data: Dict[str, Any]) -> None:
-        """处理白名单更新
-        
-        Args:
-            whitelist_data: 白名单数据
-        """
-        try:
-            if self.whitelist_manager:
-                # 更新白名单管理器的数据
-                addresses = whitelist_data.get('addresses', [])
-                self.logger.info(f"更新白名单，共{len(addresses)}个地址")
-                
-                # 这里可以调用白名单管理器的更新方法
-                # self.whitelist_manager.update_addresses(addresses)
-                
-        except Exception as e:
-            self.logger.error(f"处理白名单更新失败: {e}")
-    
     def is_running(self) -> bool:
         """检查是否在运行
         
@@ -321,5 +431,8 @@ class HttpClient:
         stats['running'] = self._running
         stats['last_heartbeat'] = self._last_heartbeat
         stats['last_config_sync'] = self._last_config_sync
-        stats['last_whitelist_sync'] = self._last_whitelist_sync
+        stats['push_active'] = self._push_active
+        stats['config_sync_interval'] = self._config_sync_interval()
+        stats['combined_sync'] = self._combined
+        stats['config_sync_schedule'] = self.scheduler.get_stats().get(self.CONFIG_SYNC_JOB)
         return stats
\ No newline at end of file
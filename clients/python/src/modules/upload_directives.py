@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+截图上传响应指令模块
+
+服务器可在 upload-with-heartbeat 响应中附带临时限流指令（不增加请求），
+接收高峰时让客户端降低上传压力：
+
+    "directives": {"nextCaptureIn": 60, "maxQuality": 40, "skipUnchanged": true, "ttl": 120}
+
+- nextCaptureIn：下一次截图在 N 秒后执行（一次性，上限 max_capture_delay）
+- maxQuality：图片质量上限（不低于 min_quality）
+- skipUnchanged：画面未变化时不上传截图，只发送心跳
+- ttl：maxQuality/skipUnchanged 的有效期（默认 default_ttl，上限 max_ttl）
+
+每个指令都有上限且会过期，异常的响应不会让截图长期停止或画质长期降低。
+无效的字段被忽略，不影响同一响应中的其他指令。
+"""
+
+import time
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from core.config import AppConfig
+
+
+class UploadDirectives:
+    """当前生效的上传指令（线程安全）"""
+
+    def __init__(self, config: AppConfig, logger, clock: Callable[[], float] = time.monotonic):
+        """初始化上传指令状态
+
+        Args:
+            config: 应用配置
+            logger: 日志记录器
+            clock: 单调时钟（测试时可替换）
+        """
+        self.config = config
+        self.logger = logger
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        self._quality_cap: Optional[int] = None
+        self._quality_expires = 0.0
+        self._skip_unchanged = False
+        self._skip_expires = 0.0
+
+        self._stats = {
+            'directives_received': 0,
+            'directives_ignored': 0,
+            'captures_deferred': 0,
+            'frames_skipped': 0,
+            'last_directives': None
+        }
+
+    def update(self, directives: Any) -> Dict[str, Any]:
+        """应用响应中的指令
+
+        Args:
+            directives: 响应中的 directives 字段
+
+        Returns:
+            实际生效的指令（已按上限修正），nextCaptureIn 由调用方执行
+        """
+        settings = self.config.upload_directives
+        if not settings.enabled or not isinstance(directives, dict) or not directives:
+            return {}
+
+        applied: Dict[str, Any] = {}
+        ttl = self._number(directives.get('ttl'))
+        ttl = min(ttl, settings.max_ttl) if ttl and ttl > 0 else settings.default_ttl
+        now = self._clock()
+
+        with self._lock:
+            self._stats['directives_received'] += 1
+
+            delay = self._number(directives.get('nextCaptureIn'))
+            if delay is not None and delay >= 0:
+                applied['nextCaptureIn'] = min(delay, settings.max_capture_delay)
+                self._stats['captures_deferred'] += 1
+
+            quality = self._number(directives.get('maxQuality'))
+            if quality is not None:
+                self._quality_cap = int(max(settings.min_quality, min(quality, 100)))
+                self._quality_expires = now + ttl
+                applied['maxQuality'] = self._quality_cap
+
+            skip = directives.get('skipUnchanged')
+            if isinstance(skip, bool):
+                self._skip_unchanged = skip
+                self._skip_expires = now + ttl
+                applied['skipUnchanged'] = skip
+
+            if not applied:
+                self._stats['directives_ignored'] += 1
+                self.logger.debug(f"忽略无法识别的上传指令: {directives}")
+                return applied
+
+            applied['ttl'] = ttl
+            self._stats['last_directives'] = applied
+
+        self.logger.info(f"服务器上传指令: {applied}")
+        return applied
+
+    def quality_cap(self) -> Optional[int]:
+        """当前的图片质量上限（没有或已过期时为None）"""
+        with self._lock:
+            if self._quality_cap is not None and self._clock() >= self._quality_expires:
+                self.logger.info("图片质量上限指令已过期，恢复本地配置")
+                self._quality_cap = None
+            return self._quality_cap
+
+    def skip_unchanged(self) -> bool:
+        """画面未变化时是否跳过上传"""
+        with self._lock:
+            if self._skip_unchanged and self._clock() >= self._skip_expires:
+                self.logger.info("跳过未变化画面指令已过期")
+                self._skip_unchanged = False
+            return self._skip_unchanged
+
+    def count_skipped_frame(self) -> None:
+        """记录一次因画面未变化而跳过的上传"""
+        with self._lock:
+            self._stats['frames_skipped'] += 1
+
+    def get_stats(self) -> Dict:
+        """获取统计信息（含当前生效的指令，随心跳上报）"""
+        quality_cap = self.quality_cap()
+        skip_unchanged = self.skip_unchanged()
+        with self._lock:
+            stats = self._stats.copy()
+        stats['quality_cap'] = quality_cap
+        stats['skip_unchanged'] = skip_unchanged
+        return stats
+
+    @staticmethod
+    def _number(value: Any) -> Optional[float]:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return None
+        return value
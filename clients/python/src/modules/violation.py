@@ -5,65 +5,114 @@
 
 功能：
 - 收集和上报违规事件
-- 事件队列管理
-- 重试机制
-- 本地缓存
+- 持久化事件队列（SQLite），入队即落盘，崩溃或重启后继续上报
+- 重试机制：失败的事件按指数退避延迟重试，重试次数过多或过期的事件移入死信表
+- 违规发生时截取证据截图，与事件一起入队（单独保存为文件）
+- 通过共用的上传调度器发送：新违规优先于心跳和定时截图，本地缓存的历史事件最后补传
+- 两阶段上报（violation_report.two_phase）：先发送违规元数据取得服务器事件ID，证据截图随后分块续传，
+  链路慢或证据上传失败都不影响告警送达；服务器不支持时退回一次性上报
+- 多个发送线程并发上报（violation_report.senders）；两阶段上报时可以一次提交一批违规元数据
+  （violation_report.batch_size），一批内按发生顺序排列，每个事件带有单调递增的 clientSeq，
+  并发发送时服务器据此恢复客户端内的事件顺序
+- 重复违规去重合并（violation_dedup）：同一地址、类型和内容在窗口内重复出现时只上报首次发生，
+  之后的重复合并为一个汇总事件（重复次数、首次和最后一次发生时间），证据只在首次发生时截取或按间隔采样
+- 检测模块传入的事件字典入队前转换为固定字段的事件记录（ViolationEvent），证据截图单独保存，
+  上报用的元数据JSON只序列化一次；等待重试的事件记录按队列序号保留，重试时不重新转换和序列化
 """
 
 import json
 import time
-import queue
+import random
 import threading
 import requests
-from typing import Dict, List, Optional
+from typing import Dict, Optional, Union
 from pathlib import Path
 from datetime import datetime
+from collections import OrderedDict
 
 from core.config import AppConfig
+from modules.evidence import EvidenceUploader
+from modules.violation_queue import ViolationQueue
+from modules.violation_coalescer import ViolationCoalescer
+from modules.violation_event import ViolationEvent
+from utils.upload_scheduler import PRIORITY_BACKLOG, PRIORITY_VIOLATION, UploadScheduler
+
+# 重试延迟的随机抖动比例，避免故障恢复后大量客户端同时重试
+RETRY_JITTER = 0.1
 
 
 class ViolationReporter:
     """违规事件上报器"""
     
-    def __init__(self, config: AppConfig, client_id: str, logger):
+    def __init__(self, config: AppConfig, client_id: str, logger, uploader: Optional[UploadScheduler] = None,
+                 data_dir: Optional[Path] = None):
         """初始化违规事件上报器
         
         Args:
             config: 应用配置
             client_id: 客户端ID
             logger: 日志记录器
+            uploader: 共用的上传调度器，为None时在上报线程中直接发送
+            data_dir: 本地缓存目录（违规事件队列和待上传证据），默认为 logs
         """
         self.config = config
         self.client_id = client_id
         self.logger = logger
+        self.uploader = uploader or UploadScheduler(logger)
+        self._data_dir = data_dir
+        # 服务器不支持两阶段上报时关闭，退回一次性上报
+        self._two_phase = config.violation_report.two_phase
+        # 服务器不支持批量上报时关闭，逐个发送
+        self._batch = config.violation_report.batch_size > 1
         
-        # 事件队列
-        self._event_queue = queue.Queue(maxsize=1000)
         self._running = False
         self._stop_event = threading.Event()
+        self._report_threads = []
         
         # HTTP会话
         self.session = requests.Session()
         self.session.timeout = config.server.timeout
         
-        # 本地缓存文件
+        # 持久化事件队列（首次打开时导入旧版JSON缓存）
         self._cache_file = self._get_cache_file_path()
+        self._queue = ViolationQueue(
+            config,
+            logger,
+            self._cache_file.parent / "violation_queue.db",
+            self._cache_file.parent / "violation_queue_evidence",
+            legacy_cache=self._cache_file
+        )
+        
+        # 等待重试的事件记录（按队列序号），重试时复用已缓存的元数据JSON；
+        # 最多与队列事件数上限相同，被队列淘汰的事件的记录随后被挤出
+        self._retry_records: "OrderedDict[int, ViolationEvent]" = OrderedDict()
+        self._retry_records_lock = threading.Lock()
+        
+        # 重复违规的去重合并（汇总事件在窗口结束时入队）
+        self._coalescer = ViolationCoalescer(config, logger, self._enqueue)
+        
+        # 两阶段上报的证据续传
+        self.evidence = EvidenceUploader(config, self.session, logger, self.uploader,
+                                         self._cache_file.parent / "violation_evidence")
         
         # 统计信息
         self._stats = {
             'total_events': 0,
             'successful_reports': 0,
             'failed_reports': 0,
-            'cached_events': 0
+            'metadata_reports': 0,
+            'legacy_reports': 0,
+            'batches': 0,
+            'coalesced': 0
         }
-        
-        # 加载缓存的事件
-        self._load_cached_events()
+        self._stats_lock = threading.Lock()
         
         self.logger.info("违规事件上报器初始化完成")
     
     def _get_cache_file_path(self) -> Path:
-        """获取缓存文件路径"""
+        """获取旧版缓存文件路径（事件队列与其在同一目录）"""
+        if self._data_dir is not None:
+            return Path(self._data_dir) / "violation_cache.json"
         project_root = Path(__file__).parent.parent.parent
         return project_root / "logs" / "violation_cache.json"
     
@@ -76,12 +125,18 @@ class ViolationReporter:
         self._running = True
         
         # 启动上报线程
-        self._report_thread = threading.Thread(
-            target=self._report_worker,
-            name="ViolationReporter",
-            daemon=True
-        )
-        self._report_thread.start()
+        self._report_threads = [
+            threading.Thread(
+                target=self._report_worker,
+                name=f"ViolationReporter-{index}",
+                daemon=True
+            )
+            for index in range(self.config.violation_report.senders)
+        ]
+        for thread in self._report_threads:
+            thread.start()
+        self._coalescer.start()
+        self.evidence.start()
         
         self.logger.info("违规事件上报器已启动")
     
@@ -92,13 +147,21 @@ class ViolationReporter:
         
         self._running = False
         self._stop_event.set()
+        self._queue.interrupt()
+        
+        # 未结束的合并窗口输出汇总事件（入队持久化，下次启动后上报）
+        self._coalescer.stop()
         
         # 等待上报线程结束
-        if hasattr(self, '_report_thread') and self._report_thread.is_alive():
-            self._report_thread.join(timeout=5)
+        for thread in self._report_threads:
+            thread.join(timeout=5)
+        self._report_threads = []
         
-        # 保存未上报的事件到缓存
-        self._save_pending_events()
+        # 停止证据上传（未完成的证据保留在本地，下次启动后续传）
+        self.evidence.stop()
+        
+        # 关闭事件队列（未上报的事件已持久化，下次启动后继续上报）
+        self._queue.close()
         
         # 关闭HTTP会话
         try:
@@ -110,74 +173,280 @@ class ViolationReporter:
         self.logger.info(f"违规事件上报统计: {self._stats}")
         self.logger.info("违规事件上报器已停止")
     
-    def report_violation(self, violation_data: Dict) -> bool:
-        """上报违规事件
+    def report_violation(self, violation_data: Dict, evidence: Optional[bytes] = None) -> bool:
+        """上报违规事件（截取证据截图，事件持久化后返回）
+        
+        合并窗口内的重复发生只计数，窗口结束时合并为一个汇总事件上报。
+        事件字典转换为事件记录后入队，调用方可以从 violation_data['event_id'] 取得事件ID。
         
         Args:
             violation_data: 违规事件数据
+            evidence: 调用方已截取的证据截图，为None时现在截取
         
         Returns:
-            是否成功添加到队列
+            是否成功添加到队列（或合并到窗口）
         """
         try:
-            # 添加基础信息
-            violation_data.update({
-                'client_id': self.client_id,
-                'report_time': datetime.now().isoformat(),
-                'event_id': f"{self.client_id}_{int(time.time() * 1000)}"
-            })
+            event = ViolationEvent.from_dict(violation_data, self.client_id, self.config.client.version)
+            violation_data['event_id'] = event.event_id
+            if evidence is None:
+                evidence = ViolationEvent.inline_evidence(violation_data)
+            capture = self._get_current_screenshot if evidence is None else (lambda: evidence)
             
-            # 添加到队列
-            self._event_queue.put(violation_data, block=False)
-            self._stats['total_events'] += 1
+            if self._coalescer.fold(event, capture):
+                self._bump('coalesced')
+                self.logger.debug(f"重复的违规事件已合并: {event.violation_content}")
+                return True
             
-            self.logger.debug(f"违规事件已添加到队列: {violation_data.get('type', 'unknown')}")
+            # 证据截图反映违规发生时的屏幕，随事件入队
+            self._enqueue(event, capture())
             return True
             
-        except queue.Full:
-            self.logger.error("违规事件队列已满，无法添加新事件")
-            return False
         except Exception as e:
             self.logger.error(f"添加违规事件到队列失败: {e}")
             return False
     
+    def _enqueue(self, event: ViolationEvent, evidence: Optional[bytes]) -> None:
+        self._queue.put(event.to_record(), evidence)
+        self._bump('total_events')
+        self.logger.debug(f"违规事件已添加到队列: {event.event_id}")
+    
+    def _event(self, violation_data) -> ViolationEvent:
+        return ViolationEvent.coerce(violation_data, self.client_id, self.config.client.version)
+    
     def _report_worker(self) -> None:
-        """上报工作线程"""
+        """上报工作线程（没有到期的事件时一直等待，不轮询）"""
         while self._running and not self._stop_event.is_set():
             try:
-                # 从队列获取事件（超时1秒）
-                try:
-                    violation_data = self._event_queue.get(timeout=1)
-                except queue.Empty:
+                # 等待到期的事件（停止时被唤醒并返回空列表）
+                batch_size = self.config.violation_report.batch_size if self._two_phase and self._batch else 1
+                items = self._queue.get_batch(batch_size)
+                if not items:
                     continue
                 
-                # 尝试上报事件
-                success = self._send_violation_report(violation_data)
+                for item in items:
+                    item.event = self._record(item)
                 
-                if success:
-                    self._stats['successful_reports'] += 1
-                    self.logger.debug(f"违规事件上报成功: {violation_data.get('event_id')}")
+                if len(items) > 1:
+                    self._send_batch(items)
                 else:
-                    self._stats['failed_reports'] += 1
-                    # 上报失败，重新加入队列（如果队列未满）
-                    try:
-                        self._event_queue.put(violation_data, block=False)
-                    except queue.Full:
-                        # 队列满了，保存到缓存
-                        self._cache_event(violation_data)
-                
-                # 标记任务完成
-                self._event_queue.task_done()
+                    self._process(items[0])
                 
             except Exception as e:
                 self.logger.error(f"违规事件上报工作线程异常: {e}")
                 time.sleep(1)
     
-    def _send_violation_report(self, violation_data: Dict) -> bool:
-        """发送违规事件报告（使用新的统一接口）
+    def _record(self, item) -> ViolationEvent:
+        """队列事件的记录：重试时取回上次发送的记录，首次发送时从队列内容生成"""
+        with self._retry_records_lock:
+            event = self._retry_records.pop(item.seq, None)
+        if event is None:
+            event = self._event(item.event)
+            event.set_sequence(item.seq)
+        # 上次运行遗留的事件按积压补传的优先级发送，不与新违规争抢链路
+        event.from_cache = item.recovered
+        return event
+    
+    def _process(self, item) -> None:
+        """上报单个事件，成功后确认，失败后安排重试"""
+        success = self._send_violation_report(item.event, self._item_evidence(item), fallback=False)
+        if success:
+            self._queue.ack(item)
+            self._bump('successful_reports')
+            self.logger.debug(f"违规事件上报成功: {item.event.event_id}")
+        else:
+            self._bump('failed_reports')
+            self._schedule_retry(item)
+    
+    def _send_batch(self, items) -> None:
+        """批量提交违规元数据，逐个确认成功的事件，其余安排重试
+
+        请求: {clientId, events: [元数据, ...]}（按 clientSeq 升序）
+        响应 data: {results: [{clientEventId, eventId, success}]}
+        """
+        url = f"{self.config.server.api_base_url}{self.config.violation_report.batch_endpoint}"
+        evidences = [self._item_evidence(item) for item in items]
+        for item, evidence in zip(items, evidences):
+            item.event.set_evidence(evidence)
+        # 直接拼接各事件缓存的元数据JSON，不重新序列化
+        body = b''.join([
+            b'{"clientId": ', json.dumps(self.client_id, ensure_ascii=False).encode('utf-8'),
+            b', "events": [', b', '.join(item.event.metadata_json() for item in items), b']}'
+        ])
+        priority = PRIORITY_BACKLOG if all(item.recovered for item in items) else PRIORITY_VIOLATION
+
+        response = self._post_json(url, body, priority)
+        if response is not None and response.status_code in (404, 405, 501):
+            self.logger.warning(f"服务器不支持批量违规上报 ({response.status_code})，逐个发送")
+            self._batch = False
+            for item in items:
+                self._process(item)
+            return
+
+        results = {}
+        if response is not None and response.status_code in (200, 201):
+            try:
+                for result in (response.json().get('data') or {}).get('results') or []:
+                    results[result.get('clientEventId')] = result
+                self._bump('batches')
+            except (ValueError, AttributeError) as e:
+                self.logger.warning(f"批量违规上报响应无效: {e}")
+        elif response is not None:
+            self.logger.warning(f"批量违规上报失败: {response.status_code} - {(response.text or '')[:500]}")
+
+        succeeded = 0
+        for item, evidence in zip(items, evidences):
+            result = results.get(item.event.event_id) or {}
+            if result.get('success', True) and result.get('eventId'):
+                succeeded += 1
+                self._queue.ack(item)
+                if evidence:
+                    self.evidence.enqueue(str(result['eventId']), evidence, 'image/jpeg')
+            else:
+                self._bump('failed_reports')
+                self._schedule_retry(item)
+        self._bump('successful_reports', succeeded)
+        self._bump('metadata_reports', succeeded)
+        self.logger.info(f"批量违规上报: {len(items)} 个事件，成功 {succeeded} 个")
+    
+    def _bump(self, name: str, count: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[name] += count
+    
+    def _schedule_retry(self, item) -> None:
+        """上报失败：按指数退避延迟重试，重试次数超过上限时移入死信表"""
+        settings = self.config.violation_queue
+        attempts = item.attempts + 1
+        if settings.max_attempts and attempts >= settings.max_attempts:
+            self._queue.dead_letter(item, 'max_attempts')
+            return
+        delay = min(settings.max_retry_delay, settings.retry_delay * 2 ** (attempts - 1))
+        delay *= random.uniform(1 - RETRY_JITTER, 1 + RETRY_JITTER)
+        with self._retry_records_lock:
+            self._retry_records[item.seq] = item.event
+            while len(self._retry_records) > settings.max_events:
+                self._retry_records.popitem(last=False)
+        self._queue.release(item, delay)
+        self.logger.debug(f"违规事件 {item.event.event_id} 第 {attempts} 次上报失败，{delay:.1f} 秒后重试")
+
+    def _send_violation_report(self, violation_data: Union[ViolationEvent, Dict],
+                               evidence: Optional[bytes] = None, fallback: bool = True) -> bool:
+        """发送违规事件报告
 
         Args:
-            violation_data: 违规事件数据
+            violation_data: 违规事件记录（或事件字典）
+            evidence: 入队时截取的证据截图，为None时（旧版缓存事件、截图失败）现在截取
+            fallback: 没有证据时是否现在截取（队列事件已补截过一次时为False）
+
+        Returns:
+            是否发送成功
+        """
+        event = self._event(violation_data)
+        if evidence is None and fallback:
+            evidence = self._fallback_evidence(event)
+        if self._two_phase:
+            result = self._send_metadata_report(event, evidence)
+            if result is not None:
+                return result
+        return self._send_combined_report(event, evidence)
+
+    def _item_evidence(self, item) -> Optional[bytes]:
+        """队列事件的证据：入队时没有证据的事件只在首次发送前补截一次并保存到队列，退避重试不再截图"""
+        evidence = item.load_evidence()
+        if evidence is None and not item.evidence_resolved:
+            evidence = self._fallback_evidence(item.event)
+            self._queue.attach_evidence(item, evidence)
+        return evidence
+
+    def _fallback_evidence(self, event: ViolationEvent) -> Optional[bytes]:
+        """没有随事件入队的证据时（旧版缓存事件、截图失败）现在截取；合并汇总事件不补截"""
+        if (event.occurrence or {}).get('repeatOf'):
+            return None
+        return self._get_current_screenshot()
+
+    def _send_metadata_report(self, event: ViolationEvent, evidence: Optional[bytes]) -> Optional[bool]:
+        """两阶段上报：发送违规元数据，取得事件ID后证据截图排队续传
+
+        请求: {clientEventId, clientSeq, clientId, violationType, violationContent, timestamp, additionalData, evidence?}
+        响应 data: {eventId}；服务器按 clientEventId 去重，重试不会产生重复事件。
+
+        Returns:
+            是否发送成功；服务器不支持两阶段上报时返回None（调用方退回一次性上报）
+        """
+        url = f"{self.config.server.api_base_url}{self.config.violation_report.metadata_endpoint}"
+        event.set_evidence(evidence)
+        body = event.metadata_json()
+        priority = PRIORITY_BACKLOG if event.from_cache else PRIORITY_VIOLATION
+
+        response = self._post_json(url, body, priority)
+        if response is None:
+            return False
+
+        if response.status_code in (404, 405, 501):
+            self.logger.warning(f"服务器不支持两阶段违规上报 ({response.status_code})，退回一次性上报")
+            self._two_phase = False
+            return None
+
+        if response.status_code not in (200, 201):
+            self.logger.warning(f"违规元数据上报失败: {response.status_code} - {(response.text or '')[:500]}")
+            return False
+
+        try:
+            event_ref = (response.json().get('data') or {}).get('eventId')
+        except (ValueError, AttributeError):
+            event_ref = None
+        if not event_ref:
+            self.logger.warning(f"违规元数据上报响应缺少事件ID: {response.text[:500]}")
+            return False
+
+        self._bump('metadata_reports')
+        self.logger.info(f"违规元数据已上报: eventId={event_ref}")
+        if evidence:
+            self.evidence.enqueue(str(event_ref), evidence, 'image/jpeg')
+        return True
+
+    def _post_json(self, url: str, body: bytes, priority: int):
+        """经上传调度器POST JSON，连接失败或服务器5xx时按 server.max_retries 重试
+
+        Returns:
+            最后一次响应，全部因连接问题失败时返回None
+        """
+        response = None
+        for attempt in range(self.config.server.max_retries):
+            try:
+                response = self.uploader.run(
+                    priority,
+                    lambda: self.session.post(
+                        url,
+                        data=body,
+                        headers={'Content-Type': 'application/json'},
+                        timeout=self.config.server.timeout
+                    ),
+                    nbytes=len(body)
+                )
+                if response.status_code < 500:
+                    return response
+                self.logger.warning(f"服务器错误 {response.status_code} (尝试 {attempt + 1}/{self.config.server.max_retries})")
+
+            except requests.exceptions.Timeout:
+                self.logger.warning(f"上报超时 (尝试 {attempt + 1}/{self.config.server.max_retries})")
+            except requests.exceptions.ConnectionError:
+                self.logger.warning(f"连接错误 (尝试 {attempt + 1}/{self.config.server.max_retries})")
+            except Exception as e:
+                self.logger.error(f"上报异常: {e} (尝试 {attempt + 1}/{self.config.server.max_retries})")
+
+            # 重试前等待
+            if attempt < self.config.server.max_retries - 1:
+                time.sleep(self.config.server.retry_delay)
+
+        return response
+
+    def _send_combined_report(self, event: ViolationEvent, evidence: Optional[bytes]) -> bool:
+        """一次性上报违规事件和截图（统一违规上报接口）
+
+        Args:
+            event: 违规事件记录
+            evidence: 证据截图
 
         Returns:
             是否发送成功
@@ -185,17 +454,21 @@ class ViolationReporter:
         # 使用新的统一违规上报接口
         url = f"{self.config.server.api_base_url}/security/violations/report-with-screenshot"
 
+        # 准备multipart/form-data格式的数据（证据已由调用方确定，重试时不再截图）
+        files_data, form_data = self._prepare_violation_data(event, evidence, fallback=False)
+
         # 重试发送
         for attempt in range(self.config.server.max_retries):
             try:
-                # 准备multipart/form-data格式的数据
-                files_data, form_data = self._prepare_violation_data(violation_data)
-
-                response = self.session.post(
-                    url,
-                    files=files_data,
-                    data=form_data,
-                    timeout=self.config.server.timeout
+                response = self.uploader.run(
+                    PRIORITY_BACKLOG if event.from_cache else PRIORITY_VIOLATION,
+                    lambda: self.session.post(
+                        url,
+                        files=files_data,
+                        data=form_data,
+                        timeout=self.config.server.timeout
+                    ),
+                    nbytes=self._payload_size(files_data, form_data)
                 )
 
                 # 日志中输出服务器返回（状态码与响应体）
@@ -214,6 +487,7 @@ class ViolationReporter:
                         if isinstance(result, dict):
                             # 检查新接口的响应格式
                             if result.get('success') or (result.get('data', {}).get('success')):
+                                self._bump('legacy_reports')
                                 return True
                             else:
                                 self.logger.warning(f"服务器返回非成功结果: {result}")
@@ -239,51 +513,31 @@ class ViolationReporter:
 
         return False
 
-    def _prepare_violation_data(self, violation_data: Dict) -> tuple:
+    @staticmethod
+    def _payload_size(files_data: Dict, form_data: Dict) -> int:
+        """估算上传字节数（文件内容和表单字段）"""
+        size = sum(len(content) for _, content, _ in files_data.values())
+        return size + sum(len(str(value).encode('utf-8')) for value in form_data.values())
+
+    def _prepare_violation_data(self, violation_data: Union[ViolationEvent, Dict],
+                                screenshot_data: Optional[bytes] = None, fallback: bool = True) -> tuple:
         """准备违规数据为新接口格式
 
         Args:
-            violation_data: 违规事件数据
+            violation_data: 违规事件记录（或事件字典）
+            screenshot_data: 证据截图，为None时现在截取
+            fallback: 没有证据时是否现在截取，为False时使用占位文件
 
         Returns:
             (files_data, form_data): 文件数据和表单数据的元组
         """
-        # 准备表单数据
-        form_data = {
-            'clientId': violation_data.get('clientId', self.client_id),
-            'violationType': violation_data.get('violationType', 'BLOCKCHAIN_ADDRESS'),
-            'violationContent': violation_data.get('violationContent', ''),
-            'timestamp': violation_data.get('report_time', datetime.now().isoformat()),
-        }
-
-        # 准备附加数据
-        additional_data = {}
-        if 'additionalData' in violation_data:
-            if isinstance(violation_data['additionalData'], dict):
-                additional_data = violation_data['additionalData']
-            else:
-                try:
-                    additional_data = json.loads(violation_data['additionalData'])
-                except:
-                    additional_data = {'raw_data': str(violation_data['additionalData'])}
-
-        # 添加其他有用的信息
-        if 'fullClipboardContent' in violation_data:
-            additional_data['clipboardContent'] = violation_data['fullClipboardContent']
-        if 'address_type' in violation_data:
-            additional_data['addressType'] = violation_data['address_type']
-        if 'detected_at' in violation_data:
-            additional_data['detectedAt'] = violation_data['detected_at']
-
-        # 添加客户端信息
-        additional_data['clientVersion'] = self.config.client.version
-        additional_data['platform'] = 'Python'
-
-        form_data['additionalData'] = json.dumps(additional_data, ensure_ascii=False)
+        event = self._event(violation_data)
+        form_data = event.form_data()
 
         # 准备截图文件
         files_data = {}
-        screenshot_data = self._get_current_screenshot()
+        if screenshot_data is None and fallback:
+            screenshot_data = self._fallback_evidence(event)
         if screenshot_data:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"violation_screenshot_{timestamp}.jpg"
@@ -380,123 +634,20 @@ class ViolationReporter:
             self.logger.error(f"获取违规截图失败: {e}")
             return None
 
-    def _cache_event(self, violation_data: Dict) -> None:
-        """缓存事件到本地文件
-        
-        Args:
-            violation_data: 违规事件数据
-        """
-        try:
-            # 确保缓存目录存在
-            self._cache_file.parent.mkdir(parents=True, exist_ok=True)
-            
-            # 读取现有缓存
-            cached_events = []
-            if self._cache_file.exists():
-                try:
-                    with open(self._cache_file, 'r', encoding='utf-8') as f:
-                        cached_events = json.load(f)
-                except:
-                    pass
-            
-            # 添加新事件
-            cached_events.append(violation_data)
-            
-            # 限制缓存大小（最多保留1000个事件）
-            if len(cached_events) > 1000:
-                cached_events = cached_events[-1000:]
-            
-            # 保存到文件
-            with open(self._cache_file, 'w', encoding='utf-8') as f:
-                json.dump(cached_events, f, indent=2, ensure_ascii=False)
-            
-            self._stats['cached_events'] += 1
-            self.logger.debug(f"违规事件已缓存: {violation_data.get('event_id')}")
-            
-        except Exception as e:
-            self.logger.error(f"缓存违规事件失败: {e}")
-    
-    def _load_cached_events(self) -> None:
-        """加载缓存的事件"""
-        try:
-            if not self._cache_file.exists():
-                return
-            
-            with open(self._cache_file, 'r', encoding='utf-8') as f:
-                cached_events = json.load(f)
-            
-            # 将缓存的事件添加到队列
-            loaded_count = 0
-            for event in cached_events:
-                try:
-                    self._event_queue.put(event, block=False)
-                    loaded_count += 1
-                except queue.Full:
-                    break
-            
-            if loaded_count > 0:
-                self.logger.info(f"已加载 {loaded_count} 个缓存的违规事件")
-                
-                # 清空缓存文件
-                try:
-                    self._cache_file.unlink()
-                except:
-                    pass
-            
-        except Exception as e:
-            self.logger.error(f"加载缓存事件失败: {e}")
-    
-    def _save_pending_events(self) -> None:
-        """保存队列中未处理的事件"""
-        try:
-            pending_events = []
-            
-            # 从队列中获取所有未处理的事件
-            while not self._event_queue.empty():
-                try:
-                    event = self._event_queue.get_nowait()
-                    pending_events.append(event)
-                except queue.Empty:
-                    break
-            
-            if pending_events:
-                # 读取现有缓存
-                cached_events = []
-                if self._cache_file.exists():
-                    try:
-                        with open(self._cache_file, 'r', encoding='utf-8') as f:
-                            cached_events = json.load(f)
-                    except:
-                        pass
-                
-                # 合并事件
-                all_events = cached_events + pending_events
-                
-                # 限制缓存大小
-                if len(all_events) > 1000:
-                    all_events = all_events[-1000:]
-                
-                # 确保缓存目录存在
-                self._cache_file.parent.mkdir(parents=True, exist_ok=True)
-                
-                # 保存到文件
-                with open(self._cache_file, 'w', encoding='utf-8') as f:
-                    json.dump(all_events, f, indent=2, ensure_ascii=False)
-                
-                self.logger.info(f"已保存 {len(pending_events)} 个未处理的违规事件到缓存")
-            
-        except Exception as e:
-            self.logger.error(f"保存未处理事件失败: {e}")
-    
     def get_stats(self) -> Dict:
         """获取统计信息
         
         Returns:
             统计信息字典
         """
-        stats = self._stats.copy()
-        stats['queue_size'] = self._event_queue.qsize()
+        with self._stats_lock:
+            stats = self._stats.copy()
+        stats['queue_size'] = len(self._queue)
+        stats['queue'] = self._queue.get_stats()
         stats['is_running'] = self._running
+        stats['two_phase'] = self._two_phase
+        stats['evidence'] = self.evidence.get_stats()
+        stats['dedup'] = self._coalescer.get_stats()
         return stats
     
     def get_queue_size(self) -> int:
@@ -505,18 +656,19 @@ class ViolationReporter:
         Returns:
             队列中的事件数量
         """
-        return self._event_queue.qsize()
+        return len(self._queue)
     
     def clear_cache(self) -> bool:
-        """清空缓存文件
+        """清空待上报的事件队列
         
         Returns:
             是否成功
         """
         try:
-            if self._cache_file.exists():
-                self._cache_file.unlink()
-                self.logger.info("违规事件缓存已清空")
+            removed = self._queue.clear()
+            with self._retry_records_lock:
+                self._retry_records.clear()
+            self.logger.info(f"违规事件队列已清空 ({removed} 个事件)")
             return True
         except Exception as e:
             self.logger.error(f"清空缓存失败: {e}")
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+违规事件去重合并模块
+
+用户反复复制同一地址时，每次都会产生新的违规事件、证据截图和上传。合并窗口（violation_dedup.window）内，
+同一地址、同一类型、同一内容（摘要）的重复只计数，不单独上报：
+
+- 首次发生照常作为独立事件上报并截取证据，告警不延迟
+- 窗口内的重复只累计次数和首次/最后一次发生时间，窗口结束时合并为一个汇总事件，计数不丢失
+- 窗口从首次发生开始计时、长度固定；窗口结束后再次出现时开始新的窗口（首次发生照常上报）
+- 证据只在首次发生时截取；violation_dedup.evidence_sample_every 大于0时，窗口内每重复N次再截取一次，
+  汇总事件携带最后一次采样的截图
+- 首次事件和汇总事件带有相同的合并键（occurrence.key），汇总事件的 occurrence.repeatOf 指向首次事件
+- 后台线程等到最早的窗口结束时输出汇总事件，不轮询；停止时输出所有未结束窗口的汇总
+"""
+
+import json
+import time
+import hashlib
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from core.config import AppConfig
+from modules.violation_event import ViolationEvent
+
+
+class CoalesceWindow:
+    """一个合并窗口（首次发生之后的重复）"""
+
+    __slots__ = ('key', 'first_event_id', 'first_seen', 'deadline', 'repeats', 'repeat_first_seen',
+                 'repeat_last_seen', 'last_event', 'evidence')
+
+    def __init__(self, key: str, first_event_id: Optional[str], first_seen: str, deadline: float):
+        self.key = key
+        self.first_event_id = first_event_id
+        self.first_seen = first_seen
+        self.deadline = deadline
+        self.repeats = 0
+        self.repeat_first_seen: Optional[str] = None
+        self.repeat_last_seen: Optional[str] = None
+        self.last_event: Optional[ViolationEvent] = None
+        self.evidence: Optional[bytes] = None
+
+
+class ViolationCoalescer:
+    """违规事件去重合并器"""
+
+    def __init__(self, config: AppConfig, logger, emit: Callable[[ViolationEvent, Optional[bytes]], None]):
+        """初始化合并器
+
+        Args:
+            config: 应用配置
+            logger: 日志记录器
+            emit: 输出汇总事件的回调 emit(event, evidence)
+        """
+        self.config = config
+        self.logger = logger
+        self._emit = emit
+
+        self._cond = threading.Condition()
+        # 按开始时间排列（字典保持插入顺序，最早的窗口最先结束）
+        self._windows: Dict[str, CoalesceWindow] = {}
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+        self._stats = {
+            'windows': 0,
+            'folded': 0,
+            'summaries': 0,
+            'evidence_samples': 0
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.config.violation_dedup.window > 0
+
+    # ---------- 生命周期 ----------
+
+    def start(self) -> None:
+        """启动窗口到期输出线程"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._worker, name="ViolationCoalescer", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """停止输出线程，并输出所有未结束窗口的汇总（计数不丢失）"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=5)
+        self._thread = None
+        self.flush()
+
+    def flush(self) -> int:
+        """立即结束所有窗口并输出汇总事件
+
+        Returns:
+            输出的汇总事件数
+        """
+        with self._cond:
+            windows = list(self._windows.values())
+            self._windows.clear()
+        return self._emit_summaries(windows)
+
+    # ---------- 合并 ----------
+
+    def fold(self, event: ViolationEvent, capture: Callable[[], Optional[bytes]]) -> bool:
+        """记录一次违规发生
+
+        首次发生时在事件中写入 occurrence 信息并返回False（调用方照常上报）；
+        窗口内的重复计入窗口并返回True（调用方不再单独上报），按采样间隔截取证据。
+
+        Args:
+            event: 违规事件记录
+            capture: 截取证据截图的函数
+
+        Returns:
+            是否已合并到窗口
+        """
+        if not self.enabled:
+            return False
+
+        settings = self.config.violation_dedup
+        key = self.key_for(event)
+        now = time.monotonic()
+        seen_at = datetime.now().isoformat()
+        sample = False
+        with self._cond:
+            expired = self._pop_expired(now)
+            window = self._windows.get(key)
+            if window is None:
+                if len(self._windows) >= settings.max_windows:
+                    # 窗口过多时提前结束最早的窗口
+                    expired.append(self._windows.pop(next(iter(self._windows))))
+                self._windows[key] = CoalesceWindow(key, event.event_id, seen_at,
+                                                    now + settings.window)
+                self._stats['windows'] += 1
+                self._cond.notify_all()
+            else:
+                window.repeats += 1
+                window.repeat_first_seen = window.repeat_first_seen or seen_at
+                window.repeat_last_seen = seen_at
+                window.last_event = event
+                self._stats['folded'] += 1
+                every = settings.evidence_sample_every
+                sample = every > 0 and window.repeats % every == 0
+        self._emit_summaries(expired)
+
+        if window is None:
+            event.occurrence = {
+                'key': key,
+                'count': 1,
+                'firstSeen': seen_at,
+                'lastSeen': seen_at
+            }
+            return False
+
+        if sample:
+            evidence = capture()
+            if evidence:
+                with self._cond:
+                    window.evidence = evidence
+                    self._stats['evidence_samples'] += 1
+        return True
+
+    @staticmethod
+    def key_for(event: ViolationEvent) -> str:
+        """合并键：违规类型、地址类型、地址和内容摘要"""
+        additional = event.additional_data
+        address_type = (additional.get('blockchainType') or additional.get('address_type')
+                        or additional.get('addressType') or '')
+        content = (additional.get('fullClipboardContent') or additional.get('clipboardContent')
+                   or additional.get('contentPreview') or '')
+        content_hash = hashlib.sha256(str(content).encode('utf-8')).hexdigest()
+        parts = [event.violation_type, address_type, event.violation_content, content_hash]
+        return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode('utf-8')).hexdigest()[:32]
+
+    def open_windows(self) -> int:
+        with self._cond:
+            return len(self._windows)
+
+    def get_stats(self) -> Dict:
+        with self._cond:
+            stats = self._stats.copy()
+            stats['open_windows'] = len(self._windows)
+        return stats
+
+    # ---------- 窗口到期 ----------
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                expired = self._pop_expired(time.monotonic())
+                while self._running and not expired:
+                    self._cond.wait(self._next_deadline_in())
+                    expired = self._pop_expired(time.monotonic())
+                if not self._running and not expired:
+                    return
+            self._emit_summaries(expired)
+
+    def _next_deadline_in(self) -> Optional[float]:
+        """距离最早的窗口结束的秒数，没有窗口时返回None（调用方持有锁）"""
+        if not self._windows:
+            return None
+        return max(0.0, min(window.deadline for window in self._windows.values()) - time.monotonic())
+
+    def _pop_expired(self, now: float) -> List[CoalesceWindow]:
+        """取出已结束的窗口（调用方持有锁）"""
+        expired = [window for window in self._windows.values() if window.deadline <= now]
+        for window in expired:
+            del self._windows[window.key]
+        return expired
+
+    def _emit_summaries(self, windows: List[CoalesceWindow]) -> int:
+        """输出有重复的窗口的汇总事件（没有重复的窗口直接结束）"""
+        emitted = 0
+        for window in windows:
+            if not window.repeats:
+                continue
+            summary = window.last_event.derive({
+                'key': window.key,
+                'count': window.repeats,
+                'firstSeen': window.repeat_first_seen,
+                'lastSeen': window.repeat_last_seen,
+                'repeatOf': window.first_event_id
+            })
+            try:
+                self._emit(summary, window.evidence)
+            except Exception as e:
+                self.logger.error(f"输出违规合并汇总失败: {e}")
+                continue
+            emitted += 1
+            with self._cond:
+                self._stats['summaries'] += 1
+            self.logger.info(f"违规事件 {window.first_event_id} 在合并窗口内重复 {window.repeats} 次，已合并上报")
+        return emitted
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+违规事件记录
+
+违规事件原先是在检测、入队和上报各环节反复修改、重组的字典（剪贴板监控还把证据截图以base64放在字典里），
+每次发送都重新整理字段并 json.dumps。ViolationEvent 是固定字段（__slots__）的事件记录：
+
+- 创建时一次性规整检测模块传入的各种字段写法，之后只读
+- 证据截图不放在记录里（out-of-line），由持久化队列单独保存为文件；旧版字典中的base64截图取出后作为证据
+- 上报用的表单字段和元数据JSON在首次使用时生成并缓存，重试和批量上报直接复用
+- to_record() 是写入持久化队列的形式，与旧版事件字典兼容（from_dict 可以读取旧版缓存和队列中的事件）
+"""
+
+import json
+import uuid
+import time
+import base64
+import hashlib
+from datetime import datetime
+from typing import Any, Dict, Optional, Union
+
+
+class ViolationEvent:
+    """违规事件记录"""
+
+    __slots__ = ('event_id', 'client_id', 'violation_type', 'violation_content', 'timestamp',
+                 'additional_data', 'occurrence', 'client_seq', 'from_cache', 'evidence_info',
+                 '_form', '_metadata_json')
+
+    def __init__(self, event_id: str, client_id: str, violation_type: str, violation_content: str,
+                 timestamp: str, additional_data: Dict[str, Any], occurrence: Optional[Dict[str, Any]] = None):
+        self.event_id = event_id
+        self.client_id = client_id
+        self.violation_type = violation_type
+        self.violation_content = violation_content
+        self.timestamp = timestamp
+        self.additional_data = additional_data
+        self.occurrence = occurrence
+        # 持久化队列中的序号，取出发送时设置
+        self.client_seq: Optional[int] = None
+        # 上次运行遗留的事件（按积压补传的优先级发送）
+        self.from_cache = False
+        # 证据的大小和摘要（证据内容不保存在记录中）
+        self.evidence_info: Optional[Dict[str, Any]] = None
+        self._form: Optional[Dict[str, str]] = None
+        self._metadata_json: Optional[bytes] = None
+
+    @staticmethod
+    def new_event_id(client_id: str) -> str:
+        """生成事件ID（同一毫秒内的多个违规事件ID也不重复，服务器按事件ID去重）"""
+        return f"{client_id}_{int(time.time() * 1000)}_{uuid.uuid4().hex[:8]}"
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], client_id: str, client_version: Optional[str] = None) -> 'ViolationEvent':
+        """从检测模块传入的事件字典或持久化队列中的记录创建事件
+
+        Args:
+            data: 事件字典（没有 event_id 时生成新的事件ID）
+            client_id: 客户端ID（字典中没有 clientId 时使用）
+            client_version: 客户端版本，写入附加数据
+
+        Returns:
+            违规事件记录
+        """
+        additional = data.get('additionalData')
+        if isinstance(additional, dict):
+            additional = dict(additional)
+        elif additional:
+            try:
+                additional = json.loads(additional)
+            except (TypeError, ValueError):
+                additional = {'raw_data': str(additional)}
+            if not isinstance(additional, dict):
+                additional = {'raw_data': str(additional)}
+        else:
+            additional = {}
+
+        # 检测模块顶层字段的不同写法
+        if 'fullClipboardContent' in data:
+            additional['clipboardContent'] = data['fullClipboardContent']
+        if 'address_type' in data:
+            additional['addressType'] = data['address_type']
+        if 'detected_at' in data:
+            additional['detectedAt'] = data['detected_at']
+
+        if client_version is not None:
+            additional['clientVersion'] = client_version
+        additional.setdefault('platform', 'Python')
+
+        return cls(
+            event_id=data.get('event_id') or cls.new_event_id(client_id),
+            client_id=data.get('clientId') or client_id,
+            violation_type=data.get('violationType', 'BLOCKCHAIN_ADDRESS'),
+            violation_content=data.get('violationContent', ''),
+            timestamp=data.get('report_time') or datetime.now().isoformat(),
+            additional_data=additional,
+            occurrence=data.get('occurrence')
+        )
+
+    @classmethod
+    def coerce(cls, event: Union['ViolationEvent', Dict[str, Any]], client_id: str,
+               client_version: Optional[str] = None) -> 'ViolationEvent':
+        """事件记录原样返回，字典转换为事件记录"""
+        if isinstance(event, cls):
+            return event
+        return cls.from_dict(event, client_id, client_version)
+
+    @staticmethod
+    def inline_evidence(data: Dict[str, Any]) -> Optional[bytes]:
+        """取出旧版事件字典中以base64内嵌的证据截图"""
+        screenshot = data.get('screenshot')
+        if not isinstance(screenshot, dict) or not screenshot.get('data'):
+            return None
+        try:
+            return base64.b64decode(screenshot['data'])
+        except (TypeError, ValueError):
+            return None
+
+    def derive(self, occurrence: Dict[str, Any]) -> 'ViolationEvent':
+        """以本事件为模板生成新事件（新的事件ID和时间，用于合并汇总）"""
+        return ViolationEvent(self.new_event_id(self.client_id), self.client_id, self.violation_type,
+                              self.violation_content, datetime.now().isoformat(), self.additional_data,
+                              occurrence)
+
+    # ---------- 发送 ----------
+
+    def set_sequence(self, client_seq: Optional[int]) -> None:
+        if client_seq != self.client_seq:
+            self.client_seq = client_seq
+            self._metadata_json = None
+
+    def set_evidence(self, evidence: Optional[bytes], content_type: str = 'image/jpeg') -> None:
+        """记录证据的大小和摘要（两阶段上报随元数据发送）"""
+        info = None
+        if evidence:
+            info = {
+                'size': len(evidence),
+                'sha256': hashlib.sha256(evidence).hexdigest(),
+                'contentType': content_type
+            }
+        if info != self.evidence_info:
+            self.evidence_info = info
+            self._metadata_json = None
+
+    def form_data(self) -> Dict[str, str]:
+        """一次性上报的表单字段（additionalData 为JSON字符串），生成后缓存"""
+        if self._form is None:
+            self._form = {
+                'clientId': self.client_id,
+                'violationType': self.violation_type,
+                'violationContent': self.violation_content,
+                'timestamp': self.timestamp,
+                'additionalData': json.dumps(self._additional(), ensure_ascii=False)
+            }
+        return self._form
+
+    def metadata(self) -> Dict[str, Any]:
+        """两阶段上报的违规元数据（证据只带大小和摘要）"""
+        payload = {
+            'clientId': self.client_id,
+            'violationType': self.violation_type,
+            'violationContent': self.violation_content,
+            'timestamp': self.timestamp,
+            'additionalData': self._additional(),
+            'clientEventId': self.event_id
+        }
+        if self.client_seq is not None:
+            payload['clientSeq'] = self.client_seq
+        if self.evidence_info:
+            payload['evidence'] = self.evidence_info
+        return payload
+
+    def metadata_json(self) -> bytes:
+        """序列化后的违规元数据，生成后缓存（序号或证据变化时重新生成）"""
+        if self._metadata_json is None:
+            self._metadata_json = json.dumps(self.metadata(), ensure_ascii=False).encode('utf-8')
+        return self._metadata_json
+
+    def _additional(self) -> Dict[str, Any]:
+        if self.occurrence:
+            return dict(self.additional_data, occurrence=self.occurrence)
+        return self.additional_data
+
+    # ---------- 持久化 ----------
+
+    def to_record(self) -> Dict[str, Any]:
+        """写入持久化队列的形式（与旧版事件字典兼容）"""
+        record = {
+            'event_id': self.event_id,
+            'clientId': self.client_id,
+            'violationType': self.violation_type,
+            'violationContent': self.violation_content,
+            'report_time': self.timestamp,
+            'additionalData': self.additional_data
+        }
+        if self.occurrence:
+            record['occurrence'] = self.occurrence
+        return record
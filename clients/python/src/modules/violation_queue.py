@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+违规事件持久化队列
+
+替代整体重写的 violation_cache.json：事件写入 SQLite（WAL 模式），每次入队/确认只是一次小事务，
+进程崩溃后已提交的事件不会丢失。
+
+- 入队即持久化；取出的事件在确认前保持在库中，崩溃或重启后重新投递（至少一次，服务器按事件ID去重）
+- 延迟队列：上报失败的事件记录重试次数和下次重试时间，到期前不会被取出；
+  取事件时一直等到最早的事件到期（或有新事件入队），不轮询
+- 重试次数过多或保存时间过长的事件移入死信表，保留供排查，不再投递
+- 多个发送线程可以同时取事件（已取出未确认的事件不会被重复取出），也可以一次取出一批
+- 事件序号（seq）单调递增且跨重启不重复，随上报发送，服务器据此恢复客户端内的事件顺序
+- 证据截图不写入数据库，保存为证据目录中的单独文件，库中只记录文件名；
+  入队时没有证据的事件在首次发送前补充一次（补截失败时记录证据不可用），重试时不再补截
+- 按事件数、总字节数（含证据）和保存时长保留，超出时从最早的事件开始淘汰
+- 首次打开时导入旧版 violation_cache.json 中的事件
+- 数据库无法打开时退回内存数据库（不持久化），上报功能不受影响
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from core.config import AppConfig
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS violations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created REAL NOT NULL,
+    available_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    size INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    evidence TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_violations_available ON violations (available_at, id);
+CREATE TABLE IF NOT EXISTS dead_letters (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created REAL NOT NULL,
+    dead_at REAL NOT NULL,
+    attempts INTEGER NOT NULL,
+    reason TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+"""
+
+# 证据列的取值：补充证据时截图失败，之后发送不再补截
+EVIDENCE_UNAVAILABLE = ''
+
+
+class QueuedViolation:
+    """从队列取出、尚未确认的违规事件"""
+
+    __slots__ = ('seq', 'event', 'evidence_path', 'evidence_resolved', 'attempts', 'created', 'recovered')
+
+    def __init__(self, seq: int, event: Dict[str, Any], evidence_path: Optional[Path], attempts: int,
+                 created: float, recovered: bool, evidence_resolved: Optional[bool] = None):
+        self.seq = seq
+        self.event = event
+        self.evidence_path = evidence_path
+        # 是否已有证据记录（证据文件或证据不可用标记）；为False时可补充一次证据
+        self.evidence_resolved = evidence_path is not None if evidence_resolved is None else evidence_resolved
+        self.attempts = attempts
+        self.created = created
+        self.recovered = recovered  # 上次运行遗留的事件
+
+    def load_evidence(self) -> Optional[bytes]:
+        """读取证据内容，没有证据或文件已丢失时返回None"""
+        if self.evidence_path is None:
+            return None
+        try:
+            return self.evidence_path.read_bytes()
+        except OSError:
+            return None
+
+
+class ViolationQueue:
+    """违规事件持久化队列（线程安全）"""
+
+    def __init__(self, config: AppConfig, logger, db_path: Path, evidence_dir: Path,
+                 legacy_cache: Optional[Path] = None):
+        """打开（或创建）队列
+
+        Args:
+            config: 应用配置（保留策略每次入队时读取）
+            logger: 日志记录器
+            db_path: SQLite数据库文件
+            evidence_dir: 证据文件目录
+            legacy_cache: 旧版JSON缓存文件，存在时导入后删除
+        """
+        self.config = config
+        self.logger = logger
+        self.db_path = db_path
+        self.evidence_dir = evidence_dir
+
+        self._cond = threading.Condition()
+        self._in_flight: Set[int] = set()
+        self._closed = False
+        self._interrupted = False
+        self._stats = {
+            'enqueued': 0,
+            'acked': 0,
+            'released': 0,
+            'evicted': 0,
+            'expired': 0,
+            'dead_lettered': 0,
+            'recovered': 0
+        }
+
+        self._conn = self._open()
+        self._count, self._bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM violations").fetchone()
+        # 此前写入的事件是上次运行遗留的
+        self._recovered_upto = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM violations").fetchone()[0]
+        self._stats['recovered'] = self._count
+        self._dead_count = self._conn.execute("SELECT COUNT(*) FROM dead_letters").fetchone()[0]
+
+        self._remove_orphan_evidence()
+        if legacy_cache is not None and legacy_cache.exists():
+            self._import_legacy(legacy_cache)
+        with self._cond:
+            self._enforce_retention(time.time())
+
+        if self._count:
+            self.logger.info(f"违规事件队列中有 {self._count} 个待上报事件")
+
+    def _open(self) -> sqlite3.Connection:
+        settings = self.config.violation_queue
+        try:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self.evidence_dir.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA synchronous={settings.synchronous}")
+            conn.executescript(_SCHEMA)
+            return conn
+        except (OSError, sqlite3.Error) as e:
+            self.logger.error(f"无法打开违规事件队列 {self.db_path}，使用内存队列（不持久化）: {e}")
+            conn = sqlite3.connect(":memory:", check_same_thread=False, isolation_level=None)
+            conn.executescript(_SCHEMA)
+            return conn
+
+    # ---------- 入队与出队 ----------
+
+    def put(self, event: Dict[str, Any], evidence: Optional[bytes] = None) -> int:
+        """事件入队（提交后返回）
+
+        Args:
+            event: 违规事件数据（可JSON序列化）
+            evidence: 证据内容，单独保存为文件
+
+        Returns:
+            事件在队列中的序号
+        """
+        payload = json.dumps(event, ensure_ascii=False, separators=(',', ':'))
+        evidence_name = None
+        size = len(payload.encode('utf-8'))
+        if evidence:
+            evidence_name = f"{uuid.uuid4().hex}.bin"
+            self._write_evidence(self.evidence_dir / evidence_name, evidence)
+            size += len(evidence)
+
+        now = time.time()
+        try:
+            with self._cond:
+                cursor = self._conn.execute(
+                    "INSERT INTO violations (created, available_at, size, payload, evidence) VALUES (?, ?, ?, ?, ?)",
+                    (now, now, size, payload, evidence_name))
+                self._count += 1
+                self._bytes += size
+                self._stats['enqueued'] += 1
+                self._enforce_retention(now)
+                self._cond.notify_all()
+                return cursor.lastrowid
+        except sqlite3.Error:
+            if evidence_name:
+                self._unlink(evidence_name)
+            raise
+
+    def get(self, timeout: Optional[float] = None) -> Optional[QueuedViolation]:
+        """取出最早到期的事件（确认前保留在队列中）
+
+        没有到期事件时等到最早的事件到期、有新事件入队或被 interrupt() 唤醒。
+
+        Args:
+            timeout: 最长等待秒数，为None时一直等待
+
+        Returns:
+            事件，超时、被中断或队列已关闭时返回None
+        """
+        items = self.get_batch(1, timeout)
+        return items[0] if items else None
+
+    def get_batch(self, max_events: int, timeout: Optional[float] = None) -> List[QueuedViolation]:
+        """按到期顺序取出最多 max_events 个事件（有事件到期后立即返回，不等待凑满一批）
+
+        Args:
+            max_events: 最多取出的事件数
+            timeout: 最长等待秒数，为None时一直等待
+
+        Returns:
+            事件列表，超时、被中断或队列已关闭时为空
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not (self._closed or self._interrupted):
+                items = self._take_available(max_events)
+                if items:
+                    self._in_flight.update(item.seq for item in items)
+                    return items
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return []
+                due_in = self._next_due_in()
+                if due_in is not None:
+                    remaining = due_in if remaining is None else min(remaining, due_in)
+                self._cond.wait(remaining)
+            return []
+
+    def attach_evidence(self, item: QueuedViolation, evidence: Optional[bytes]) -> None:
+        """为入队时没有证据的事件补充证据（只补充一次）
+
+        Args:
+            item: 已取出的事件
+            evidence: 补截的证据，为None时记录证据不可用，之后的发送不再补截
+        """
+        evidence_name = EVIDENCE_UNAVAILABLE
+        if evidence:
+            evidence_name = f"{uuid.uuid4().hex}.bin"
+            try:
+                self._write_evidence(self.evidence_dir / evidence_name, evidence)
+            except OSError as e:
+                self.logger.warning(f"保存违规事件 #{item.seq} 的证据失败: {e}")
+                evidence, evidence_name = None, EVIDENCE_UNAVAILABLE
+        size = len(evidence) if evidence else 0
+
+        with self._cond:
+            updated = not self._closed and self._conn.execute(
+                "UPDATE violations SET evidence = ?, size = size + ? WHERE id = ? AND evidence IS NULL",
+                (evidence_name, size, item.seq)).rowcount > 0
+            if updated:
+                self._bytes += size
+                self._enforce_retention(time.time())
+        if not updated:
+            if evidence_name:
+                self._unlink(evidence_name)
+            return
+        item.evidence_path = self.evidence_dir / evidence_name if evidence_name else None
+        item.evidence_resolved = True
+
+    def interrupt(self) -> None:
+        """唤醒并结束所有等待中的 get()（停止上报线程时使用）"""
+        with self._cond:
+            self._interrupted = True
+            self._cond.notify_all()
+
+    def ack(self, item: QueuedViolation) -> None:
+        """确认事件已上报，从队列删除（连同证据文件）"""
+        with self._cond:
+            self._in_flight.discard(item.seq)
+            if self._delete(item.seq):
+                self._stats['acked'] += 1
+
+    def release(self, item: QueuedViolation, delay: float = 0.0) -> None:
+        """上报失败，重试次数加一，delay 秒后再投递"""
+        with self._cond:
+            self._in_flight.discard(item.seq)
+            if self._closed:
+                return
+            self._conn.execute("UPDATE violations SET attempts = attempts + 1, available_at = ? WHERE id = ?",
+                               (time.time() + delay, item.seq))
+            self._stats['released'] += 1
+            self._cond.notify_all()
+
+    def dead_letter(self, item: QueuedViolation, reason: str) -> None:
+        """放弃投递，事件移入死信表（证据文件删除）"""
+        with self._cond:
+            self._in_flight.discard(item.seq)
+            self._move_to_dead_letters(item.seq, reason)
+
+    def dead_letters(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """最近的死信事件（最新的在前）"""
+        with self._cond:
+            if self._closed:
+                return []
+            rows = self._conn.execute(
+                "SELECT created, dead_at, attempts, reason, payload FROM dead_letters ORDER BY id DESC LIMIT ?",
+                (limit,)).fetchall()
+        return [{'created': created, 'dead_at': dead_at, 'attempts': attempts, 'reason': reason,
+                 'event': json.loads(payload)} for created, dead_at, attempts, reason, payload in rows]
+
+    def clear(self) -> int:
+        """删除所有未投递的事件
+
+        Returns:
+            删除的事件数
+        """
+        with self._cond:
+            rows = self._conn.execute("SELECT id FROM violations").fetchall()
+            removed = 0
+            for (seq,) in rows:
+                if seq not in self._in_flight and self._delete(seq):
+                    removed += 1
+            return removed
+
+    def close(self) -> None:
+        """关闭队列（未确认的事件下次打开时重新投递）"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+            try:
+                self._conn.close()
+            except sqlite3.Error:
+                pass
+
+    def __len__(self) -> int:
+        return self._count
+
+    def get_stats(self) -> Dict:
+        with self._cond:
+            stats = self._stats.copy()
+            stats.update({'events': self._count, 'bytes': self._bytes, 'in_flight': len(self._in_flight),
+                          'dead_letters': self._dead_count})
+            due_in = None if self._closed else self._next_due_in()
+        stats['next_due_in'] = None if due_in is None else round(due_in, 1)
+        return stats
+
+    # ---------- 内部（调用方持有锁） ----------
+
+    def _take_available(self, limit: int) -> List[QueuedViolation]:
+        """按到期顺序最多取 limit 个事件；保存时间过长的事件移入死信表"""
+        items: List[QueuedViolation] = []
+        while len(items) < limit:
+            exclude = tuple(self._in_flight) + tuple(item.seq for item in items)
+            placeholders = ','.join('?' * len(exclude))
+            now = time.time()
+            rows = self._conn.execute(
+                "SELECT id, created, attempts, payload, evidence FROM violations "
+                f"WHERE available_at <= ? AND id NOT IN ({placeholders}) ORDER BY available_at, id LIMIT ?",
+                (now,) + exclude + (limit - len(items),)).fetchall()
+            removed = False
+            for seq, created, attempts, payload, evidence_name in rows:
+                if created < now - self.config.violation_queue.max_age:
+                    self._move_to_dead_letters(seq, 'expired')
+                    self._stats['expired'] += 1
+                    removed = True
+                    continue
+                try:
+                    event = json.loads(payload)
+                except ValueError:
+                    self.logger.error(f"丢弃无法解析的违规事件 #{seq}")
+                    self._delete(seq)
+                    removed = True
+                    continue
+                evidence_path = self.evidence_dir / evidence_name if evidence_name else None
+                items.append(QueuedViolation(seq, event, evidence_path, attempts, created,
+                                             seq <= self._recovered_upto, evidence_name is not None))
+            # 有事件被移除时继续补足一批
+            if not removed:
+                break
+        return items
+
+    def _next_due_in(self) -> Optional[float]:
+        """距离最早一个未投递事件到期的秒数，没有事件时返回None"""
+        exclude = tuple(self._in_flight)
+        placeholders = ','.join('?' * len(exclude))
+        row = self._conn.execute(
+            f"SELECT MIN(available_at) FROM violations WHERE id NOT IN ({placeholders})", exclude).fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+    def _move_to_dead_letters(self, seq: int, reason: str) -> None:
+        if self._closed:
+            return
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.execute(
+                "INSERT INTO dead_letters (created, dead_at, attempts, reason, payload) "
+                "SELECT created, ?, attempts, ?, payload FROM violations WHERE id = ?", (time.time(), reason, seq))
+            moved = self._delete(seq)
+            self._conn.execute("COMMIT")
+        except sqlite3.Error:
+            self._conn.execute("ROLLBACK")
+            raise
+        if not moved:
+            return
+        self._dead_count += 1
+        self._stats['dead_lettered'] += 1
+        self.logger.warning(f"违规事件 #{seq} 移入死信表: {reason}")
+
+        excess = self._dead_count - self.config.violation_queue.dead_letter_max
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM dead_letters WHERE id IN (SELECT id FROM dead_letters ORDER BY id LIMIT ?)", (excess,))
+            self._dead_count -= excess
+
+    def _delete(self, seq: int) -> bool:
+        if self._closed:
+            return False
+        row = self._conn.execute("SELECT size, evidence FROM violations WHERE id = ?", (seq,)).fetchone()
+        if row is None:
+            return False
+        self._conn.execute("DELETE FROM violations WHERE id = ?", (seq,))
+        self._count -= 1
+        self._bytes -= row[0]
+        if row[1]:
+            self._unlink(row[1])
+        return True
+
+    def _enforce_retention(self, now: float) -> None:
+        """从最早的事件开始淘汰超出数量/字节数上限的事件，保存时间过长的事件移入死信表（正在投递的除外）"""
+        settings = self.config.violation_queue
+        cutoff = now - settings.max_age
+        while self._count:
+            over_limit = self._count > settings.max_events or self._bytes > settings.max_bytes
+            exclude = tuple(self._in_flight)
+            placeholders = ','.join('?' * len(exclude))
+            row = self._conn.execute(
+                f"SELECT id, created FROM violations WHERE id NOT IN ({placeholders}) ORDER BY id LIMIT 1",
+                exclude).fetchone()
+            if row is None:
+                return
+            if row[1] < cutoff:
+                self._move_to_dead_letters(row[0], 'expired')
+                self._stats['expired'] += 1
+            elif over_limit:
+                self._delete(row[0])
+                self._stats['evicted'] += 1
+                self.logger.warning(f"违规事件队列超出上限，丢弃最早的事件 #{row[0]}")
+            else:
+                return
+
+    # ---------- 证据文件 ----------
+
+    @staticmethod
+    def _write_evidence(path: Path, data: bytes) -> None:
+        temp_path = path.with_suffix('.tmp')
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    def _unlink(self, evidence_name: str) -> None:
+        try:
+            (self.evidence_dir / evidence_name).unlink()
+        except OSError:
+            pass
+
+    def _remove_orphan_evidence(self) -> None:
+        """删除崩溃遗留的、库中没有记录的证据文件"""
+        if not self.evidence_dir.exists():
+            return
+        referenced = {name for (name,) in
+                      self._conn.execute("SELECT evidence FROM violations WHERE evidence IS NOT NULL")}
+        for path in self.evidence_dir.iterdir():
+            if path.name not in referenced:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    def _import_legacy(self, legacy_cache: Path) -> None:
+        """导入旧版JSON缓存中的事件后删除该文件"""
+        try:
+            with open(legacy_cache, 'r', encoding='utf-8') as f:
+                events: List[Dict[str, Any]] = json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"无法读取旧版违规事件缓存: {e}")
+            return
+        for event in events:
+            if isinstance(event, dict):
+                self.put(event)
+        self._recovered_upto = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM violations").fetchone()[0]
+        self._stats['recovered'] = self._count
+        try:
+            legacy_cache.unlink()
+        except OSError:
+            pass
+        self.logger.info(f"已从旧版缓存导入 {len(events)} 个违规事件")
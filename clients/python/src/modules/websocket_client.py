@@ -8,6 +8,9 @@ WebSocket客户端模块
 - 心跳机制
 - 事件处理
 - 自动重连
+- 白名单/配置更新推送：通知对应管理器立即同步（合并窗口内的多次推送只同步一次），
+  连接状态同步给各管理器，连接正常时定时同步退为长间隔兜底
+- 截图请求：交给截图管理器立即截图，先确认收到，上传结束后再回报结果和耗时（同一请求ID）
 """
 
 import asyncio
@@ -16,7 +19,11 @@ import time
 from typing import Optional, Dict, Callable
 from datetime import datetime
 
-import socketio
+try:
+    import socketio
+    SOCKETIO_AVAILABLE = True
+except ImportError:
+    SOCKETIO_AVAILABLE = False
 
 from core.config import AppConfig
 
@@ -24,29 +31,41 @@ from core.config import AppConfig
 class WebSocketClient:
     """WebSocket客户端"""
     
-    def __init__(self, config: AppConfig, client_id: str, logger, whitelist_manager=None):
+    def __init__(self, config: AppConfig, client_id: str, logger, whitelist_manager=None,
+                 http_client=None, sio=None, screenshot_manager=None):
         """初始化WebSocket客户端
         
         Args:
             config: 应用配置
             client_id: 客户端ID
             logger: 日志记录器
-            whitelist_manager: 白名单管理器
+            whitelist_manager: 白名单管理器（收到白名单更新推送时同步）
+            http_client: HTTP客户端（收到配置更新推送时同步配置）
+            sio: Socket.IO客户端，默认创建 socketio.AsyncClient
+            screenshot_manager: 截图管理器（收到截图请求时立即截图）
         """
         self.config = config
         self.client_id = client_id
         self.logger = logger
         self.whitelist_manager = whitelist_manager
+        self.http_client = http_client
+        self.screenshot_manager = screenshot_manager
+        # 事件处理所在的事件循环（截图结果在截图线程中回报，需要交回事件循环发送）
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
         
         # Socket.IO客户端
-        self.sio = socketio.AsyncClient(
-            reconnection=True,
-            reconnection_attempts=0,  # 无限重连
-            reconnection_delay=1,
-            reconnection_delay_max=30,
-            logger=False,  # 禁用socketio的日志
-            engineio_logger=False
-        )
+        if sio is None:
+            if not SOCKETIO_AVAILABLE:
+                raise RuntimeError("未安装 python-socketio，无法使用WebSocket客户端")
+            sio = socketio.AsyncClient(
+                reconnection=True,
+                reconnection_attempts=0,  # 无限重连
+                reconnection_delay=1,
+                reconnection_delay_max=30,
+                logger=False,  # 禁用socketio的日志
+                engineio_logger=False
+            )
+        self.sio = sio
         
         # 设置namespace
         self.namespace = '/monitor'
@@ -55,6 +74,7 @@ class WebSocketClient:
         self._connected = False
         self._running = False
         self._last_heartbeat = 0
+        self._heartbeat: Optional[asyncio.Task] = None
         
         # 统计信息
         self._stats = {
@@ -63,7 +83,10 @@ class WebSocketClient:
             'disconnections': 0,
             'heartbeats_sent': 0,
             'messages_received': 0,
-            'messages_sent': 0
+            'messages_sent': 0,
+            'whitelist_pushes': 0,
+            'config_pushes': 0,
+            'capture_requests': 0
         }
         
         # 注册事件处理器
@@ -72,9 +95,13 @@ class WebSocketClient:
         self.logger.info("WebSocket客户端初始化完成")
     
     def _register_event_handlers(self) -> None:
-        """注册事件处理器"""
+        """注册事件处理器（注册在 /monitor 命名空间上，与连接的命名空间一致）"""
+        
+        def on(handler):
+            self.sio.on(handler.__name__, handler, namespace=self.namespace)
+            return handler
         
-        @self.sio.event
+        @on
         async def connect():
             """连接成功事件"""
             self._connected = True
@@ -86,53 +113,62 @@ class WebSocketClient:
             
             # 加入客户端房间
             await self._join_client_room()
+            
+            # 推送通道可用，定时同步退为兜底
+            self._set_push_active(True)
+            
+            # 重连后补同步一次，避免遗漏断线期间的推送
+            if self._stats['successful_connections'] > 1:
+                self._request_whitelist_sync()
+                self._request_config_sync()
         
-        @self.sio.event
+        @on
         async def disconnect():
             """断开连接事件"""
             self._connected = False
             self._stats['disconnections'] += 1
             self.logger.warning("WebSocket连接已断开")
+            self._set_push_active(False)
         
-        @self.sio.event
+        @on
         async def connect_error(data):
             """连接错误事件"""
             self.logger.error(f"WebSocket连接错误: {data}")
         
-        @self.sio.event
+        @on
         async def screenshot_request(data):
             """截图请求事件"""
             self._stats['messages_received'] += 1
             self.logger.info("收到截图请求")
             await self._handle_screenshot_request(data)
         
-        @self.sio.event
+        @on
         async def whitelist_updated(data):
             """白名单更新事件"""
             self._stats['messages_received'] += 1
             self.logger.info("收到白名单更新通知")
             await self._handle_whitelist_update(data)
         
-        @self.sio.event
+        @on
         async def client_config_updated(data):
             """客户端配置更新事件"""
             self._stats['messages_received'] += 1
             self.logger.info("收到客户端配置更新通知")
             await self._handle_config_update(data)
         
-        @self.sio.event
+        @on
         async def heartbeat_response(data):
             """心跳响应事件"""
             self._stats['messages_received'] += 1
             self.logger.debug("收到心跳响应")
         
-        @self.sio.event
+        @on
         async def room_joined(data):
             """房间加入成功事件"""
             self._stats['messages_received'] += 1
             self.logger.info(f"成功加入房间: {data.get('room', 'unknown')}")
         
-        @self.sio.event
+        @on
         async def connection_success(data):
             """连接成功确认事件"""
             self._stats['messages_received'] += 1
@@ -153,12 +189,13 @@ class WebSocketClient:
             
             # 启动心跳任务
             if self.config.heartbeat.enabled:
-                asyncio.create_task(self._heartbeat_task())
+                self._heartbeat = asyncio.create_task(self._heartbeat_task())
             
             self.logger.info("WebSocket客户端启动成功")
             
         except Exception as e:
             self.logger.error(f"WebSocket客户端启动失败: {e}")
+            self._running = False
             raise
     
     async def stop(self) -> None:
@@ -167,8 +204,14 @@ class WebSocketClient:
             return
         
         self._running = False
+        self._set_push_active(False)
         self.logger.info("正在停止WebSocket客户端...")
         
+        # 心跳任务在等待下次到期，直接取消
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+        
         try:
             # 断开连接
             if self._connected:
@@ -261,8 +304,8 @@ class WebSocketClient:
                     await self._send_heartbeat()
                     self._last_heartbeat = current_time
                 
-                # 等待1秒
-                await asyncio.sleep(1)
+                # 等到下次心跳到期（停止时任务被取消）
+                await asyncio.sleep(max(0.0, self._last_heartbeat + self.config.heartbeat.interval - time.time()))
                 
             except Exception as e:
                 self.logger.error(f"心跳任务异常: {e}")
@@ -295,12 +338,16 @@ class WebSocketClient:
             data: 请求数据
         """
         try:
-            # 这里可以触发立即截图
-            # 由于截图管理器在另一个线程中运行，我们发送一个响应确认收到请求
+            # 交给截图管理器立即截图（在调度器线程中执行），先确认收到，上传结束后回报结果
+            self._loop = asyncio.get_running_loop()
+            self._stats['capture_requests'] += 1
+            request_id = data.get('requestId') or f"{self.client_id}_{int(time.time() * 1000)}"
+            accepted = self._request_capture(str(request_id))
+            
             response_data = {
                 'clientId': self.client_id,
-                'requestId': data.get('requestId'),
-                'status': 'received',
+                'requestId': request_id,
+                'status': 'received' if accepted else 'rejected',
                 'timestamp': datetime.now().isoformat()
             }
             
@@ -310,6 +357,30 @@ class WebSocketClient:
         except Exception as e:
             self.logger.error(f"处理截图请求失败: {e}")
     
+    def _request_capture(self, request_id: str) -> bool:
+        """请求立即截图（不阻塞事件循环）"""
+        if self.screenshot_manager and hasattr(self.screenshot_manager, 'request_capture'):
+            return self.screenshot_manager.request_capture(request_id, self._capture_finished)
+        return False
+    
+    def _capture_finished(self, request_id: str, success: bool, latency_ms: float) -> None:
+        """立即截图上传结束（在截图线程中调用）：回报结果和从收到请求到上传完成的耗时"""
+        loop = self._loop
+        if loop is None or not self._running:
+            return
+        response_data = {
+            'clientId': self.client_id,
+            'requestId': request_id,
+            'status': 'uploaded' if success else 'failed',
+            'latencyMs': round(latency_ms, 1),
+            'timestamp': datetime.now().isoformat()
+        }
+        try:
+            asyncio.run_coroutine_threadsafe(self.send_message('screenshot_response', response_data), loop)
+        except RuntimeError:
+            # 事件循环已关闭
+            pass
+    
     async def _handle_whitelist_update(self, data: Dict) -> None:
         """处理白名单更新
         
@@ -317,10 +388,10 @@ class WebSocketClient:
             data: 更新数据
         """
         try:
-            if self.whitelist_manager:
-                # 触发白名单同步
-                # 由于白名单管理器在另一个线程中运行，我们只记录日志
-                self.logger.info("触发白名单同步")
+            # 通知白名单管理器同步（在其同步线程中执行，合并窗口内的多次推送只同步一次）
+            self._stats['whitelist_pushes'] += 1
+            if self._request_whitelist_sync():
+                self.logger.info("已触发白名单同步")
             
             # 发送确认响应
             response_data = {
@@ -346,6 +417,11 @@ class WebSocketClient:
             # 记录配置更新
             self.logger.info(f"收到配置更新: {data}")
             
+            # 通知HTTP客户端同步配置
+            self._stats['config_pushes'] += 1
+            if self._request_config_sync():
+                self.logger.info("已触发配置同步")
+            
             # 发送确认响应
             response_data = {
                 'clientId': self.client_id,
@@ -360,6 +436,29 @@ class WebSocketClient:
         except Exception as e:
             self.logger.error(f"处理配置更新失败: {e}")
     
+    def _request_whitelist_sync(self) -> bool:
+        """请求白名单同步（不阻塞事件循环）"""
+        if self.whitelist_manager and hasattr(self.whitelist_manager, 'request_sync'):
+            self.whitelist_manager.request_sync()
+            return True
+        return False
+    
+    def _request_config_sync(self) -> bool:
+        """请求配置同步（不阻塞事件循环）"""
+        if self.http_client and hasattr(self.http_client, 'request_config_sync'):
+            self.http_client.request_config_sync()
+            return True
+        return False
+    
+    def _set_push_active(self, active: bool) -> None:
+        """把推送连接状态同步给各管理器"""
+        for target in (self.whitelist_manager, self.http_client):
+            if target and hasattr(target, 'set_push_active'):
+                try:
+                    target.set_push_active(active)
+                except Exception as e:
+                    self.logger.error(f"更新推送连接状态失败: {e}")
+    
     async def send_message(self, event: str, data: Dict) -> bool:
         """发送消息
         
@@ -4,58 +4,134 @@
 白名单管理模块
 
 功能：
-- 白名单数据同步
+- 白名单数据同步（条件请求 + 按版本增量更新）
 - 本地缓存管理
 - 地址验证
-- 定时更新
+- 定时更新（收到服务器推送时立即同步，推送连接正常时定时同步退为长间隔兜底）
+
+同步协议：
+- 请求携带 If-None-Match（上次的ETag）和 sinceVersion（本地白名单版本）
+- 304：白名单未变化
+- 200 且 data.delta 为真：data.added/data.removed 是相对 data.baseVersion 的增量
+- 200 其他情况：data.addresses 为完整白名单
+旧版服务器不返回 version/ETag 时，按完整列表处理，版本取地址集合的摘要。
+
+whitelist.store 为 compact 时，地址保存在mmap映射的紧凑文件中（见 whitelist_store），
+JSON缓存只记录版本和文件名，适用于数十万以上地址的白名单。
+
+条目格式和按链规范化规则见 whitelist_index：支持限定链类型的条目、前缀条目和通配条目。
 """
 
+import os
 import json
 import time
+import uuid
+import hashlib
 import threading
-from typing import Set, Dict, List, Optional
+from typing import Callable, Dict, FrozenSet, List, NamedTuple, Optional, Union
 from datetime import datetime, timedelta
 from pathlib import Path
 
 import requests
 
 from core.config import AppConfig
+from utils.scheduler import Scheduler
+from .whitelist_store import CompactWhitelist
+from .whitelist_index import (
+    ANY_CHAIN, EMPTY_PATTERNS, PatternIndex, entry_key, entry_partition,
+    is_pattern_entry, normalize_address, normalize_entry
+)
+
+# 白名单地址容器：内存集合或紧凑存储，均支持 in 和 len
+AddressSet = Union[FrozenSet[str], CompactWhitelist]
+
+# 缓存条目格式版本：1 为全部转小写的旧格式，2 为按链规范化
+ENTRY_FORMAT = 2
+
+
+class WhitelistSnapshot(NamedTuple):
+    """不可变的白名单快照
+
+    同步时在锁外构建新快照，再以一次引用替换发布；
+    读取方只需读取一次引用，无需加锁，也不会看到更新到一半的数据。
+    """
+    addresses: AddressSet
+    last_update: float
+    version: Optional[str] = None
+    patterns: PatternIndex = EMPTY_PATTERNS
+    
+    def contains(self, address: str, chain: Optional[str] = None) -> bool:
+        """检查规范化后的地址：精确条目、限定该链类型的条目、前缀和通配条目
+        
+        Args:
+            address: 规范化后的地址
+            chain: 链类型，为None时只检查未限定链类型的条目
+        """
+        addresses = self.addresses
+        if isinstance(addresses, CompactWhitelist):
+            if addresses.contains(address, ANY_CHAIN):
+                return True
+            if chain and addresses.contains(entry_key(address, chain), chain):
+                return True
+        else:
+            if address in addresses:
+                return True
+            if chain and entry_key(address, chain) in addresses:
+                return True
+        return self.patterns.match(address, chain)
 
 
 class WhitelistManager:
     """白名单管理器"""
     
-    def __init__(self, config: AppConfig, logger):
+    # 调度器中的定时同步任务名
+    SYNC_JOB = 'whitelist_sync'
+    
+    def __init__(self, config: AppConfig, logger, scheduler: Optional[Scheduler] = None):
         """初始化白名单管理器
         
         Args:
             config: 应用配置
             logger: 日志记录器
+            scheduler: 共用的定时调度器，为None时使用自己的调度器
         """
         self.config = config
         self.logger = logger
         
-        # 白名单数据
-        self._whitelist: Set[str] = set()
-        self._last_update = 0
+        # 白名单数据（只通过 _publish 整体替换）
+        self._snapshot = WhitelistSnapshot(frozenset(), 0)
+        self._etag: Optional[str] = None
         
         # 创建缓存目录和文件路径
         cache_dir = Path(__file__).parent.parent.parent / "cache"
         cache_dir.mkdir(exist_ok=True)
         self._cache_file = cache_dir / "whitelist.json"
+        self._compact = config.whitelist.store == 'compact'
         
-        # 线程控制
+        # 定时同步由调度器执行
         self._running = False
-        self._thread: Optional[threading.Thread] = None
+        self._owns_scheduler = scheduler is None
+        self.scheduler = scheduler or Scheduler(logger, name="WhitelistScheduler", max_workers=1)
+        self._push_active = False
+        # 合并同步（见 HttpClient）接管白名单同步时，收到推送改为触发合并同步
+        self._sync_delegate: Optional[Callable[[], None]] = None
+        # 写锁：只保护快照替换和增删地址的读-改-写，读取方不使用
         self._lock = threading.RLock()
+        # 同步锁：避免并发同步，网络请求期间持有
+        self._sync_lock = threading.Lock()
         
-        # 统计信息
+        # 统计信息（计数器不加锁，并发时允许极少量误差）
         self._stats = {
             'total_addresses': 0,
             'last_sync_time': None,
             'sync_attempts': 0,
             'successful_syncs': 0,
             'failed_syncs': 0,
+            'not_modified': 0,
+            'delta_syncs': 0,
+            'full_syncs': 0,
+            'cache_writes': 0,
+            'push_notifications': 0,
             'cache_hits': 0,
             'cache_misses': 0
         }
@@ -79,17 +155,24 @@ class WhitelistManager:
         self.logger.info("正在启动白名单管理器...")
         
         try:
-            # 立即同步一次
-            self._sync_whitelist()
-            
-            # 启动定时同步线程
             if self.config.whitelist.sync_interval > 0:
-                self._thread = threading.Thread(
-                    target=self._sync_task,
-                    name="WhitelistSync",
-                    daemon=True
+                # 注册定时同步任务：没有有效缓存时立即同步，否则首次同步由调度器随机分散，
+                # 避免大量客户端同时启动时集中请求服务器
+                scheduling = self.config.scheduler
+                splay = scheduling.splay and self.is_cache_valid()
+                self.scheduler.add_job(
+                    self.SYNC_JOB,
+                    self._sync_whitelist,
+                    interval=self._sync_interval(),
+                    jitter=scheduling.jitter,
+                    initial_delay=None if splay else 0,
+                    retry_delay=scheduling.retry_delay,
+                    max_backoff=scheduling.max_backoff
                 )
-                self._thread.start()
+                self.scheduler.start()
+            else:
+                # 未启用定时同步时只在启动时同步一次
+                self._sync_whitelist()
             
             self.logger.info("白名单管理器启动成功")
             
@@ -107,12 +190,10 @@ class WhitelistManager:
         self.logger.info("正在停止白名单管理器...")
         
         try:
-            # 等待线程结束
-            if self._thread and self._thread.is_alive():
-                self._thread.join(timeout=5)
-            
-            # 保存缓存
-            self._save_cache()
+            # 移除定时同步任务（自己的调度器一并停止）
+            self.scheduler.remove_job(self.SYNC_JOB)
+            if self._owns_scheduler:
+                self.scheduler.stop()
             
             # 输出统计信息
             self.logger.info(f"白名单统计: {self._stats}")
@@ -121,113 +202,378 @@ class WhitelistManager:
         except Exception as e:
             self.logger.error(f"停止白名单管理器时出错: {e}")
     
-    def _sync_task(self) -> None:
-        """定时同步任务"""
-        self.logger.info("白名单同步任务已启动")
+    def _sync_interval(self) -> float:
+        """当前定时同步间隔：推送连接正常或由合并同步接管时退为兜底间隔"""
+        interval = self.config.whitelist.sync_interval
+        if self._push_active or self._sync_delegate is not None:
+            return max(interval, self.config.push.fallback_interval)
+        return interval
+    
+    def request_sync(self) -> None:
+        """收到白名单更新推送：合并窗口后同步一次（不阻塞调用方）"""
+        self._stats['push_notifications'] += 1
+        delegate = self._sync_delegate
+        if delegate is not None:
+            delegate()
+        else:
+            self.scheduler.trigger(self.SYNC_JOB, delay=self.config.push.coalesce_delay)
+    
+    def set_sync_delegate(self, delegate: Optional[Callable[[], None]]) -> None:
+        """由合并同步接管（或交还）白名单同步
         
-        while self._running:
-            try:
-                current_time = time.time()
-                
-                # 检查是否需要同步
-                if (current_time - self._last_update) >= self.config.whitelist.sync_interval:
-                    self._sync_whitelist()
-                
-                # 等待一段时间
-                time.sleep(min(60, self.config.whitelist.sync_interval // 10))
-                
-            except Exception as e:
-                self.logger.error(f"白名单同步任务异常: {e}")
-                time.sleep(60)
+        接管期间白名单随合并同步更新（见 apply_sync_data），自己的定时同步退为兜底间隔，
+        收到推送时调用 delegate 触发合并同步。
+        
+        Args:
+            delegate: 触发一次合并同步的函数，为None时恢复独立同步
+        """
+        self._sync_delegate = delegate
+        self.scheduler.set_interval(self.SYNC_JOB, self._sync_interval())
     
-    def _sync_whitelist(self) -> bool:
-        """同步白名单数据
+    def apply_runtime_config(self, changes: Dict) -> None:
+        """远程配置变化：同步间隔变化时重新安排定时同步"""
+        if 'whitelist.sync_interval' in changes:
+            self.scheduler.set_interval(self.SYNC_JOB, self._sync_interval())
+    
+    def sync_version(self) -> Optional[str]:
+        """本地白名单版本（合并同步时告知服务器）"""
+        return self._snapshot.version
+    
+    def apply_sync_data(self, api_data: Optional[Dict]) -> bool:
+        """应用合并同步响应中的白名单部分
+        
+        Args:
+            api_data: 白名单数据（格式同白名单接口的 data 字段），为None表示服务器确认未变化
         
         Returns:
-            是否同步成功
+            是否应用成功；增量与本地版本不衔接时返回False并安排一次完整同步
         """
         if not self.config.whitelist.enabled:
             return False
         
-        with self._lock:
+        with self._sync_lock:
             self._stats['sync_attempts'] += 1
-            
-            try:
-                self.logger.info("正在同步白名单数据...")
-                
-                # 构建请求URL
-                url = f"{self.config.server.api_base_url}/whitelist/addresses/active"
-                
-                # 请求参数
-                params = {
-                    'lastUpdate': int(self._last_update) if self._last_update > 0 else 0
-                }
-                
-                # 发送请求
-                response = requests.get(
-                    url,
-                    params=params,
-                    timeout=self.config.server.timeout,
-                    headers={
-                        'User-Agent': f"PythonClient/{self.config.client.version}",
-                        'Content-Type': 'application/json'
-                    }
-                )
-                
-                response.raise_for_status()
-                data = response.json()
-                
-                # 调试：打印完整的API响应
-                self.logger.debug(f"白名单API响应: {data}")
-                
-                # 处理响应数据
-                # API返回格式: {code: 200, data: {addresses: [string], lastUpdated: Date}}
-                api_data = data.get('data', {})
-                addresses = api_data.get('addresses', [])
-                
-                # 调试：打印解析后的地址
-                self.logger.debug(f"解析到的地址列表: {addresses}")
-                
-                # 更新白名单
-                if addresses:
-                    old_count = len(self._whitelist)
-                    # 清空旧数据，使用新数据
-                    self._whitelist.clear()
-                    # 标准化地址并添加到白名单
-                    for addr in addresses:
-                        if isinstance(addr, str):
-                            self._whitelist.add(addr.lower().strip())
-                    
-                    new_count = len(self._whitelist)
-                    self.logger.info(f"白名单已更新: {old_count} -> {new_count}")
-                
-                # 更新时间戳
-                self._last_update = time.time()
-                self._stats['last_sync_time'] = datetime.now().isoformat()
-                self._stats['successful_syncs'] += 1
-                self._stats['total_addresses'] = len(self._whitelist)
-                
-                # 保存缓存
-                self._save_cache()
-                
-                self.logger.info(f"白名单同步成功，共 {len(self._whitelist)} 个地址")
+            snapshot = self._snapshot
+            if api_data is None:
+                self._stats['not_modified'] += 1
+                self._confirm_snapshot(snapshot)
                 return True
-                
-            except requests.exceptions.RequestException as e:
-                self.logger.error(f"白名单同步网络错误: {e}")
+            
+            if api_data.get('delta') and api_data.get('baseVersion') != snapshot.version:
+                self.logger.warning(f"白名单增量基准版本 {api_data.get('baseVersion')} 与本地版本 {snapshot.version} 不一致，安排完整同步")
                 self._stats['failed_syncs'] += 1
+                self.scheduler.trigger(self.SYNC_JOB)
                 return False
             
+            try:
+                return self._apply_response(snapshot, api_data, None)
             except Exception as e:
-                self.logger.error(f"白名单同步异常: {e}")
+                self.logger.error(f"应用白名单同步数据失败: {e}")
                 self._stats['failed_syncs'] += 1
                 return False
     
-    def is_whitelisted(self, address: str) -> bool:
+    def set_push_active(self, active: bool) -> None:
+        """推送连接状态变化：连接正常时定时同步退为兜底间隔"""
+        self._push_active = active
+        interval = self._sync_interval()
+        self.scheduler.set_interval(self.SYNC_JOB, interval)
+        self.logger.info(f"白名单推送{'已连接' if active else '已断开'}，定时同步间隔 {interval}s")
+    
+    def _sync_whitelist(self) -> bool:
+        """同步白名单数据
+        
+        Returns:
+            是否同步成功
+        """
+        if not self.config.whitelist.enabled:
+            return False
+        
+        with self._sync_lock:
+            return self._do_sync_whitelist()
+    
+    def _do_sync_whitelist(self) -> bool:
+        """执行一次白名单同步：请求、解析和构建新快照都在写锁之外完成"""
+        self._stats['sync_attempts'] += 1
+        
+        try:
+            self.logger.info("正在同步白名单数据...")
+            
+            snapshot = self._snapshot
+            response = self._request_whitelist(snapshot, conditional=True)
+            
+            # 服务器确认白名单未变化
+            if response.status_code == 304:
+                self._stats['not_modified'] += 1
+                self._confirm_snapshot(snapshot)
+                self.logger.info(f"白名单未变化 (版本 {snapshot.version})，共 {len(snapshot.addresses)} 个地址")
+                return True
+            
+            response.raise_for_status()
+            api_data = response.json().get('data', {})
+            
+            # 增量与本地版本不衔接时，重新拉取完整白名单
+            if api_data.get('delta') and api_data.get('baseVersion') != snapshot.version:
+                self.logger.warning(f"白名单增量基准版本 {api_data.get('baseVersion')} 与本地版本 {snapshot.version} 不一致，重新拉取完整列表")
+                response = self._request_whitelist(snapshot, conditional=False)
+                response.raise_for_status()
+                api_data = response.json().get('data', {})
+            
+            # 调试：打印完整的API响应
+            self.logger.debug(f"白名单API响应: {api_data}")
+            
+            return self._apply_response(snapshot, api_data, response.headers.get('ETag'))
+            
+        except requests.exceptions.RequestException as e:
+            self.logger.error(f"白名单同步网络错误: {e}")
+            self._stats['failed_syncs'] += 1
+            return False
+        
+        except Exception as e:
+            self.logger.error(f"白名单同步异常: {e}")
+            self._stats['failed_syncs'] += 1
+            return False
+    
+    def _apply_response(self, snapshot: WhitelistSnapshot, api_data: Dict, etag: Optional[str]) -> bool:
+        """应用白名单响应数据（完整列表或增量），版本变化时发布新快照并写缓存
+        
+        Args:
+            snapshot: 请求时的本地快照
+            api_data: 响应中的 data 字段
+            etag: 响应的ETag（合并同步没有ETag）
+        
+        Returns:
+            是否成功
+        """
+        parsed = self._parse_response(api_data)
+        if parsed is None:
+            # 服务器未返回地址时保留原有白名单
+            self._confirm_snapshot(snapshot)
+            self.logger.info(f"服务器未返回白名单地址，保留现有 {len(snapshot.addresses)} 个地址")
+            return True
+        
+        full, added, removed = parsed
+        version = api_data.get('version') or (self._digest(full) if full is not None else None)
+        
+        if version is not None and version == snapshot.version:
+            self._etag = etag or self._etag
+            self._confirm_snapshot(snapshot)
+            self.logger.info(f"白名单未变化 (版本 {version})，共 {len(snapshot.addresses)} 个地址")
+            return True
+        
+        # 构建并发布新快照；请求期间快照被本地修改替换时，增量在最新快照上重新构建，不丢失本地修改
+        base = snapshot
+        while True:
+            new_addresses = self._build_addresses(base.addresses, full, added, removed, version)
+            with self._lock:
+                replaced = self._snapshot
+                if replaced is base or full is not None:
+                    # 增量叠加了本地修改后与服务器版本不一致，下次同步拉取完整列表
+                    synced = full is not None or base is snapshot
+                    new_snapshot = self._publish(new_addresses, time.time(), version if synced else None)
+                    self._etag = etag if synced else None
+                    break
+            self._retire_store(new_addresses, None)
+            base = replaced
+        self._retire_store(replaced.addresses, new_addresses)
+        
+        self.logger.info(f"白名单已更新: {len(replaced.addresses)} -> {len(new_snapshot.addresses)} "
+                         f"(版本 {replaced.version} -> {new_snapshot.version})")
+        self._stats['last_sync_time'] = datetime.now().isoformat()
+        self._stats['successful_syncs'] += 1
+        
+        # 只有版本变化时才写缓存
+        self._save_cache(new_snapshot)
+        return True
+    
+    def _request_whitelist(self, snapshot: WhitelistSnapshot, conditional: bool) -> requests.Response:
+        """请求白名单接口
+        
+        Args:
+            snapshot: 本地当前快照
+            conditional: 是否携带ETag和本地版本（请求304或增量）
+        
+        Returns:
+            响应对象
+        """
+        url = f"{self.config.server.api_base_url}/whitelist/addresses/active"
+        headers = {
+            'User-Agent': f"PythonClient/{self.config.client.version}",
+            'Content-Type': 'application/json'
+        }
+        params = {
+            'lastUpdate': int(snapshot.last_update) if snapshot.last_update > 0 else 0
+        }
+        
+        if conditional:
+            if self._etag:
+                headers['If-None-Match'] = self._etag
+            if snapshot.version:
+                params['sinceVersion'] = snapshot.version
+        
+        return requests.get(url, params=params, timeout=self.config.server.timeout, headers=headers)
+    
+    def _parse_response(self, api_data: Dict):
+        """解析白名单响应
+        
+        Args:
+            api_data: 响应中的 data 字段
+        
+        Returns:
+            (完整列表或None, 新增地址, 删除地址)；完整列表为空且没有版本号（旧版服务器）时返回None
+        """
+        if api_data.get('delta'):
+            added = self._normalize_all(api_data.get('added', []))
+            removed = self._normalize_all(api_data.get('removed', []))
+            self._stats['delta_syncs'] += 1
+            self.logger.info(f"应用白名单增量: +{len(added)} -{len(removed)}")
+            return None, added, removed
+        
+        # API返回格式: {code: 200, data: {addresses: [string], lastUpdated: Date, version?: string}}
+        addresses = api_data.get('addresses', [])
+        if not addresses and not api_data.get('version'):
+            return None
+        
+        self._stats['full_syncs'] += 1
+        return self._normalize_all(addresses), frozenset(), frozenset()
+    
+    def _build_addresses(self, current: AddressSet, full: Optional[FrozenSet[str]],
+                         added: FrozenSet[str], removed: FrozenSet[str],
+                         version: Optional[str]) -> AddressSet:
+        """构建新的地址容器（不修改当前容器）
+        
+        Args:
+            current: 当前地址容器
+            full: 完整地址列表，为None时在当前容器上应用增量
+            added: 新增地址
+            removed: 删除地址
+            version: 新版本号
+        
+        Returns:
+            新地址容器
+        """
+        if not self._compact:
+            if full is not None:
+                return full
+            return (frozenset(current) - removed) | added
+        
+        # 紧凑存储只保存精确条目的哈希，前缀和通配条目写入文件元数据
+        store_file = self._cache_file.parent / f"whitelist-{uuid.uuid4().hex[:12]}.bin"
+        if full is None and isinstance(current, CompactWhitelist):
+            patterns = (frozenset(current.metadata.get('patterns', [])) - removed) | \
+                frozenset(entry for entry in added if is_pattern_entry(entry))
+            metadata = {'whitelist_version': version, 'patterns': sorted(patterns)}
+            return current.apply_delta(
+                store_file,
+                (entry for entry in added if not is_pattern_entry(entry)),
+                removed,
+                partition_of=entry_partition,
+                metadata=metadata
+            )
+        if full is None:
+            full = (frozenset(current) - removed) | added
+        metadata = {'whitelist_version': version,
+                    'patterns': sorted(entry for entry in full if is_pattern_entry(entry))}
+        return CompactWhitelist.build(
+            store_file, (entry for entry in full if not is_pattern_entry(entry)),
+            partition_of=entry_partition,
+            bloom_bits_per_entry=self.config.whitelist.bloom_bits_per_entry,
+            metadata=metadata
+        )
+    
+    def _retire_store(self, old: AddressSet, new: AddressSet) -> None:
+        """删除被替换的紧凑存储文件
+        
+        仍持有旧快照的读取方不受影响（POSIX下映射在删除后依然有效）；
+        Windows下文件仍被映射时删除失败，留待下次启动时清理。
+        """
+        if isinstance(old, CompactWhitelist) and old is not new:
+            try:
+                old.path.unlink()
+            except OSError:
+                pass
+    
+    @staticmethod
+    def _normalize_all(addresses) -> FrozenSet[str]:
+        """规范化条目列表（按链规则，见 whitelist_index）"""
+        normalized = (normalize_entry(entry) for entry in addresses)
+        return frozenset(entry for entry in normalized if entry)
+    
+    @staticmethod
+    def _digest(addresses: FrozenSet[str]) -> str:
+        """服务器未提供版本号时，以地址集合的摘要作为版本"""
+        digest = hashlib.sha1('\n'.join(sorted(addresses)).encode('utf-8')).hexdigest()
+        return f"sha1:{digest[:16]}"
+    
+    def _confirm_snapshot(self, snapshot: WhitelistSnapshot) -> None:
+        """服务器确认白名单未变化：刷新同步时间，只更新缓存文件时间，不重写内容"""
+        with self._lock:
+            if self._snapshot is snapshot:
+                self._publish(snapshot.addresses, time.time(), snapshot.version, snapshot.patterns)
+        
+        self._stats['last_sync_time'] = datetime.now().isoformat()
+        self._stats['successful_syncs'] += 1
+        
+        try:
+            if self._cache_file.exists():
+                os.utime(self._cache_file)
+            else:
+                self._save_cache()
+        except OSError as e:
+            self.logger.debug(f"更新白名单缓存时间失败: {e}")
+    
+    def _publish(self, addresses: AddressSet, last_update: float,
+                 version: Optional[str] = None,
+                 patterns: Optional[PatternIndex] = None) -> WhitelistSnapshot:
+        """以一次引用替换发布新的白名单快照
+        
+        Args:
+            addresses: 规范化后的条目集合或紧凑存储
+            last_update: 更新时间戳
+            version: 白名单版本，本地修改后为None
+            patterns: 前缀/通配条目索引，为None时由条目重新构建
+        
+        Returns:
+            新快照
+        """
+        if not isinstance(addresses, CompactWhitelist):
+            addresses = frozenset(addresses)
+        if patterns is None:
+            patterns = self._build_patterns(addresses)
+        snapshot = WhitelistSnapshot(addresses, last_update, version, patterns)
+        self._snapshot = snapshot
+        self._stats['total_addresses'] = len(snapshot.addresses)
+        return snapshot
+    
+    @staticmethod
+    def _build_patterns(addresses: AddressSet) -> PatternIndex:
+        """构建前缀/通配条目索引"""
+        if isinstance(addresses, CompactWhitelist):
+            entries = addresses.metadata.get('patterns', [])
+        else:
+            entries = [entry for entry in addresses if is_pattern_entry(entry)]
+        return PatternIndex(entries) if entries else EMPTY_PATTERNS
+    
+    @staticmethod
+    def _has_entry(snapshot: WhitelistSnapshot, entry: str) -> bool:
+        """快照中是否已有该条目（条目本身，而非地址匹配）"""
+        if is_pattern_entry(entry):
+            return entry in snapshot.patterns.entries
+        return entry in snapshot.addresses
+    
+    def get_snapshot(self) -> WhitelistSnapshot:
+        """获取当前白名单快照，批量校验时可在同一快照上完成
+        
+        Returns:
+            当前白名单快照
+        """
+        return self._snapshot
+    
+    def is_whitelisted(self, address: str, blockchain_type: Optional[str] = None) -> bool:
         """检查地址是否在白名单中
         
         Args:
             address: 区块链地址
+            blockchain_type: 区块链类型，指定时同时检查限定该链类型的条目
         
         Returns:
             是否在白名单中
@@ -235,26 +581,32 @@ class WhitelistManager:
         if not self.config.whitelist.enabled:
             return True  # 如果白名单功能禁用，则认为所有地址都是合法的
         
-        with self._lock:
-            # 标准化地址（转换为小写）
-            normalized_address = address.lower().strip()
-            
-            # 检查白名单
-            is_whitelisted = normalized_address in self._whitelist
-            
-            # 更新统计
-            if is_whitelisted:
-                self._stats['cache_hits'] += 1
-            else:
-                self._stats['cache_misses'] += 1
-            
-            return is_whitelisted
+        # 检查白名单（读取当前快照，无需加锁）
+        is_whitelisted = self._snapshot.contains(normalize_address(address), self._chain(blockchain_type))
+        
+        # 更新统计
+        if is_whitelisted:
+            self._stats['cache_hits'] += 1
+        else:
+            self._stats['cache_misses'] += 1
+        
+        return is_whitelisted
+    
+    def is_address_whitelisted(self, address: str, blockchain_type: Optional[str] = None) -> bool:
+        """按链类型检查地址是否在白名单中（剪贴板监控使用的接口）"""
+        return self.is_whitelisted(address, blockchain_type)
+    
+    @staticmethod
+    def _chain(blockchain_type: Optional[str]) -> Optional[str]:
+        return blockchain_type.upper() if blockchain_type else None
     
     def validate_addresses(self, addresses: list) -> dict:
         """批量验证地址是否在白名单中
         
+        整批地址在同一快照上校验，结果中保留传入的原始元素。
+        
         Args:
-            addresses: 地址列表
+            addresses: 地址列表，元素为地址字符串或检测结果字典（含 address，可含 type）
         
         Returns:
             验证结果字典，包含whitelisted和violations列表
@@ -268,15 +620,20 @@ class WhitelistManager:
         whitelisted = []
         violations = []
         
-        with self._lock:
-            for address in addresses:
-                normalized_address = address.lower().strip()
-                if normalized_address in self._whitelist:
-                    whitelisted.append(address)
-                    self._stats['cache_hits'] += 1
-                else:
-                    violations.append(address)
-                    self._stats['cache_misses'] += 1
+        # 整批地址在同一快照上校验
+        snapshot = self._snapshot
+        for item in addresses:
+            if isinstance(item, dict):
+                address, chain = item.get('address', ''), self._chain(item.get('type'))
+            else:
+                address, chain = item, None
+            if snapshot.contains(normalize_address(address), chain):
+                whitelisted.append(item)
+            else:
+                violations.append(item)
+        
+        self._stats['cache_hits'] += len(whitelisted)
+        self._stats['cache_misses'] += len(violations)
         
         return {
             'whitelisted': whitelisted,
@@ -292,26 +649,32 @@ class WhitelistManager:
         Returns:
             是否添加成功
         """
-        with self._lock:
-            try:
-                # 标准化地址
-                normalized_address = address.lower().strip()
-                
-                if normalized_address not in self._whitelist:
-                    self._whitelist.add(normalized_address)
-                    self._stats['total_addresses'] = len(self._whitelist)
-                    
-                    # 保存缓存
-                    self._save_cache()
-                    
-                    self.logger.info(f"地址已添加到白名单: {address}")
-                    return True
-                
-                return True  # 地址已存在
-                
-            except Exception as e:
-                self.logger.error(f"添加地址到白名单失败: {e}")
+        try:
+            # 规范化条目
+            normalized_address = normalize_entry(address)
+            if not normalized_address:
                 return False
+            
+            with self._lock:
+                old_snapshot = self._snapshot
+                if self._has_entry(old_snapshot, normalized_address):
+                    return True  # 地址已存在
+                # 本地修改后与服务器版本不再一致，下次同步拉取完整列表
+                addresses = self._build_addresses(old_snapshot.addresses, None, frozenset([normalized_address]),
+                                                  frozenset(), None)
+                snapshot = self._publish(addresses, old_snapshot.last_update)
+                self._etag = None
+            self._retire_store(old_snapshot.addresses, addresses)
+            
+            # 保存缓存
+            self._save_cache(snapshot)
+            
+            self.logger.info(f"地址已添加到白名单: {address}")
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"添加地址到白名单失败: {e}")
+            return False
     
     def remove_address(self, address: str) -> bool:
         """从白名单中移除地址
@@ -322,35 +685,43 @@ class WhitelistManager:
         Returns:
             是否移除成功
         """
-        with self._lock:
-            try:
-                # 标准化地址
-                normalized_address = address.lower().strip()
-                
-                if normalized_address in self._whitelist:
-                    self._whitelist.remove(normalized_address)
-                    self._stats['total_addresses'] = len(self._whitelist)
-                    
-                    # 保存缓存
-                    self._save_cache()
-                    
-                    self.logger.info(f"地址已从白名单移除: {address}")
-                    return True
-                
-                return True  # 地址不存在
-                
-            except Exception as e:
-                self.logger.error(f"从白名单移除地址失败: {e}")
+        try:
+            # 规范化条目
+            normalized_address = normalize_entry(address)
+            if not normalized_address:
                 return False
+            
+            with self._lock:
+                old_snapshot = self._snapshot
+                if not self._has_entry(old_snapshot, normalized_address):
+                    return True  # 地址不存在
+                addresses = self._build_addresses(old_snapshot.addresses, None, frozenset(),
+                                                  frozenset([normalized_address]), None)
+                snapshot = self._publish(addresses, old_snapshot.last_update)
+                self._etag = None
+            self._retire_store(old_snapshot.addresses, addresses)
+            
+            # 保存缓存
+            self._save_cache(snapshot)
+            
+            self.logger.info(f"地址已从白名单移除: {address}")
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"从白名单移除地址失败: {e}")
+            return False
     
     def get_whitelist(self) -> List[str]:
         """获取白名单列表
         
         Returns:
-            白名单地址列表
+            白名单地址列表（紧凑存储只保存地址哈希，返回空列表）
         """
-        with self._lock:
-            return list(self._whitelist)
+        addresses = self._snapshot.addresses
+        if isinstance(addresses, CompactWhitelist):
+            self.logger.warning("紧凑白名单存储只保存地址哈希，无法列出地址")
+            return []
+        return list(addresses)
     
     def get_stats(self) -> Dict:
         """获取统计信息
@@ -358,12 +729,14 @@ class WhitelistManager:
         Returns:
             统计信息字典
         """
-        with self._lock:
-            stats = self._stats.copy()
-            stats['enabled'] = self.config.whitelist.enabled
-            stats['running'] = self._running
-            stats['cache_file'] = str(self._cache_file)
-            return stats
+        stats = self._stats.copy()
+        stats['enabled'] = self.config.whitelist.enabled
+        stats['running'] = self._running
+        stats['cache_file'] = str(self._cache_file)
+        stats['push_active'] = self._push_active
+        stats['sync_interval'] = self._sync_interval()
+        stats['schedule'] = self.scheduler.get_stats().get(self.SYNC_JOB)
+        return stats
     
     def force_sync(self) -> bool:
         """强制同步白名单
@@ -381,52 +754,104 @@ class WhitelistManager:
                 with open(self._cache_file, 'r', encoding='utf-8') as f:
                     cache_data = json.load(f)
                 
-                # 加载白名单数据
-                addresses = cache_data.get('addresses', [])
-                self._whitelist = set(addresses)
-                
-                # 加载时间戳
-                self._last_update = cache_data.get('last_update', 0)
+                # 加载白名单数据和时间戳（未变化的同步只更新缓存文件时间）
+                last_update = max(cache_data.get('last_update', 0), self._cache_file.stat().st_mtime)
                 
                 # 检查缓存是否过期
-                cache_age = time.time() - self._last_update
+                cache_age = time.time() - last_update
                 max_age = self.config.whitelist.cache_ttl
                 
                 if cache_age > max_age:
                     self.logger.warning(f"白名单缓存已过期 ({cache_age:.0f}s > {max_age}s)")
-                    self._whitelist.clear()
-                    self._last_update = 0
+                    self._publish(frozenset(), 0)
                 else:
-                    self.logger.info(f"白名单缓存已加载，共 {len(self._whitelist)} 个地址")
-                
-                self._stats['total_addresses'] = len(self._whitelist)
+                    self._load_cached_addresses(cache_data, last_update)
             
             else:
                 self.logger.info("白名单缓存文件不存在，将创建新缓存")
         
         except Exception as e:
             self.logger.error(f"加载白名单缓存失败: {e}")
-            self._whitelist.clear()
-            self._last_update = 0
+            self._publish(frozenset(), 0)
+        
+        self._cleanup_stores()
     
-    def _save_cache(self) -> None:
-        """保存本地缓存"""
+    def _load_cached_addresses(self, cache_data: Dict, last_update: float) -> None:
+        """按缓存格式加载地址：紧凑存储直接映射文件，JSON列表按配置转换"""
+        version = cache_data.get('whitelist_version')
+        store_file = cache_data.get('store_file')
+        etag = cache_data.get('etag')
+        
+        if cache_data.get('entry_format', 1) != ENTRY_FORMAT:
+            # 旧缓存中的地址全部转为小写，base58地址可能无法匹配；先使用旧数据，下次同步拉取完整列表
+            self.logger.info("白名单缓存为旧条目格式，下次同步将拉取完整白名单")
+            version = None
+            etag = None
+        
+        if store_file and not self._compact:
+            # 紧凑存储无法还原出地址字符串，等待下次同步拉取完整列表
+            self.logger.warning("白名单缓存为紧凑格式，当前配置为内存存储，将重新同步完整白名单")
+            self._publish(frozenset(), 0)
+            return
+        
+        if store_file:
+            addresses = CompactWhitelist(self._cache_file.parent / store_file)
+        elif self._compact:
+            # 旧JSON缓存迁移为紧凑存储，之后启动无需再解析地址列表
+            addresses = self._build_addresses(frozenset(), frozenset(cache_data.get('addresses', [])),
+                                              frozenset(), frozenset(), version)
+        else:
+            addresses = frozenset(cache_data.get('addresses', []))
+        
+        snapshot = self._publish(addresses, last_update, version)
+        self._etag = etag
+        if self._compact and not store_file:
+            self._save_cache(snapshot)
+        self.logger.info(f"白名单缓存已加载 (版本 {snapshot.version})，共 {len(snapshot.addresses)} 个地址")
+    
+    def _cleanup_stores(self) -> None:
+        """清理不再使用的紧凑存储文件"""
+        current = self._snapshot.addresses
+        current_path = current.path if isinstance(current, CompactWhitelist) else None
+        for path in self._cache_file.parent.glob("whitelist-*.bin"):
+            if path != current_path:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+    
+    def _save_cache(self, snapshot: Optional[WhitelistSnapshot] = None) -> None:
+        """保存本地缓存
+        
+        Args:
+            snapshot: 要保存的快照，默认为当前快照
+        """
+        snapshot = snapshot or self._snapshot
         try:
             # 确保目录存在
             self._cache_file.parent.mkdir(parents=True, exist_ok=True)
             
-            # 准备缓存数据
+            # 准备缓存数据（紧凑存储只记录文件名）
             cache_data = {
-                'addresses': list(self._whitelist),
-                'last_update': self._last_update,
+                'last_update': snapshot.last_update,
+                'whitelist_version': snapshot.version,
+                'entry_format': ENTRY_FORMAT,
+                'etag': self._etag,
                 'created_at': datetime.now().isoformat(),
                 'version': self.config.client.version
             }
+            if isinstance(snapshot.addresses, CompactWhitelist):
+                cache_data['store_file'] = snapshot.addresses.path.name
+            else:
+                cache_data['addresses'] = sorted(snapshot.addresses)
             
-            # 写入文件
-            with open(self._cache_file, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, ensure_ascii=False, indent=2)
+            # 写入临时文件后替换，避免中途退出留下不完整的缓存
+            temp_file = self._cache_file.with_suffix('.tmp')
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(cache_data, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(temp_file, self._cache_file)
             
+            self._stats['cache_writes'] += 1
             self.logger.debug(f"白名单缓存已保存: {self._cache_file}")
         
         except Exception as e:
@@ -434,19 +859,20 @@ class WhitelistManager:
     
     def clear_cache(self) -> None:
         """清除缓存"""
-        with self._lock:
-            try:
-                self._whitelist.clear()
-                self._last_update = 0
-                self._stats['total_addresses'] = 0
-                
-                if self._cache_file.exists():
-                    self._cache_file.unlink()
-                
-                self.logger.info("白名单缓存已清除")
+        try:
+            with self._lock:
+                old_snapshot = self._snapshot
+                self._publish(frozenset(), 0)
+                self._etag = None
+            self._retire_store(old_snapshot.addresses, None)
             
-            except Exception as e:
-                self.logger.error(f"清除白名单缓存失败: {e}")
+            if self._cache_file.exists():
+                self._cache_file.unlink()
+            
+            self.logger.info("白名单缓存已清除")
+        
+        except Exception as e:
+            self.logger.error(f"清除白名单缓存失败: {e}")
     
     def is_cache_valid(self) -> bool:
         """检查缓存是否有效
@@ -454,8 +880,9 @@ class WhitelistManager:
         Returns:
             缓存是否有效
         """
-        if not self._whitelist:
+        snapshot = self._snapshot
+        if not snapshot.addresses:
             return False
         
-        cache_age = time.time() - self._last_update
+        cache_age = time.time() - snapshot.last_update
         return cache_age <= self.config.whitelist.cache_ttl
\ No newline at end of file
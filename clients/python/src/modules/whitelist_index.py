@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+白名单索引模块
+
+白名单条目格式：
+- 0x742d...d8b6              精确地址，适用于所有链
+- TRX:TLyqz...ZYH            限定链类型的精确地址，只在该链类型的检测结果上生效
+- 0x742d35cc*                前缀条目（以 * 结尾），匹配该前缀下的所有地址
+- ETH:0x00000000????????*    通配条目（含 ? 或中间的 *），与前缀条目一样可限定链类型
+
+地址规范化按地址格式决定，条目和待检查地址使用同一规则：
+- EVM 十六进制地址（0x...）不区分大小写，统一转为小写
+- 单一大小写的编码（bech32、cashaddr、base32 等）不区分大小写，统一转为小写
+- 大小写混合的地址（base58）区分大小写，原样保留
+
+精确条目保存在集合或紧凑存储中（限定链的条目以 "链类型:地址" 为键），
+前缀条目按链类型分区保存在前缀树中，通配条目按分区合并为一个正则表达式。
+"""
+
+import re
+import fnmatch
+from typing import Dict, Iterable, Optional, Pattern, Tuple
+
+# 未限定链类型的条目所在分区
+ANY_CHAIN = ''
+
+WILDCARDS = '*?'
+
+_EVM_ADDRESS = re.compile(r'0[xX][0-9a-fA-F*?]*\Z')
+_CHAIN_QUALIFIER = re.compile(r'([A-Z][A-Z0-9_]{0,15}):(.+)\Z')
+
+# 前缀树中标记条目结束的键
+_END = None
+
+
+def normalize_address(address: str) -> str:
+    """按地址格式规范化地址（也用于条目中的地址部分）
+
+    Args:
+        address: 原始地址
+
+    Returns:
+        规范化后的地址
+    """
+    address = address.strip()
+    if _EVM_ADDRESS.match(address):
+        return address.lower()
+    lowered = address.lower()
+    if lowered == address or address.upper() == address:
+        return lowered
+    return address
+
+
+def split_entry(entry: str) -> Tuple[str, str]:
+    """拆分条目为 (链类型, 地址部分)，未限定链类型时链类型为 ANY_CHAIN"""
+    match = _CHAIN_QUALIFIER.match(entry)
+    if match:
+        return match.group(1), match.group(2)
+    return ANY_CHAIN, entry
+
+
+def normalize_entry(entry: str) -> Optional[str]:
+    """规范化白名单条目
+
+    Args:
+        entry: 原始条目
+
+    Returns:
+        规范化后的条目，无效条目返回None
+    """
+    if not isinstance(entry, str):
+        return None
+    chain, address = split_entry(entry.strip())
+    address = normalize_address(address)
+    if not address:
+        return None
+    return f"{chain}:{address}" if chain else address
+
+
+def entry_key(address: str, chain: str = ANY_CHAIN) -> str:
+    """由规范化地址和链类型得到精确条目的键"""
+    return f"{chain}:{address}" if chain else address
+
+
+def entry_partition(entry: str) -> str:
+    """条目所在分区（链类型），供紧凑存储分区使用"""
+    return split_entry(entry)[0]
+
+
+def is_pattern_entry(entry: str) -> bool:
+    """是否为前缀或通配条目"""
+    return any(char in entry for char in WILDCARDS)
+
+
+class PrefixTrie:
+    """只读前缀树：检查地址是否以任一前缀开头"""
+
+    __slots__ = ('_root', '_size')
+
+    def __init__(self, prefixes: Iterable[str] = ()):
+        self._root: Dict = {}
+        self._size = 0
+        for prefix in prefixes:
+            node = self._root
+            for char in prefix:
+                node = node.setdefault(char, {})
+            if _END not in node:
+                node[_END] = True
+                self._size += 1
+
+    def __len__(self) -> int:
+        return self._size
+
+    def match(self, address: str) -> bool:
+        """地址是否以树中任一前缀开头"""
+        node = self._root
+        if _END in node:
+            return True
+        for char in address:
+            node = node.get(char)
+            if node is None:
+                return False
+            if _END in node:
+                return True
+        return False
+
+
+class PatternIndex:
+    """按链类型分区的前缀和通配条目索引（构建后不可修改）"""
+
+    __slots__ = ('entries', '_tries', '_patterns')
+
+    def __init__(self, entries: Iterable[str] = ()):
+        """构建索引
+
+        Args:
+            entries: 规范化后的前缀/通配条目
+        """
+        self.entries = frozenset(entries)
+
+        prefixes: Dict[str, list] = {}
+        globs: Dict[str, list] = {}
+        for entry in self.entries:
+            chain, address = split_entry(entry)
+            body = address[:-1] if address.endswith('*') else None
+            if body is not None and not is_pattern_entry(body):
+                prefixes.setdefault(chain, []).append(body)
+            else:
+                globs.setdefault(chain, []).append(fnmatch.translate(address))
+
+        self._tries: Dict[str, PrefixTrie] = {chain: PrefixTrie(items) for chain, items in prefixes.items()}
+        self._patterns: Dict[str, Pattern] = {chain: re.compile('|'.join(items)) for chain, items in globs.items()}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def match(self, address: str, chain: Optional[str] = None) -> bool:
+        """检查规范化后的地址是否匹配前缀或通配条目
+
+        Args:
+            address: 规范化后的地址
+            chain: 链类型，为None时只匹配未限定链类型的条目
+        """
+        if not self.entries:
+            return False
+        for partition in (ANY_CHAIN, chain) if chain else (ANY_CHAIN,):
+            trie = self._tries.get(partition)
+            if trie is not None and trie.match(address):
+                return True
+            pattern = self._patterns.get(partition)
+            if pattern is not None and pattern.match(address):
+                return True
+        return False
+
+
+EMPTY_PATTERNS = PatternIndex()
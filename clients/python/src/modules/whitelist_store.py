@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+紧凑白名单存储模块
+
+用于数十万到千万级白名单地址，替代内存中的字符串集合和JSON缓存：
+- 每个地址只存储8字节哈希（blake2b截断），按分区排序后连续存放
+- 文件通过mmap只读映射，打开时只解析文件头，与地址数量无关
+- 查找为内存映射数组上的二分查找，可选Bloom过滤器快速排除不存在的地址
+- 支持按链类型分区，指定链类型时只查找对应分区
+
+文件布局（小端序）：
+    文件头 | 分区表 | 元数据JSON（8字节对齐）| 哈希数组 | Bloom位图
+
+8字节哈希在千万级地址时误判概率约为 10^-6 量级。
+"""
+
+import os
+import sys
+import json
+import mmap
+import struct
+import hashlib
+import heapq
+from array import array
+from bisect import bisect_left
+from itertools import groupby
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+MAGIC = b'SMWL0001'
+
+# magic, 哈希宽度, 分区数, 地址数, Bloom位数, Bloom哈希函数个数, 元数据长度
+_HEADER = struct.Struct('<8sIIQQII')
+# 分区名, 起始下标, 地址数
+_PARTITION = struct.Struct('<16sQQ')
+
+KEY_WIDTH = 8
+DEFAULT_PARTITION = ''
+
+PathLike = Union[str, Path]
+
+
+def address_key(address: str) -> int:
+    """计算地址的8字节哈希键（地址需已标准化）"""
+    return int.from_bytes(hashlib.blake2b(address.encode('utf-8'), digest_size=KEY_WIDTH).digest(), 'little')
+
+
+def _bloom_positions(key: int, bits: int, hashes: int):
+    """双重哈希生成Bloom位置（哈希键本身已均匀分布，直接拆成两个32位值）"""
+    h1 = key & 0xFFFFFFFF
+    h2 = (key >> 32) | 1
+    for i in range(hashes):
+        yield (h1 + i * h2) % bits
+
+
+class CompactWhitelist:
+    """只读的紧凑白名单（mmap映射）
+
+    实例不可修改；更新通过 build/apply_delta 写出新文件并打开新实例。
+    """
+
+    __slots__ = ('path', 'metadata', '_file', '_mmap', '_keys', '_count',
+                 '_partitions', '_ranges', '_bloom', '_bloom_bits', '_bloom_hashes')
+
+    def __init__(self, path: PathLike):
+        """打开紧凑白名单文件
+
+        Args:
+            path: 文件路径
+        """
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+
+        magic, key_width, partition_count, count, bloom_bits, bloom_hashes, metadata_length = \
+            _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or key_width != KEY_WIDTH:
+            self.close()
+            raise ValueError(f"不是有效的紧凑白名单文件: {self.path}")
+
+        offset = _HEADER.size
+        self._partitions: Dict[str, Tuple[int, int]] = {}
+        for _ in range(partition_count):
+            name, start, size = _PARTITION.unpack_from(self._mmap, offset)
+            self._partitions[name.rstrip(b'\0').decode('utf-8')] = (start, start + size)
+            offset += _PARTITION.size
+
+        self.metadata = json.loads(bytes(self._mmap[offset:offset + metadata_length]) or b'{}')
+        keys_offset = _align(offset + metadata_length)
+        keys_end = keys_offset + count * KEY_WIDTH
+
+        keys = memoryview(self._mmap)[keys_offset:keys_end].cast('Q')
+        if sys.byteorder != 'little':
+            # 大端平台无法直接使用映射数据，复制并转换字节序
+            keys = array('Q', keys.tobytes())
+            keys.byteswap()
+        self._keys = keys
+        self._count = count
+        self._ranges = list(self._partitions.values())
+
+        self._bloom_bits = bloom_bits
+        self._bloom_hashes = bloom_hashes
+        self._bloom = memoryview(self._mmap)[keys_end:keys_end + bloom_bits // 8] if bloom_bits else None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, address: str) -> bool:
+        return self.contains(address)
+
+    def contains(self, address: str, chain: Optional[str] = None) -> bool:
+        """检查地址是否在白名单中
+
+        Args:
+            address: 标准化后的地址
+            chain: 链类型，指定时只查找该分区和默认分区
+
+        Returns:
+            是否在白名单中
+        """
+        return self.contains_key(address_key(address), chain)
+
+    def contains_key(self, key: int, chain: Optional[str] = None) -> bool:
+        """按哈希键检查"""
+        bloom = self._bloom
+        if bloom is not None:
+            bits = self._bloom_bits
+            position = key & 0xFFFFFFFF
+            step = (key >> 32) | 1
+            for _ in range(self._bloom_hashes):
+                position %= bits
+                if not bloom[position >> 3] & (1 << (position & 7)):
+                    return False
+                position += step
+
+        if chain is None:
+            ranges = self._ranges
+        else:
+            names = (chain, DEFAULT_PARTITION) if chain != DEFAULT_PARTITION else (DEFAULT_PARTITION,)
+            ranges = [self._partitions[name] for name in names if name in self._partitions]
+
+        keys = self._keys
+        for start, end in ranges:
+            index = bisect_left(keys, key, start, end)
+            if index < end and keys[index] == key:
+                return True
+        return False
+
+    @property
+    def partitions(self) -> Dict[str, int]:
+        """各分区地址数"""
+        return {name: end - start for name, (start, end) in self._partitions.items()}
+
+    @property
+    def bloom_bits_per_entry(self) -> int:
+        return self._bloom_bits // self._count if self._count and self._bloom_bits else 0
+
+    def partition_keys(self, name: str):
+        """获取分区的有序哈希键（只读视图）"""
+        start, end = self._partitions.get(name, (0, 0))
+        return self._keys[start:end]
+
+    def close(self) -> None:
+        """关闭映射（仍有读取方引用时由垃圾回收关闭）"""
+        try:
+            self._keys = array('Q')
+            self._bloom = None
+            self._mmap.close()
+        except (BufferError, ValueError, AttributeError):
+            pass
+        self._file.close()
+
+    # ---------- 构建 ----------
+
+    @classmethod
+    def build(cls, path: PathLike, addresses: Iterable[str],
+              partition_of: Optional[Callable[[str], str]] = None,
+              bloom_bits_per_entry: int = 0, metadata: Optional[Dict] = None) -> 'CompactWhitelist':
+        """由地址列表构建紧凑白名单文件
+
+        Args:
+            path: 输出文件路径
+            addresses: 标准化后的地址
+            partition_of: 地址所属分区（链类型），为None时全部放入默认分区
+            bloom_bits_per_entry: 每个地址的Bloom位数，0表示不使用Bloom过滤器
+            metadata: 写入文件的元数据（版本号等）
+
+        Returns:
+            打开的新实例
+        """
+        partitions: Dict[str, List[int]] = {}
+        for address in addresses:
+            name = partition_of(address) if partition_of else DEFAULT_PARTITION
+            partitions.setdefault(name or DEFAULT_PARTITION, []).append(address_key(address))
+
+        sorted_partitions = {}
+        for name, keys in partitions.items():
+            keys.sort()
+            sorted_partitions[name] = array('Q', (key for key, _ in groupby(keys)))
+            keys.clear()
+
+        return cls._write(path, sorted_partitions, bloom_bits_per_entry, metadata)
+
+    def apply_delta(self, path: PathLike, added: Iterable[str] = (), removed: Iterable[str] = (),
+                    partition_of: Optional[Callable[[str], str]] = None,
+                    metadata: Optional[Dict] = None) -> 'CompactWhitelist':
+        """在当前白名单上应用增量，写出新文件
+
+        当前文件保持不变，已取得本实例的读取方不受影响。
+
+        Args:
+            path: 新文件路径（不能与当前文件相同）
+            added: 新增地址
+            removed: 删除地址
+            partition_of: 新增地址所属分区
+            metadata: 新文件元数据，默认沿用当前元数据
+
+        Returns:
+            打开的新实例
+        """
+        removed_keys = {address_key(address) for address in removed}
+        added_keys: Dict[str, List[int]] = {}
+        for address in added:
+            name = partition_of(address) if partition_of else DEFAULT_PARTITION
+            added_keys.setdefault(name or DEFAULT_PARTITION, []).append(address_key(address))
+
+        partitions = {}
+        for name in set(self._partitions) | set(added_keys):
+            existing = (key for key in self.partition_keys(name) if key not in removed_keys)
+            merged = heapq.merge(existing, sorted(added_keys.get(name, ())))
+            partitions[name] = array('Q', (key for key, _ in groupby(merged)))
+
+        return self._write(path, partitions, self.bloom_bits_per_entry,
+                           self.metadata if metadata is None else metadata)
+
+    @classmethod
+    def _write(cls, path: PathLike, partitions: Dict[str, array], bloom_bits_per_entry: int,
+               metadata: Optional[Dict]) -> 'CompactWhitelist':
+        """写出文件（先写临时文件再替换）并打开"""
+        path = Path(path)
+        names = sorted(name for name, keys in partitions.items() if len(keys))
+        count = sum(len(partitions[name]) for name in names)
+
+        bloom_bits = 0
+        bloom_hashes = 0
+        bloom = None
+        if bloom_bits_per_entry > 0 and count:
+            bloom_bits = _align(count * bloom_bits_per_entry)
+            bloom_hashes = max(1, round(bloom_bits_per_entry * 0.693))
+            bloom = bytearray(bloom_bits // 8)
+
+        metadata_bytes = json.dumps(metadata or {}, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        header = bytearray(_HEADER.pack(MAGIC, KEY_WIDTH, len(names), count, bloom_bits, bloom_hashes,
+                                        len(metadata_bytes)))
+        start = 0
+        for name in names:
+            encoded = name.encode('utf-8')
+            if len(encoded) > 16:
+                raise ValueError(f"分区名过长: {name}")
+            header += _PARTITION.pack(encoded, start, len(partitions[name]))
+            start += len(partitions[name])
+        header += metadata_bytes
+        header += b'\0' * (_align(len(header)) - len(header))
+
+        temp_path = path.with_name(path.name + '.tmp')
+        with open(temp_path, 'wb') as f:
+            f.write(header)
+            for name in names:
+                keys = partitions[name]
+                if bloom is not None:
+                    for key in keys:
+                        for position in _bloom_positions(key, bloom_bits, bloom_hashes):
+                            bloom[position >> 3] |= 1 << (position & 7)
+                if sys.byteorder != 'little':
+                    keys = array('Q', keys)
+                    keys.byteswap()
+                keys.tofile(f)
+            if bloom is not None:
+                f.write(bloom)
+        os.replace(temp_path, path)
+
+        return cls(path)
+
+
+def _align(value: int, alignment: int = 8) -> int:
+    return (value + alignment - 1) // alignment * alignment
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+单事件循环运行时
+
+runtime.mode 为 asyncio 时，客户端由一个事件循环线程驱动定时调度、WebSocket推送和剪贴板监听，
+不再为每个模块创建常驻线程：
+
+- 定时任务的到期等待、WebSocket连接和剪贴板变化等待都是事件循环上的协程，空闲时不占用线程
+- 阻塞调用和CPU密集的工作（HTTP请求、截图编码、地址检测、读写剪贴板）交给共用的线程池执行，
+  线程池线程只在有工作时创建
+- 其他线程通过 call_soon / spawn 把回调和协程交给事件循环（线程安全）
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Coroutine, Dict, Optional
+
+
+class AsyncRuntime:
+    """单事件循环运行时（线程安全）"""
+
+    def __init__(self, logger, workers: int = 4, name: str = "AsyncRuntime"):
+        """初始化运行时
+
+        Args:
+            logger: 日志记录器
+            workers: 执行阻塞和CPU密集工作的线程池大小
+            name: 事件循环线程名称
+        """
+        self.logger = logger
+        self.workers = workers
+        self.name = name
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    # ---------- 生命周期 ----------
+
+    def start(self) -> None:
+        """启动事件循环线程（已启动时不做任何事）"""
+        with self._lock:
+            if self._loop is not None:
+                return
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"{self.name}Worker")
+            self._loop = asyncio.new_event_loop()
+            self._loop.set_default_executor(self._executor)
+            ready = threading.Event()
+            self._thread = threading.Thread(target=self._run_loop, args=(ready,), name=self.name, daemon=True)
+            self._thread.start()
+        ready.wait(5)
+        self.logger.info(f"事件循环运行时已启动 (线程池 {self.workers} 个线程)")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """取消所有协程并停止事件循环（不等待线程池中正在执行的工作）"""
+        with self._lock:
+            loop, thread, executor = self._loop, self._thread, self._executor
+            if loop is None:
+                return
+            self._loop = None
+            self._thread = None
+            self._executor = None
+
+        try:
+            asyncio.run_coroutine_threadsafe(self._cancel_tasks(), loop).result(timeout)
+        except Exception as e:
+            self.logger.debug(f"取消事件循环任务超时: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join(timeout=timeout)
+        if not loop.is_running():
+            loop.close()
+        executor.shutdown(wait=False)
+        self.logger.info("事件循环运行时已停止")
+
+    def is_running(self) -> bool:
+        return self._loop is not None
+
+    @property
+    def loop(self) -> Optional[asyncio.AbstractEventLoop]:
+        return self._loop
+
+    @property
+    def executor(self) -> Optional[ThreadPoolExecutor]:
+        return self._executor
+
+    # ---------- 提交工作 ----------
+
+    def spawn(self, coroutine: Coroutine) -> Future:
+        """在事件循环上运行协程（任意线程可调用）
+
+        Returns:
+            协程结果的 Future
+        """
+        loop = self._loop
+        if loop is None:
+            coroutine.close()
+            raise RuntimeError("事件循环运行时未启动")
+        return asyncio.run_coroutine_threadsafe(coroutine, loop)
+
+    def call_soon(self, callback: Callable[..., Any], *args) -> bool:
+        """在事件循环线程中执行回调（任意线程可调用）
+
+        Returns:
+            是否已提交（运行时已停止时返回False）
+        """
+        loop = self._loop
+        if loop is None:
+            return False
+        try:
+            loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            # 事件循环已关闭
+            return False
+        return True
+
+    async def run_blocking(self, func: Callable[..., Any], *args) -> Any:
+        """在线程池中执行阻塞或CPU密集的函数并等待结果（在事件循环上调用）"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def get_stats(self) -> Dict:
+        loop = self._loop
+        executor = self._executor
+        return {
+            'running': loop is not None,
+            'tasks': len(asyncio.all_tasks(loop)) if loop is not None and loop.is_running() else 0,
+            'executor_threads': len(executor._threads) if executor is not None else 0
+        }
+
+    # ---------- 内部 ----------
+
+    def _run_loop(self, ready: threading.Event) -> None:
+        loop = self._loop
+        asyncio.set_event_loop(loop)
+        loop.call_soon(ready.set)
+        try:
+            loop.run_forever()
+        except Exception as e:
+            self.logger.error(f"事件循环异常退出: {e}")
+
+    @staticmethod
+    async def _cancel_tasks() -> None:
+        current = asyncio.current_task()
+        tasks = [task for task in asyncio.all_tasks() if task is not current]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+上传带宽预算
+
+所有上传（定时截图、违规证据）共用一个令牌桶，限制客户端的总上传速率，
+避免在小型办公网络中挤占视频会议等业务的上行带宽：
+- 令牌按 max_bytes_per_second 匀速补充，最多积累 burst_bytes
+- 定时上传等待令牌；违规证据不等待直接透支，透支部分由之后的定时上传偿还
+- 最近 adapt_window 秒的上传需求持续超过预算时逐级降低定时截图的质量和分辨率，
+  需求回落到预算一半以下时逐级恢复
+
+预算利用率随心跳元数据上报。
+"""
+
+import time
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+from core.config import AppConfig
+
+# 降级档位：(质量系数, 分辨率系数)
+DEGRADE_LEVELS: Tuple[Tuple[float, float], ...] = (
+    (1.0, 1.0),
+    (0.75, 1.0),
+    (0.5, 0.75),
+    (0.35, 0.5),
+)
+
+
+class BandwidthBudget:
+    """上传带宽令牌桶（线程安全）"""
+
+    def __init__(self, config: AppConfig, logger, clock: Callable[[], float] = time.monotonic):
+        """初始化带宽预算
+
+        Args:
+            config: 应用配置（速率等参数每次使用时读取，远程配置修改后立即生效）
+            logger: 日志记录器
+            clock: 单调时钟（测试时可替换）
+        """
+        self.config = config
+        self.logger = logger
+        self._clock = clock
+        self._cond = threading.Condition()
+
+        now = clock()
+        self._tokens = float(config.bandwidth.burst_bytes)
+        self._updated = now
+
+        # 最近 adapt_window 秒内的上传需求：(时刻, 字节数)
+        self._demand: Deque[Tuple[float, int]] = deque()
+        self._demand_bytes = 0
+        self._level = 0
+        self._level_changed = now
+
+        self._stats = {
+            'uploads': 0,
+            'bytes': 0,
+            'waits': 0,
+            'wait_seconds': 0.0,
+            'denied': 0,
+            'overdrafts': 0,
+            'level_changes': 0
+        }
+
+    def acquire(self, nbytes: int, wait: bool = True, timeout: Optional[float] = None) -> bool:
+        """为一次上传申请令牌（阻塞等待）
+
+        Args:
+            nbytes: 上传字节数
+            wait: 是否等待令牌；为False时立即透支（违规证据）
+            timeout: 最长等待秒数，为None时一直等待
+
+        Returns:
+            是否可以上传（等待超时返回False，不消耗令牌）
+        """
+        if not wait:
+            self.overdraw(nbytes)
+            return True
+
+        started = self._clock()
+        waiting_since = None
+        with self._cond:
+            while True:
+                delay = self.try_acquire(nbytes, waiting_since)
+                if delay <= 0:
+                    return True
+                waiting_since = started
+                if timeout is not None:
+                    remaining = started + timeout - self._clock()
+                    if remaining <= 0:
+                        self.deny(nbytes, started)
+                        return False
+                    delay = min(delay, remaining)
+                self._cond.wait(delay)
+
+    def try_acquire(self, nbytes: int, waiting_since: Optional[float] = None) -> float:
+        """令牌足够时立即扣除，否则返回还需等待的秒数（不扣除）
+
+        超过桶容量的上传只需等到桶满，之后透支。
+
+        Args:
+            nbytes: 上传字节数
+            waiting_since: 开始等待的时刻（用于统计等待时间）
+
+        Returns:
+            0 表示已扣除令牌，否则为预计等待秒数
+        """
+        settings = self.config.bandwidth
+        if not settings.enabled:
+            return 0.0
+        with self._cond:
+            now = self._clock()
+            self._refill(now)
+            needed = min(nbytes, settings.burst_bytes)
+            if self._tokens < needed:
+                return (needed - self._tokens) / settings.max_bytes_per_second
+            self._grant(now, nbytes, waiting_since)
+            return 0.0
+
+    def overdraw(self, nbytes: int) -> None:
+        """不等待直接扣除令牌（允许透支）"""
+        if not self.config.bandwidth.enabled:
+            return
+        with self._cond:
+            now = self._clock()
+            self._refill(now)
+            self._grant(now, nbytes, None)
+
+    def deny(self, nbytes: int, waiting_since: Optional[float] = None) -> None:
+        """记录一次因等不到令牌而放弃的上传（计入需求，不扣除令牌）"""
+        with self._cond:
+            now = self._clock()
+            self._record_demand(now, nbytes)
+            self._stats['denied'] += 1
+            if waiting_since is not None:
+                self._stats['wait_seconds'] += now - waiting_since
+
+    def quality_factor(self) -> float:
+        """定时截图质量系数（1.0 为不降级）"""
+        return DEGRADE_LEVELS[self._level][0]
+
+    def resolution_factor(self) -> float:
+        """定时截图分辨率系数（1.0 为不降级）"""
+        return DEGRADE_LEVELS[self._level][1]
+
+    def utilisation(self) -> float:
+        """最近 adapt_window 秒的上传需求占预算的比例"""
+        with self._cond:
+            self._expire_demand(self._clock())
+            return self._demand_rate() / self.config.bandwidth.max_bytes_per_second
+
+    def get_stats(self) -> Dict:
+        """获取统计信息（随心跳上报）"""
+        settings = self.config.bandwidth
+        with self._cond:
+            now = self._clock()
+            self._refill(now)
+            self._expire_demand(now)
+            stats = self._stats.copy()
+            stats.update({
+                'enabled': settings.enabled,
+                'max_bytes_per_second': settings.max_bytes_per_second,
+                'tokens': int(self._tokens),
+                'demand_bytes_per_second': round(self._demand_rate(), 1),
+                'utilisation': round(self._demand_rate() / settings.max_bytes_per_second, 3),
+                'degrade_level': self._level,
+                'quality_factor': DEGRADE_LEVELS[self._level][0],
+                'resolution_factor': DEGRADE_LEVELS[self._level][1]
+            })
+        stats['wait_seconds'] = round(stats['wait_seconds'], 3)
+        return stats
+
+    # ---------- 内部（调用方持有锁） ----------
+
+    def _grant(self, now: float, nbytes: int, waiting_since: Optional[float]) -> None:
+        self._record_demand(now, nbytes)
+        if self._tokens < nbytes:
+            self._stats['overdrafts'] += 1
+        self._tokens -= nbytes
+        self._stats['uploads'] += 1
+        self._stats['bytes'] += nbytes
+        if waiting_since is not None:
+            self._stats['waits'] += 1
+            self._stats['wait_seconds'] += now - waiting_since
+
+    def _refill(self, now: float) -> None:
+        settings = self.config.bandwidth
+        elapsed = max(0.0, now - self._updated)
+        self._tokens = min(float(settings.burst_bytes), self._tokens + elapsed * settings.max_bytes_per_second)
+        self._updated = now
+
+    def _expire_demand(self, now: float) -> None:
+        horizon = now - self.config.bandwidth.adapt_window
+        while self._demand and self._demand[0][0] <= horizon:
+            self._demand_bytes -= self._demand.popleft()[1]
+
+    def _demand_rate(self) -> float:
+        return self._demand_bytes / self.config.bandwidth.adapt_window
+
+    def _record_demand(self, now: float, nbytes: int) -> None:
+        """记录上传需求，每个窗口最多调整一档降级"""
+        settings = self.config.bandwidth
+        self._demand.append((now, nbytes))
+        self._demand_bytes += nbytes
+        self._expire_demand(now)
+
+        if not settings.adaptive or now - self._level_changed < settings.adapt_window:
+            return
+        rate = self._demand_rate()
+        if rate > settings.max_bytes_per_second and self._level < len(DEGRADE_LEVELS) - 1:
+            self._set_level(self._level + 1, now, rate)
+        elif rate < settings.max_bytes_per_second * 0.5 and self._level > 0:
+            self._set_level(self._level - 1, now, rate)
+
+    def _set_level(self, level: int, now: float, rate: float) -> None:
+        self._level = level
+        self._level_changed = now
+        self._stats['level_changes'] += 1
+        quality, resolution = DEGRADE_LEVELS[level]
+        self.logger.warning(
+            f"上传需求 {rate / 1024:.1f}KB/s（预算 {self.config.bandwidth.max_bytes_per_second / 1024:.1f}KB/s），"
+            f"定时截图降级档位调整为 {level}（质量 x{quality}，分辨率 x{resolution}）"
+        )
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+性能指标工具
+用于记录关键路径的耗时分布，汇总结果随心跳元数据上报
+"""
+
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+
+class LatencyTracker:
+    """延迟统计器
+
+    保留最近 window 个样本用于计算分位数，总次数与最大值覆盖全部样本。
+    """
+
+    def __init__(self, window: int = 512):
+        """初始化延迟统计器
+
+        Args:
+            window: 计算分位数时保留的最近样本数
+        """
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._count = 0
+        self._max = 0.0
+        self._last: Optional[float] = None
+
+    def record(self, latency_ms: float) -> None:
+        """记录一次耗时（毫秒）"""
+        with self._lock:
+            self._samples.append(latency_ms)
+            self._count += 1
+            self._last = latency_ms
+            if latency_ms > self._max:
+                self._max = latency_ms
+
+    @staticmethod
+    def _percentile(ordered, percent: float) -> float:
+        index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def summary(self) -> Dict:
+        """获取统计摘要
+
+        Returns:
+            包含 count/last/avg/p50/p95/max 的字典（毫秒，保留两位小数）
+        """
+        with self._lock:
+            samples = list(self._samples)
+            count, last, maximum = self._count, self._last, self._max
+
+        if not samples:
+            return {'count': 0}
+
+        ordered = sorted(samples)
+        return {
+            'count': count,
+            'last': round(last, 2),
+            'avg': round(sum(samples) / len(samples), 2),
+            'p50': round(self._percentile(ordered, 50), 2),
+            'p95': round(self._percentile(ordered, 95), 2),
+            'max': round(maximum, 2)
+        }
@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+统一定时调度器
+
+所有周期任务（白名单同步、配置同步、定时截图）由一个调度器统一执行：
+- 单个调度线程维护按单调时钟排序的定时堆，到期任务交给工作线程池执行
+- 每个任务可设置间隔、随机抖动、失败退避和错过执行时的补执行策略
+- 首次执行时间在一个间隔内随机分散（随机种子取客户端ID），
+  同时启动的大量客户端均匀错开，不会在同一时刻请求服务器
+- 支持立即触发（服务器推送）、动态调整间隔和推迟下一次执行（服务器背压），可查询各任务下次执行时间
+
+同一任务不会并发执行；任务执行期间到期或被触发的执行在其结束后再安排。
+任务函数返回 False 或抛出异常视为失败。
+
+传入事件循环运行时（AsyncRuntime）时不创建调度线程和线程池：到期等待是事件循环上的协程，
+任务在运行时共用的线程池中执行。
+"""
+
+import time
+import asyncio
+import heapq
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+# 错过执行时的补执行策略
+CATCH_UP_SKIP = 'skip'  # 跳过错过的执行，对齐到原相位的下一次
+CATCH_UP_ONCE = 'once'  # 立即补执行一次，之后按原相位继续
+CATCH_UP_POLICIES = (CATCH_UP_SKIP, CATCH_UP_ONCE)
+
+
+class ScheduledJob:
+    """周期任务及其调度状态（调度时刻均为单调时钟）"""
+
+    __slots__ = ('name', 'func', 'interval', 'jitter', 'retry_delay', 'max_backoff', 'catch_up',
+                 'planned', 'run_at', 'triggered_at', 'rescheduled_at', 'next_run', 'version', 'running',
+                 'failures', 'runs', 'errors', 'missed', 'triggers', 'last_started',
+                 'last_duration', 'last_result')
+
+    def __init__(self, name: str, func: Callable[[], Optional[bool]], interval: float,
+                 jitter: float = 0.0, retry_delay: Optional[float] = None,
+                 max_backoff: Optional[float] = None, catch_up: str = CATCH_UP_SKIP):
+        if interval <= 0:
+            raise ValueError(f"任务间隔必须大于0: {name}")
+        if catch_up not in CATCH_UP_POLICIES:
+            raise ValueError(f"未知的补执行策略: {catch_up}")
+
+        self.name = name
+        self.func = func
+        self.interval = float(interval)
+        self.jitter = max(0.0, min(jitter, 0.5))
+        self.retry_delay = retry_delay
+        self.max_backoff = max_backoff
+        self.catch_up = catch_up
+
+        self.planned = 0.0  # 下一次常规执行的相位时刻（不含抖动）
+        self.run_at = 0.0  # 下一次常规执行时刻（含抖动，失败时为退避后的重试时刻）
+        self.triggered_at: Optional[float] = None  # 被触发的执行时刻
+        self.rescheduled_at: Optional[float] = None  # 执行期间指定的下一次执行时刻，结束时生效
+        self.next_run = 0.0
+        self.version = 0
+        self.running = False
+
+        self.failures = 0
+        self.runs = 0
+        self.errors = 0
+        self.missed = 0
+        self.triggers = 0
+        self.last_started: Optional[float] = None
+        self.last_duration: Optional[float] = None
+        self.last_result: Optional[bool] = None
+
+    def start_at(self, now: float, rng: random.Random, initial_delay: Optional[float]) -> None:
+        """安排首次执行：未指定初始延迟时在一个间隔内随机分散"""
+        delay = rng.uniform(0, self.interval) if initial_delay is None else initial_delay
+        self.planned = now + delay
+        self.run_at = self.planned
+
+    def _jittered(self, planned: float, now: float, rng: random.Random) -> float:
+        offset = rng.uniform(-self.jitter, self.jitter) * self.interval if self.jitter else 0.0
+        return max(now, planned + offset)
+
+    def finish(self, now: float, success: bool, regular: bool, rng: random.Random) -> None:
+        """一次执行结束后计算下一次常规执行时刻
+
+        Args:
+            now: 当前时刻
+            success: 是否成功
+            regular: 是否为常规执行（而非触发或补执行），常规执行推进相位
+            rng: 随机数发生器（抖动）
+        """
+        if regular:
+            self.planned += self.interval
+
+        if self.rescheduled_at is not None:
+            self.reschedule(self.rescheduled_at)
+            self.rescheduled_at = None
+            return
+
+        if not success and self.retry_delay:
+            # 失败退避：重试间隔指数增长，不超过上限（默认为任务间隔）；
+            # 相位保持不变，重试执行视为本次常规执行
+            if regular:
+                self.planned -= self.interval
+            self.failures += 1
+            limit = self.max_backoff or self.interval
+            delay = min(self.retry_delay * (2 ** (self.failures - 1)), limit)
+            self.run_at = now + delay
+            return
+
+        self.failures = 0 if success else self.failures + 1
+        if self.planned <= now:
+            # 执行耗时过长或进程挂起导致错过了若干次执行
+            missed = int((now - self.planned) // self.interval) + 1
+            self.missed += missed
+            self.planned += missed * self.interval
+            if self.catch_up == CATCH_UP_ONCE:
+                self.run_at = now
+                return
+        self.run_at = self._jittered(self.planned, now, rng)
+
+    def reschedule(self, when: float) -> None:
+        """下一次常规执行安排在 when，之后按间隔以此为新相位继续"""
+        self.planned = when
+        self.run_at = when
+
+    def due_time(self) -> float:
+        """下一次执行时刻"""
+        if self.triggered_at is not None:
+            return min(self.run_at, self.triggered_at)
+        return self.run_at
+
+    def info(self, now: float) -> Dict:
+        """任务状态（供统计/心跳上报）"""
+        return {
+            'interval': self.interval,
+            'next_run_in': None if self.running else round(max(0.0, self.next_run - now), 3),
+            'running': self.running,
+            'runs': self.runs,
+            'errors': self.errors,
+            'failures': self.failures,
+            'missed': self.missed,
+            'triggers': self.triggers,
+            'last_duration_ms': round(self.last_duration * 1000, 1) if self.last_duration is not None else None,
+            'last_result': self.last_result
+        }
+
+
+class Scheduler:
+    """统一定时调度器（线程安全）"""
+
+    def __init__(self, logger, seed=None, max_workers: int = 3, name: str = "Scheduler", runtime=None):
+        """初始化调度器
+
+        Args:
+            logger: 日志记录器
+            seed: 随机种子（通常为客户端ID），决定首次执行相位和抖动
+            max_workers: 执行任务的工作线程数（使用事件循环运行时时由运行时的线程池执行）
+            name: 调度线程名称
+            runtime: 事件循环运行时，为None时使用独立的调度线程
+        """
+        self.logger = logger
+        self.name = name
+        self.max_workers = max_workers
+        self.runtime = runtime
+
+        self._rng = random.Random(seed)
+        self._cond = threading.Condition()
+        self._jobs: Dict[str, ScheduledJob] = {}
+        self._heap: List[Tuple[float, int, str, int]] = []
+        self._sequence = 0
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # 事件循环模式：唤醒调度协程（只在事件循环线程中访问）
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task = None
+
+    # ---------- 生命周期 ----------
+
+    def start(self) -> None:
+        """启动调度线程（已启动时不做任何事）"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            if self.runtime is not None:
+                self._executor = self.runtime.executor
+                self._task = self.runtime.spawn(self._dispatch_async())
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix=f"{self.name}Worker")
+                self._thread = threading.Thread(target=self._dispatch_loop, name=self.name, daemon=True)
+                self._thread.start()
+        self.logger.info(f"调度器已启动 ({len(self._jobs)} 个任务)")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """停止调度（不等待正在执行的任务完成）"""
+        with self._cond:
+            if not self._running:
+                return
+            self._running = False
+            self._cond.notify_all()
+        if self._task is not None:
+            self._wake_loop()
+            try:
+                self._task.result(timeout)
+            except Exception:
+                pass
+            self._task = None
+        elif self._thread:
+            self._thread.join(timeout=timeout)
+            self._executor.shutdown(wait=False)
+        self._thread = None
+        self._executor = None
+        self.logger.info("调度器已停止")
+
+    def is_running(self) -> bool:
+        return self._running
+
+    # ---------- 任务管理 ----------
+
+    def add_job(self, name: str, func: Callable[[], Optional[bool]], interval: float,
+                jitter: float = 0.0, initial_delay: Optional[float] = None,
+                retry_delay: Optional[float] = None, max_backoff: Optional[float] = None,
+                catch_up: str = CATCH_UP_SKIP) -> ScheduledJob:
+        """添加（或替换同名）周期任务
+
+        Args:
+            name: 任务名称
+            func: 任务函数，返回 False 或抛出异常视为失败
+            interval: 执行间隔（秒）
+            jitter: 每次执行的随机抖动，占间隔的比例（0-0.5）
+            initial_delay: 首次执行延迟（秒），为None时在一个间隔内随机分散
+            retry_delay: 失败后的首次重试延迟（秒），之后指数增长；为None时失败按正常间隔
+            max_backoff: 退避上限（秒），默认为任务间隔
+            catch_up: 错过执行时的补执行策略
+
+        Returns:
+            任务对象
+        """
+        job = ScheduledJob(name, func, interval, jitter, retry_delay, max_backoff, catch_up)
+        with self._cond:
+            job.start_at(time.monotonic(), self._rng, initial_delay)
+            self._jobs[name] = job
+            self._push(job)
+        self.logger.debug(f"调度任务已添加: {name} (间隔 {interval}s, 首次 {job.run_at - time.monotonic():.1f}s 后)")
+        return job
+
+    def remove_job(self, name: str) -> None:
+        """移除任务（正在执行的本次执行不受影响）"""
+        with self._cond:
+            job = self._jobs.pop(name, None)
+            if job is not None:
+                job.version += 1
+                self._cond.notify_all()
+
+    def has_job(self, name: str) -> bool:
+        return name in self._jobs
+
+    def trigger(self, name: str, delay: float = 0.0) -> bool:
+        """在 delay 秒后执行一次任务，不改变常规执行相位
+
+        已有更早的触发时保持不变，因此合并窗口内的多次触发只执行一次。
+
+        Returns:
+            任务是否存在
+        """
+        with self._cond:
+            job = self._jobs.get(name)
+            if job is None:
+                return False
+            job.triggers += 1
+            when = time.monotonic() + delay
+            if job.triggered_at is None or when < job.triggered_at:
+                job.triggered_at = when
+                if not job.running:
+                    self._push(job)
+            return True
+
+    def set_interval(self, name: str, interval: float) -> bool:
+        """调整任务间隔，下一次常规执行按新间隔重新安排
+
+        在任务函数内部调用时，本次执行结束后按新间隔推进相位（只推进一次）。
+
+        Returns:
+            任务是否存在
+        """
+        with self._cond:
+            job = self._jobs.get(name)
+            if job is None:
+                return False
+            if interval == job.interval:
+                return True
+            now = time.monotonic()
+            job.interval = float(interval)
+            if job.running:
+                # 常规执行结束时相位加上新间隔；触发的执行不推进相位，这里直接按新间隔安排
+                if job.run_at > job.last_started:
+                    job.planned = job.last_started + job.interval
+                return True
+            if job.last_started is None:
+                # 尚未执行过：首次执行不晚于原定时刻
+                job.planned = max(now, min(job.planned, now + job.interval))
+            else:
+                job.planned = max(now, job.last_started + job.interval)
+            job.run_at = job._jittered(job.planned, now, self._rng)
+            self._push(job)
+            return True
+
+    def reschedule(self, name: str, delay: float) -> bool:
+        """下一次常规执行安排在 delay 秒后（可推迟也可提前），之后按间隔继续
+
+        在任务函数内部调用时，本次执行结束后生效。
+
+        Returns:
+            任务是否存在
+        """
+        with self._cond:
+            job = self._jobs.get(name)
+            if job is None:
+                return False
+            when = time.monotonic() + max(0.0, delay)
+            if job.running:
+                job.rescheduled_at = when
+            else:
+                job.reschedule(when)
+                self._push(job)
+            return True
+
+    def get_interval(self, name: str) -> Optional[float]:
+        job = self._jobs.get(name)
+        return job.interval if job else None
+
+    def next_run_times(self) -> Dict[str, Optional[float]]:
+        """各任务距下一次执行的秒数（正在执行的任务为None）"""
+        now = time.monotonic()
+        with self._cond:
+            return {name: None if job.running else max(0.0, job.next_run - now)
+                    for name, job in self._jobs.items()}
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """各任务的调度统计"""
+        now = time.monotonic()
+        with self._cond:
+            return {name: job.info(now) for name, job in self._jobs.items()}
+
+    # ---------- 调度 ----------
+
+    def _push(self, job: ScheduledJob) -> None:
+        """按任务当前的下一次执行时刻入堆（旧的堆条目按版本号失效）"""
+        job.version += 1
+        job.next_run = job.due_time()
+        self._sequence += 1
+        heapq.heappush(self._heap, (job.next_run, self._sequence, job.name, job.version))
+        self._cond.notify_all()
+        if self._task is not None:
+            self._wake_loop()
+
+    def _wake_loop(self) -> None:
+        self.runtime.call_soon(self._set_wakeup)
+
+    def _set_wakeup(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _next_due(self) -> Tuple[Optional[ScheduledJob], bool, Optional[float]]:
+        """取出到期的任务并标记为执行中（调用方持有锁）
+
+        Returns:
+            (任务, 是否常规执行, 距最早任务到期的秒数)；没有到期任务时任务为None，没有任何任务时秒数为None
+        """
+        while self._heap:
+            due, _, name, version = self._heap[0]
+            job = self._jobs.get(name)
+            if job is None or version != job.version:
+                heapq.heappop(self._heap)
+                continue
+
+            now = time.monotonic()
+            if due > now:
+                return None, False, due - now
+
+            heapq.heappop(self._heap)
+            regular = now >= job.run_at
+            if job.triggered_at is not None and now >= job.triggered_at:
+                job.triggered_at = None
+            job.running = True
+            job.last_started = now
+            return job, regular, 0.0
+        return None, False, None
+
+    def _dispatch_loop(self) -> None:
+        with self._cond:
+            while self._running:
+                job, regular, wait = self._next_due()
+                if job is None:
+                    self._cond.wait(wait)
+                    continue
+                try:
+                    self._executor.submit(self._run_job, job, regular)
+                except RuntimeError:
+                    job.running = False
+                    break
+
+    async def _dispatch_async(self) -> None:
+        """事件循环模式的调度协程：等到最早的任务到期（或被唤醒），任务交给线程池执行"""
+        loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        try:
+            while True:
+                # 先清除唤醒标记再检查定时堆，检查之后的变化会再次唤醒
+                self._wakeup.clear()
+                with self._cond:
+                    if not self._running:
+                        return
+                    job, regular, wait = self._next_due()
+                if job is not None:
+                    try:
+                        loop.run_in_executor(self._executor, self._run_job, job, regular)
+                    except RuntimeError:
+                        job.running = False
+                        return
+                    continue
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._wakeup = None
+
+    def _run_job(self, job: ScheduledJob, regular: bool) -> None:
+        started = time.monotonic()
+        success = False
+        try:
+            success = job.func() is not False
+        except Exception as e:
+            job.errors += 1
+            self.logger.error(f"调度任务 {job.name} 执行异常: {e}")
+
+        with self._cond:
+            now = time.monotonic()
+            job.runs += 1
+            job.last_duration = now - started
+            job.last_result = success
+            job.running = False
+            job.finish(now, success, regular, self._rng)
+            if self._jobs.get(job.name) is job:
+                self._push(job)
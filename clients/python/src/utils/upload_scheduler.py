@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+优先级上传调度器
+
+违规上报、截图和心跳共用一个上传调度器，按优先级顺序使用上行链路：
+
+    违规元数据 > 违规证据 > 立即截图 > 心跳 > 定时截图 > 积压补传
+
+- 工作线程总是先执行优先级最高的任务；另有紧急通道只执行违规任务，
+  违规上报不会排在正在进行的慢速定时上传之后
+- 违规任务不等待带宽预算（透支），其余任务等待令牌；等待期间有更高优先级的任务到达时
+  让出工作线程重新排队，提交后超过任务的最长等待时间仍等不到预算则放弃
+- 队列满时淘汰优先级最低的排队任务；同一 key 的新任务替换排队中的旧任务（如过期的定时截图）
+- 按优先级统计排队延迟和总延迟，随心跳上报
+
+已经开始发送的请求不会被中断。调度器未启动时任务在调用线程中直接执行（仍计入带宽预算）。
+"""
+
+import time
+import heapq
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.metrics import LatencyTracker
+
+# 优先级（数值越小越优先）
+PRIORITY_VIOLATION = 0  # 违规元数据
+PRIORITY_EVIDENCE = 1  # 违规证据
+PRIORITY_ON_DEMAND = 2  # 立即截图（服务器请求，有人在等待结果）
+PRIORITY_HEARTBEAT = 3  # 心跳
+PRIORITY_PERIODIC = 4  # 定时截图
+PRIORITY_BACKLOG = 5  # 积压补传（本地缓存的历史事件）
+
+PRIORITY_NAMES = {
+    PRIORITY_VIOLATION: 'violation',
+    PRIORITY_EVIDENCE: 'evidence',
+    PRIORITY_ON_DEMAND: 'on_demand',
+    PRIORITY_HEARTBEAT: 'heartbeat',
+    PRIORITY_PERIODIC: 'periodic',
+    PRIORITY_BACKLOG: 'backlog',
+}
+
+# 紧急通道和带宽透支适用的优先级上限
+URGENT_PRIORITY = PRIORITY_EVIDENCE
+
+
+class UploadDropped(Exception):
+    """上传任务未执行（被淘汰、被替换、等不到带宽预算或调度器已停止）"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class UploadTask:
+    """排队中的上传任务"""
+
+    __slots__ = ('priority', 'func', 'nbytes', 'key', 'max_wait', 'submitted', 'future', 'started',
+                 'waiting_since')
+
+    def __init__(self, priority: int, func: Callable[[], Any], nbytes: int, key: Optional[str],
+                 max_wait: Optional[float]):
+        self.priority = priority
+        self.func = func
+        self.nbytes = nbytes
+        self.key = key
+        self.max_wait = max_wait
+        self.submitted = time.monotonic()
+        self.future: Future = Future()
+        self.started = False  # 已被工作线程取出（被抢占后重新排队时仍为True）
+        self.waiting_since: Optional[float] = None  # 开始等待带宽预算的时刻
+
+
+class UploadScheduler:
+    """优先级上传调度器（线程安全）"""
+
+    def __init__(self, logger, bandwidth=None, workers: int = 1, urgent_workers: int = 1,
+                 max_queued: int = 32):
+        """初始化上传调度器
+
+        Args:
+            logger: 日志记录器
+            bandwidth: 共用的上传带宽预算（BandwidthBudget），为None时不限速
+            workers: 按优先级执行所有任务的工作线程数
+            urgent_workers: 只执行违规任务的紧急通道线程数
+            max_queued: 排队任务上限，满时淘汰优先级最低的任务
+        """
+        self.logger = logger
+        self.bandwidth = bandwidth
+        self.workers = workers
+        self.urgent_workers = urgent_workers
+        self.max_queued = max_queued
+
+        self._cond = threading.Condition()
+        self._heap: List[Tuple[int, int, UploadTask]] = []
+        self._sequence = 0
+        self._running = False
+        self._threads: List[threading.Thread] = []
+
+        self._latency = {priority: {'queue': LatencyTracker(), 'total': LatencyTracker()}
+                         for priority in PRIORITY_NAMES}
+        self._counts = {priority: {'submitted': 0, 'completed': 0, 'failed': 0, 'dropped': 0,
+                                   'preempted': 0}
+                        for priority in PRIORITY_NAMES}
+
+    # ---------- 生命周期 ----------
+
+    def start(self) -> None:
+        """启动工作线程（已启动时不做任何事）"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            lanes = [(f"UploadWorker-{index}", PRIORITY_BACKLOG) for index in range(self.workers)]
+            lanes += [(f"UploadUrgent-{index}", URGENT_PRIORITY) for index in range(self.urgent_workers)]
+            self._threads = [threading.Thread(target=self._worker, args=(limit,), name=name, daemon=True)
+                             for name, limit in lanes]
+            for thread in self._threads:
+                thread.start()
+        self.logger.info(f"上传调度器已启动 ({self.workers} 个工作线程, {self.urgent_workers} 个紧急通道)")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """停止调度，排队中的任务以 UploadDropped 结束（不等待正在发送的请求）"""
+        with self._cond:
+            if not self._running:
+                return
+            self._running = False
+            pending = [task for _, _, task in self._heap]
+            self._heap.clear()
+            self._cond.notify_all()
+        for task in pending:
+            self._drop(task, 'stopped')
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+        self.logger.info("上传调度器已停止")
+
+    def is_running(self) -> bool:
+        return self._running
+
+    # ---------- 提交任务 ----------
+
+    def submit(self, priority: int, func: Callable[[], Any], nbytes: int = 0, key: Optional[str] = None,
+               max_wait: Optional[float] = None) -> Future:
+        """提交上传任务
+
+        Args:
+            priority: 优先级（PRIORITY_*）
+            func: 执行上传的函数，返回值和异常通过 Future 传回
+            nbytes: 上传字节数（计入带宽预算）
+            key: 同一 key 的新任务替换排队中的旧任务
+            max_wait: 提交后等待带宽预算的最长秒数，超过则放弃（违规任务不等待）
+
+        Returns:
+            任务的 Future；任务未执行时以 UploadDropped 结束
+        """
+        if priority not in PRIORITY_NAMES:
+            raise ValueError(f"未知的上传优先级: {priority}")
+
+        task = UploadTask(priority, func, nbytes, key, max_wait)
+        dropped: List[Tuple[UploadTask, str]] = []
+        with self._cond:
+            self._counts[priority]['submitted'] += 1
+            if not self._running:
+                inline = True
+            else:
+                inline = False
+                if key is not None:
+                    for entry in [entry for entry in self._heap if entry[2].key == key]:
+                        self._heap.remove(entry)
+                        dropped.append((entry[2], 'superseded'))
+                    heapq.heapify(self._heap)
+                if len(self._heap) >= self.max_queued:
+                    victim = max(self._heap, key=lambda entry: (entry[0], entry[1]))
+                    if victim[0] > priority:
+                        self._heap.remove(victim)
+                        heapq.heapify(self._heap)
+                        dropped.append((victim[2], 'evicted'))
+                    else:
+                        dropped.append((task, 'queue full'))
+                if not any(item is task for item, _ in dropped):
+                    self._push(task)
+        for item, reason in dropped:
+            self._drop(item, reason)
+
+        if inline:
+            self._execute(task, preemptible=False)
+        return task.future
+
+    def run(self, priority: int, func: Callable[[], Any], nbytes: int = 0, key: Optional[str] = None,
+            max_wait: Optional[float] = None) -> Any:
+        """提交上传任务并等待结果
+
+        Returns:
+            上传函数的返回值
+
+        Raises:
+            UploadDropped: 任务未执行
+            Exception: 上传函数抛出的异常
+        """
+        return self.submit(priority, func, nbytes, key, max_wait).result()
+
+    def queued(self) -> int:
+        """排队中的任务数"""
+        with self._cond:
+            return len(self._heap)
+
+    def get_stats(self) -> Dict:
+        """按优先级统计的任务数和延迟（毫秒，随心跳上报）"""
+        with self._cond:
+            stats: Dict[str, Any] = {'queued': len(self._heap)}
+            counts = {priority: dict(values) for priority, values in self._counts.items()}
+        for priority, name in PRIORITY_NAMES.items():
+            stats[name] = dict(counts[priority],
+                               queue_latency_ms=self._latency[priority]['queue'].summary(),
+                               total_latency_ms=self._latency[priority]['total'].summary())
+        return stats
+
+    # ---------- 执行 ----------
+
+    def _push(self, task: UploadTask) -> None:
+        self._sequence += 1
+        heapq.heappush(self._heap, (task.priority, self._sequence, task))
+        self._cond.notify_all()
+
+    def _worker(self, max_priority: int) -> None:
+        while True:
+            with self._cond:
+                while self._running and not (self._heap and self._heap[0][0] <= max_priority):
+                    self._cond.wait()
+                if not self._running:
+                    return
+                _, _, task = heapq.heappop(self._heap)
+            self._execute(task, preemptible=True)
+
+    def _execute(self, task: UploadTask, preemptible: bool) -> None:
+        """等待带宽预算后执行任务；被更高优先级任务抢占时重新排队"""
+        if not task.started:
+            if not task.future.set_running_or_notify_cancel():
+                return
+            task.started = True
+            self._latency[task.priority]['queue'].record((time.monotonic() - task.submitted) * 1000)
+
+        if not self._wait_for_budget(task, preemptible):
+            return
+
+        try:
+            result = task.func()
+        except Exception as e:
+            self._finish(task, 'failed')
+            task.future.set_exception(e)
+            return
+        self._finish(task, 'completed' if result is not False else 'failed')
+        task.future.set_result(result)
+
+    def _wait_for_budget(self, task: UploadTask, preemptible: bool) -> bool:
+        """违规任务直接透支；其余任务等待令牌
+
+        Returns:
+            是否可以执行（被抢占或放弃时返回False，Future 已另行处理）
+        """
+        if self.bandwidth is None or not task.nbytes:
+            return True
+        if task.priority <= URGENT_PRIORITY:
+            self.bandwidth.overdraw(task.nbytes)
+            return True
+
+        while True:
+            delay = self.bandwidth.try_acquire(task.nbytes, task.waiting_since)
+            if delay <= 0:
+                return True
+            now = time.monotonic()
+            if task.waiting_since is None:
+                task.waiting_since = now
+            if task.max_wait is not None:
+                remaining = task.submitted + task.max_wait - now
+                if remaining <= 0:
+                    self.bandwidth.deny(task.nbytes, task.waiting_since)
+                    self._drop(task, 'bandwidth budget exhausted')
+                    return False
+                delay = min(delay, remaining)
+
+            with self._cond:
+                if preemptible and not self._running:
+                    stopped = True
+                elif preemptible and self._heap and self._heap[0][0] < task.priority:
+                    # 让出工作线程：重新排队，保留原提交时间和等待起点
+                    self._counts[task.priority]['preempted'] += 1
+                    self._push(task)
+                    return False
+                else:
+                    stopped = False
+                    self._cond.wait(delay)
+            if stopped:
+                self._drop(task, 'stopped')
+                return False
+
+    def _finish(self, task: UploadTask, outcome: str) -> None:
+        self._latency[task.priority]['total'].record((time.monotonic() - task.submitted) * 1000)
+        with self._cond:
+            self._counts[task.priority][outcome] += 1
+
+    def _drop(self, task: UploadTask, reason: str) -> None:
+        with self._cond:
+            self._counts[task.priority]['dropped'] += 1
+        self.logger.debug(f"上传任务未执行 ({PRIORITY_NAMES[task.priority]}): {reason}")
+        if task.started or task.future.set_running_or_notify_cancel():
+            task.future.set_exception(UploadDropped(reason))
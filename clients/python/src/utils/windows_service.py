@@ -55,6 +55,7 @@ class ScreenMonitorService:
         
         # 运行状态
         self._running = False
+        self._stop_requested = threading.Event()
         self._client_thread: Optional[threading.Thread] = None
     
     def SvcStop(self):
@@ -67,6 +68,7 @@ class ScreenMonitorService:
             
             # 停止客户端
             self._running = False
+            self._stop_requested.set()
             if self.client:
                 self.client.stop()
             
@@ -228,18 +230,18 @@ class ScreenMonitorService:
             # 启动客户端
             self.client.start()
             
-            # 保持运行
+            # 保持运行：客户端停止时才唤醒，服务仍在运行则重启客户端
             while self._running:
-                time.sleep(1)
+                self.client.wait_stopped()
+                if not self._running:
+                    break
                 
-                # 检查客户端状态
-                if not self.client.is_running():
-                    self.logger.warning("客户端已停止，尝试重启...")
-                    try:
-                        self.client.start()
-                    except Exception as e:
-                        self.logger.error(f"重启客户端失败: {e}")
-                        time.sleep(30)  # 等待30秒后重试
+                self.logger.warning("客户端已停止，尝试重启...")
+                try:
+                    self.client.start()
+                except Exception as e:
+                    self.logger.error(f"重启客户端失败: {e}")
+                    self._stop_requested.wait(30)  # 等待30秒后重试，服务停止时立即返回
         
         except Exception as e:
             self.logger.error(f"客户端运行异常: {e}")
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试单事件循环运行时
+
+功能：
+- 验证调度器在事件循环上等待到期和触发，不创建调度线程，任务在运行时线程池中执行
+- 验证剪贴板监控器在事件循环上等待变化通知，检测违规后清空剪贴板，不占用监控线程
+- 验证运行时停止时取消未结束的协程
+- 验证运行方式配置的默认值和校验
+"""
+
+import sys
+import time
+import asyncio
+import logging
+import tempfile
+import threading
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from core.config import AppConfig, ConfigManager
+from modules.clipboard import ClipboardMonitor
+from modules.clipboard_watcher import MemoryClipboardWatcher
+from utils.async_runtime import AsyncRuntime
+from utils.scheduler import Scheduler
+
+logger = logging.getLogger(__name__)
+
+ETH_ADDRESS = "0x742d35Cc6634C0532925a3b8D4C9db96C4b4d8b6"
+
+
+class _Reporter:
+    """记录上报内容的违规上报器"""
+
+    def __init__(self):
+        self.reported = []
+        self.event = threading.Event()
+
+    def report_violation(self, violation_data, evidence=None):
+        self.reported.append(violation_data)
+        self.event.set()
+        return True
+
+
+class _Whitelist:
+    def is_address_whitelisted(self, address, blockchain_type):
+        return False
+
+
+def _wait_for(condition, timeout: float = 3.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def _thread_names() -> set:
+    return {thread.name for thread in threading.enumerate()}
+
+
+def test_scheduler_on_event_loop():
+    """调度器在事件循环上运行：定时执行、触发执行都不需要调度线程"""
+    runtime = AsyncRuntime(logger, workers=2)
+    runtime.start()
+    scheduler = Scheduler(logger, seed="test", name="AsyncTestScheduler", runtime=runtime)
+    runs = []
+    triggered = []
+    scheduler.add_job('tick', lambda: runs.append(threading.current_thread().name),
+                      interval=0.1, initial_delay=0)
+    scheduler.add_job('sync', lambda: triggered.append(time.monotonic()), interval=3600, initial_delay=3600)
+    scheduler.start()
+    try:
+        assert _wait_for(lambda: len(runs) >= 3)
+        assert "AsyncTestScheduler" not in _thread_names()
+        assert all(name.startswith("AsyncRuntimeWorker") for name in runs)
+
+        # 触发唤醒等待中的调度协程
+        started = time.monotonic()
+        assert scheduler.trigger('sync')
+        assert _wait_for(lambda: triggered)
+        assert triggered[0] - started < 1.0
+    finally:
+        scheduler.stop()
+
+    count = len(runs)
+    time.sleep(0.3)
+    assert len(runs) == count
+    runtime.stop()
+
+
+def test_clipboard_monitor_on_event_loop():
+    """剪贴板监控器在事件循环上等待变化：检测到违规地址后清空并上报，停止后协程退出"""
+    runtime = AsyncRuntime(logger, workers=2)
+    runtime.start()
+    watcher = MemoryClipboardWatcher(logger, initial_text="初始内容")
+    reporter = _Reporter()
+    monitor = ClipboardMonitor(AppConfig(), "test-client", logger, _Whitelist(), reporter,
+                               clipboard_watcher=watcher)
+    monitor._capture_violation_screenshot = lambda: None
+    try:
+        future = monitor.start_async(runtime)
+        assert future is not None and monitor.is_running()
+        assert _wait_for(lambda: watcher.read_count >= 1)
+        assert "ClipboardMonitor" not in _thread_names()
+
+        # 剪贴板未变化时不读取
+        time.sleep(0.2)
+        assert watcher.read_count == 1
+
+        watcher.set_text(f"转账地址 {ETH_ADDRESS}")
+        assert reporter.event.wait(2)
+        assert watcher.clear_count == 1
+        assert watcher.read_text() is None
+        assert reporter.reported[0]['violationContent'] == ETH_ADDRESS
+        assert monitor.get_performance_metrics()['clearLatencyMs']['count'] == 1
+    finally:
+        monitor.stop()
+        runtime.stop()
+
+    assert future.done()
+    assert not watcher._listeners
+
+
+def test_stop_cancels_pending_coroutines():
+    """运行时停止时取消仍在等待的协程，停止后不再接受新的工作"""
+    runtime = AsyncRuntime(logger, workers=1)
+    runtime.start()
+    future = runtime.spawn(asyncio.sleep(3600))
+    assert runtime.get_stats()['running']
+
+    runtime.stop()
+    assert future.cancelled()
+    assert not runtime.is_running()
+    assert not runtime.call_soon(lambda: None)
+
+
+def test_runtime_config():
+    """默认使用线程模式；运行方式和线程池大小需合法"""
+    config = AppConfig()
+    assert config.runtime.mode == "threads" and config.runtime.executor_workers == 4
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        config_path = Path(config_dir) / "config.yaml"
+        config_path.write_text("runtime:\n  mode: asyncio\n  executor_workers: 2\n", encoding="utf-8")
+        loaded = ConfigManager(config_path).get_config()
+        assert loaded.runtime.mode == "asyncio" and loaded.runtime.executor_workers == 2
+
+        for body in ("runtime:\n  mode: gevent\n", "runtime:\n  executor_workers: 0\n"):
+            config_path.write_text(body, encoding="utf-8")
+            try:
+                ConfigManager(config_path)
+            except RuntimeError:
+                continue
+            raise AssertionError(f"非法配置未被拒绝: {body!r}")
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: 通过")
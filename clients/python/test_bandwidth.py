@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试上传带宽预算
+
+功能：
+- 验证令牌桶把总上传速率限制在预算内
+- 验证违规证据不等待直接透支，之后的定时上传等待偿还，超时则放弃
+- 验证需求持续超过预算时逐级降级、回落后逐级恢复
+- 验证定时截图按降级档位缩小，预算不足时只发送心跳
+"""
+
+import io
+import sys
+import time
+import logging
+from pathlib import Path
+
+from PIL import Image
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from core.config import AppConfig
+from modules.screenshot import ScreenshotManager
+from mock_server import MockBackend
+from utils.bandwidth import DEGRADE_LEVELS, BandwidthBudget
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_PATH = "/api/security/screenshots/upload-with-heartbeat"
+HEARTBEAT_PATH = "/api/clients/heartbeat"
+KB = 1024
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class _ClientId:
+    def get_client_uid(self):
+        return "TEST-CLIENT"
+
+
+def _make_config(rate: int, burst: int) -> AppConfig:
+    config = AppConfig()
+    config.bandwidth.max_bytes_per_second = rate
+    config.bandwidth.burst_bytes = burst
+    return config
+
+
+def test_rate_limited_to_budget():
+    """连续上传超过桶容量后按预算速率放行"""
+    budget = BandwidthBudget(_make_config(200 * KB, 50 * KB), logger)
+    started = time.monotonic()
+    for _ in range(5):
+        assert budget.acquire(50 * KB)
+    elapsed = time.monotonic() - started
+
+    # 首个上传使用桶内令牌，其余 200KB 按 200KB/s 放行
+    assert 0.85 <= elapsed < 1.6
+    stats = budget.get_stats()
+    assert stats['uploads'] == 5 and stats['bytes'] == 250 * KB
+    assert stats['waits'] == 4
+
+
+def test_evidence_overdraws_and_periodic_waits():
+    """违规证据立即透支；之后的定时上传等待偿还，超时放弃且不消耗令牌"""
+    budget = BandwidthBudget(_make_config(100 * KB, 50 * KB), logger)
+    started = time.monotonic()
+    assert budget.acquire(2048 * KB, wait=False)
+    assert time.monotonic() - started < 0.1
+    assert budget.get_stats()['overdrafts'] == 1
+
+    assert not budget.acquire(10 * KB, timeout=0.2)
+    stats = budget.get_stats()
+    assert stats['denied'] == 1 and stats['uploads'] == 1
+    assert stats['tokens'] < 0
+
+    config = AppConfig()
+    config.bandwidth.enabled = False
+    assert BandwidthBudget(config, logger).acquire(100 * 1024 * KB, timeout=0)
+
+
+def test_sustained_demand_degrades_and_recovers():
+    """需求持续超过预算时每个窗口降一档，回落到预算一半以下后逐档恢复"""
+    config = _make_config(10 * KB, 100 * KB)
+    clock = _Clock()
+    budget = BandwidthBudget(config, logger, clock=clock)
+    window = config.bandwidth.adapt_window
+
+    def run(seconds: int, bytes_per_second: int):
+        for _ in range(seconds):
+            clock.now += 1
+            budget.acquire(bytes_per_second, wait=False)
+
+    run(window, 20 * KB)
+    assert budget.get_stats()['utilisation'] > 1.5
+    run(1, 20 * KB)
+    assert budget.get_stats()['degrade_level'] == 1
+
+    run(window * 4, 20 * KB)
+    assert budget.get_stats()['degrade_level'] == len(DEGRADE_LEVELS) - 1
+    assert budget.quality_factor() == DEGRADE_LEVELS[-1][0]
+
+    run(window * 4, 2 * KB)
+    stats = budget.get_stats()
+    assert stats['degrade_level'] == 0 and stats['utilisation'] < 0.5
+    assert budget.resolution_factor() == 1.0
+
+
+def test_screenshot_upload_respects_budget():
+    """降级时定时截图缩小分辨率；预算不足一个截图间隔时跳过上传，只发送心跳"""
+    backend = MockBackend()
+    backend.start()
+    config = _make_config(10 * KB, 10 * KB)
+    config.server.api_base_url = backend.api_base_url
+    config.server.timeout = 5
+    config.server.max_retries = 1
+    config.screenshot.interval = 1
+    budget = BandwidthBudget(config, logger)
+    manager = ScreenshotManager(config, logger, _ClientId(), bandwidth=budget)
+    manager._grab_screen = lambda: Image.new('RGB', (1920, 1080), (20, 120, 200))
+    try:
+        budget._level = 2
+        data = manager._compress_image(Image.new('RGB', (1920, 1080), (20, 120, 200)))
+        resolution = DEGRADE_LEVELS[2][1]
+        assert max(Image.open(io.BytesIO(data)).size) == int(config.screenshot.max_long_side * resolution)
+
+        # 证据上传透支后，定时截图在一个间隔内等不到预算
+        budget.acquire(100 * KB, wait=False)
+        manager._take_and_upload_screenshot()
+        assert not backend.requests_to(UPLOAD_PATH)
+        assert len(backend.requests_to(HEARTBEAT_PATH)) == 1
+        assert budget.get_stats()['denied'] == 1
+    finally:
+        manager.stop()
+        backend.stop()
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: 通过")
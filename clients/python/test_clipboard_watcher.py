@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试剪贴板变化监听
+
+功能：
+- 验证监听器序列号与等待变化的语义
+- 验证剪贴板未变化时监控器不读取剪贴板
+- 验证剪贴板变化后检测违规地址并清空剪贴板
+- 验证无图形环境下自动选择轮询后备方案
+- 验证Windows监听器关闭后可以重新注册消息窗口
+- 验证未实现读写方法的监听器无法创建
+"""
+
+import os
+import sys
+import time
+import queue
+import ctypes
+import logging
+import threading
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from core.config import AppConfig
+from modules import clipboard_watcher
+from modules.clipboard import ClipboardMonitor
+from modules.clipboard_watcher import (
+    ClipboardWatcher, MemoryClipboardWatcher, PollingClipboardWatcher, Win32ClipboardWatcher,
+    create_clipboard_watcher
+)
+
+logger = logging.getLogger(__name__)
+
+ETH_ADDRESS = "0x742d35Cc6634C0532925a3b8D4C9db96C4b4d8b6"
+
+
+class _Reporter:
+    """记录上报内容的违规上报器"""
+
+    def __init__(self):
+        self.reported = []
+        self.event = threading.Event()
+
+    def report_violation(self, violation_data, evidence=None):
+        self.reported.append(violation_data)
+        self.event.set()
+        return True
+
+
+class _Whitelist:
+    def __init__(self, addresses=()):
+        self.addresses = set(addresses)
+
+    def is_address_whitelisted(self, address, blockchain_type):
+        return address in self.addresses
+
+
+def _start_monitor(watcher, whitelist=None):
+    reporter = _Reporter()
+    monitor = ClipboardMonitor(AppConfig(), "test-client", logger, whitelist or _Whitelist(), reporter,
+                               clipboard_watcher=watcher)
+    monitor._capture_violation_screenshot = lambda: None
+    thread = threading.Thread(target=monitor.start, daemon=True)
+    thread.start()
+    # 等待监控器记录初始序列号并读取初始内容
+    _wait_until(lambda: watcher.read_count >= 1)
+    return monitor, reporter, thread
+
+
+def _wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_wait_for_change_semantics():
+    """等待变化：超时返回原序列号，变化立即返回，关闭唤醒等待者"""
+    watcher = MemoryClipboardWatcher(logger)
+    sequence = watcher.get_sequence()
+
+    started = time.monotonic()
+    assert watcher.wait_for_change(sequence, timeout=0.05) == sequence
+    assert time.monotonic() - started >= 0.05
+
+    threading.Timer(0.05, watcher.set_text, args=("hello",)).start()
+    assert watcher.wait_for_change(sequence, timeout=2) != sequence
+
+    current = watcher.get_sequence()
+    threading.Timer(0.05, watcher.close).start()
+    started = time.monotonic()
+    assert watcher.wait_for_change(current) == current
+    assert time.monotonic() - started < 2
+
+
+def test_no_reads_while_clipboard_unchanged():
+    """剪贴板没有变化时不读取内容"""
+    watcher = MemoryClipboardWatcher(logger, initial_text="初始内容")
+    monitor, reporter, thread = _start_monitor(watcher)
+    try:
+        assert _wait_until(lambda: watcher.read_count == 1)
+        time.sleep(0.3)
+        assert watcher.read_count == 1
+
+        watcher.set_text("普通文本")
+        assert _wait_until(lambda: watcher.read_count == 2)
+        time.sleep(0.1)
+        assert watcher.read_count == 2
+        assert monitor.get_detection_stats()['change_notifications'] == 1
+    finally:
+        monitor.stop()
+        thread.join(timeout=2)
+
+    assert not thread.is_alive()
+    assert reporter.reported == []
+
+
+def test_violation_clears_clipboard_and_reports():
+    """复制非白名单地址后清空剪贴板并上报"""
+    watcher = MemoryClipboardWatcher(logger)
+    monitor, reporter, thread = _start_monitor(watcher)
+    try:
+        watcher.set_text(f"转账地址 {ETH_ADDRESS}")
+        assert reporter.event.wait(2)
+        assert watcher.clear_count == 1
+        assert watcher.read_text() is None
+        assert reporter.reported[0]['violationContent'] == ETH_ADDRESS
+        assert reporter.reported[0]['additionalData']['clipboardCleared'] is True
+    finally:
+        monitor.stop()
+        thread.join(timeout=2)
+
+
+def test_whitelisted_address_not_cleared():
+    """白名单地址不清空剪贴板"""
+    watcher = MemoryClipboardWatcher(logger)
+    monitor, reporter, thread = _start_monitor(watcher, _Whitelist([ETH_ADDRESS]))
+    try:
+        watcher.set_text(ETH_ADDRESS)
+        assert _wait_until(lambda: watcher.read_count >= 2)
+        time.sleep(0.1)
+        assert watcher.clear_count == 0
+        assert reporter.reported == []
+    finally:
+        monitor.stop()
+        thread.join(timeout=2)
+
+
+def test_polling_watcher_detects_content_change():
+    """轮询后备方案：内容变化后序列号递增，读取复用轮询结果"""
+    contents = ["a"]
+    reads = []
+
+    class _FakePolling(PollingClipboardWatcher):
+        def _read_backend(self):
+            reads.append(contents[0])
+            return contents[0]
+
+    watcher = _FakePolling(logger, poll_interval=0.05)
+    watcher.start()
+    sequence = watcher.get_sequence()
+    assert watcher.wait_for_change(sequence, timeout=0.2) == sequence
+
+    contents[0] = "b"
+    new_sequence = watcher.wait_for_change(sequence, timeout=2)
+    assert new_sequence != sequence
+
+    read_count = len(reads)
+    assert watcher.read_text() == "b"
+    assert len(reads) == read_count
+
+
+def test_auto_backend_falls_back_to_polling_without_display():
+    """无图形环境时自动选择轮询"""
+    display = os.environ.pop('DISPLAY', None)
+    try:
+        watcher = create_clipboard_watcher(logger, backend='auto', poll_interval=0.5)
+        try:
+            if sys.platform != 'win32':
+                assert watcher.name == 'polling'
+        finally:
+            watcher.close()
+    finally:
+        if display is not None:
+            os.environ['DISPLAY'] = display
+
+
+class _FakeWin32:
+    """模拟 win32gui/win32api/win32con 与 user32 的消息窗口接口
+
+    窗口类按类名登记，未注销时再次注册失败，与 Windows 行为一致。
+    """
+
+    WM_CLOSE = 0x0010
+    WM_DESTROY = 0x0002
+    WM_QUIT = 0x0012
+    HWND_MESSAGE = -3
+    CF_UNICODETEXT = 13
+
+    class WNDCLASS:
+        lpfnWndProc = None
+        lpszClassName = None
+        hInstance = None
+
+    def __init__(self):
+        self.classes = {}
+        self.procs = {}
+        self.windows = {}
+        self.listeners = set()
+        self.messages = queue.Queue()
+        self._next_handle = 100
+        self.user32 = self
+
+    def GetModuleHandle(self, name):
+        return 1
+
+    def RegisterClass(self, window_class):
+        if window_class.lpszClassName in self.classes.values():
+            raise RuntimeError("Class already exists.")
+        self._next_handle += 1
+        self.classes[self._next_handle] = window_class.lpszClassName
+        self.procs[self._next_handle] = window_class.lpfnWndProc
+        return self._next_handle
+
+    def UnregisterClass(self, class_atom, hinstance):
+        if class_atom in self.windows.values():
+            raise RuntimeError("Class still has open windows.")
+        del self.classes[class_atom]
+
+    def CreateWindow(self, class_atom, *args):
+        self._next_handle += 1
+        self.windows[self._next_handle] = class_atom
+        return self._next_handle
+
+    def DestroyWindow(self, hwnd):
+        class_atom = self.windows.pop(hwnd)
+        self.procs[class_atom](hwnd, self.WM_DESTROY, 0, 0)
+
+    def AddClipboardFormatListener(self, hwnd):
+        self.listeners.add(hwnd)
+        return True
+
+    def RemoveClipboardFormatListener(self, hwnd):
+        self.listeners.discard(hwnd)
+        return True
+
+    def PostMessage(self, hwnd, message, wparam, lparam):
+        self.messages.put((hwnd, message))
+
+    def PostQuitMessage(self, code):
+        self.messages.put((None, self.WM_QUIT))
+
+    def DefWindowProc(self, hwnd, message, wparam, lparam):
+        if message == self.WM_CLOSE:
+            self.DestroyWindow(hwnd)
+        return 0
+
+    def PumpMessages(self):
+        while True:
+            hwnd, message = self.messages.get()
+            if message == self.WM_QUIT:
+                return
+            self.procs[self.windows[hwnd]](hwnd, message, 0, 0)
+
+
+def test_win32_watcher_restarts():
+    """关闭后注销窗口类：重新启动的监听器仍使用格式监听器，而不是退化为轮询"""
+    fake = _FakeWin32()
+    originals = {name: getattr(clipboard_watcher, name, None) for name in ('win32gui', 'win32api', 'win32con')}
+    had_windll = hasattr(ctypes, 'windll')
+    original_windll = getattr(ctypes, 'windll', None)
+    for name in originals:
+        setattr(clipboard_watcher, name, fake)
+    ctypes.windll = fake
+    try:
+        for _ in range(2):
+            watcher = Win32ClipboardWatcher(logger)
+            watcher.start()
+            try:
+                assert watcher.event_driven
+                assert len(fake.listeners) == 1
+            finally:
+                watcher.close()
+            assert not watcher._listener_thread.is_alive()
+            assert not fake.classes and not fake.listeners
+    finally:
+        for name, value in originals.items():
+            if value is None:
+                delattr(clipboard_watcher, name)
+            else:
+                setattr(clipboard_watcher, name, value)
+        if had_windll:
+            ctypes.windll = original_windll
+        else:
+            del ctypes.windll
+
+
+def test_incomplete_watcher_rejected():
+    """未实现 read_text/write_text 的后端在创建时失败"""
+
+    class _ReadOnlyWatcher(ClipboardWatcher):
+        def read_text(self):
+            return None
+
+    try:
+        _ReadOnlyWatcher(logger)
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("缺少 write_text 的监听器不应能创建")
+
+    # 内置后端都实现了读写
+    for watcher_class in (MemoryClipboardWatcher, PollingClipboardWatcher, Win32ClipboardWatcher):
+        watcher_class(logger)
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: 通过")
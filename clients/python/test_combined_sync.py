@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试合并同步
+
+功能：
+- 验证一次请求携带配置、白名单、规则包的本地版本，只应用有变化的部分
+- 验证白名单增量随合并同步下发
+- 验证服务器指令分发到注册的处理函数
+- 验证服务器不支持合并同步时退回分别同步并交还白名单同步
+- 验证合并同步请求带有超时
+"""
+
+import sys
+import copy
+import json
+import time
+import logging
+import tempfile
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from core.config import AppConfig
+from modules.http_client import HttpClient
+from modules.rule_pack import DEFAULT_RULE_PACK, RulePackManager, get_active_rule_pack, publish_rule_pack
+from modules.whitelist import WhitelistManager
+from mock_server import MockBackend
+
+logger = logging.getLogger(__name__)
+
+CLIENT_ID = "TEST-CLIENT"
+SYNC_PATH = f"/api/clients/{CLIENT_ID}/sync"
+ETH_ADDRESS = "0x742d35Cc6634C0532925a3b8D4C9db96C4b4d8b6"
+TRX_ADDRESS = "TLyqzVGLV1srkB7dToTAEqgDSfPtXRJZYH"
+
+
+class _Env:
+    """替身服务器 + 使用临时缓存目录的客户端组件"""
+
+    def __init__(self, cache_dir: str):
+        self.backend = MockBackend()
+        self.backend.set_whitelist([ETH_ADDRESS])
+        self.backend.set_client_config({'screenshotInterval': 30})
+        self.rule_pack = dict(copy.deepcopy(DEFAULT_RULE_PACK), version='combined-1')
+        self.backend.set_rule_pack(self.rule_pack)
+        self.backend.start()
+
+        config = AppConfig()
+        config.server.api_base_url = self.backend.api_base_url
+        config.server.timeout = 5
+        config.config_sync.combined = True
+        config.blockchain.rule_pack_sync = True
+        config.scheduler.splay = False
+        self.config = config
+
+        self.whitelist = WhitelistManager(config, logger)
+        self.whitelist._cache_file = Path(cache_dir) / "whitelist.json"
+        self.whitelist._publish(frozenset(), 0)
+        self.rule_packs = RulePackManager(config, logger)
+        self.rule_packs._cache_file = Path(cache_dir) / "rule_pack.json"
+        self.client = HttpClient(config, CLIENT_ID, logger, self.whitelist, self.rule_packs)
+        self.previous_pack = get_active_rule_pack()
+
+    def close(self):
+        self.client.stop()
+        self.whitelist.stop()
+        self.rule_packs.stop()
+        self.backend.stop()
+        publish_rule_pack(self.previous_pack)
+
+
+def _sent_versions(backend: MockBackend, index: int = -1) -> dict:
+    return json.loads(backend.requests_to(SYNC_PATH)[index]['body'])['versions']
+
+
+def test_combined_sync_returns_only_changes():
+    """首次合并同步下发全部资源，之后只下发有变化的部分"""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = _Env(cache_dir)
+        try:
+            updates = []
+            env.client._handle_config_update = updates.append
+
+            assert env.client._run_config_sync()
+            assert env.whitelist.is_whitelisted(ETH_ADDRESS)
+            assert get_active_rule_pack().version == 'combined-1'
+            assert updates == [{'screenshotInterval': 30}]
+            assert _sent_versions(env.backend) == {'config': None, 'whitelist': None,
+                                                   'rulePack': env.previous_pack.digest}
+
+            # 没有变化：只有一次请求，不重复应用
+            assert env.client._run_config_sync()
+            assert len(updates) == 1
+            sent = _sent_versions(env.backend)
+            assert sent['config'] == 'c1' and sent['whitelist'] == 'v2'
+
+            # 只有白名单变化：按增量应用
+            env.backend.set_whitelist([ETH_ADDRESS, TRX_ADDRESS])
+            assert env.client._run_config_sync()
+            assert env.whitelist.is_whitelisted(TRX_ADDRESS)
+            assert env.whitelist.get_stats()['delta_syncs'] == 1
+            assert len(updates) == 1
+
+            assert len(env.backend.requests) == 3
+            assert len(env.backend.requests_to(SYNC_PATH)) == 3
+            assert env.client.get_stats()['combined_syncs'] == 3
+        finally:
+            env.close()
+
+
+def test_combined_sync_request_has_timeout():
+    """合并同步请求使用配置的超时，连接停滞时不会一直阻塞同步任务"""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = _Env(cache_dir)
+        try:
+            timeouts = []
+            request = env.client.session.request
+            env.client.session.request = lambda *args, **kwargs: (
+                timeouts.append(kwargs.get('timeout')) or request(*args, **kwargs))
+            assert env.client._run_config_sync()
+            assert timeouts and all(timeout == env.config.server.timeout for timeout in timeouts)
+        finally:
+            env.close()
+
+
+def test_directives_dispatched_to_handlers():
+    """合并同步响应中的指令分发到注册的处理函数，未知指令被忽略"""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = _Env(cache_dir)
+        try:
+            received = []
+            env.client.register_directive_handler('captureNow', received.append)
+            env.backend.directives = {'captureNow': {'requestId': 'r1'}, 'unknownDirective': 1}
+            assert env.client._run_config_sync()
+            assert received == [{'requestId': 'r1'}]
+            assert env.client.get_stats()['directives_received'] == 2
+        finally:
+            env.close()
+
+
+def test_falls_back_when_server_lacks_endpoint():
+    """服务器不支持合并同步：退回分别同步，白名单恢复独立定时同步"""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = _Env(cache_dir)
+        env.backend.combined_sync_enabled = False
+        try:
+            env.whitelist.start()
+            env.client.start()
+
+            deadline = time.monotonic() + 5
+            while env.client.get_stats()['combined_sync'] and time.monotonic() < deadline:
+                time.sleep(0.02)
+            assert not env.client.get_stats()['combined_sync']
+            assert env.whitelist.get_stats()['sync_interval'] == env.config.whitelist.sync_interval
+
+            deadline = time.monotonic() + 5
+            while not env.backend.requests_to('/api/detection/rule-pack') and time.monotonic() < deadline:
+                time.sleep(0.02)
+            assert env.backend.requests_to(f"/api/client-config/client/{CLIENT_ID}/effective")
+            assert len(env.backend.requests_to(SYNC_PATH)) == 1
+        finally:
+            env.close()
+
+
+def test_whitelist_push_triggers_combined_sync():
+    """合并同步接管白名单时，白名单推送触发合并同步而不是单独请求白名单"""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = _Env(cache_dir)
+        env.config.push.coalesce_delay = 0.05
+        env.config.config_sync.interval = 600
+        env.config.whitelist.sync_interval = 600
+        try:
+            env.client.start()
+            assert env.whitelist.get_stats()['sync_interval'] == env.config.push.fallback_interval
+            deadline = time.monotonic() + 5
+            while not env.whitelist.is_whitelisted(ETH_ADDRESS) and time.monotonic() < deadline:
+                time.sleep(0.02)
+
+            env.backend.set_whitelist([ETH_ADDRESS, TRX_ADDRESS])
+            env.whitelist.request_sync()
+            deadline = time.monotonic() + 5
+            while not env.whitelist.is_whitelisted(TRX_ADDRESS) and time.monotonic() < deadline:
+                time.sleep(0.02)
+            assert env.whitelist.is_whitelisted(TRX_ADDRESS)
+            assert len(env.backend.requests_to(SYNC_PATH)) == 2
+            assert not env.backend.requests_to('/api/whitelist/addresses/active')
+        finally:
+            env.close()
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: 通过")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试离线批量检测
+
+功能：
+- 验证 detect_many 在单进程和进程池模式下结果与 detect_addresses 一致
+- 验证批量检测CLI的逐条输出和汇总报告
+"""
+
+import io
+import sys
+import json
+import logging
+import tempfile
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from modules.blockchain_detector import BlockchainAddressDetector
+import detect_batch
+
+logger = logging.getLogger(__name__)
+
+BTC_ADDRESS = "1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNa"
+ETH_ADDRESS = "0x742d35Cc6634C0532925a3b8D4C9db96C4b4d8b6"
+TRX_ADDRESS = "TLyqzVGLV1srkB7dToTAEqgDSfPtXRJZYH"
+
+SAMPLES = [
+    f"请转账到这个地址: {BTC_ADDRESS}",
+    f"ETH地址: {ETH_ADDRESS}",
+    "这是一段普通的文本，没有区块链地址",
+    f"TRX: {TRX_ADDRESS} 洗钱 100 USDT",
+    "会议纪要：下周一上午十点开会",
+]
+
+
+def test_detect_many_sequential_matches_single_detection():
+    """单进程批量检测与逐条检测一致"""
+    detector = BlockchainAddressDetector(logger)
+    expected = [detector.detect_addresses(text) for text in SAMPLES]
+    assert list(detector.detect_many(SAMPLES, workers=1)) == expected
+
+
+def test_detect_many_process_pool_matches_single_detection():
+    """进程池批量检测与逐条检测一致且保持输入顺序"""
+    detector = BlockchainAddressDetector(logger)
+    contents = SAMPLES * 20
+    expected = [detector.detect_addresses(text) for text in contents]
+    results = list(detector.detect_many(iter(contents), workers=2, chunksize=4))
+    assert results == expected
+
+
+def test_cli_run_reports_precision_and_throughput():
+    """CLI输出逐条结果并计算精确率/召回率"""
+    records = [
+        {'id': 'a', 'content': SAMPLES[0], 'expected': [BTC_ADDRESS], 'label': True},
+        {'id': 'b', 'content': SAMPLES[1], 'expected': [ETH_ADDRESS], 'label': True},
+        {'id': 'c', 'content': SAMPLES[2], 'expected': [], 'label': False},
+        {'id': 'd', 'content': SAMPLES[4], 'expected': [], 'label': False},
+    ]
+    input_stream = io.StringIO('\n'.join(json.dumps(record, ensure_ascii=False) for record in records) + '\n')
+    output_stream = io.StringIO()
+
+    report = detect_batch.run(input_stream, output_stream, input_format='jsonl', workers=1)
+
+    lines = [json.loads(line) for line in output_stream.getvalue().splitlines()]
+    assert [line['id'] for line in lines] == ['a', 'b', 'c', 'd']
+    assert [item['address'] for item in lines[0]['addresses']] == [BTC_ADDRESS]
+
+    assert report['records'] == 4
+    assert report['records_with_detections'] == 2
+    assert report['record_level']['precision'] == 1.0
+    assert report['record_level']['recall'] == 1.0
+    assert report['address_level']['tp'] == 2
+    assert report['records_per_second'] > 0
+
+
+def test_cli_main_with_text_input():
+    """CLI处理逐行文本文件并写出报告"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        input_path = Path(tmp_dir) / "input.txt"
+        output_path = Path(tmp_dir) / "results.jsonl"
+        report_path = Path(tmp_dir) / "report.json"
+        input_path.write_text('\n'.join(SAMPLES) + '\n', encoding='utf-8')
+
+        exit_code = detect_batch.main([
+            str(input_path), '--format', 'text', '--workers', '2', '--chunksize', '2',
+            '--output', str(output_path), '--report', str(report_path)
+        ])
+
+        assert exit_code == 0
+        report = json.loads(report_path.read_text(encoding='utf-8'))
+        assert report['records'] == len(SAMPLES)
+        assert report['by_type'].get('BTC') == 1
+        assert len(output_path.read_text(encoding='utf-8').splitlines()) == len(SAMPLES)
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: 通过")
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试空闲时不定时唤醒
+
+功能：
+- 验证运行器等待客户端停止时不分段轮询，客户端停止后立即返回
+- 验证客户端启动失败或停止后等待方被唤醒，重新启动后复位
+- 验证完整客户端在没有到期任务时各线程不被唤醒（psutil 上下文切换）
+"""
+
+import sys
+import time
+import argparse
+import logging
+import threading
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from core.config import AppConfig
+from core.client import ScreenMonitorClient
+from main import ClientRunner
+import bench_idle_wakeups
+
+logger = logging.getLogger(__name__)
+
+
+class _Client:
+    """记录等待调用的客户端"""
+
+    def __init__(self):
+        self.stopped = threading.Event()
+        self.waits = []
+
+    def wait_stopped(self, timeout=None):
+        self.waits.append(timeout)
+        return self.stopped.wait(timeout)
+
+    def is_running(self):
+        return not self.stopped.is_set()
+
+
+def test_runner_waits_without_polling():
+    """运行器一直等待到客户端停止，期间不分段唤醒"""
+    runner = ClientRunner("unused.yaml")
+    runner.client = _Client()
+    runner._running = True
+    thread = threading.Thread(target=runner.wait_for_stop, daemon=True)
+    thread.start()
+    time.sleep(0.3)
+    assert thread.is_alive()
+
+    started = time.monotonic()
+    runner.client.stopped.set()
+    thread.join(timeout=2)
+    assert not thread.is_alive()
+    assert time.monotonic() - started < 0.5
+    if sys.platform != "win32":
+        assert runner.client.waits == [None]
+
+    # 带超时的等待在超时后返回
+    runner.client = _Client()
+    started = time.monotonic()
+    runner.wait_for_stop(timeout=0.2)
+    assert 0.15 < time.monotonic() - started < 1.0
+
+
+def test_client_wait_stopped():
+    """启动失败时唤醒等待方；重新启动时复位停止事件"""
+    client = ScreenMonitorClient(AppConfig(), logger)
+    client.client_id_manager.get_client_uid = lambda: "TEST-CLIENT"
+
+    def fail(client_id):
+        raise RuntimeError("初始化失败")
+
+    client._initialize_modules = fail
+    try:
+        client.start()
+    except RuntimeError:
+        pass
+    assert client.wait_stopped(0)
+
+    client._initialize_modules = lambda client_id: None
+    client._start_modules = lambda: None
+    client.start()
+    assert client.is_running() and not client.wait_stopped(0.05)
+
+    waiter = threading.Thread(target=client.wait_stopped, daemon=True)
+    waiter.start()
+    client._stop_modules = lambda: None
+    client.stop()
+    waiter.join(timeout=1)
+    assert not waiter.is_alive()
+
+
+def test_idle_client_threads_sleep():
+    """没有到期的定时任务时，客户端各线程在空闲期间不被唤醒"""
+    if not sys.platform.startswith('linux'):
+        return
+    args = argparse.Namespace(idle=2.0, settle=1.0, screenshot_interval=3600)
+    result = bench_idle_wakeups.simulate('threads', args)
+    assert not result['job_runs']
+    # 允许偶发的一次唤醒（如日志写入）
+    assert result['wakeups_per_minute'] <= 30, result['per_thread']
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: 通过")
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试服务器请求的立即截图
+
+功能：
+- 验证截图请求立即触发截图，不等待定时间隔，请求ID随截图上传，回报成功和耗时
+- 验证截图进行中的多个请求由下一张截图一并响应，重复请求只响应一次，超出上限的请求被拒绝
+- 验证停止时等待中的请求回报失败
+- 验证上传遇到网络错误时按重试次数重试
+- 验证WebSocket先确认收到请求，上传结束后回报结果和耗时
+- 验证立即截图配置的校验
+"""
+
+import sys
+import time
+import asyncio
+import logging
+import tempfile
+import threading
+from pathlib import Path
+
+import requests
+from PIL import Image
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from core.config import AppConfig, ConfigManager
+from modules.screenshot import CaptureRequest, ScreenshotManager
+from modules.websocket_client import WebSocketClient
+from mock_server import MockBackend
+from utils.scheduler import Scheduler
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_PATH = "/api/security/screenshots/upload-with-heartbeat"
+
+
+class _ClientId:
+    def get_client_uid(self):
+        return "TEST-CLIENT"
+
+
+class _Results:
+    """记录立即截图回调"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, request_id, success, latency_ms):
+        self.calls.append((request_id, success, latency_ms))
+
+
+def _frame(seed: int) -> Image.Image:
+    image = Image.new('RGB', (320, 180), (seed * 40 % 256, 90, 160))
+    for x in range(0, 320, 16):
+        image.putpixel((x, seed % 180), (x % 256, 30, 60))
+    return image
+
+
+def _make_manager(backend: MockBackend, scheduler: Scheduler) -> ScreenshotManager:
+    # 定时截图间隔很长，首次截图随机分散在间隔内：期间的上传只能来自立即截图
+    config = AppConfig()
+    config.server.api_base_url = backend.api_base_url
+    config.server.timeout = 5
+    config.server.max_retries = 1
+    config.screenshot.interval = 3600
+    return ScreenshotManager(config, logger, _ClientId(), scheduler=scheduler)
+
+
+def _wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_request_captures_immediately():
+    """请求立即截图上传，不等待定时间隔；请求ID随截图上传，耗时计入统计"""
+    backend = MockBackend()
+    backend.start()
+    scheduler = Scheduler(logger, seed="test")
+    manager = _make_manager(backend, scheduler)
+    manager._grab_screen = lambda: _frame(3)
+    results = _Results()
+    try:
+        # 未启动时不接受请求
+        assert not manager.request_capture("req-0", results)
+
+        manager.start()
+        time.sleep(0.2)
+        assert not backend.requests_to(UPLOAD_PATH)
+
+        started = time.monotonic()
+        assert manager.request_capture("req-1", results)
+        assert _wait_for(lambda: results.calls)
+        assert time.monotonic() - started < 3
+
+        uploads = backend.requests_to(UPLOAD_PATH)
+        assert len(uploads) == 1
+        assert b'name="requestId"' in uploads[0]['body'] and b'req-1' in uploads[0]['body']
+        request_id, success, latency_ms = results.calls[0]
+        assert request_id == "req-1" and success and 0 < latency_ms < 3000
+
+        stats = manager.get_capture_stats()
+        assert stats['requests'] == 1 and stats['uploaded'] == 1 and stats['rejected'] == 1
+        assert stats['pending'] == 0 and stats['slo_breaches'] == 0
+        assert stats['latency_ms']['count'] == 1
+
+        # 立即截图不影响定时截图的节奏
+        assert scheduler.next_run_times()[ScreenshotManager.SCREENSHOT_JOB] > 60
+    finally:
+        manager.stop()
+        scheduler.stop()
+        backend.stop()
+
+
+def test_pending_requests_coalesced():
+    """截图进行中到达的请求由下一张截图一并响应；重复请求只响应一次，超出上限被拒绝"""
+    backend = MockBackend()
+    backend.start()
+    scheduler = Scheduler(logger, seed="test")
+    manager = _make_manager(backend, scheduler)
+    manager.config.on_demand_capture.max_pending = 2
+    grabbing = threading.Event()
+    release = threading.Event()
+
+    def grab():
+        grabbing.set()
+        release.wait(5)
+        return _frame(len(backend.requests_to(UPLOAD_PATH)) + 1)
+
+    manager._grab_screen = grab
+    results = _Results()
+    try:
+        manager.start()
+        assert manager.request_capture("first", results)
+        assert grabbing.wait(3)
+
+        assert manager.request_capture("second", results)
+        assert manager.request_capture("third", results)
+        assert manager.request_capture("third", results)
+        assert not manager.request_capture("fourth", results)
+        assert manager.get_capture_stats()['pending'] == 2
+
+        release.set()
+        assert _wait_for(lambda: len(results.calls) == 3)
+        assert [call[0] for call in results.calls] == ["first", "second", "third"]
+        assert all(call[1] for call in results.calls)
+
+        uploads = backend.requests_to(UPLOAD_PATH)
+        assert len(uploads) == 2
+        assert b'second' in uploads[1]['body'] and b'third' in uploads[1]['body']
+        assert manager.get_capture_stats()['rejected'] == 1
+    finally:
+        release.set()
+        manager.stop()
+        scheduler.stop()
+        backend.stop()
+
+
+def test_stop_fails_pending_requests():
+    """停止时等待中的请求回报失败"""
+    backend = MockBackend()
+    backend.start()
+    scheduler = Scheduler(logger, seed="test")
+    manager = _make_manager(backend, scheduler)
+    grabbing = threading.Event()
+    release = threading.Event()
+
+    def grab():
+        grabbing.set()
+        release.wait(5)
+        return _frame(5)
+
+    manager._grab_screen = grab
+    results = _Results()
+    try:
+        manager.start()
+        assert manager.request_capture("running", results)
+        assert grabbing.wait(3)
+        assert manager.request_capture("waiting", results)
+
+        manager.stop()
+        assert ("waiting", False) in [call[:2] for call in results.calls]
+        assert manager.get_capture_stats()['failed'] >= 1
+    finally:
+        release.set()
+        manager.stop()
+        scheduler.stop()
+        backend.stop()
+
+
+def test_upload_retries_network_errors():
+    """上传遇到连接错误时按配置的次数重试后返回失败"""
+    config = AppConfig()
+    config.server.max_retries = 3
+    config.server.retry_delay = 0
+    manager = ScreenshotManager(config, logger, _ClientId(), scheduler=Scheduler(logger, seed="test"))
+    calls = []
+
+    def post(*args, **kwargs):
+        calls.append(kwargs.get('data'))
+        raise requests.exceptions.ConnectionError("连接被拒绝")
+
+    manager.session.post = post
+    assert not manager._upload_screenshot(b'jpeg')
+    assert len(calls) == 3
+
+    # 立即截图的上传同样重试
+    calls.clear()
+    assert not manager._upload_screenshot(b'jpeg', [CaptureRequest("req-1")])
+    assert len(calls) == 3 and calls[0]['requestId'] == "req-1"
+
+
+class _FakeSio:
+    """记录事件注册和发送内容的Socket.IO替身"""
+
+    def __init__(self):
+        self.handlers = {}
+        self.emitted = []
+
+    def on(self, event, handler, namespace=None):
+        self.handlers[(namespace, event)] = handler
+
+    async def emit(self, event, data, namespace=None):
+        self.emitted.append((event, data))
+
+
+class _Capture:
+    """记录立即截图请求的截图管理器替身"""
+
+    def __init__(self, accept: bool = True):
+        self.accept = accept
+        self.requests = []
+
+    def request_capture(self, request_id, callback=None):
+        self.requests.append((request_id, callback))
+        return self.accept
+
+
+def test_websocket_reports_capture_result():
+    """WebSocket先确认收到截图请求，上传结束后回报结果和耗时"""
+    sio = _FakeSio()
+    capture = _Capture()
+    client = WebSocketClient(AppConfig(), "test-client", logger, sio=sio, screenshot_manager=capture)
+    handler = sio.handlers[('/monitor', 'screenshot_request')]
+    client._running = True
+    client._connected = True
+
+    async def scenario():
+        await handler({'requestId': 'req-9'})
+        assert capture.requests[0][0] == 'req-9'
+        # 上传结束的回调在截图线程中调用
+        request_id, callback = capture.requests[0]
+        threading.Thread(target=callback, args=(request_id, True, 321.456)).start()
+        for _ in range(100):
+            if len(sio.emitted) >= 2:
+                break
+            await asyncio.sleep(0.01)
+
+        capture.accept = False
+        await handler({'requestId': 'req-10'})
+
+    asyncio.run(scenario())
+    responses = [data for event, data in sio.emitted if event == 'screenshot_response']
+    assert [(data['requestId'], data['status']) for data in responses] == [
+        ('req-9', 'received'), ('req-9', 'uploaded'), ('req-10', 'rejected')]
+    assert responses[1]['latencyMs'] == 321.5
+    assert client.get_stats()['capture_requests'] == 2
+
+
+def test_on_demand_capture_config():
+    """默认启用；目标耗时、等待时间和请求数上限需为正数"""
+    config = AppConfig()
+    assert config.on_demand_capture.enabled and config.on_demand_capture.slo_ms == 3000
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        config_path = Path(config_dir) / "config.yaml"
+        config_path.write_text("on_demand_capture:\n  slo_ms: 1500\n  max_pending: 4\n", encoding="utf-8")
+        loaded = ConfigManager(config_path).get_config()
+        assert loaded.on_demand_capture.slo_ms == 1500 and loaded.on_demand_capture.max_pending == 4
+
+        for body in ("on_demand_capture:\n  slo_ms: 0\n", "on_demand_capture:\n  max_wait: -1\n",
+                     "on_demand_capture:\n  max_pending: 0\n"):
+            config_path.write_text(body, encoding="utf-8")
+            try:
+                ConfigManager(config_path)
+            except RuntimeError:
+                continue
+            raise AssertionError(f"非法配置未被拒绝: {body!r}")
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: 通过")
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试推送触发的同步
+
+功能：
+- 验证合并窗口内的多次推送只触发一次同步
+- 验证推送连接正常时定时同步退为兜底间隔
+- 验证白名单推送端到端：推送后数秒内生效，且只多一次请求
+- 验证WebSocket事件在 /monitor 命名空间上注册，并通知对应管理器
+"""
+
+import sys
+import time
+import asyncio
+import logging
+import tempfile
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from core.config import AppConfig
+from modules.http_client import HttpClient
+from modules.whitelist import WhitelistManager
+from modules.websocket_client import WebSocketClient
+from utils.scheduler import Scheduler
+from mock_server import MockBackend
+
+logger = logging.getLogger(__name__)
+
+WHITELIST_PATH = '/api/whitelist/addresses/active'
+ETH_ADDRESS = "0x742d35Cc6634C0532925a3b8D4C9db96C4b4d8b6"
+TRX_ADDRESS = "TLyqzVGLV1srkB7dToTAEqgDSfPtXRJZYH"
+
+
+def _wait_for(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return predicate()
+
+
+def test_pushes_are_coalesced():
+    """合并窗口内的多次推送只触发一次同步"""
+    scheduler = Scheduler(logger)
+    runs = []
+    scheduler.add_job('sync', lambda: runs.append(time.monotonic()), interval=600, initial_delay=600)
+    scheduler.start()
+    try:
+        started = time.monotonic()
+        for _ in range(5):
+            scheduler.trigger('sync', delay=0.2)
+        assert _wait_for(lambda: runs, timeout=2)
+        assert runs[0] - started >= 0.2
+
+        time.sleep(0.5)
+        assert len(runs) == 1
+        stats = scheduler.get_stats()['sync']
+        assert stats['triggers'] == 5
+        assert stats['next_run_in'] > 500
+    finally:
+        scheduler.stop()
+
+
+def test_push_active_uses_fallback_interval():
+    """推送连接正常时按兜底间隔轮询，断开后恢复正常间隔"""
+    config = AppConfig()
+    config.config_sync.interval = 0.3
+    config.scheduler.splay = False
+    config.scheduler.jitter = 0
+    client = HttpClient(config, "test-client", logger)
+    synced = []
+    client._sync_config = lambda: synced.append(time.monotonic()) or True
+
+    client.start()
+    try:
+        assert _wait_for(lambda: synced, timeout=2)
+        client.set_push_active(True)
+        assert client.get_stats()['config_sync_interval'] == config.push.fallback_interval
+        count = len(synced)
+        time.sleep(0.6)
+        assert len(synced) == count
+
+        client.set_push_active(False)
+        assert _wait_for(lambda: len(synced) > count, timeout=2)
+    finally:
+        client.stop()
+
+
+def test_whitelist_push_syncs_once():
+    """白名单推送：合并后只多一次请求，新地址立即生效"""
+    backend = MockBackend()
+    backend.set_whitelist([ETH_ADDRESS])
+    backend.start()
+    config = AppConfig()
+    config.server.api_base_url = backend.api_base_url
+    config.server.timeout = 5
+    config.whitelist.sync_interval = 600
+    config.push.coalesce_delay = 0.2
+    manager = WhitelistManager(config, logger)
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            manager._cache_file = Path(cache_dir) / "whitelist.json"
+            manager._publish(frozenset(), 0)
+            manager.start()
+            manager.set_push_active(True)
+            # 没有有效缓存：启动后立即同步一次
+            assert _wait_for(lambda: manager.is_whitelisted(ETH_ADDRESS))
+            assert len(backend.requests_to(WHITELIST_PATH)) == 1
+
+            backend.set_whitelist([ETH_ADDRESS, TRX_ADDRESS])
+            for _ in range(10):
+                manager.request_sync()
+
+            assert _wait_for(lambda: manager.is_whitelisted(TRX_ADDRESS))
+
+            time.sleep(0.5)
+            assert len(backend.requests_to(WHITELIST_PATH)) == 2
+            assert manager.get_stats()['push_notifications'] == 10
+            assert manager.get_stats()['sync_interval'] == config.push.fallback_interval
+            manager.stop()
+    finally:
+        manager.stop()
+        backend.stop()
+
+
+def test_config_push_triggers_config_sync():
+    """配置更新推送触发HTTP客户端同步配置"""
+    config = AppConfig()
+    config.config_sync.interval = 600
+    config.push.coalesce_delay = 0.1
+    config.scheduler.splay = False
+    client = HttpClient(config, "test-client", logger)
+    synced = []
+    client._sync_config = lambda: synced.append(time.monotonic()) or True
+
+    client.start()
+    try:
+        assert _wait_for(lambda: synced, timeout=2)
+        assert len(synced) == 1
+
+        client.request_config_sync()
+        client.request_config_sync()
+        time.sleep(0.5)
+        assert len(synced) == 2
+    finally:
+        client.stop()
+    assert not client.scheduler.is_running()
+
+
+class _FakeSio:
+    """记录事件注册和发送的Socket.IO替身"""
+
+    def __init__(self):
+        self.handlers = {}
+        self.emitted = []
+
+    def on(self, event, handler, namespace=None):
+        self.handlers[(namespace, event)] = handler
+
+    async def emit(self, event, data, namespace=None):
+        self.emitted.append((event, namespace))
+
+
+class _Target:
+    def __init__(self):
+        self.calls = []
+
+    def request_sync(self):
+        self.calls.append('request_sync')
+
+    def request_config_sync(self):
+        self.calls.append('request_config_sync')
+
+    def set_push_active(self, active):
+        self.calls.append(('push_active', active))
+
+
+def test_websocket_events_notify_managers():
+    """WebSocket事件注册在/monitor命名空间，推送通知对应管理器"""
+    sio = _FakeSio()
+    whitelist, http = _Target(), _Target()
+    client = WebSocketClient(AppConfig(), "test-client", logger, whitelist, http, sio=sio)
+
+    handlers = {event: handler for (namespace, event), handler in sio.handlers.items() if namespace == '/monitor'}
+    assert {'connect', 'disconnect', 'whitelist_updated', 'client_config_updated'} <= set(handlers)
+
+    async def scenario():
+        await handlers['connect']()
+        await handlers['whitelist_updated']({'updateId': 1})
+        await handlers['client_config_updated']({'configId': 2})
+        await handlers['disconnect']()
+        await handlers['connect']()
+
+    asyncio.run(scenario())
+    assert whitelist.calls == [('push_active', True), 'request_sync', ('push_active', False),
+                               ('push_active', True), 'request_sync']
+    assert http.calls == [('push_active', True), 'request_config_sync', ('push_active', False),
+                          ('push_active', True), 'request_config_sync']
+    assert ('whitelist_update_response', '/monitor') in sio.emitted
+    assert client.get_stats()['whitelist_pushes'] == 1
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: 通过")
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试远程配置运行时生效
+
+功能：
+- 验证下发的同步间隔、截图间隔无需重启即重新安排调度任务
+- 验证任一字段无效时整份配置被拒绝，同一份配置不重复尝试
+- 验证模块应用失败时回滚到上一份有效配置
+- 验证剪贴板相关开关和检查间隔在运行中生效
+- 验证从替身服务器拉取的生效配置被应用
+"""
+
+import sys
+import json
+import logging
+import tempfile
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from core.config import AppConfig
+from core.remote_config import RemoteConfigManager
+from modules.clipboard import ClipboardMonitor
+from modules.clipboard_watcher import MemoryClipboardWatcher
+from modules.http_client import HttpClient
+from modules.screenshot import ScreenshotManager
+from modules.whitelist import WhitelistManager
+from mock_server import MockBackend
+from utils.scheduler import Scheduler
+
+logger = logging.getLogger(__name__)
+
+CLIENT_ID = "TEST-CLIENT"
+ETH_ADDRESS = "0x742d35Cc6634C0532925a3b8D4C9db96C4b4d8b6"
+
+
+def _make_whitelist(config: AppConfig, cache_dir: str, scheduler=None) -> WhitelistManager:
+    whitelist = WhitelistManager(config, logger, scheduler)
+    whitelist._cache_file = Path(cache_dir) / "whitelist.json"
+    whitelist._publish(frozenset(), 0)
+    return whitelist
+
+
+def test_intervals_rescheduled_without_restart():
+    """同步间隔和截图间隔变化后，调度任务立即按新间隔重新安排"""
+    config = AppConfig()
+    config.server.api_base_url = "http://127.0.0.1:9/api"
+    scheduler = Scheduler(logger, seed="test")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        whitelist = _make_whitelist(config, cache_dir, scheduler)
+        client = HttpClient(config, CLIENT_ID, logger, whitelist, scheduler=scheduler)
+        screenshots = ScreenshotManager(config, logger, None, scheduler=scheduler)
+        manager = RemoteConfigManager(config, logger)
+        manager.register("截图管理器", screenshots.apply_runtime_config)
+        manager.register("白名单管理器", whitelist.apply_runtime_config)
+        manager.register("HTTP客户端", client.apply_runtime_config)
+        try:
+            client.start()
+            screenshots.start()
+            whitelist.start()
+
+            assert manager.apply({'screenshotInterval': 45, 'extendedSettings': {'configSyncInterval': 120,
+                                                                                 'whitelistSyncInterval': 600}})
+            assert config.screenshot.interval == 45
+            assert scheduler.get_interval(ScreenshotManager.SCREENSHOT_JOB) == 45
+            assert scheduler.get_interval(HttpClient.CONFIG_SYNC_JOB) == 120
+            assert scheduler.get_interval(WhitelistManager.SYNC_JOB) == 600
+            assert scheduler.next_run_times()[HttpClient.CONFIG_SYNC_JOB] <= 120
+
+            # 相同配置再次下发：没有变化
+            assert manager.apply({'screenshotInterval': 45})
+            stats = manager.get_stats()
+            assert stats['updates_applied'] == 1 and stats['updates_unchanged'] == 1
+            assert stats['effective']['config_sync.interval'] == 120
+        finally:
+            screenshots.stop()
+            client.stop()
+            whitelist.stop()
+            scheduler.stop()
+
+
+def test_invalid_payload_rejected_atomically():
+    """任一字段无效时整份配置不生效，同一份无效配置不重复校验"""
+    config = AppConfig()
+    manager = RemoteConfigManager(config, logger)
+    notified = []
+    manager.register("记录", notified.append)
+    quality = config.screenshot.quality
+    interval = config.screenshot.interval
+
+    payload = {'screenshotInterval': 0, 'imageQuality': 50}
+    assert not manager.apply(payload)
+    assert config.screenshot.quality == quality and config.screenshot.interval == interval
+    assert not notified
+    assert manager.get_stats()['updates_rejected'] == 1
+
+    assert not manager.apply(dict(payload))
+    assert manager.get_stats()['updates_rejected'] == 1
+
+    for bad in ({'imageQuality': 'high'}, {'screenshotInterval': 12.5}, {'enableClipboardMonitoring': 2},
+                json.loads('{"clipboardCheckInterval": NaN}'), json.loads('{"screenshotInterval": Infinity}')):
+        assert not manager.apply(bad)
+    assert manager.get_stats()['updates_rejected'] == 6
+    assert config.clipboard.check_interval == AppConfig().clipboard.check_interval
+
+    # 修正后的配置正常生效，未知字段忽略
+    assert manager.apply({'screenshotInterval': 30, 'imageQuality': 50, 'unknownField': 1})
+    assert notified == [{'screenshot.interval': (interval, 30), 'screenshot.quality': (quality, 50)}]
+
+
+def test_hook_failure_rolls_back():
+    """模块应用失败：恢复上一份有效配置，已通知的模块收到反向变化"""
+    config = AppConfig()
+    manager = RemoteConfigManager(config, logger)
+    assert manager.apply({'heartbeatInterval': 60})
+
+    notified = []
+    manager.register("记录", notified.append)
+
+    def failing(changes):
+        if 'screenshot.quality' in changes and changes['screenshot.quality'][1] == 20:
+            raise RuntimeError("不支持的质量")
+
+    manager.register("失败模块", failing)
+    quality = config.screenshot.quality
+
+    assert not manager.apply({'heartbeatInterval': 90, 'imageQuality': 20})
+    assert config.heartbeat.interval == 60 and config.screenshot.quality == quality
+    assert notified == [{'heartbeat.interval': (60, 90), 'screenshot.quality': (quality, 20)},
+                        {'heartbeat.interval': (90, 60), 'screenshot.quality': (20, quality)}]
+    stats = manager.get_stats()
+    assert stats['rollbacks'] == 1 and '失败模块' in stats['last_error']
+
+
+def test_clipboard_settings_applied_live():
+    """tinyint 开关被转换为布尔值；检查间隔变化同步到剪贴板监听器"""
+    config = AppConfig()
+    watcher = MemoryClipboardWatcher(logger)
+    monitor = ClipboardMonitor(config, CLIENT_ID, logger, None, None, clipboard_watcher=watcher)
+    manager = RemoteConfigManager(config, logger)
+    manager.register("剪贴板监控器", monitor.apply_runtime_config)
+
+    assert manager.apply({'clearClipboardOnViolation': 0, 'extendedSettings': {'clipboardCheckInterval': 0.2}})
+    assert config.clipboard.auto_clear_on_violation is False
+    assert watcher.poll_interval == 0.2
+
+    # 禁用清空时检测到违规只记录，不清空剪贴板
+    monitor._handle_violation(ETH_ADDRESS, {'type': 'ETH', 'address': ETH_ADDRESS, 'confidence': 'high'})
+    assert watcher.clear_count == 0
+
+
+def test_effective_config_from_server_applied():
+    """配置同步拉取到的生效配置（{code, message, data} 包装）被应用"""
+    backend = MockBackend()
+    backend.set_client_config({'screenshotInterval': 60, 'imageQuality': 40, 'enableClipboardMonitoring': 1})
+    backend.start()
+    config = AppConfig()
+    config.server.api_base_url = backend.api_base_url
+    config.server.timeout = 5
+    manager = RemoteConfigManager(config, logger)
+    client = HttpClient(config, CLIENT_ID, logger, remote_config=manager)
+    try:
+        assert client._sync_config()
+        assert config.screenshot.interval == 60
+        assert config.screenshot.quality == 40
+        assert config.clipboard.enabled is True
+        assert manager.get_stats()['updates_applied'] == 1
+    finally:
+        client.stop()
+        backend.stop()
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: 通过")
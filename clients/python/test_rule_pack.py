@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试检测规则包
+
+功能：
+- 验证规则包只编译一次并在检测器之间共享，已编译缓存只保留最近使用的几个版本
+- 验证规则包原子替换，进行中的扫描保持原版本
+- 验证从文件加载和通过ETag从服务器拉取规则包，内容未变时的新ETag也会保存
+- 验证无效规则包不会替换当前规则
+"""
+
+import sys
+import copy
+import json
+import logging
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from core.config import AppConfig
+from modules.blockchain_detector import BlockchainAddressDetector
+from modules import rule_pack
+from modules.rule_pack import (
+    DEFAULT_RULE_PACK, RulePackError, RulePackManager,
+    compile_rule_pack, get_active_rule_pack, publish_rule_pack
+)
+
+logger = logging.getLogger(__name__)
+
+ETH_ADDRESS = "0x742d35Cc6634C0532925a3b8D4C9db96C4b4d8b6"
+BTC_ADDRESS = "1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNa"
+
+
+def _custom_pack(version: str) -> dict:
+    """只检测以太坊地址的最小规则包"""
+    return {
+        'version': version,
+        'chains': {
+            'ETH': {'patterns': [r'\b0x[a-fA-F0-9]{40}\b'], 'min_length': 42, 'max_length': 42, 'prefixes': ['0x']}
+        }
+    }
+
+
+def test_compile_once_and_shared():
+    """相同内容的规则包只编译一次，多个检测器共享同一对象"""
+    first = compile_rule_pack(copy.deepcopy(DEFAULT_RULE_PACK))
+    second = compile_rule_pack(copy.deepcopy(DEFAULT_RULE_PACK))
+    assert first is second
+
+    detector_a = BlockchainAddressDetector(logger)
+    detector_b = BlockchainAddressDetector(logger)
+    assert detector_a.rule_pack is detector_b.rule_pack
+
+
+def test_compiled_cache_bounded():
+    """同步下发的新版本不断加入时，已编译缓存只保留最近使用的版本"""
+    default = compile_rule_pack(copy.deepcopy(DEFAULT_RULE_PACK))
+    for index in range(rule_pack.MAX_COMPILED_PACKS * 3):
+        compile_rule_pack(_custom_pack(f"bounded-{index}"))
+        # 内置规则包持续使用，不被淘汰
+        assert compile_rule_pack(copy.deepcopy(DEFAULT_RULE_PACK)) is default
+    assert len(rule_pack._compiled_packs) == rule_pack.MAX_COMPILED_PACKS
+
+    latest = _custom_pack(f"bounded-{rule_pack.MAX_COMPILED_PACKS * 3 - 1}")
+    assert compile_rule_pack(latest) is compile_rule_pack(copy.deepcopy(latest))
+
+
+def test_rule_pack_is_immutable():
+    """编译后的规则包不可修改"""
+    pack = compile_rule_pack(DEFAULT_RULE_PACK)
+    try:
+        pack.version = 'hacked'
+    except AttributeError:
+        pass
+    else:
+        assert False, "RulePack 应当不可修改"
+    assert pack.version == DEFAULT_RULE_PACK['version']
+
+
+def test_hot_swap_keeps_in_flight_version():
+    """替换规则包后，进行中的流式扫描继续使用旧版本"""
+    original = get_active_rule_pack()
+    try:
+        detector = BlockchainAddressDetector(logger)
+        content = f"{BTC_ADDRESS}\n" + "填充文本 " * 2000 + f"\n{BTC_ADDRESS[:-1]}X {ETH_ADDRESS}\n"
+
+        scan = detector.iter_addresses_chunked(content, chunk_size=2048, overlap=256)
+        first = next(scan)
+        assert first['address'] == BTC_ADDRESS
+
+        # 扫描进行中发布只检测ETH的新规则包
+        publish_rule_pack(compile_rule_pack(_custom_pack('eth-only-1')))
+        remaining = [item['address'] for item in scan]
+        assert ETH_ADDRESS in remaining
+
+        # 新的检测使用新版本：BTC地址不再被识别
+        assert detector.rule_pack.version == 'eth-only-1'
+        addresses = [item['address'] for item in detector.detect_addresses(f"{BTC_ADDRESS} {ETH_ADDRESS}")]
+        assert addresses == [ETH_ADDRESS]
+    finally:
+        publish_rule_pack(original)
+
+
+def test_invalid_rule_pack_rejected():
+    """格式错误的规则包在编译阶段被拒绝"""
+    for data in ({'chains': {}}, {'version': 'x', 'chains': {'ETH': {'patterns': ['[unclosed']}}},
+                 {'version': 'x', 'chains': {'ETH': {'patterns': ['0x'], 'validators': ['nope']}}}):
+        try:
+            compile_rule_pack(data)
+        except RulePackError:
+            continue
+        assert False, f"应当拒绝无效规则包: {data}"
+
+
+def test_base58check_validator():
+    """规则包可引用base58check校验器"""
+    data = {
+        'version': 'btc-checked',
+        'chains': {'BTC': {'patterns': [r'\b[13][a-km-zA-HJ-NP-Z1-9]{25,34}\b'], 'validators': ['base58check']}}
+    }
+    detector = BlockchainAddressDetector(logger, rule_pack=compile_rule_pack(data))
+    valid = [item['address'] for item in detector.detect_addresses(BTC_ADDRESS)]
+    invalid = [item['address'] for item in detector.detect_addresses(BTC_ADDRESS[:-1] + "b")]
+    assert valid == [BTC_ADDRESS]
+    assert invalid == []
+
+
+def test_load_rule_pack_from_config_file():
+    """从配置指定的文件加载规则包"""
+    original = get_active_rule_pack()
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            pack_path = Path(tmp_dir) / "rules.json"
+            pack_path.write_text(json.dumps(_custom_pack('file-1')), encoding='utf-8')
+
+            config = AppConfig()
+            config.blockchain.rule_pack_file = str(pack_path)
+            manager = RulePackManager(config, logger)
+            pack = manager.load()
+
+            assert pack.version == 'file-1'
+            assert get_active_rule_pack() is pack
+    finally:
+        publish_rule_pack(original)
+
+
+class _RulePackHandler(BaseHTTPRequestHandler):
+    """规则包接口的本地替身"""
+
+    pack = _custom_pack('server-1')
+    etag = '"server-1"'
+    requests_seen = []
+
+    def do_GET(self):
+        self.requests_seen.append(self.headers.get('If-None-Match'))
+        if self.headers.get('If-None-Match') == self.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = json.dumps({'code': 200, 'success': True, 'data': self.pack}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('ETag', self.etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_sync_from_server_with_etag():
+    """服务器拉取规则包：首次200并替换，之后带If-None-Match得到304"""
+    original = get_active_rule_pack()
+    server = HTTPServer(('127.0.0.1', 0), _RulePackHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            config = AppConfig()
+            config.server.api_base_url = f"http://127.0.0.1:{server.server_port}/api"
+            config.server.timeout = 5
+            config.blockchain.rule_pack_sync = True
+
+            manager = RulePackManager(config, logger)
+            manager._cache_file = Path(tmp_dir) / "rule_pack.json"
+
+            assert manager.sync() is True
+            assert get_active_rule_pack().version == 'server-1'
+            assert manager.sync() is False
+            assert _RulePackHandler.requests_seen[-2:] == [None, '"server-1"']
+            assert manager.get_stats()['not_modified'] == 1
+
+            # 重启后从缓存恢复同一版本
+            publish_rule_pack(original)
+            restarted = RulePackManager(config, logger)
+            restarted._cache_file = manager._cache_file
+            assert restarted.load().version == 'server-1'
+            assert restarted._etag == '"server-1"'
+    finally:
+        server.shutdown()
+        server.server_close()
+        publish_rule_pack(original)
+
+
+def test_etag_kept_for_unchanged_pack():
+    """内容未变的新ETag写入缓存；合并同步（没有ETag）不清除已有ETag"""
+    original = get_active_rule_pack()
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            manager = RulePackManager(AppConfig(), logger)
+            manager._cache_file = Path(tmp_dir) / "rule_pack.json"
+
+            def cached_etag():
+                return json.loads(manager._cache_file.read_text(encoding='utf-8'))['etag']
+
+            assert manager._apply(_custom_pack('etag-1'), '"a"') is True
+            assert manager._apply(_custom_pack('etag-1'), '"b"') is False
+            assert manager._etag == '"b"' and cached_etag() == '"b"'
+
+            assert manager.apply_sync_data(_custom_pack('etag-1')) is False
+            assert manager.apply_sync_data(_custom_pack('etag-2')) is True
+            assert manager._etag == '"b"' and cached_etag() == '"b"'
+            assert get_active_rule_pack().version == 'etag-2'
+    finally:
+        publish_rule_pack(original)
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: 通过")
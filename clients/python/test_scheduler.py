@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试统一定时调度器
+
+功能：
+- 验证首次执行在一个间隔内随机分散，不同客户端ID相互错开
+- 验证抖动不改变长期相位
+- 验证失败退避指数增长且有上限，成功后恢复相位
+- 验证错过执行时的补执行策略
+- 验证触发合并、下次执行时间和同一任务不并发执行
+"""
+
+import sys
+import time
+import random
+import logging
+import threading
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from utils.scheduler import Scheduler, ScheduledJob, CATCH_UP_ONCE, CATCH_UP_SKIP
+
+logger = logging.getLogger(__name__)
+
+
+def _wait_for(predicate, timeout: float = 3.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_splay_spreads_fleet_within_interval():
+    """以客户端ID为种子：首次执行均匀分布在一个间隔内，同一ID结果稳定"""
+    delays = []
+    for index in range(1000):
+        job = ScheduledJob('sync', lambda: None, interval=300)
+        job.start_at(0.0, random.Random(f"CLIENT-{index}"), None)
+        delays.append(job.run_at)
+
+    assert all(0 <= delay <= 300 for delay in delays)
+    # 每30秒的时间段内都有客户端，且没有明显集中
+    buckets = [0] * 10
+    for delay in delays:
+        buckets[min(int(delay // 30), 9)] += 1
+    assert min(buckets) > 50 and max(buckets) < 150
+
+    again = ScheduledJob('sync', lambda: None, interval=300)
+    again.start_at(0.0, random.Random("CLIENT-0"), None)
+    assert again.run_at == delays[0]
+
+
+def test_jitter_keeps_phase():
+    """抖动只影响单次执行时刻，相位按间隔推进不漂移"""
+    rng = random.Random(1)
+    job = ScheduledJob('sync', lambda: None, interval=100, jitter=0.1)
+    job.start_at(0.0, rng, 0)
+    now = 0.0
+    for index in range(1, 51):
+        now = job.run_at + 2  # 每次执行耗时2秒
+        job.finish(now, True, True, rng)
+        assert job.planned == index * 100
+        assert abs(job.run_at - job.planned) <= 10
+    assert job.missed == 0
+
+
+def test_failure_backoff_is_capped_and_resets():
+    """失败后按指数退避重试，不超过上限；成功后回到原相位"""
+    rng = random.Random(1)
+    job = ScheduledJob('sync', lambda: None, interval=600, retry_delay=30, max_backoff=100)
+    job.start_at(0.0, rng, 0)
+
+    delays = []
+    now = 0.0
+    for _ in range(5):
+        job.finish(now, False, True, rng)
+        delays.append(job.run_at - now)
+        now = job.run_at
+    assert delays == [30, 60, 100, 100, 100]
+    assert job.planned == 0
+
+    # 重试成功（相当于完成了第一次常规执行），下一次回到 600 的相位
+    job.finish(now, True, True, rng)
+    assert job.failures == 0
+    assert job.planned == 600 and job.run_at == 600
+
+
+def test_catch_up_policies():
+    """错过执行：skip 对齐到下一次相位，once 立即补执行一次"""
+    rng = random.Random(1)
+    skip = ScheduledJob('skip', lambda: None, interval=10, catch_up=CATCH_UP_SKIP)
+    skip.start_at(0.0, rng, 0)
+    skip.finish(35.0, True, True, rng)
+    assert skip.missed == 3
+    assert skip.run_at == 40
+
+    once = ScheduledJob('once', lambda: None, interval=10, catch_up=CATCH_UP_ONCE)
+    once.start_at(0.0, rng, 0)
+    once.finish(35.0, True, True, rng)
+    assert once.run_at == 35
+    once.finish(35.5, True, True, rng)
+    assert once.run_at == 50
+
+
+def test_trigger_does_not_shift_phase():
+    """触发执行不推进相位；合并窗口内的多次触发只执行一次"""
+    scheduler = Scheduler(logger, seed="test")
+    runs = []
+    scheduler.add_job('sync', lambda: runs.append(time.monotonic()), interval=0.5, initial_delay=0.5)
+    job_planned = scheduler._jobs['sync'].planned
+    scheduler.start()
+    try:
+        for _ in range(3):
+            scheduler.trigger('sync', delay=0.1)
+        assert _wait_for(lambda: len(runs) >= 1)
+        assert scheduler._jobs['sync'].planned == job_planned
+        assert _wait_for(lambda: len(runs) >= 2)
+        assert runs[1] - runs[0] > 0.3
+    finally:
+        scheduler.stop()
+    assert not scheduler.trigger('missing')
+
+
+def test_next_run_times_and_interval_change():
+    """可查询各任务下次执行时间，调整间隔后重新安排"""
+    scheduler = Scheduler(logger, seed="test")
+    scheduler.add_job('slow', lambda: None, interval=3600, initial_delay=3600)
+    scheduler.add_job('fast', lambda: None, interval=60, initial_delay=30)
+    scheduler.start()
+    try:
+        times = scheduler.next_run_times()
+        assert 3590 < times['slow'] <= 3600
+        assert 20 < times['fast'] <= 30
+
+        assert scheduler.set_interval('slow', 120)
+        assert scheduler.get_interval('slow') == 120
+        assert scheduler.next_run_times()['slow'] <= 120
+
+        scheduler.remove_job('fast')
+        assert not scheduler.has_job('fast')
+        assert set(scheduler.get_stats()) == {'slow'}
+    finally:
+        scheduler.stop()
+
+
+def test_interval_change_inside_job():
+    """在任务函数内部调整间隔：本次执行结束后按新间隔安排一次，不重复推进相位"""
+    scheduler = Scheduler(logger, seed="test")
+    scheduler.add_job('sync', lambda: scheduler.set_interval('sync', 20), interval=10, initial_delay=0)
+    scheduler.add_job('push', lambda: scheduler.set_interval('push', 30), interval=3600, initial_delay=3600)
+    scheduler.start()
+    try:
+        assert _wait_for(lambda: scheduler.get_stats()['sync']['runs'] == 1
+                         and not scheduler.get_stats()['sync']['running'])
+        assert 19 < scheduler.next_run_times()['sync'] <= 20
+
+        # 触发的执行不推进相位，同样按新间隔安排
+        assert scheduler.trigger('push')
+        assert _wait_for(lambda: scheduler.get_stats()['push']['runs'] == 1
+                         and not scheduler.get_stats()['push']['running'])
+        assert 29 < scheduler.next_run_times()['push'] <= 30
+    finally:
+        scheduler.stop()
+
+
+def test_job_never_runs_concurrently():
+    """执行耗时超过间隔时同一任务不会并发执行，失败和异常计入统计"""
+    scheduler = Scheduler(logger, seed="test", max_workers=4)
+    active = []
+    overlaps = []
+    lock = threading.Lock()
+
+    def slow_job():
+        with lock:
+            active.append(1)
+            if len(active) > 1:
+                overlaps.append(len(active))
+        time.sleep(0.15)
+        with lock:
+            active.pop()
+        raise RuntimeError("boom")
+
+    scheduler.add_job('slow', slow_job, interval=0.05, initial_delay=0)
+    scheduler.start()
+    try:
+        for _ in range(5):
+            scheduler.trigger('slow')
+            time.sleep(0.05)
+        assert _wait_for(lambda: scheduler.get_stats()['slow']['runs'] >= 3)
+    finally:
+        scheduler.stop()
+
+    stats = scheduler.get_stats()['slow']
+    assert not overlaps
+    assert stats['errors'] == stats['runs'] or stats['running']
+    assert stats['last_result'] is False
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: 通过")
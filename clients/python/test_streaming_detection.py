@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试分块流式区块链地址检测
+
+功能：
+- 验证超长内容中的地址能被完整扫描
+- 验证跨分块边界的地址只被检测一次且不产生截断误报
+- 验证流式检测结果与整体检测一致
+- 验证确认违规后可提前停止扫描
+"""
+
+import sys
+import logging
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from modules.blockchain_detector import BlockchainAddressDetector
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s | %(levelname)s | %(message)s')
+logger = logging.getLogger(__name__)
+
+BTC_ADDRESS = "1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNa"
+ETH_ADDRESS = "0x742d35Cc6634C0532925a3b8D4C9db96C4b4d8b6"
+TRX_ADDRESS = "TLyqzVGLV1srkB7dToTAEqgDSfPtXRJZYH"
+
+FILLER_LINE = "季度报表 第一列 第二列 合计 备注说明\n"
+
+
+def _make_detector() -> BlockchainAddressDetector:
+    return BlockchainAddressDetector(logger)
+
+
+def test_address_beyond_truncation_limit():
+    """地址位于第5000行时仍能被检测到"""
+    detector = _make_detector()
+    content = FILLER_LINE * 5000 + f"收款: {ETH_ADDRESS}\n" + FILLER_LINE * 10
+
+    results = list(detector.iter_addresses_chunked(content, chunk_size=4096, overlap=256))
+    addresses = [item['address'] for item in results]
+
+    assert ETH_ADDRESS in addresses
+    eth_info = next(item for item in results if item['address'] == ETH_ADDRESS)
+    assert eth_info['position'] == content.index(ETH_ADDRESS)
+
+
+def test_address_across_chunk_boundary():
+    """跨越分块边界的地址只被报告一次"""
+    detector = _make_detector()
+    chunk_size, overlap = 512, 128
+
+    # 让地址横跨每一个可能的边界偏移
+    for shift in range(0, 60, 7):
+        prefix = "x " * ((chunk_size - 20 + shift) // 2)
+        content = prefix + BTC_ADDRESS + " 结尾文本"
+        results = list(detector.iter_addresses_chunked(content, chunk_size=chunk_size, overlap=overlap))
+        addresses = [item['address'] for item in results]
+        assert addresses.count(BTC_ADDRESS) == 1, (shift, addresses)
+
+
+def test_no_partial_matches_from_split_tokens():
+    """分块截断的超长字符串不应产生误报"""
+    detector = _make_detector()
+    long_token = ("ab12" * 60)  # 240字符的连续字母数字串，整体检测不会匹配
+    content = "说明 " * 100 + long_token + " 说明" * 100
+
+    expected = {item['address'] for item in detector.detect_addresses(content)}
+    streamed = {item['address'] for item in detector.iter_addresses_chunked(content, chunk_size=300, overlap=200)}
+
+    assert streamed == expected
+
+
+def test_streaming_matches_full_scan():
+    """流式检测与整体检测结果一致"""
+    detector = _make_detector()
+    content = (
+        FILLER_LINE * 300 + f"BTC: {BTC_ADDRESS}\n" +
+        FILLER_LINE * 300 + f"ETH: {ETH_ADDRESS}\n" +
+        FILLER_LINE * 300 + f"TRX: {TRX_ADDRESS}\n"
+    )
+
+    expected = {(item['address'], item['type']) for item in detector.detect_addresses(content)}
+    streamed = {(item['address'], item['type'])
+                for item in detector.iter_addresses_chunked(content, chunk_size=2048, overlap=256)}
+
+    assert streamed == expected
+    assert (BTC_ADDRESS, 'BTC') in streamed
+
+
+def test_iterable_source_matches_string_source():
+    """按片段产出的内容与完整字符串结果一致"""
+    detector = _make_detector()
+    content = FILLER_LINE * 200 + f"地址 {TRX_ADDRESS} " + FILLER_LINE * 200 + ETH_ADDRESS
+    pieces = [content[i:i + 333] for i in range(0, len(content), 333)]
+
+    from_string = [(item['address'], item['position'])
+                   for item in detector.iter_addresses_chunked(content, chunk_size=1024, overlap=200)]
+    from_pieces = [(item['address'], item['position'])
+                   for item in detector.iter_addresses_chunked(iter(pieces), chunk_size=1024, overlap=200)]
+
+    assert sorted(from_pieces) == sorted(from_string)
+
+
+def test_early_stop_skips_remaining_chunks():
+    """调用方停止迭代后不再扫描剩余分块"""
+    detector = _make_detector()
+    content = f"{ETH_ADDRESS}\n" + FILLER_LINE * 20000
+
+    scanned_chunks = []
+    original_scan = detector._scan_text
+
+    def counting_scan(text, accept=None, rules=None):
+        scanned_chunks.append(len(text))
+        return original_scan(text, accept, rules)
+
+    detector._scan_text = counting_scan
+
+    for item in detector.iter_addresses_chunked(content, chunk_size=4096, overlap=256):
+        if item['address'] == ETH_ADDRESS:
+            break
+
+    assert len(scanned_chunks) == 1
+
+
+def test_invalid_chunk_configuration():
+    """分块大小不大于重叠长度时报错"""
+    detector = _make_detector()
+    try:
+        list(detector.iter_addresses_chunked("text", chunk_size=100, overlap=100))
+    except ValueError:
+        return
+    assert False, "应当抛出 ValueError"
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: 通过")
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试两阶段违规上报
+
+功能：
+- 验证违规元数据先于证据送达，请求很小并取得服务器事件ID
+- 验证证据分块上传，链路中断后从服务器已收到的位置续传
+- 验证服务器确认的位置没有前进时不反复重发同一块
+- 验证证据上传失败不影响告警，未完成的证据在重启后继续上传
+- 验证服务器不支持两阶段上报时退回一次性上报
+"""
+
+import os
+import sys
+import time
+import logging
+import tempfile
+import requests
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from core.config import AppConfig
+from modules.violation import ViolationReporter
+from mock_server import MockBackend
+
+logger = logging.getLogger(__name__)
+
+METADATA_PATH = "/api/security/violations"
+COMBINED_PATH = "/api/security/violations/report-with-screenshot"
+KB = 1024
+
+
+def _make_reporter(backend: MockBackend, data_dir: str, evidence: bytes) -> ViolationReporter:
+    config = AppConfig()
+    config.server.api_base_url = backend.api_base_url
+    config.server.timeout = 5
+    config.server.max_retries = 1
+    config.violation_report.two_phase = True
+    config.violation_report.evidence_chunk_size = 64 * KB
+    config.violation_report.evidence_retry_delay = 1
+    reporter = ViolationReporter(config, "TEST-CLIENT", logger, data_dir=Path(data_dir))
+    reporter._get_current_screenshot = lambda: evidence
+    return reporter
+
+
+def _report(reporter: ViolationReporter) -> bool:
+    """生成一个违规事件并直接发送（不经过上报线程）"""
+    assert reporter.report_violation({
+        'violationType': 'BLOCKCHAIN_ADDRESS',
+        'violationContent': '0x742d35Cc6634C0532925a3b8D4C9db96C4b4d8b6',
+        'address_type': 'ETH'
+    })
+    item = reporter._queue.get(timeout=0)
+    success = reporter._send_violation_report(item.event, item.load_evidence())
+    if success:
+        reporter._queue.ack(item)
+    return success
+
+
+def _wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+def test_metadata_before_evidence():
+    """元数据请求很小且立即取得事件ID，证据随后分块上传并关联到该事件"""
+    backend = MockBackend()
+    backend.start()
+    evidence = os.urandom(300 * KB)
+    with tempfile.TemporaryDirectory() as data_dir:
+        reporter = _make_reporter(backend, data_dir, evidence)
+        try:
+            assert _report(reporter)
+            metadata_requests = backend.requests_to(METADATA_PATH)
+            assert len(metadata_requests) == 1 and len(metadata_requests[0]['body']) < 2 * KB
+            assert backend.violations[0]['evidence']['size'] == len(evidence)
+            assert backend.evidence('e1') is None
+            assert reporter.evidence.pending_count() == 1
+
+            reporter.evidence.start()
+            assert _wait_for(lambda: backend.evidence('e1') is not None)
+            assert backend.evidence('e1') == evidence
+            assert _wait_for(lambda: reporter.evidence.pending_count() == 0)
+            assert not list((Path(data_dir) / "violation_evidence").iterdir())
+        finally:
+            reporter.stop()
+            reporter.evidence.stop()
+            backend.stop()
+
+    stats = reporter.get_stats()
+    assert stats['metadata_reports'] == 1 and stats['legacy_reports'] == 0
+    assert stats['evidence']['chunks'] == 5 and stats['evidence']['uploaded'] == 1
+
+
+def test_evidence_resumes_after_interruption():
+    """分块上传中断后先查询服务器进度，只补传剩余部分"""
+    backend = MockBackend()
+    backend.start()
+    evidence = os.urandom(200 * KB)
+    with tempfile.TemporaryDirectory() as data_dir:
+        reporter = _make_reporter(backend, data_dir, evidence)
+        put = reporter.session.put
+        calls = []
+
+        def flaky_put(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 2:
+                raise requests.exceptions.ConnectionError("链路中断")
+            return put(*args, **kwargs)
+
+        reporter.session.put = flaky_put
+        try:
+            assert _report(reporter)
+            reporter.evidence.start()
+            assert _wait_for(lambda: backend.evidence('e1') is not None)
+            assert backend.evidence('e1') == evidence
+        finally:
+            reporter.evidence.stop()
+            reporter.stop()
+            backend.stop()
+
+    # 服务器收到的数据总量等于证据大小：中断前的分块没有重传
+    evidence_requests = [request for request in backend.requests if request['method'] == 'PUT']
+    assert sum(len(request['body']) for request in evidence_requests) == len(evidence)
+    stats = reporter.evidence.get_stats()
+    assert stats['resumed'] == 1 and stats['retries'] == 1
+
+
+class _Reply:
+    def __init__(self, status_code: int, body: dict):
+        self.status_code = status_code
+        self.body = body
+
+    def json(self):
+        return self.body
+
+
+def test_evidence_upload_requires_progress():
+    """分块上传成功但响应缺少已收到的字节数或位置没有前进时，不重发同一块，稍后重试"""
+    backend = MockBackend()
+    backend.start()
+    with tempfile.TemporaryDirectory() as data_dir:
+        reporter = _make_reporter(backend, data_dir, os.urandom(200 * KB))
+        try:
+            assert _report(reporter)
+            item = reporter.evidence._pending[0]
+            for progress in ({}, {'received': 0}):
+                calls = []
+                reporter.session.put = lambda *args, progress=progress, **kwargs: (
+                    calls.append(1) or _Reply(200, {'success': True, 'data': progress}))
+                assert not reporter.evidence._upload(item)
+                assert len(calls) == 1
+        finally:
+            reporter.stop()
+            backend.stop()
+
+    assert reporter.evidence.get_stats()['stalled'] == 2
+
+
+def test_evidence_failure_keeps_alert_and_survives_restart():
+    """证据上传失败时告警照常成功；重启后继续上传保存在本地的证据"""
+    backend = MockBackend()
+    backend.start()
+    backend.evidence_failures = 1000
+    evidence = os.urandom(100 * KB)
+    with tempfile.TemporaryDirectory() as data_dir:
+        reporter = _make_reporter(backend, data_dir, evidence)
+        try:
+            assert _report(reporter)
+            assert len(backend.violations) == 1
+            reporter.evidence.start()
+            assert _wait_for(lambda: reporter.evidence.get_stats()['retries'] >= 1)
+        finally:
+            reporter.evidence.stop()
+            reporter.stop()
+
+        backend.evidence_failures = 0
+        restarted = _make_reporter(backend, data_dir, b'')
+        try:
+            assert restarted.evidence.pending_count() == 1
+            restarted.evidence.start()
+            assert _wait_for(lambda: backend.evidence('e1') is not None)
+            assert backend.evidence('e1') == evidence
+        finally:
+            restarted.evidence.stop()
+            restarted.stop()
+            backend.stop()
+
+
+def test_falls_back_to_combined_report():
+    """服务器不支持两阶段上报时退回一次性上报，之后不再尝试"""
+    backend = MockBackend()
+    backend.two_phase_enabled = False
+    backend.start()
+    with tempfile.TemporaryDirectory() as data_dir:
+        reporter = _make_reporter(backend, data_dir, os.urandom(10 * KB))
+        try:
+            assert _report(reporter)
+            assert _report(reporter)
+        finally:
+            reporter.stop()
+            backend.stop()
+
+    assert len(backend.requests_to(METADATA_PATH)) == 1
+    assert len(backend.requests_to(COMBINED_PATH)) == 2
+    stats = reporter.get_stats()
+    assert not stats['two_phase'] and stats['legacy_reports'] == 2
+    assert stats['evidence']['queued'] == 0
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: 通过")
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试截图上传响应中的服务器限流指令
+
+功能：
+- 验证指令按上限修正并在有效期后过期，无效字段被忽略
+- 验证质量上限立即用于压缩，画面未变化时只发送心跳不上传截图
+- 验证推迟下一次截图的指令重新安排定时截图，且不超过上限
+"""
+
+import sys
+import time
+import logging
+from pathlib import Path
+
+from PIL import Image
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from core.config import AppConfig
+from modules.screenshot import ScreenshotManager
+from modules.upload_directives import UploadDirectives
+from mock_server import MockBackend
+from utils.scheduler import Scheduler
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_PATH = "/api/security/screenshots/upload-with-heartbeat"
+HEARTBEAT_PATH = "/api/clients/heartbeat"
+
+
+class _ClientId:
+    def get_client_uid(self):
+        return "TEST-CLIENT"
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _frame(seed: int) -> Image.Image:
+    image = Image.new('RGB', (640, 360), (seed * 40 % 256, 90, 160))
+    for x in range(0, 640, 16):
+        for y in range(0, 360, 8):
+            image.putpixel((x, y), ((x + seed * 7) % 256, (y * 3) % 256, seed % 256))
+    return image
+
+
+def _make_manager(backend: MockBackend, scheduler=None) -> ScreenshotManager:
+    config = AppConfig()
+    config.server.api_base_url = backend.api_base_url
+    config.server.timeout = 5
+    config.server.max_retries = 1
+    config.scheduler.splay = False
+    return ScreenshotManager(config, logger, _ClientId(), scheduler=scheduler)
+
+
+def test_directives_capped_and_expire():
+    """指令按配置上限修正，有效期过后恢复本地配置"""
+    config = AppConfig()
+    clock = _Clock()
+    directives = UploadDirectives(config, logger, clock=clock)
+
+    applied = directives.update({'nextCaptureIn': 86400, 'maxQuality': 1, 'skipUnchanged': True, 'ttl': 86400})
+    assert applied == {'nextCaptureIn': config.upload_directives.max_capture_delay,
+                       'maxQuality': config.upload_directives.min_quality,
+                       'skipUnchanged': True,
+                       'ttl': config.upload_directives.max_ttl}
+    assert directives.quality_cap() == config.upload_directives.min_quality
+    assert directives.skip_unchanged()
+
+    clock.now += config.upload_directives.max_ttl
+    assert directives.quality_cap() is None
+    assert not directives.skip_unchanged()
+
+    # 未指定有效期时使用默认有效期；无效字段被忽略
+    assert directives.update({'maxQuality': 'low', 'skipUnchanged': 1, 'nextCaptureIn': -5}) == {}
+    assert directives.update({'maxQuality': 50})['ttl'] == config.upload_directives.default_ttl
+    clock.now += config.upload_directives.default_ttl - 1
+    assert directives.quality_cap() == 50
+
+    config.upload_directives.enabled = False
+    assert directives.update({'maxQuality': 30}) == {}
+    stats = directives.get_stats()
+    assert stats['directives_received'] == 3 and stats['directives_ignored'] == 1
+
+
+def test_quality_cap_and_unchanged_frames():
+    """质量上限立即用于下一次压缩；画面未变化时只发送心跳"""
+    backend = MockBackend()
+    backend.start()
+    manager = _make_manager(backend)
+    frames = [_frame(1), _frame(1), _frame(2)]
+    manager._grab_screen = lambda: frames.pop(0)
+    try:
+        full_quality = len(manager._compress_image(_frame(1)))
+        backend.upload_directives = {'maxQuality': 20, 'skipUnchanged': True}
+
+        manager._take_and_upload_screenshot()
+        assert len(backend.requests_to(UPLOAD_PATH)) == 1
+        assert manager.directives.quality_cap() == 20
+        assert len(manager._compress_image(_frame(1))) < full_quality
+
+        # 相同画面：不上传截图，心跳照常发送
+        manager._take_and_upload_screenshot()
+        assert len(backend.requests_to(UPLOAD_PATH)) == 1
+        assert len(backend.requests_to(HEARTBEAT_PATH)) == 1
+        assert manager.directives.get_stats()['frames_skipped'] == 1
+
+        # 画面变化：正常上传
+        manager._take_and_upload_screenshot()
+        assert len(backend.requests_to(UPLOAD_PATH)) == 2
+    finally:
+        manager.stop()
+        backend.stop()
+
+
+def test_next_capture_deferred():
+    """推迟指令在本次截图结束后重新安排下一次截图，不超过上限"""
+    backend = MockBackend()
+    backend.upload_directives = {'nextCaptureIn': 100000}
+    backend.start()
+    scheduler = Scheduler(logger, seed="test")
+    manager = _make_manager(backend, scheduler)
+    manager.config.screenshot.interval = 5
+    manager._grab_screen = lambda: _frame(3)
+    try:
+        manager.start()
+        deadline = time.monotonic() + 5
+        while not backend.requests_to(UPLOAD_PATH) and time.monotonic() < deadline:
+            time.sleep(0.02)
+        deadline = time.monotonic() + 5
+        while scheduler.get_stats()[ScreenshotManager.SCREENSHOT_JOB]['runs'] < 1 and time.monotonic() < deadline:
+            time.sleep(0.02)
+
+        delay = scheduler.next_run_times()[ScreenshotManager.SCREENSHOT_JOB]
+        max_delay = manager.config.upload_directives.max_capture_delay
+        assert max_delay - 5 < delay <= max_delay
+        assert manager.directives.get_stats()['captures_deferred'] == 1
+    finally:
+        manager.stop()
+        scheduler.stop()
+        backend.stop()
+
+
+def test_reschedule_outside_job():
+    """在任务外调用推迟：立即重新安排，之后按原间隔继续"""
+    scheduler = Scheduler(logger, seed="test")
+    runs = []
+    scheduler.add_job('capture', lambda: runs.append(time.monotonic()), interval=0.1, initial_delay=0)
+    scheduler.reschedule('capture', 0.4)
+    started = time.monotonic()
+    scheduler.start()
+    try:
+        deadline = time.monotonic() + 3
+        while len(runs) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert runs[0] - started >= 0.35
+        assert runs[1] - runs[0] < 0.35
+    finally:
+        scheduler.stop()
+    assert not scheduler.reschedule('missing', 1)
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: 通过")
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试优先级上传调度器
+
+功能：
+- 验证排队任务按 违规 > 证据 > 心跳 > 定时截图 > 积压补传 的顺序执行
+- 验证紧急通道：违规上报不排在正在进行的慢速定时上传之后
+- 验证等待带宽预算的低优先级任务被更高优先级任务抢占，超时放弃
+- 验证队列满时淘汰最低优先级任务，同一 key 的新任务替换旧任务
+- 验证按优先级统计延迟，停止时排队任务以 UploadDropped 结束
+"""
+
+import sys
+import time
+import logging
+import threading
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from core.config import AppConfig
+from utils.bandwidth import BandwidthBudget
+from utils.upload_scheduler import (
+    PRIORITY_BACKLOG, PRIORITY_EVIDENCE, PRIORITY_HEARTBEAT, PRIORITY_ON_DEMAND, PRIORITY_PERIODIC,
+    PRIORITY_VIOLATION,
+    UploadDropped, UploadScheduler
+)
+
+logger = logging.getLogger(__name__)
+
+KB = 1024
+
+
+def _blocker(scheduler: UploadScheduler, priority: int = PRIORITY_PERIODIC):
+    """提交一个阻塞到 release 的任务，返回 (started, release, future)"""
+    started = threading.Event()
+    release = threading.Event()
+
+    def task():
+        started.set()
+        release.wait(5)
+        return True
+
+    future = scheduler.submit(priority, task)
+    assert started.wait(2)
+    return started, release, future
+
+
+def _dropped_reason(future, timeout: float = 3.0) -> str:
+    """等待任务结束并返回未执行的原因（任务执行了则断言失败）"""
+    try:
+        future.result(timeout=timeout)
+    except UploadDropped as e:
+        return e.reason
+    raise AssertionError("任务不应被执行")
+
+
+def _budget(rate: int, burst: int) -> BandwidthBudget:
+    config = AppConfig()
+    config.bandwidth.max_bytes_per_second = rate
+    config.bandwidth.burst_bytes = burst
+    return BandwidthBudget(config, logger)
+
+
+def test_queued_tasks_run_by_priority():
+    """工作线程空闲后按优先级而不是提交顺序执行"""
+    scheduler = UploadScheduler(logger, workers=1, urgent_workers=0)
+    scheduler.start()
+    order = []
+    try:
+        _, release, _ = _blocker(scheduler)
+        futures = [scheduler.submit(priority, lambda p=priority: order.append(p))
+                   for priority in (PRIORITY_BACKLOG, PRIORITY_PERIODIC, PRIORITY_HEARTBEAT,
+                                    PRIORITY_ON_DEMAND, PRIORITY_EVIDENCE, PRIORITY_VIOLATION)]
+        release.set()
+        for future in futures:
+            future.result(timeout=2)
+    finally:
+        scheduler.stop()
+    assert order == [PRIORITY_VIOLATION, PRIORITY_EVIDENCE, PRIORITY_ON_DEMAND, PRIORITY_HEARTBEAT,
+                     PRIORITY_PERIODIC, PRIORITY_BACKLOG]
+
+
+def test_urgent_lane_bypasses_slow_upload():
+    """慢速定时上传进行中，违规上报经紧急通道立即发送"""
+    scheduler = UploadScheduler(logger, workers=1, urgent_workers=1)
+    scheduler.start()
+    try:
+        _, release, periodic = _blocker(scheduler)
+        started = time.monotonic()
+        assert scheduler.run(PRIORITY_VIOLATION, lambda: 'sent') == 'sent'
+        assert time.monotonic() - started < 0.5
+        assert not periodic.done()
+        release.set()
+        assert periodic.result(timeout=2)
+    finally:
+        scheduler.stop()
+
+    stats = scheduler.get_stats()
+    assert stats['violation']['completed'] == 1
+    assert stats['violation']['total_latency_ms']['max'] < 500
+
+
+def test_waiting_task_preempted_and_expires():
+    """等待预算的定时截图让位于心跳；违规透支预算；等待超时的任务被放弃"""
+    budget = _budget(rate=20 * KB, burst=20 * KB)
+    scheduler = UploadScheduler(logger, budget, workers=1, urgent_workers=0)
+    scheduler.start()
+    try:
+        budget.overdraw(30 * KB)  # 约 2.5 秒后才有 20KB 令牌
+        periodic = scheduler.submit(PRIORITY_PERIODIC, lambda: 'frame', nbytes=20 * KB, max_wait=1.0)
+        time.sleep(0.2)
+
+        started = time.monotonic()
+        assert scheduler.run(PRIORITY_HEARTBEAT, lambda: 'beat') == 'beat'
+        assert scheduler.run(PRIORITY_VIOLATION, lambda: 'alert', nbytes=100 * KB) == 'alert'
+        assert time.monotonic() - started < 0.5
+        assert not periodic.done()
+        assert scheduler.get_stats()['periodic']['preempted'] >= 1
+
+        # 违规透支后定时截图在最长等待时间内等不到预算
+        stale = scheduler.submit(PRIORITY_PERIODIC, lambda: 'late', nbytes=20 * KB, max_wait=0.2)
+        for future in (periodic, stale):
+            assert 'bandwidth' in _dropped_reason(future)
+        assert budget.get_stats()['denied'] == 2
+    finally:
+        scheduler.stop()
+
+
+def test_eviction_and_superseding():
+    """同 key 任务替换旧任务；队列满时淘汰最低优先级任务，新任务优先级最低时被拒绝"""
+    scheduler = UploadScheduler(logger, workers=1, urgent_workers=0, max_queued=2)
+    scheduler.start()
+    try:
+        _, release, _ = _blocker(scheduler)
+        backlog = scheduler.submit(PRIORITY_BACKLOG, lambda: 'old event')
+        first_frame = scheduler.submit(PRIORITY_PERIODIC, lambda: 'frame 1', key='screenshot')
+        second_frame = scheduler.submit(PRIORITY_PERIODIC, lambda: 'frame 2', key='screenshot')
+        assert _dropped_reason(first_frame) == 'superseded'
+
+        violation = scheduler.submit(PRIORITY_VIOLATION, lambda: 'alert')
+        assert _dropped_reason(backlog) == 'evicted'
+        rejected = scheduler.submit(PRIORITY_BACKLOG, lambda: 'another old event')
+        assert _dropped_reason(rejected) == 'queue full'
+
+        release.set()
+        assert violation.result(timeout=2) == 'alert'
+        assert second_frame.result(timeout=2) == 'frame 2'
+    finally:
+        scheduler.stop()
+
+    stats = scheduler.get_stats()
+    assert stats['backlog']['dropped'] == 2 and stats['periodic']['dropped'] == 1
+
+
+def test_inline_when_not_started_and_stop_drops_pending():
+    """未启动时在调用线程中执行并传回异常；停止时排队任务被放弃"""
+    scheduler = UploadScheduler(logger)
+    assert scheduler.run(PRIORITY_PERIODIC, lambda: threading.current_thread().name) == threading.current_thread().name
+    try:
+        scheduler.run(PRIORITY_VIOLATION, lambda: 1 / 0)
+        raise AssertionError("应传回上传函数的异常")
+    except ZeroDivisionError:
+        pass
+    assert scheduler.get_stats()['violation']['failed'] == 1
+
+    scheduler.start()
+    _, release, _ = _blocker(scheduler)
+    pending = scheduler.submit(PRIORITY_BACKLOG, lambda: 'never')
+    scheduler.stop(timeout=0.1)
+    release.set()
+    assert _dropped_reason(pending) == 'stopped'
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: 通过")
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试违规事件批量与并发上报
+
+功能：
+- 验证积压的事件按批提交，批内按发生顺序排列，clientSeq 单调递增
+- 验证多个发送线程并发上报时事件不重复、不丢失，按 clientSeq 可恢复发生顺序
+- 验证批量结果逐个确认，被拒绝的事件单独重试
+- 验证服务器不支持批量上报时退回逐个上报
+"""
+
+import sys
+import time
+import logging
+import tempfile
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from core.config import AppConfig
+from modules.violation import ViolationReporter
+from mock_server import MockBackend
+
+logger = logging.getLogger(__name__)
+
+METADATA_PATH = "/api/security/violations"
+BATCH_PATH = "/api/security/violations/batch"
+
+
+def _make_reporter(backend: MockBackend, data_dir: str, senders: int = 1, batch_size: int = 1) -> ViolationReporter:
+    config = AppConfig()
+    config.server.api_base_url = backend.api_base_url
+    config.server.timeout = 5
+    config.server.max_retries = 1
+    config.violation_report.two_phase = True
+    config.violation_report.senders = senders
+    config.violation_report.batch_size = batch_size
+    config.violation_queue.retry_delay = 0.1
+    reporter = ViolationReporter(config, "TEST-CLIENT", logger, data_dir=Path(data_dir))
+    reporter._get_current_screenshot = lambda: None
+    return reporter
+
+
+def _report(reporter: ViolationReporter, count: int) -> list:
+    """产生 count 个违规事件，返回按发生顺序排列的事件ID"""
+    event_ids = []
+    for index in range(count):
+        event = {'violationType': 'BLOCKCHAIN_ADDRESS', 'violationContent': f"0x{index:040x}"}
+        assert reporter.report_violation(event)
+        event_ids.append(event['event_id'])
+    return event_ids
+
+
+def _wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_backlog_sent_in_ordered_batches():
+    """积压的事件按 batch_size 分批提交，到达顺序与发生顺序一致"""
+    backend = MockBackend()
+    backend.start()
+    with tempfile.TemporaryDirectory() as data_dir:
+        reporter = _make_reporter(backend, data_dir, batch_size=20)
+        event_ids = _report(reporter, 100)
+        reporter.start()
+        try:
+            assert _wait_for(lambda: len(backend.violations) == 100)
+        finally:
+            reporter.stop()
+            backend.stop()
+
+    received = backend.violations
+    assert [metadata['clientEventId'] for metadata in received] == event_ids
+    sequence = [metadata['clientSeq'] for metadata in received]
+    assert sequence == sorted(sequence) and len(set(sequence)) == 100
+    assert len(backend.requests_to(BATCH_PATH)) == 5
+    assert not backend.requests_to(METADATA_PATH)
+    assert reporter.get_stats()['batches'] == 5
+
+
+def test_concurrent_senders_drain_burst():
+    """多个发送线程并发上报：高延迟链路上快速清空突发，事件不重复，按 clientSeq 恢复顺序"""
+    backend = MockBackend()
+    backend.latency = 0.1
+    backend.start()
+    with tempfile.TemporaryDirectory() as data_dir:
+        reporter = _make_reporter(backend, data_dir, senders=4, batch_size=10)
+        reporter.start()
+        try:
+            started = time.monotonic()
+            event_ids = _report(reporter, 200)
+            assert _wait_for(lambda: reporter.get_queue_size() == 0)
+            elapsed = time.monotonic() - started
+        finally:
+            reporter.stop()
+            backend.stop()
+
+    received = sorted(backend.violations, key=lambda metadata: metadata['clientSeq'])
+    assert [metadata['clientEventId'] for metadata in received] == event_ids
+    # 逐个串行上报需要 200 × 0.1 = 20 秒
+    assert elapsed < 1.5
+    assert reporter.get_stats()['successful_reports'] == 200
+
+
+def test_rejected_events_retried_individually():
+    """批量结果逐个确认：被拒绝的事件单独重试，其余事件不重复提交"""
+    backend = MockBackend()
+    backend.start()
+    with tempfile.TemporaryDirectory() as data_dir:
+        reporter = _make_reporter(backend, data_dir, batch_size=10)
+        event_ids = _report(reporter, 10)
+        backend.rejected_events.add(event_ids[3])
+        reporter.start()
+        try:
+            assert _wait_for(lambda: len(backend.violations) == 9)
+            backend.rejected_events.clear()
+            assert _wait_for(lambda: len(backend.violations) == 10)
+            assert _wait_for(lambda: reporter.get_queue_size() == 0)
+        finally:
+            reporter.stop()
+            backend.stop()
+
+    received = backend.violations
+    assert received[-1]['clientEventId'] == event_ids[3]
+    assert len({metadata['clientEventId'] for metadata in received}) == 10
+    stats = reporter.get_stats()
+    assert stats['failed_reports'] == 1 and stats['successful_reports'] == 10
+
+
+def test_falls_back_to_single_reports():
+    """服务器不支持批量上报时逐个上报，之后不再尝试批量接口"""
+    backend = MockBackend()
+    backend.batch_enabled = False
+    backend.start()
+    with tempfile.TemporaryDirectory() as data_dir:
+        reporter = _make_reporter(backend, data_dir, batch_size=10)
+        event_ids = _report(reporter, 25)
+        reporter.start()
+        try:
+            assert _wait_for(lambda: len(backend.violations) == 25)
+        finally:
+            reporter.stop()
+            backend.stop()
+
+    assert [metadata['clientEventId'] for metadata in backend.violations] == event_ids
+    assert len(backend.requests_to(BATCH_PATH)) == 1
+    assert len(backend.requests_to(METADATA_PATH)) == 25
+    assert reporter.get_stats()['batches'] == 0
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: 通过")
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试违规事件去重合并
+
+功能：
+- 验证合并窗口内的重复只上报首次发生，窗口结束时合并为一个汇总事件（次数、首次/最后一次时间）
+- 验证证据只在首次发生时截取，或按采样间隔截取
+- 验证上报到服务器的事件数大幅减少，重复次数不丢失
+- 验证停止时未结束的窗口输出汇总事件，重启后继续上报
+"""
+
+import sys
+import time
+import logging
+import tempfile
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from core.config import AppConfig
+from modules.violation import ViolationReporter
+from mock_server import MockBackend
+
+logger = logging.getLogger(__name__)
+
+ETH_ADDRESS = "0x742d35Cc6634C0532925a3b8D4C9db96C4b4d8b6"
+
+
+def _make_reporter(data_dir: str, window: float, sample_every: int = 0, backend: MockBackend = None):
+    config = AppConfig()
+    config.violation_dedup.window = window
+    config.violation_dedup.evidence_sample_every = sample_every
+    if backend is not None:
+        config.server.api_base_url = backend.api_base_url
+        config.server.timeout = 5
+        config.server.max_retries = 1
+        config.violation_report.two_phase = True
+    reporter = ViolationReporter(config, "TEST-CLIENT", logger, data_dir=Path(data_dir))
+    captures = []
+
+    def capture():
+        captures.append(1)
+        return f"evidence-{len(captures)}".encode()
+
+    reporter._get_current_screenshot = capture
+    return reporter, captures
+
+
+def _violation(address: str = ETH_ADDRESS, content: str = None) -> dict:
+    return {
+        'violationType': 'BLOCKCHAIN_ADDRESS',
+        'violationContent': address,
+        'additionalData': {
+            'blockchainType': 'ETH',
+            'fullClipboardContent': content if content is not None else f"转账到 {address}"
+        }
+    }
+
+
+def _drain(reporter: ViolationReporter) -> list:
+    """取出队列中的全部事件，返回 (事件, 证据) 列表"""
+    items = []
+    while True:
+        item = reporter._queue.get(timeout=0)
+        if item is None:
+            return items
+        items.append((item.event, item.load_evidence()))
+        reporter._queue.ack(item)
+
+
+def _wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_repeats_folded_into_summary():
+    """窗口内的重复只计数，窗口结束时输出一个汇总事件；内容不同的事件不合并"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        reporter, captures = _make_reporter(data_dir, window=0.3)
+        reporter._coalescer.start()
+        try:
+            for _ in range(5):
+                assert reporter.report_violation(_violation())
+            assert reporter.report_violation(_violation(content="另一段剪贴板内容 " + ETH_ADDRESS))
+            assert reporter.get_queue_size() == 2
+            assert len(captures) == 2
+
+            assert _wait_for(lambda: reporter.get_queue_size() == 3)
+            items = _drain(reporter)
+        finally:
+            reporter._coalescer.stop()
+            reporter._queue.close()
+
+    first, other, summary = (event for event, _ in items)
+    assert first['occurrence']['count'] == 1 and other['occurrence']['count'] == 1
+    assert first['occurrence']['key'] != other['occurrence']['key']
+    occurrence = summary['occurrence']
+    assert occurrence['key'] == first['occurrence']['key']
+    assert occurrence['count'] == 4 and occurrence['repeatOf'] == first['event_id']
+    assert first['occurrence']['firstSeen'] <= occurrence['firstSeen'] <= occurrence['lastSeen']
+    assert summary['event_id'] not in (first['event_id'], other['event_id'])
+    # 汇总事件不截取新的证据
+    assert items[2][1] is None
+
+    stats = reporter.get_stats()
+    assert stats['coalesced'] == 4 and stats['total_events'] == 3
+    assert stats['dedup']['summaries'] == 1 and stats['dedup']['open_windows'] == 0
+
+
+def test_evidence_sampling():
+    """按采样间隔截取重复发生时的证据，汇总事件携带最后一次采样"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        reporter, captures = _make_reporter(data_dir, window=60, sample_every=2)
+        try:
+            for _ in range(6):
+                assert reporter.report_violation(_violation())
+            # 首次发生 + 第2、4次重复
+            assert len(captures) == 3
+            assert reporter._coalescer.flush() == 1
+            items = _drain(reporter)
+        finally:
+            reporter._queue.close()
+
+    assert [event['occurrence']['count'] for event, _ in items] == [1, 5]
+    assert [evidence for _, evidence in items] == [b'evidence-1', b'evidence-3']
+    assert reporter.get_stats()['dedup']['evidence_samples'] == 2
+
+
+def test_upload_volume_reduced():
+    """反复复制同一地址：服务器只收到首次事件和一个汇总事件，重复次数合计不变，证据只上传一次"""
+    backend = MockBackend()
+    backend.start()
+    with tempfile.TemporaryDirectory() as data_dir:
+        reporter, captures = _make_reporter(data_dir, window=0.5, backend=backend)
+        reporter.start()
+        try:
+            for _ in range(20):
+                assert reporter.report_violation(_violation())
+            assert _wait_for(lambda: len(backend.violations) == 2)
+            assert _wait_for(lambda: backend.evidence('e1') is not None)
+        finally:
+            reporter.stop()
+            backend.stop()
+
+    counts = [metadata['additionalData']['occurrence']['count'] for metadata in backend.violations]
+    assert counts == [1, 19]
+    assert len(captures) == 1
+    assert backend.evidence('e2') is None
+    assert len([request for request in backend.requests if request['method'] == 'PUT']) == 1
+
+
+def test_stop_flushes_open_windows():
+    """停止时未结束的窗口输出汇总事件，持久化后重启继续上报"""
+    backend = MockBackend()
+    backend.start()
+    with tempfile.TemporaryDirectory() as data_dir:
+        reporter, _ = _make_reporter(data_dir, window=60, backend=backend)
+        reporter.start()
+        for _ in range(3):
+            assert reporter.report_violation(_violation())
+        reporter.stop()
+        assert reporter.get_stats()['dedup']['summaries'] == 1
+
+        restarted, _ = _make_reporter(data_dir, window=60, backend=backend)
+        restarted.start()
+        try:
+            assert _wait_for(lambda: len(backend.violations) == 2)
+        finally:
+            restarted.stop()
+            backend.stop()
+
+    counts = [metadata['additionalData']['occurrence']['count'] for metadata in backend.violations]
+    assert counts == [1, 2]
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: 通过")
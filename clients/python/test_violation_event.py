@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试违规事件记录
+
+功能：
+- 验证元数据JSON生成后缓存，序号或证据变化时重新生成
+- 验证上报失败后重试复用上次的事件记录和元数据JSON，不重新序列化
+- 验证旧版事件字典和队列记录可以互相转换，内嵌的截图取出后单独保存
+- 验证批量上报的请求体直接拼接缓存的元数据
+"""
+
+import sys
+import json
+import base64
+import logging
+import tempfile
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from core.config import AppConfig
+from modules.violation import ViolationReporter
+from modules.violation_event import ViolationEvent
+from mock_server import MockBackend
+
+logger = logging.getLogger(__name__)
+
+KB = 1024
+
+
+def _legacy_dict(index: int, screenshot: bytes = None) -> dict:
+    """旧版剪贴板监控组装、上报器补充字段后的事件字典"""
+    address = f"0x{index:040x}"
+    content = f"请转账到 {address} 谢谢"
+    data = {
+        'clientId': 'TEST-CLIENT',
+        'violationType': 'BLOCKCHAIN_ADDRESS',
+        'violationContent': address,
+        'additionalData': {
+            'blockchainType': 'ETH',
+            'fullClipboardContent': content,
+            'detectionTime': f"2025-01-01T00:00:{index % 60:02d}",
+            'position': 6,
+            'contentLength': len(content),
+            'contentPreview': content,
+            'confidence': 'high',
+            'riskLevel': 'medium',
+            'detectionMethod': 'pattern_match',
+            'clipboardCleared': True,
+            'clearTime': f"2025-01-01T00:00:{index % 60:02d}",
+            'clearLatencyMs': 1.5
+        },
+        'client_id': 'TEST-CLIENT',
+        'report_time': f"2025-01-01T00:00:{index % 60:02d}",
+        'event_id': f"TEST-CLIENT_{index}_{index:08x}"
+    }
+    if screenshot is not None:
+        data['screenshot'] = {
+            'data': base64.b64encode(screenshot).decode('utf-8'),
+            'format': 'jpeg',
+            'size': len(screenshot),
+            'compressed_with_mozjpeg': False
+        }
+    return data
+
+
+def test_metadata_serialised_once():
+    """元数据JSON缓存后直接复用，序号或证据变化时重新生成"""
+    event = ViolationEvent.from_dict(_legacy_dict(1), 'TEST-CLIENT', '1.0.0')
+    event.set_sequence(7)
+    event.set_evidence(b'evidence')
+    body = event.metadata_json()
+    assert event.metadata_json() is body
+    event.set_sequence(7)
+    event.set_evidence(b'evidence')
+    assert event.metadata_json() is body
+
+    metadata = json.loads(body)
+    assert metadata['clientEventId'] == event.event_id and metadata['clientSeq'] == 7
+    assert metadata['evidence']['size'] == len(b'evidence')
+    assert metadata['additionalData']['clientVersion'] == '1.0.0'
+    assert metadata['additionalData']['blockchainType'] == 'ETH'
+
+    event.set_sequence(8)
+    assert json.loads(event.metadata_json())['clientSeq'] == 8
+    assert event.form_data() is event.form_data()
+
+
+def test_record_round_trip_and_inline_evidence():
+    """队列记录可以还原为相同的事件；旧版字典内嵌的截图单独保存，不进入队列记录"""
+    screenshot = b'\xff\xd8' + b'x' * 4 * KB
+    legacy = _legacy_dict(2, screenshot)
+    legacy['fullClipboardContent'] = '顶层写法的剪贴板内容'
+
+    event = ViolationEvent.from_dict(legacy, 'TEST-CLIENT')
+    assert ViolationEvent.inline_evidence(legacy) == screenshot
+    record = event.to_record()
+    assert 'screenshot' not in record
+    assert event.additional_data['clipboardContent'] == '顶层写法的剪贴板内容'
+    assert ViolationEvent.from_dict(record, 'OTHER').metadata() == event.metadata()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        reporter = ViolationReporter(AppConfig(), "TEST-CLIENT", logger, data_dir=Path(data_dir))
+        reporter._get_current_screenshot = lambda: b'should not capture'
+        try:
+            assert reporter.report_violation(_legacy_dict(3, screenshot))
+            item = reporter._queue.get(timeout=0)
+            assert item.load_evidence() == screenshot
+            assert 'screenshot' not in item.event
+            assert len(json.dumps(item.event)) < 2 * KB
+        finally:
+            reporter._queue.close()
+
+
+def test_batch_body_from_cached_metadata():
+    """批量上报的请求体由缓存的元数据拼接而成，服务器收到完整的事件"""
+    backend = MockBackend()
+    backend.start()
+    config = AppConfig()
+    config.server.api_base_url = backend.api_base_url
+    config.server.timeout = 5
+    config.server.max_retries = 1
+    config.violation_report.two_phase = True
+    config.violation_report.batch_size = 10
+    with tempfile.TemporaryDirectory() as data_dir:
+        reporter = ViolationReporter(config, "TEST-CLIENT", logger, data_dir=Path(data_dir))
+        reporter._get_current_screenshot = lambda: None
+        try:
+            for index in range(5):
+                assert reporter.report_violation(_legacy_dict(index))
+            items = reporter._queue.get_batch(10)
+            for item in items:
+                item.event = ViolationEvent.from_dict(item.event, "TEST-CLIENT")
+                item.event.set_sequence(item.seq)
+            reporter._send_batch(items)
+        finally:
+            reporter._queue.close()
+            backend.stop()
+
+    body = json.loads(backend.requests_to("/api/security/violations/batch")[0]['body'])
+    assert body['clientId'] == "TEST-CLIENT" and len(body['events']) == 5
+    assert [metadata['clientEventId'] for metadata in backend.violations] == [
+        f"TEST-CLIENT_{index}_{index:08x}" for index in range(5)]
+    assert [metadata['clientSeq'] for metadata in backend.violations] == [item.seq for item in items]
+
+
+def test_retry_reuses_serialised_metadata():
+    """上报失败后重试取回同一事件记录，请求体就是上次缓存的元数据JSON；确认后不再保留"""
+    config = AppConfig()
+    config.violation_report.two_phase = True
+    config.violation_queue.retry_delay = 0
+    with tempfile.TemporaryDirectory() as data_dir:
+        reporter = ViolationReporter(config, "TEST-CLIENT", logger, data_dir=Path(data_dir))
+        reporter._get_current_screenshot = lambda: None
+        bodies = []
+
+        def post_json(url, body, priority):
+            bodies.append(body)
+            # 第一次连接失败，之后成功
+            if len(bodies) == 1:
+                return None
+            return _Response({'data': {'eventId': 'server-1'}})
+
+        reporter._post_json = post_json
+        try:
+            assert reporter.report_violation(_legacy_dict(4))
+            for _ in range(2):
+                item = reporter._queue.get_batch(1, timeout=1)[0]
+                item.event = reporter._record(item)
+                reporter._process(item)
+
+            assert len(bodies) == 2 and bodies[1] is bodies[0]
+            assert json.loads(bodies[0])['clientSeq'] == item.seq
+            assert not reporter._retry_records and len(reporter._queue) == 0
+        finally:
+            reporter._queue.close()
+
+
+class _Response:
+    status_code = 200
+    text = ''
+
+    def __init__(self, payload):
+        self._payload = payload
+
+    def json(self):
+        return self._payload
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: 通过")
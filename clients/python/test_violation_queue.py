@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试违规事件持久化队列
+
+功能：
+- 验证入队/确认的耗时不随队列长度增长，证据单独保存为文件
+- 验证进程被强制终止后已提交的事件全部保留，数据库完整
+- 验证未确认的事件重启后重新投递，并标记为遗留事件
+- 验证按事件数、字节数和保存时长淘汰最早的事件（连同证据文件）
+- 验证上报器导入旧版JSON缓存，违规发生时截取的证据随事件入队
+- 验证失败的事件到期前不会被取出，取事件时等到最早的事件到期
+- 验证重试次数过多或过期的事件移入死信表
+- 验证服务器不可用时上报线程按退避重试，不重复截图，最终移入死信表
+- 验证入队时没有证据的事件只补截一次，补截的证据（或证据不可用标记）保存在队列中
+"""
+
+import sys
+import json
+import time
+import logging
+import socket
+import sqlite3
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from core.config import AppConfig
+from modules.violation import ViolationReporter
+from modules.violation_queue import ViolationQueue
+
+logger = logging.getLogger(__name__)
+
+KB = 1024
+
+
+def _open(tmp_dir: str, config: AppConfig = None) -> ViolationQueue:
+    return ViolationQueue(config or AppConfig(), logger, Path(tmp_dir) / "violations.db",
+                          Path(tmp_dir) / "evidence")
+
+
+def test_enqueue_and_ack_constant_cost():
+    """入队/确认的耗时与队列长度无关；证据不进入数据库"""
+    config = AppConfig()
+    config.violation_queue.max_events = 100000
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        queue = _open(tmp_dir, config)
+        evidence = b'\xff' * KB
+        batches = []
+        for _ in range(6):
+            started = time.perf_counter()
+            for n in range(500):
+                queue.put({'n': n, 'violationContent': '0x742d35Cc6634C0532925a3b8D4C9db96C4b4d8b6'}, evidence)
+            batches.append(time.perf_counter() - started)
+        assert len(queue) == 3000
+
+        # 队列增长到3000个事件后，每批500个的耗时没有随之增长
+        assert batches[-1] < batches[0] * 3 + 0.05
+        assert 3000 / sum(batches) > 300
+        assert len(list((Path(tmp_dir) / "evidence").iterdir())) == 3000
+        assert (Path(tmp_dir) / "violations.db").stat().st_size < 3000 * KB
+
+        started = time.perf_counter()
+        for _ in range(3000):
+            item = queue.get(timeout=0)
+            assert item.load_evidence() == evidence
+            queue.ack(item)
+        assert 3000 / (time.perf_counter() - started) > 300
+        assert len(queue) == 0 and queue.get(timeout=0) is None
+        assert not list((Path(tmp_dir) / "evidence").iterdir())
+        queue.close()
+
+
+def test_crash_recovery():
+    """写入过程中强制终止进程：已提交的事件全部保留，数据库完整，残留的临时文件被清理"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        code = (
+            "import sys, logging\n"
+            f"sys.path.insert(0, {str(Path(__file__).parent / 'src')!r})\n"
+            "from pathlib import Path\n"
+            "from core.config import AppConfig\n"
+            "from modules.violation_queue import ViolationQueue\n"
+            f"queue = ViolationQueue(AppConfig(), logging.getLogger('child'), Path({tmp_dir!r}) / 'violations.db',\n"
+            f"                       Path({tmp_dir!r}) / 'evidence')\n"
+            "n = 0\n"
+            "while True:\n"
+            "    queue.put({'n': n}, b'x' * 2048)\n"
+            "    print(n, flush=True)\n"
+            "    n += 1\n"
+        )
+        child = subprocess.Popen([sys.executable, '-c', code], stdout=subprocess.PIPE, text=True)
+        committed = -1
+        try:
+            for line in child.stdout:
+                committed = int(line)
+                if committed >= 300:
+                    break
+        finally:
+            child.kill()
+            child.wait()
+            child.stdout.close()
+        assert committed >= 300
+
+        conn = sqlite3.connect(str(Path(tmp_dir) / "violations.db"))
+        assert conn.execute("PRAGMA integrity_check").fetchone()[0] == 'ok'
+        conn.close()
+
+        queue = _open(tmp_dir)
+        try:
+            assert len(queue) >= committed + 1
+            seen = set()
+            while True:
+                item = queue.get(timeout=0)
+                if item is None:
+                    break
+                assert item.recovered and item.load_evidence() == b'x' * 2048
+                seen.add(item.event['n'])
+                queue.ack(item)
+            assert set(range(committed + 1)) <= seen
+            assert not list((Path(tmp_dir) / "evidence").iterdir())
+        finally:
+            queue.close()
+
+
+def test_unacked_events_redelivered():
+    """取出未确认的事件在重启后重新投递；上报失败的事件放回队列末尾"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        queue = _open(tmp_dir)
+        queue.put({'n': 1})
+        queue.put({'n': 2})
+        first = queue.get(timeout=0)
+        assert first.event == {'n': 1} and not first.recovered
+        queue.close()
+
+        queue = _open(tmp_dir)
+        try:
+            first = queue.get(timeout=0)
+            assert first.event == {'n': 1} and first.recovered
+            queue.release(first)
+            queue.put({'n': 3})
+
+            order = []
+            for _ in range(3):
+                item = queue.get(timeout=0)
+                order.append((item.event['n'], item.attempts))
+                queue.ack(item)
+            assert order == [(2, 0), (1, 1), (3, 0)]
+            assert queue.get(timeout=0.05) is None
+        finally:
+            queue.close()
+
+
+def test_retention_limits():
+    """超出事件数、字节数或保存时长时淘汰最早的事件和证据文件，正在投递的事件除外"""
+    config = AppConfig()
+    config.violation_queue.max_events = 3
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        queue = _open(tmp_dir, config)
+        try:
+            in_flight = None
+            for n in range(5):
+                queue.put({'n': n}, b'e' * KB)
+                if n == 0:
+                    in_flight = queue.get(timeout=0)
+            assert len(queue) == 3
+            remaining = [queue.get(timeout=0).event['n'] for _ in range(2)]
+            assert remaining == [3, 4]
+            assert len(list((Path(tmp_dir) / "evidence").iterdir())) == 3
+            assert in_flight.load_evidence() == b'e' * KB
+            assert queue.get_stats()['evicted'] == 2
+
+            config.violation_queue.max_events = 1000
+            config.violation_queue.max_bytes = 10 * KB
+            for n in range(5):
+                queue.put({'n': n}, b'e' * 4 * KB)
+            assert queue.get_stats()['bytes'] <= 10 * KB
+
+            config.violation_queue.max_age = 0.2
+            time.sleep(0.3)
+            queue.put({'n': 'fresh'})
+            assert queue.get_stats()['expired'] >= 1
+            assert queue.get(timeout=0).event == {'n': 'fresh'}
+        finally:
+            queue.close()
+
+
+def test_reporter_uses_durable_queue():
+    """上报器导入旧版缓存；新事件连同违规时的截图持久化，重启后仍在队列中"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        legacy_cache = Path(tmp_dir) / "violation_cache.json"
+        legacy_cache.write_text(json.dumps([{'event_id': 'old-1'}, {'event_id': 'old-2'}]), encoding='utf-8')
+
+        reporter = ViolationReporter(AppConfig(), "TEST-CLIENT", logger, data_dir=Path(tmp_dir))
+        reporter._get_current_screenshot = lambda: b'screen at violation time'
+        assert not legacy_cache.exists()
+        assert reporter.get_queue_size() == 2
+        assert reporter.report_violation({'violationType': 'BLOCKCHAIN_ADDRESS'})
+        reporter._queue.close()
+
+        restarted = ViolationReporter(AppConfig(), "TEST-CLIENT", logger, data_dir=Path(tmp_dir))
+        try:
+            items = [restarted._queue.get(timeout=0) for _ in range(3)]
+            assert [item.event['event_id'] for item in items[:2]] == ['old-1', 'old-2']
+            assert all(item.recovered for item in items)
+            assert items[2].load_evidence() == b'screen at violation time'
+            assert restarted.get_stats()['queue']['recovered'] == 3
+        finally:
+            restarted._queue.close()
+
+
+def test_delayed_retry_waits_until_due():
+    """延迟重试的事件到期前不会被取出；get 等到事件到期，新事件入队时立即返回"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        queue = _open(tmp_dir)
+        try:
+            queue.put({'n': 1})
+            queue.release(queue.get(timeout=0), delay=0.4)
+            assert queue.get(timeout=0) is None
+            assert 0 < queue.get_stats()['next_due_in'] <= 0.4
+
+            started = time.monotonic()
+            item = queue.get(timeout=2)
+            assert 0.3 <= time.monotonic() - started < 1.0
+            assert item.event == {'n': 1} and item.attempts == 1
+
+            queue.release(item, delay=60)
+            threading.Timer(0.2, queue.put, args=({'n': 2},)).start()
+            started = time.monotonic()
+            assert queue.get(timeout=2).event == {'n': 2}
+            assert time.monotonic() - started < 1.0
+
+            # 超时和被中断时都返回空列表
+            assert queue.get_batch(5, timeout=0) == []
+            queue.interrupt()
+            assert queue.get_batch(5) == []
+        finally:
+            queue.close()
+
+
+def test_dead_letters():
+    """重试次数过多或过期的事件移入死信表（证据删除），死信表按容量保留最新的"""
+    config = AppConfig()
+    config.violation_queue.dead_letter_max = 2
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        queue = _open(tmp_dir, config)
+        try:
+            for n in range(3):
+                queue.put({'n': n}, b'e' * KB)
+                queue.dead_letter(queue.get(timeout=0), 'max_attempts')
+            assert len(queue) == 0
+            assert not list((Path(tmp_dir) / "evidence").iterdir())
+            assert [entry['event']['n'] for entry in queue.dead_letters()] == [2, 1]
+
+            config.violation_queue.max_age = 0.1
+            queue.put({'n': 'stale'})
+            time.sleep(0.2)
+            assert queue.get(timeout=0) is None
+            dead = queue.dead_letters(limit=1)[0]
+            assert dead['event'] == {'n': 'stale'} and dead['reason'] == 'expired'
+            stats = queue.get_stats()
+            assert stats['dead_lettered'] == 4 and stats['dead_letters'] == 2
+        finally:
+            queue.close()
+
+
+def test_reporter_backs_off_during_outage():
+    """服务器不可用时按指数退避重试而不是立即重试，证据不重复截取，超过次数后移入死信表"""
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+
+    config = AppConfig()
+    config.server.api_base_url = f"http://127.0.0.1:{port}/api"
+    config.server.timeout = 1
+    config.server.max_retries = 1
+    config.violation_queue.retry_delay = 0.1
+    config.violation_queue.max_attempts = 4
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        reporter = ViolationReporter(config, "TEST-CLIENT", logger, data_dir=Path(tmp_dir))
+        captures = []
+        attempts = []
+        reporter._get_current_screenshot = lambda: captures.append(1) or b'evidence'
+        send = reporter._send_violation_report
+        reporter._send_violation_report = lambda *args, **kwargs: (
+            attempts.append(time.monotonic()) or send(*args, **kwargs))
+
+        reporter.start()
+        try:
+            assert reporter.report_violation({'violationType': 'BLOCKCHAIN_ADDRESS'})
+            deadline = time.monotonic() + 5
+            while not reporter._queue.dead_letters() and time.monotonic() < deadline:
+                time.sleep(0.02)
+            dead_letters = reporter._queue.dead_letters()
+        finally:
+            started = time.monotonic()
+            reporter.stop()
+            stop_seconds = time.monotonic() - started
+
+    assert len(dead_letters) == 1 and dead_letters[0]['reason'] == 'max_attempts'
+    assert len(attempts) == 4 and len(captures) == 1
+    # 重试间隔按 0.1、0.2、0.4 秒递增（含抖动）
+    gaps = [later - earlier for earlier, later in zip(attempts, attempts[1:])]
+    assert gaps[0] >= 0.09 and gaps[2] >= 0.36 and gaps[2] > gaps[0]
+    assert stop_seconds < 1.0
+
+
+def test_fallback_evidence_attached_once():
+    """入队时没有证据的事件：补截的证据保存到队列，补截失败时记录证据不可用，重试时都不再截图"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        queue = _open(tmp_dir)
+        try:
+            queue.put({'n': 'late'})
+            queue.put({'n': 'missing'})
+            late, missing = queue.get_batch(2, timeout=0)
+            assert not late.evidence_resolved and not missing.evidence_resolved
+
+            queue.attach_evidence(late, b'l' * KB)
+            queue.attach_evidence(missing, None)
+            assert late.load_evidence() == b'l' * KB and missing.evidence_resolved
+            assert queue.get_stats()['bytes'] > KB
+
+            # 已有证据记录的事件不再补充
+            queue.attach_evidence(late, b'other')
+            queue.release(late)
+            queue.release(missing)
+            late, missing = queue.get_batch(2, timeout=0)
+            assert late.evidence_resolved and late.load_evidence() == b'l' * KB
+            assert missing.evidence_resolved and missing.load_evidence() is None
+            assert len(list((Path(tmp_dir) / "evidence").iterdir())) == 1
+
+            queue.ack(late)
+            queue.ack(missing)
+            assert not list((Path(tmp_dir) / "evidence").iterdir())
+        finally:
+            queue.close()
+
+    # 上报线程：违规时截图失败，首次发送前补截一次，之后的退避重试使用保存的证据
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    config = AppConfig()
+    config.server.api_base_url = f"http://127.0.0.1:{port}/api"
+    config.server.timeout = 1
+    config.server.max_retries = 1
+    config.violation_queue.retry_delay = 0.05
+    config.violation_queue.max_attempts = 3
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        reporter = ViolationReporter(config, "TEST-CLIENT", logger, data_dir=Path(tmp_dir))
+        screens = [None, b'screen after detection']
+        captures = []
+        reporter._get_current_screenshot = lambda: captures.append(1) or (screens.pop(0) if screens else b'retry')
+        sent = []
+        send = reporter._send_violation_report
+        reporter._send_violation_report = lambda event, evidence=None, **kwargs: (
+            sent.append(evidence) or send(event, evidence, **kwargs))
+
+        reporter.start()
+        try:
+            assert reporter.report_violation({'violationType': 'BLOCKCHAIN_ADDRESS'})
+            deadline = time.monotonic() + 5
+            while not reporter._queue.dead_letters() and time.monotonic() < deadline:
+                time.sleep(0.02)
+        finally:
+            reporter.stop()
+
+    assert len(captures) == 2
+    assert sent == [b'screen after detection'] * 3
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: 通过")
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试剪贴板违规异步处理
+
+功能：
+- 验证证据截图和上报在工作线程中执行，不阻塞剪贴板监听
+- 验证同一次变化中多个违规地址只清空一次剪贴板
+- 验证清空耗时被统计并随心跳元数据上报
+- 验证上报队列满时丢弃最早的事件
+- 验证批量白名单结果按规范化地址和链匹配，不依赖返回同一对象
+- 验证流式扫描按分块批量检查白名单
+"""
+
+import sys
+import time
+import logging
+import threading
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from core.config import AppConfig
+from modules.clipboard import ClipboardMonitor
+from modules.clipboard_watcher import MemoryClipboardWatcher
+from modules.screenshot import ScreenshotManager
+
+logger = logging.getLogger(__name__)
+
+ETH_ADDRESS = "0x742d35Cc6634C0532925a3b8D4C9db96C4b4d8b6"
+BTC_ADDRESS = "1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNa"
+TRX_ADDRESS = "TLyqzVGLV1srkB7dToTAEqgDSfPtXRJZYH"
+
+
+class _Reporter:
+    def __init__(self):
+        self.reported = []
+
+    def report_violation(self, violation_data, evidence=None):
+        self.reported.append(violation_data)
+        return True
+
+
+def _wait_until(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+def _make_monitor(screenshot_delay=0.0, config=None):
+    watcher = MemoryClipboardWatcher(logger)
+    reporter = _Reporter()
+    monitor = ClipboardMonitor(config or AppConfig(), "test-client", logger, None, reporter,
+                               clipboard_watcher=watcher)
+
+    def slow_screenshot():
+        time.sleep(screenshot_delay)
+        return None
+
+    monitor._capture_violation_screenshot = slow_screenshot
+    return monitor, watcher, reporter
+
+
+class _CopyingWhitelist:
+    """返回规范化副本（或只返回地址字符串）的白名单"""
+
+    def __init__(self, strings=False):
+        self.strings = strings
+
+    def validate_addresses(self, addresses):
+        whitelisted = [item for item in addresses if item['address'] == ETH_ADDRESS]
+        if self.strings:
+            return {'whitelisted': [f" {item['address'].lower()} " for item in whitelisted]}
+        return {'whitelisted': [dict(item, address=item['address'].lower(), type=item['type'].lower())
+                                for item in whitelisted]}
+
+
+def test_batch_whitelist_matched_by_address():
+    """批量白名单结果是副本或地址字符串时仍按地址和链匹配"""
+    addresses = [{'address': ETH_ADDRESS, 'type': 'ETH'}, {'address': BTC_ADDRESS, 'type': 'BTC'},
+                 {'address': ETH_ADDRESS, 'type': 'BSC'}]
+    for whitelist, expected in ((_CopyingWhitelist(), [True, False, True]),
+                                (_CopyingWhitelist(strings=True), [True, False, True])):
+        monitor = ClipboardMonitor(AppConfig(), "test-client", logger, whitelist, _Reporter(),
+                                   clipboard_watcher=MemoryClipboardWatcher(logger))
+        assert monitor._check_whitelist_batch(addresses) == expected
+
+    # 白名单只放行以太坊链上的该地址时，其他链上的同一地址不放行
+    class _ChainWhitelist:
+        def validate_addresses(self, addresses):
+            return {'whitelisted': [dict(item) for item in addresses if item['type'] == 'ETH']}
+
+    monitor = ClipboardMonitor(AppConfig(), "test-client", logger, _ChainWhitelist(), _Reporter(),
+                               clipboard_watcher=MemoryClipboardWatcher(logger))
+    assert monitor._check_whitelist_batch(addresses) == [True, False, False]
+
+
+def test_streaming_scan_checks_whitelist_per_chunk():
+    """流式扫描每个分块查询一次批量白名单，不逐个地址查询"""
+
+    class _RecordingWhitelist:
+        def __init__(self):
+            self.batches = []
+
+        def validate_addresses(self, addresses):
+            self.batches.append([item['address'] for item in addresses])
+            return {'whitelisted': [item for item in addresses if item['address'] == ETH_ADDRESS]}
+
+        def is_address_whitelisted(self, address, blockchain_type):
+            raise AssertionError("流式扫描不应逐个地址查询白名单")
+
+    config = AppConfig()
+    config.clipboard.streaming_scan = True
+    config.clipboard.scan_chunk_size = 1024
+    config.clipboard.scan_chunk_overlap = 256
+    config.clipboard.stop_on_first_violation = False
+    whitelist = _RecordingWhitelist()
+    monitor = ClipboardMonitor(config, "test-client", logger, whitelist, _Reporter(),
+                               clipboard_watcher=MemoryClipboardWatcher(logger))
+    handled = []
+    monitor._handle_violation = lambda content, addr_info: handled.append(addr_info['address'])
+
+    content = f"{ETH_ADDRESS} {BTC_ADDRESS}\n" + "季度报表 合计 备注\n" * 200 + TRX_ADDRESS
+    monitor._detect_blockchain_addresses(content)
+
+    assert [sorted(batch) for batch in whitelist.batches] == [sorted([ETH_ADDRESS, BTC_ADDRESS]), [TRX_ADDRESS]]
+    assert sorted(handled) == sorted([BTC_ADDRESS, TRX_ADDRESS])
+
+
+def test_slow_evidence_does_not_block_clearing():
+    """证据截图很慢时，后续剪贴板变化仍被立即检测和清空"""
+    monitor, watcher, reporter = _make_monitor(screenshot_delay=0.5)
+    thread = threading.Thread(target=monitor.start, daemon=True)
+    thread.start()
+    try:
+        assert _wait_until(lambda: watcher.read_count >= 1)
+        watcher.set_text(f"地址一 {ETH_ADDRESS}")
+        assert _wait_until(lambda: watcher.clear_count == 1)
+        watcher.set_text(f"地址二 {BTC_ADDRESS}")
+        assert _wait_until(lambda: watcher.clear_count == 2, timeout=0.4)
+
+        # 两次清空都已完成时，第一份报告仍在截图
+        assert len(reporter.reported) == 0
+        assert _wait_until(lambda: len(reporter.reported) == 2)
+    finally:
+        monitor.stop()
+        thread.join(timeout=3)
+
+    assert [item['violationContent'] for item in reporter.reported] == [ETH_ADDRESS, BTC_ADDRESS]
+
+
+def test_clear_once_and_latency_exported():
+    """同一内容中多个违规地址只清空一次，清空耗时写入统计和上报数据"""
+    monitor, watcher, reporter = _make_monitor()
+    thread = threading.Thread(target=monitor.start, daemon=True)
+    thread.start()
+    try:
+        assert _wait_until(lambda: watcher.read_count >= 1)
+        watcher.set_text(f"{ETH_ADDRESS}\n{BTC_ADDRESS}")
+        assert _wait_until(lambda: len(reporter.reported) == 2)
+    finally:
+        monitor.stop()
+        thread.join(timeout=3)
+
+    assert watcher.clear_count == 1
+    stats = monitor.get_detection_stats()
+    assert stats['violations_detected'] == 2
+    assert stats['clear_latency_ms']['count'] == 1
+
+    latency = reporter.reported[0]['additionalData']['clearLatencyMs']
+    assert latency is not None and latency >= 0
+    assert monitor.get_performance_metrics()['clearLatencyMs']['count'] == 1
+
+
+def test_full_queue_drops_oldest():
+    """上报队列已满时丢弃最早的事件，不阻塞调用方"""
+    config = AppConfig()
+    config.clipboard.violation_queue_size = 2
+    monitor, _, _ = _make_monitor(config=config)
+
+    # 模拟工作线程繁忙：有工作线程但尚未取走任务
+    monitor._violation_worker = threading.current_thread()
+    for index in range(3):
+        monitor._enqueue_violation({'addr_info': {'address': f"addr-{index}"}})
+
+    assert monitor.get_detection_stats()['violations_dropped'] == 1
+    remaining = [monitor._violation_queue.get_nowait()['addr_info']['address'] for _ in range(2)]
+    assert remaining == ["addr-1", "addr-2"]
+
+
+def test_metrics_included_in_heartbeat_metadata():
+    """注册的性能指标出现在心跳元数据中，失败的提供者被忽略"""
+    manager = ScreenshotManager(AppConfig(), logger, None)
+    manager.register_metrics_provider('clipboard', lambda: {'clearLatencyMs': {'count': 0}})
+    manager.register_metrics_provider('broken', lambda: 1 / 0)
+
+    assert manager._collect_metrics() == {'clipboard': {'clearLatencyMs': {'count': 0}}}
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: 通过")
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试白名单增量同步
+
+功能：
+- 验证条件请求：白名单未变化时服务器返回304，缓存文件不重写
+- 验证按版本应用增量（新增/删除地址）
+- 验证重启后从缓存恢复版本和ETag
+- 验证旧版服务器（无增量）时按完整列表同步
+- 验证同步请求期间的本地修改不被增量覆盖，被替换的紧凑存储文件被删除
+"""
+
+import sys
+import logging
+import tempfile
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from core.config import AppConfig
+from modules.http_client import HttpClient
+from modules.whitelist import WhitelistManager
+from mock_server import MockBackend
+
+logger = logging.getLogger(__name__)
+
+WHITELIST_PATH = '/api/whitelist/addresses/active'
+
+ETH_ADDRESS = "0x742d35Cc6634C0532925a3b8D4C9db96C4b4d8b6"
+BTC_ADDRESS = "1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNa"
+TRX_ADDRESS = "TLyqzVGLV1srkB7dToTAEqgDSfPtXRJZYH"
+LOCAL_ADDRESS = "0x5aAeb6053F3E94C9b9A09f33669435E7Ef1BeAed"
+
+
+def _make_manager(api_base_url: str, cache_dir: str, store: str = "memory") -> WhitelistManager:
+    config = AppConfig()
+    config.server.api_base_url = api_base_url
+    config.server.timeout = 5
+    manager = WhitelistManager(config, logger)
+    # 先指向临时缓存再切换存储方式，避免迁移仓库中的缓存文件
+    manager._cache_file = Path(cache_dir) / "whitelist.json"
+    config.whitelist.store = store
+    manager._compact = store == "compact"
+    manager._publish(frozenset(), 0)
+    manager._etag = None
+    manager._load_cache()
+    return manager
+
+
+def test_not_modified_skips_cache_write():
+    """白名单未变化时返回304，缓存只写一次"""
+    backend = MockBackend()
+    backend.set_whitelist([ETH_ADDRESS, BTC_ADDRESS])
+    backend.start()
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            manager = _make_manager(backend.api_base_url, cache_dir)
+
+            assert manager.force_sync()
+            cache_content = manager._cache_file.read_bytes()
+            assert manager.get_snapshot().version == backend.whitelist_version
+
+            for _ in range(3):
+                assert manager.force_sync()
+
+            requests = backend.requests_to(WHITELIST_PATH)
+            assert 'If-None-Match' not in requests[0]['headers']
+            assert all(request['headers'].get('If-None-Match') == f'"{backend.whitelist_version}"'
+                       for request in requests[1:])
+
+            stats = manager.get_stats()
+            assert stats['not_modified'] == 3
+            assert stats['cache_writes'] == 1
+            assert manager._cache_file.read_bytes() == cache_content
+            assert manager.is_whitelisted(ETH_ADDRESS)
+    finally:
+        backend.stop()
+
+
+def test_delta_applied_by_version():
+    """服务器白名单变化后按版本拉取增量"""
+    backend = MockBackend()
+    first_version = backend.set_whitelist([ETH_ADDRESS, BTC_ADDRESS])
+    backend.start()
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            manager = _make_manager(backend.api_base_url, cache_dir)
+            assert manager.force_sync()
+
+            backend.set_whitelist([ETH_ADDRESS, TRX_ADDRESS])
+            assert manager.force_sync()
+
+            last_request = backend.requests_to(WHITELIST_PATH)[-1]
+            assert last_request['query']['sinceVersion'] == first_version
+
+            stats = manager.get_stats()
+            assert stats['delta_syncs'] == 1
+            assert stats['full_syncs'] == 1
+            assert stats['cache_writes'] == 2
+
+            assert manager.is_whitelisted(TRX_ADDRESS)
+            assert not manager.is_whitelisted(BTC_ADDRESS)
+            assert manager.get_snapshot().version == backend.whitelist_version
+    finally:
+        backend.stop()
+
+
+def test_restart_resumes_from_cached_version():
+    """重启后从缓存恢复版本和ETag，首次同步即为304"""
+    backend = MockBackend()
+    backend.set_whitelist([ETH_ADDRESS])
+    backend.start()
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            assert _make_manager(backend.api_base_url, cache_dir).force_sync()
+
+            restarted = _make_manager(backend.api_base_url, cache_dir)
+            assert restarted.get_snapshot().version == backend.whitelist_version
+            assert restarted.is_whitelisted(ETH_ADDRESS)
+
+            assert restarted.force_sync()
+            assert restarted.get_stats()['not_modified'] == 1
+            assert restarted.get_stats()['cache_writes'] == 0
+    finally:
+        backend.stop()
+
+
+def test_full_list_fallback_without_delta():
+    """服务器不支持增量时按完整列表同步"""
+    backend = MockBackend()
+    backend.whitelist_delta_enabled = False
+    backend.set_whitelist([ETH_ADDRESS, BTC_ADDRESS])
+    backend.start()
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            manager = _make_manager(backend.api_base_url, cache_dir)
+            assert manager.force_sync()
+
+            backend.set_whitelist([BTC_ADDRESS])
+            assert manager.force_sync()
+
+            assert manager.get_stats()['full_syncs'] == 2
+            assert manager.get_stats()['delta_syncs'] == 0
+            assert not manager.is_whitelisted(ETH_ADDRESS)
+            assert manager.is_whitelisted(BTC_ADDRESS)
+    finally:
+        backend.stop()
+
+
+def test_local_change_during_delta_sync_kept():
+    """同步请求期间本地添加的地址不被增量覆盖；之后拉取完整列表，被替换的紧凑存储文件都被删除"""
+    for store in ("memory", "compact"):
+        backend = MockBackend()
+        backend.set_whitelist([ETH_ADDRESS, BTC_ADDRESS])
+        backend.start()
+        try:
+            with tempfile.TemporaryDirectory() as cache_dir:
+                manager = _make_manager(backend.api_base_url, cache_dir, store)
+                assert manager.force_sync()
+
+                backend.set_whitelist([ETH_ADDRESS, TRX_ADDRESS])
+                request = manager._request_whitelist
+
+                def request_then_edit(*args, **kwargs):
+                    response = request(*args, **kwargs)
+                    assert manager.add_address(LOCAL_ADDRESS)
+                    return response
+
+                manager._request_whitelist = request_then_edit
+                assert manager.force_sync()
+                assert manager.get_stats()['delta_syncs'] == 1
+                assert manager.is_whitelisted(TRX_ADDRESS) and not manager.is_whitelisted(BTC_ADDRESS)
+                assert manager.is_whitelisted(LOCAL_ADDRESS)
+                assert manager.get_snapshot().version is None and manager._etag is None
+                assert len(list(Path(cache_dir).glob("whitelist-*.bin"))) == (1 if store == "compact" else 0)
+
+                # 与服务器版本不一致，下次同步拉取完整列表
+                manager._request_whitelist = request
+                assert manager.force_sync()
+                assert 'sinceVersion' not in backend.requests_to(WHITELIST_PATH)[-1]['query']
+                assert manager.get_snapshot().version == backend.whitelist_version
+                assert len(list(Path(cache_dir).glob("whitelist-*.bin"))) == (1 if store == "compact" else 0)
+        finally:
+            backend.stop()
+
+
+def test_http_client_does_not_sync_whitelist():
+    """白名单只由白名单管理器同步"""
+    client = HttpClient(AppConfig(), "test-client", logger)
+    assert not hasattr(client, '_sync_whitelist')
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: 通过")
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试按链规范化的白名单索引
+
+功能：
+- 验证地址规范化：EVM不区分大小写，base58区分大小写
+- 验证限定链类型的条目、前缀条目和通配条目
+- 验证批量校验按检测结果的链类型检查
+- 验证紧凑存储下的分区条目和前缀条目
+"""
+
+import sys
+import json
+import logging
+import tempfile
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from core.config import AppConfig
+from modules.whitelist import WhitelistManager
+from modules.whitelist_index import PatternIndex, PrefixTrie, normalize_address, normalize_entry
+from mock_server import MockBackend
+
+logger = logging.getLogger(__name__)
+
+ETH_ADDRESS = "0x742d35Cc6634C0532925a3b8D4C9db96C4b4d8b6"
+TRX_ADDRESS = "TLyqzVGLV1srkB7dToTAEqgDSfPtXRJZYH"
+BTC_BECH32 = "bc1qar0srrr7xfkvy5l643lydnw9re59gtzzwf5mdq"
+
+
+def _make_manager(entries, store: str = 'memory', cache_dir: str = None) -> WhitelistManager:
+    config = AppConfig()
+    manager = WhitelistManager(config, logger)
+    if cache_dir:
+        manager._cache_file = Path(cache_dir) / "whitelist.json"
+    config.whitelist.store = store
+    manager._compact = store == 'compact'
+    manager._publish(manager._normalize_all(entries), 0)
+    return manager
+
+
+def test_normalization_by_address_format():
+    """EVM和单一大小写编码转小写，大小写混合的base58原样保留"""
+    assert normalize_address(ETH_ADDRESS) == ETH_ADDRESS.lower()
+    assert normalize_address(BTC_BECH32.upper()) == BTC_BECH32
+    assert normalize_address(f" {TRX_ADDRESS} ") == TRX_ADDRESS
+    assert normalize_entry(f"TRX:{TRX_ADDRESS}") == f"TRX:{TRX_ADDRESS}"
+    assert normalize_entry("0xABCDEF*") == "0xabcdef*"
+    assert normalize_entry("   ") is None
+
+
+def test_base58_is_case_sensitive():
+    """base58地址区分大小写，EVM地址不区分"""
+    manager = _make_manager([ETH_ADDRESS, TRX_ADDRESS])
+    assert manager.is_whitelisted(ETH_ADDRESS.upper().replace('0X', '0x'))
+    assert manager.is_whitelisted(TRX_ADDRESS)
+    assert not manager.is_whitelisted(TRX_ADDRESS.lower())
+    assert not manager.is_whitelisted(TRX_ADDRESS.swapcase())
+
+
+def test_chain_qualified_entries():
+    """限定链类型的条目只对该链类型的检测结果生效"""
+    manager = _make_manager([f"ETC:{ETH_ADDRESS}"])
+    assert manager.is_address_whitelisted(ETH_ADDRESS, 'ETC')
+    assert not manager.is_address_whitelisted(ETH_ADDRESS, 'ETH')
+    assert not manager.is_whitelisted(ETH_ADDRESS)
+
+
+def test_prefix_and_pattern_entries():
+    """前缀条目通过前缀树匹配，通配条目按正则匹配"""
+    manager = _make_manager(["0x742D35*", "TRX:TLyqz*", "0x0000????????????????????????????????dead"])
+    assert manager.is_whitelisted(ETH_ADDRESS)
+    assert manager.is_address_whitelisted(TRX_ADDRESS, 'TRX')
+    assert not manager.is_whitelisted(TRX_ADDRESS)
+    assert not manager.is_address_whitelisted("TLYQZVGLV1srkB7dToTAEqgDSfPtXRJZYH", 'TRX')
+    assert manager.is_whitelisted("0x0000" + "1" * 32 + "DEAD")
+    assert not manager.is_whitelisted("0x0001" + "1" * 32 + "dead")
+
+    trie = PrefixTrie(["ab", "abc", "x"])
+    assert len(trie) == 3
+    assert trie.match("abz") and trie.match("x1") and not trie.match("a")
+    assert PatternIndex(["*"]).match("anything")
+
+
+def test_batch_validation_uses_chain_types():
+    """批量校验传入检测结果时按各自链类型检查，结果保留原始元素"""
+    manager = _make_manager([f"TRX:{TRX_ADDRESS}", ETH_ADDRESS])
+    candidates = [
+        {'address': TRX_ADDRESS, 'type': 'TRX'},
+        {'address': TRX_ADDRESS, 'type': 'UNKNOWN_CRYPTO'},
+        {'address': ETH_ADDRESS.lower(), 'type': 'ETH'},
+    ]
+    result = manager.validate_addresses(candidates)
+    assert result['whitelisted'] == [candidates[0], candidates[2]]
+    assert result['violations'] == [candidates[1]]
+
+    assert manager.validate_addresses([ETH_ADDRESS, TRX_ADDRESS])['violations'] == [TRX_ADDRESS]
+
+
+def test_add_and_remove_prefix_entry():
+    """本地增删前缀条目"""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        manager = _make_manager([], cache_dir=cache_dir)
+        assert manager.add_address("TRX:TLyqz*")
+        assert manager.is_address_whitelisted(TRX_ADDRESS, 'TRX')
+        assert manager.remove_address("TRX:TLyqz*")
+        assert not manager.is_address_whitelisted(TRX_ADDRESS, 'TRX')
+
+
+def test_compact_store_with_chain_and_prefix_entries():
+    """紧凑存储：限定链类型的条目进入对应分区，前缀条目写入元数据，重启后仍有效"""
+    backend = MockBackend()
+    backend.set_whitelist([ETH_ADDRESS, f"TRX:{TRX_ADDRESS}", "0xdead*"])
+    backend.start()
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            manager = _make_manager([], store='compact', cache_dir=cache_dir)
+            manager.config.server.api_base_url = backend.api_base_url
+            assert manager.force_sync()
+
+            store = manager.get_snapshot().addresses
+            assert store.partitions == {'': 1, 'TRX': 1}
+            assert store.metadata['patterns'] == ["0xdead*"]
+            assert manager.is_address_whitelisted(TRX_ADDRESS, 'TRX')
+            assert not manager.is_whitelisted(TRX_ADDRESS)
+            assert manager.is_whitelisted("0xDEAD" + "0" * 36)
+
+            backend.set_whitelist([ETH_ADDRESS, "0xbeef*"])
+            assert manager.force_sync()
+            assert manager.get_stats()['delta_syncs'] == 1
+            assert not manager.is_whitelisted("0xdead" + "0" * 36)
+            assert manager.is_whitelisted("0xbeef" + "0" * 36)
+            assert not manager.is_address_whitelisted(TRX_ADDRESS, 'TRX')
+
+            restarted = _make_manager([], store='compact', cache_dir=cache_dir)
+            restarted._load_cache()
+            assert restarted.is_whitelisted("0xbeef" + "0" * 36)
+            assert restarted.is_whitelisted(ETH_ADDRESS)
+    finally:
+        backend.stop()
+
+
+def test_legacy_cache_forces_full_sync():
+    """旧格式缓存（全部小写）仍可加载，但不沿用版本号，下次同步拉取完整列表"""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache_file = Path(cache_dir) / "whitelist.json"
+        cache_file.write_text(json.dumps({
+            'addresses': [ETH_ADDRESS.lower()], 'last_update': 0, 'whitelist_version': 'v1', 'etag': '"v1"'
+        }), encoding='utf-8')
+
+        manager = WhitelistManager(AppConfig(), logger)
+        manager._cache_file = cache_file
+        manager._load_cache()
+        assert manager.is_whitelisted(ETH_ADDRESS)
+        assert manager.get_snapshot().version is None
+        assert manager._etag is None
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: 通过")
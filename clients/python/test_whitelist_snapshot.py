@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试白名单写时复制快照
+
+功能：
+- 验证同步进行中（网络请求未返回）白名单查询不被阻塞
+- 验证新白名单以整体替换的方式发布
+- 验证增删地址与批量校验基于快照工作
+"""
+
+import sys
+import time
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from unittest import mock
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from core.config import AppConfig
+from modules import whitelist as whitelist_module
+from modules.whitelist import WhitelistManager
+
+logger = logging.getLogger(__name__)
+
+OLD_ADDRESS = "0x742d35cc6634c0532925a3b8d4c9db96c4b4d8b6"
+NEW_ADDRESS = "1A1zP1eP5QGefi2DMPTfTL5SLmv7DivfNa"
+
+
+class _SlowResponse:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, addresses):
+        self._addresses = addresses
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {'code': 200, 'data': {'addresses': self._addresses}}
+
+
+def _make_manager(tmp_dir):
+    manager = WhitelistManager(AppConfig(), logger)
+    manager._cache_file = Path(tmp_dir) / "whitelist.json"
+    manager._publish(frozenset([OLD_ADDRESS]), time.time())
+    return manager
+
+
+def test_reads_not_blocked_by_slow_sync():
+    """同步请求耗时1秒期间，查询仍立即返回旧快照的结果"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        manager = _make_manager(tmp_dir)
+        request_started = threading.Event()
+
+        def slow_get(*args, **kwargs):
+            request_started.set()
+            time.sleep(1)
+            return _SlowResponse([OLD_ADDRESS, NEW_ADDRESS])
+
+        with mock.patch.object(whitelist_module.requests, 'get', side_effect=slow_get):
+            sync_thread = threading.Thread(target=manager.force_sync)
+            sync_thread.start()
+            assert request_started.wait(2)
+
+            started = time.perf_counter()
+            for _ in range(1000):
+                assert manager.is_whitelisted(OLD_ADDRESS)
+                assert not manager.is_whitelisted(NEW_ADDRESS)
+            assert time.perf_counter() - started < 0.5
+
+            sync_thread.join(timeout=5)
+
+        assert manager.is_whitelisted(NEW_ADDRESS)
+        assert manager.get_stats()['successful_syncs'] == 1
+        assert (Path(tmp_dir) / "whitelist.json").exists()
+
+
+def test_snapshot_replaced_not_mutated():
+    """同步发布新快照，已取得的旧快照保持不变"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        manager = _make_manager(tmp_dir)
+        before = manager.get_snapshot()
+
+        with mock.patch.object(whitelist_module.requests, 'get', return_value=_SlowResponse([NEW_ADDRESS])):
+            assert manager.force_sync()
+
+        after = manager.get_snapshot()
+        assert after is not before
+        assert before.addresses == frozenset([OLD_ADDRESS])
+        assert after.addresses == frozenset([NEW_ADDRESS])
+        assert after.last_update >= before.last_update
+
+
+def test_empty_server_response_keeps_whitelist():
+    """服务器未返回地址时保留原有白名单"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        manager = _make_manager(tmp_dir)
+        with mock.patch.object(whitelist_module.requests, 'get', return_value=_SlowResponse([])):
+            assert manager.force_sync()
+        assert manager.is_whitelisted(OLD_ADDRESS)
+
+
+def test_add_remove_and_batch_validation():
+    """增删地址发布新快照，批量校验返回正确分类"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        manager = _make_manager(tmp_dir)
+        snapshot = manager.get_snapshot()
+
+        assert manager.add_address(NEW_ADDRESS)
+        assert manager.is_whitelisted(NEW_ADDRESS)
+        assert NEW_ADDRESS.lower() not in snapshot.addresses
+
+        result = manager.validate_addresses([OLD_ADDRESS, NEW_ADDRESS, "TLyqzVGLV1srkB7dToTAEqgDSfPtXRJZYH"])
+        assert result['whitelisted'] == [OLD_ADDRESS, NEW_ADDRESS]
+        assert result['violations'] == ["TLyqzVGLV1srkB7dToTAEqgDSfPtXRJZYH"]
+
+        assert manager.remove_address(OLD_ADDRESS)
+        assert not manager.is_whitelisted(OLD_ADDRESS)
+        assert manager.get_stats()['total_addresses'] == 1
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: 通过")
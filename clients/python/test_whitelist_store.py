@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试紧凑白名单存储
+
+功能：
+- 验证紧凑文件的构建、打开和查找（含分区与Bloom过滤器）
+- 验证增量写出新文件且不影响旧实例
+- 验证白名单管理器在compact模式下同步、重启加载和旧缓存迁移
+"""
+
+import sys
+import json
+import random
+import logging
+import tempfile
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from core.config import AppConfig
+from modules.whitelist import WhitelistManager
+from modules.whitelist_store import CompactWhitelist
+from mock_server import MockBackend
+
+logger = logging.getLogger(__name__)
+
+ETH_ADDRESS = "0x742d35cc6634c0532925a3b8d4c9db96c4b4d8b6"
+BTC_ADDRESS = "1a1zp1ep5qgefi2dmptftl5slmv7divfna"
+TRX_ADDRESS = "tlyqzvglv1srkb7dtotaeqgdsfptxrjzyh"
+
+
+def _random_addresses(count: int, seed: int = 1):
+    rng = random.Random(seed)
+    return [f"0x{rng.getrandbits(160):040x}" for _ in range(count)]
+
+
+def test_build_open_and_lookup():
+    """构建后重新打开，全部地址可查到，随机地址查不到"""
+    addresses = _random_addresses(5000)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "whitelist.bin"
+        CompactWhitelist.build(path, addresses + addresses[:10], metadata={'whitelist_version': 'v1'})
+
+        store = CompactWhitelist(path)
+        assert len(store) == 5000
+        assert store.metadata == {'whitelist_version': 'v1'}
+        assert all(address in store for address in addresses)
+        assert not any(address in store for address in _random_addresses(5000, seed=2))
+        store.close()
+
+
+def test_bloom_has_no_false_negatives():
+    """启用Bloom过滤器后不漏判，且大部分不存在的地址被过滤器直接排除"""
+    addresses = _random_addresses(5000)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = CompactWhitelist.build(Path(tmp_dir) / "bloom.bin", addresses, bloom_bits_per_entry=10)
+        assert store.bloom_bits_per_entry == 10
+        assert all(address in store for address in addresses)
+        assert not any(address in store for address in _random_addresses(5000, seed=3))
+
+
+def test_partitions_by_chain():
+    """按链分区后，指定链类型只查找对应分区"""
+    def partition_of(address):
+        return 'ETH' if address.startswith('0x') else 'OTHER'
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = CompactWhitelist.build(Path(tmp_dir) / "chains.bin", [ETH_ADDRESS, BTC_ADDRESS, TRX_ADDRESS],
+                                       partition_of=partition_of)
+        assert store.partitions == {'ETH': 1, 'OTHER': 2}
+        assert store.contains(ETH_ADDRESS, 'ETH')
+        assert not store.contains(ETH_ADDRESS, 'OTHER')
+        assert store.contains(BTC_ADDRESS)
+
+
+def test_apply_delta_keeps_old_instance():
+    """增量写出新文件，旧实例内容不变"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        old = CompactWhitelist.build(Path(tmp_dir) / "v1.bin", [ETH_ADDRESS, BTC_ADDRESS], bloom_bits_per_entry=8)
+        new = old.apply_delta(Path(tmp_dir) / "v2.bin", added=[TRX_ADDRESS], removed=[BTC_ADDRESS])
+
+        assert BTC_ADDRESS in old and TRX_ADDRESS not in old
+        assert BTC_ADDRESS not in new and TRX_ADDRESS in new and ETH_ADDRESS in new
+        assert len(new) == 2
+        assert new.bloom_bits_per_entry == old.bloom_bits_per_entry
+
+
+def _make_manager(api_base_url: str, cache_dir: str) -> WhitelistManager:
+    config = AppConfig()
+    config.server.api_base_url = api_base_url
+    config.server.timeout = 5
+    manager = WhitelistManager(config, logger)
+    # 先指向临时缓存再切换为compact，避免迁移仓库中的缓存文件
+    manager._cache_file = Path(cache_dir) / "whitelist.json"
+    config.whitelist.store = 'compact'
+    manager._compact = True
+    manager._publish(frozenset(), 0)
+    manager._etag = None
+    manager._load_cache()
+    return manager
+
+
+def test_manager_compact_sync_and_restart():
+    """compact模式：同步写出紧凑文件，JSON缓存不含地址，重启后直接映射"""
+    backend = MockBackend()
+    backend.set_whitelist([ETH_ADDRESS, BTC_ADDRESS])
+    backend.start()
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            manager = _make_manager(backend.api_base_url, cache_dir)
+            assert manager.force_sync()
+            assert isinstance(manager.get_snapshot().addresses, CompactWhitelist)
+
+            backend.set_whitelist([ETH_ADDRESS, TRX_ADDRESS])
+            assert manager.force_sync()
+            assert manager.get_stats()['delta_syncs'] == 1
+            assert manager.is_whitelisted(TRX_ADDRESS)
+            assert not manager.is_whitelisted(BTC_ADDRESS)
+
+            cache_data = json.loads(manager._cache_file.read_text(encoding='utf-8'))
+            assert 'addresses' not in cache_data
+            assert list(Path(cache_dir).glob("whitelist-*.bin")) == [Path(cache_dir) / cache_data['store_file']]
+
+            restarted = _make_manager(backend.api_base_url, cache_dir)
+            assert restarted.is_whitelisted(ETH_ADDRESS)
+            assert restarted.get_snapshot().version == backend.whitelist_version
+            assert restarted.force_sync()
+            assert restarted.get_stats()['not_modified'] == 1
+    finally:
+        backend.stop()
+
+
+def test_manager_migrates_json_cache():
+    """compact模式启动时把旧JSON地址缓存迁移为紧凑文件"""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache_file = Path(cache_dir) / "whitelist.json"
+        cache_file.write_text(json.dumps({'addresses': [ETH_ADDRESS], 'last_update': 0}), encoding='utf-8')
+
+        manager = _make_manager("http://127.0.0.1:9/api", cache_dir)
+        assert manager.is_whitelisted(ETH_ADDRESS)
+        assert isinstance(manager.get_snapshot().addresses, CompactWhitelist)
+        assert 'store_file' in json.loads(cache_file.read_text(encoding='utf-8'))
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_") and callable(func):
+            func()
+            print(f"{name}: 通过")